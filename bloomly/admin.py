@@ -1,7 +1,8 @@
 from django.contrib import admin
 from .models import (
     ProfilUzytkownika, Roslina, CzynoscPielegnacyjna, Przypomnienie,
-    Kategoria, Post, Komentarz, BazaRoslin, AnalizaPielegnacji
+    Kategoria, Post, Komentarz, BazaRoslin, AnalizaPielegnacji,
+    ArtefaktModelu, ReferencjaArtefaktu, TrainingRun, OutboxEmail,
 )
 
 admin.site.register(ProfilUzytkownika)
@@ -77,6 +78,14 @@ class AnalizaPielegnacjiAdmin(admin.ModelAdmin):
             ),
             'classes': ('collapse',),
         }),
+        ('Koszt modelu', {
+            'fields': (
+                'czas_treningu',
+                'czas_predykcji',
+                'kandydaci_modeli',
+            ),
+            'classes': ('collapse',),
+        }),
         ('Składowe pewności', {
             'fields': (
                 'pewnosc_model',
@@ -97,3 +106,43 @@ class AnalizaPielegnacjiAdmin(admin.ModelAdmin):
     def get_queryset(self, request):
         qs = super().get_queryset(request)
         return qs.select_related('roslina', 'uzytkownik')
+
+
+@admin.register(ReferencjaArtefaktu)
+class ReferencjaArtefaktuAdmin(admin.ModelAdmin):
+    list_display = ['nazwa', 'sha256', 'data_aktualizacji']
+    search_fields = ['nazwa', 'sha256']
+
+
+@admin.register(ArtefaktModelu)
+class ArtefaktModeluAdmin(admin.ModelAdmin):
+    list_display = ['sha256', 'rozmiar', 'data_utworzenia']
+    exclude = ['dane']
+
+
+@admin.register(TrainingRun)
+class TrainingRunAdmin(admin.ModelAdmin):
+    list_display = ['roslina', 'rodzaj', 'wynik', 'typ_modelu', 'liczba_wierszy',
+                    'czas_calkowity', 'czas_fit', 'data_rozpoczecia']
+    list_filter = ['rodzaj', 'wynik', 'typ_modelu']
+    search_fields = ['roslina__nazwa', 'task_id']
+    list_select_related = ['roslina']
+    date_hierarchy = 'data_rozpoczecia'
+
+
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = ['adresat', 'temat', 'status', 'proby', 'nastepna_proba', 'data_wyslania']
+    list_filter = ['status']
+    search_fields = ['adresat', 'temat', 'ostatni_blad']
+    date_hierarchy = 'data_utworzenia'
+    actions = ['ponow_wysylke']
+
+    @admin.action(description="Ponów wysyłkę (także porzucone)")
+    def ponow_wysylke(self, request, queryset):
+        from django.utils import timezone
+
+        n = queryset.exclude(status='wyslany').update(
+            status='oczekuje', proby=0, nastepna_proba=timezone.now()
+        )
+        self.message_user(request, f"Ponowiono {n} wiadomości")
@@ -0,0 +1,118 @@
+"""
+Podsumowanie strony głównej (dashboard użytkownika) z cache.
+
+Dane dashboardu (liczba roślin, liczba do podlania, ostatnie czynności, pilne
+przypomnienia) liczone są kilkoma zapytaniami agregującymi i trzymane w cache
+per użytkownik. Unieważnianie przez wersję:
+  - klucz wersji użytkownika jest podbijany (incr) po zatwierdzeniu transakcji,
+    w której zmieniły się jego rośliny, czynności albo przypomnienia
+    (sygnały w models.py + operacje zbiorcze, które sygnały omijają),
+  - wpis danych pamięta wersję, z którą został policzony – inna wersja = chybienie.
+
+Odczyt to jedno get_many (wersja + dane). Nowa wersja startuje od znacznika czasu,
+więc wyrzucony z cache klucz wersji nie może „wskrzesić” starych danych.
+TTL ogranicza nieaktualność części zależnych od zegara (do podlania, pilne).
+"""
+
+import logging
+import time
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from .models import CzynoscPielegnacyjna, Przypomnienie, Roslina
+
+logger = logging.getLogger(__name__)
+
+CZAS_ZYCIA_S = getattr(settings, "DASHBOARD_CACHE_TTL", 300)
+LIMIT_LISTY = 5
+HORYZONT_PILNYCH = timedelta(hours=getattr(settings, "NOTIFICATION_ADVANCE_HOURS", 24))
+
+
+def _klucz_wersji(uzytkownik_id):
+    return f"bloomly:dashboard:{uzytkownik_id}:wersja"
+
+
+def _klucz_danych(uzytkownik_id):
+    return f"bloomly:dashboard:{uzytkownik_id}:dane"
+
+
+def policz_podsumowanie(uzytkownik_id) -> dict:
+    """Dane dashboardu prosto z bazy (bez cache)."""
+    liczniki = Roslina.objects.filter(wlasciciel_id=uzytkownik_id, is_active=True).aggregate(
+        liczba_roslin=Count("id"),
+        rosliny_do_podlania=Count("id", filter=Roslina.warunek_do_podlania()),
+    )
+    ostatnie_czynnosci = list(
+        CzynoscPielegnacyjna.objects.filter(uzytkownik_id=uzytkownik_id)
+        .select_related("roslina")
+        .order_by("-data")[:LIMIT_LISTY]
+    )
+    pilne_przypomnienia = list(
+        Przypomnienie.objects.filter(
+            uzytkownik_id=uzytkownik_id,
+            status__in=Przypomnienie.STATUSY_OTWARTE,
+            data_przypomnienia__lte=timezone.now() + HORYZONT_PILNYCH,
+        )
+        .select_related("roslina")
+        .order_by("data_przypomnienia")[:LIMIT_LISTY]
+    )
+    return {
+        **liczniki,
+        "ostatnie_czynnosci": ostatnie_czynnosci,
+        "pilne_przypomnienia": pilne_przypomnienia,
+    }
+
+
+def _nowa_wersja(uid):
+    wersja = time.time_ns()
+    if not cache.add(_klucz_wersji(uid), wersja, timeout=None):
+        wersja = cache.get(_klucz_wersji(uid), wersja)
+    return wersja
+
+
+def wersja_danych(uzytkownik_id):
+    """
+    Bieżąca wersja danych użytkownika (rośliny, czynności, przypomnienia).
+    Podbijana tymi samymi sygnałami co dashboard – do kluczy innych cache per użytkownik.
+    """
+    wersja = cache.get(_klucz_wersji(uzytkownik_id))
+    return _nowa_wersja(uzytkownik_id) if wersja is None else wersja
+
+
+def podsumowanie_dashboardu(uzytkownik) -> dict:
+    """Dane dashboardu z cache; przy chybieniu liczone i zapisywane pod bieżącą wersją."""
+    uid = uzytkownik.pk
+    trafienia = cache.get_many([_klucz_wersji(uid), _klucz_danych(uid)])
+    wersja = trafienia.get(_klucz_wersji(uid))
+    wpis = trafienia.get(_klucz_danych(uid))
+    if wersja is not None and wpis is not None and wpis["wersja"] == wersja:
+        return wpis["dane"]
+
+    if wersja is None:
+        wersja = _nowa_wersja(uid)
+
+    dane = policz_podsumowanie(uid)
+    cache.set(_klucz_danych(uid), {"wersja": wersja, "dane": dane}, timeout=CZAS_ZYCIA_S)
+    return dane
+
+
+def _podbij_wersje(uzytkownicy_ids):
+    for uid in uzytkownicy_ids:
+        try:
+            cache.incr(_klucz_wersji(uid))
+        except ValueError:
+            # brak klucza wersji = i tak chybienie przy następnym odczycie
+            pass
+
+
+def uniewaznij_dashboard(uzytkownicy_ids):
+    """Podbija wersję dashboardu użytkowników po zatwierdzeniu bieżącej transakcji."""
+    ids = {uid for uid in uzytkownicy_ids if uid is not None}
+    if ids:
+        transaction.on_commit(lambda: _podbij_wersje(ids))
@@ -62,8 +62,9 @@ class ProfilForm(forms.ModelForm):
     )
     class Meta:
         model = ProfilUzytkownika
-        fields = ['telefon', 'data_urodzenia', 'powiadomienia_email', 'biogram']
+        fields = ['telefon', 'data_urodzenia', 'powiadomienia_email', 'godzina_powiadomien', 'biogram']
         widgets = {
+            'godzina_powiadomien': forms.NumberInput(attrs={'class': 'form-control', 'min': 0, 'max': 23, 'placeholder': 'auto'}),
             'data_urodzenia': forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}),
             'telefon': forms.TextInput(attrs={'class': 'form-control', 'placeholder': '+48 123 456 789'}),
             'biogram': forms.Textarea(attrs={'class': 'form-control', 'rows': 4, 'placeholder': 'Napisz kilka słów o sobie (max 600 znaków)…'}),
@@ -182,6 +183,19 @@ class WykonajPrzypomnienieForm(forms.Form):
             raise forms.ValidationError("Data nie może być w przyszłości.")
         return dt
 
+
+class ImportHistoriiForm(forms.Form):
+    plik = forms.FileField(
+        widget=forms.ClearableFileInput(attrs={"class": "form-control", "accept": ".csv,.ndjson,.jsonl,.json"}),
+        label="Plik z historią (CSV lub NDJSON)",
+    )
+    format = forms.ChoiceField(
+        required=False,
+        choices=[("", "wykryj z rozszerzenia"), ("csv", "CSV"), ("ndjson", "NDJSON (obiekt JSON w każdej linii)")],
+        widget=forms.Select(attrs={"class": "form-control"}),
+        label="Format",
+    )
+
 # -----------------------------
 # Forum / Baza wiedzy
 # -----------------------------
@@ -215,13 +229,17 @@ class PostForm(forms.ModelForm):
         ).order_by("nazwa")
         sub_qs_all = Kategoria.objects.filter(
             typ="forum", aktywna=True, rodzic__isnull=False
-        )
+        ).order_by("nazwa")
+
+        # podkategorie jednym zapytaniem, pogrupowane po rodzicu
+        children_by_parent = {}
+        for child in sub_qs_all:
+            children_by_parent.setdefault(child.rodzic_id, []).append(child)
 
         choices = []
         for parent in main_qs:
             group = [(parent.pk, f"— {parent.nazwa}")]
-            children = sub_qs_all.filter(rodzic=parent).order_by("nazwa")
-            group += [(child.pk, f"↳ {child.nazwa}") for child in children]
+            group += [(child.pk, f"↳ {child.nazwa}") for child in children_by_parent.get(parent.pk, [])]
             choices.append((parent.nazwa, group))
         self.fields["kategoria"].choices = choices
 
@@ -0,0 +1,302 @@
+"""
+Import historii czynności (głównie podlewań) z CSV / NDJSON.
+
+Zapis wiersz po wierszu przez CzynoscPielegnacyjna.save() to ~4 zapytania na
+wiersz (poprzednie podlewanie, UPDATE interwal_dni, Roslina.save). Import:
+  1) czyta plik strumieniowo (csv.DictReader / linia po linii), waliduje wiersze,
+  2) zapisuje pakietami bulk_create (duplikaty roślina+typ+data są pomijane),
+  3) po imporcie liczy interwal_dni per roślina na posortowanych tablicach numpy
+     i aktualizuje tylko zmienione wiersze,
+  4) przelicza liczniki podlań (liczba, ostatnie/następne podlewanie) raz na
+     roślinę i oznacza rośliny do odświeżenia przypomnień (bulk_create / update()
+     omijają sygnały).
+
+Pamięć: jeden pakiet wierszy + słowniki per roślina; historia pojedynczej rośliny
+przy liczeniu interwałów.
+"""
+
+import csv
+import io
+import json
+import logging
+
+from datetime import datetime, time
+
+import numpy as np
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .dashboard import uniewaznij_dashboard
+from .models import CzynoscPielegnacyjna, Roslina, oznacz_rosliny_do_odswiezenia, przelicz_liczniki_podlan
+
+logger = logging.getLogger(__name__)
+
+ROZMIAR_PAKIETU = 2000
+# Limit pliku przy imporcie synchronicznym (widok import_historii)
+MAKS_ROZMIAR_PLIKU = getattr(settings, "IMPORT_HISTORII_MAX_BYTES", 10 * 1024 * 1024)
+MAKS_ZAPISANYCH_BLEDOW = 50
+FORMATY = ("csv", "ndjson")
+
+# Wiersz pliku: roslina_id albo roslina (nazwa rośliny użytkownika), data (ISO 8601;
+# sama data = południe czasu lokalnego), opcjonalnie typ, wykonane, stan_gleby,
+# ilosc_wody, notatki.
+KOLUMNY = ("roslina_id", "roslina", "data", "typ", "wykonane", "stan_gleby", "ilosc_wody", "notatki")
+
+_TYPY = {k for k, _ in CzynoscPielegnacyjna.TYPY_CZYNNOSCI}
+_STANY_GLEBY = {k for k, _ in CzynoscPielegnacyjna.STAN_GLEBY}
+_ILOSCI_WODY = {k for k, _ in CzynoscPielegnacyjna.ILOSC_WODY}
+_PRAWDA = {"1", "true", "tak", "t", "yes", "y"}
+_FALSZ = {"0", "false", "nie", "n", "no", "f"}
+
+
+class BladWiersza(ValueError):
+    pass
+
+
+def wykryj_format(nazwa_pliku: str) -> str:
+    nazwa = (nazwa_pliku or "").lower()
+    if nazwa.endswith((".ndjson", ".jsonl", ".json")):
+        return "ndjson"
+    return "csv"
+
+
+def czytaj_wiersze(strumien, format="csv"):
+    """Generator (numer_linii, dict) – bez wczytywania całego pliku."""
+    if format == "csv":
+        czytnik = csv.DictReader(strumien)
+        for wiersz in czytnik:
+            yield czytnik.line_num, wiersz
+    elif format == "ndjson":
+        for nr, linia in enumerate(strumien, start=1):
+            linia = linia.strip()
+            if not linia:
+                continue
+            try:
+                wiersz = json.loads(linia)
+            except json.JSONDecodeError as e:
+                yield nr, BladWiersza(f"niepoprawny JSON: {e.msg}")
+                continue
+            yield nr, wiersz if isinstance(wiersz, dict) else BladWiersza("oczekiwano obiektu JSON")
+    else:
+        raise ValueError(f"Nieznany format importu: {format}")
+
+
+def _tekst(wiersz, pole):
+    wartosc = wiersz.get(pole)
+    tekst = "" if wartosc is None else str(wartosc).strip()
+    if "\x00" in tekst:
+        # csv od Pythona 3.11 przepuszcza NUL, a PostgreSQL odrzuca go w polach tekstowych
+        raise BladWiersza(f"znak NUL w kolumnie {pole!r}")
+    return tekst
+
+
+def _data(tekst):
+    dt = parse_datetime(tekst)
+    if dt is None:
+        d = parse_date(tekst)
+        if d is None:
+            raise BladWiersza(f"niepoprawna data: {tekst!r}")
+        dt = datetime.combine(d, time(12))
+    if timezone.is_naive(dt):
+        dt = timezone.make_aware(dt)
+    return dt
+
+
+class _Walidator:
+    """Zamienia wiersz pliku na CzynoscPielegnacyjna (bez zapisu) dla roślin użytkownika."""
+
+    def __init__(self, uzytkownik):
+        self.uzytkownik = uzytkownik
+        self.rosliny = set()
+        self.po_nazwie = {}
+        for pk, nazwa in Roslina.objects.filter(wlasciciel=uzytkownik).values_list("pk", "nazwa"):
+            self.rosliny.add(pk)
+            # nazwa niejednoznaczna -> None (trzeba podać roslina_id)
+            klucz = nazwa.strip().lower()
+            self.po_nazwie[klucz] = None if klucz in self.po_nazwie else pk
+
+    def __call__(self, wiersz) -> CzynoscPielegnacyjna:
+        if isinstance(wiersz, BladWiersza):
+            raise wiersz
+
+        rid = _tekst(wiersz, "roslina_id")
+        if rid:
+            try:
+                roslina_id = int(rid)
+            except ValueError:
+                raise BladWiersza(f"niepoprawne roslina_id: {rid!r}")
+            if roslina_id not in self.rosliny:
+                raise BladWiersza(f"roślina {roslina_id} nie istnieje lub nie należy do użytkownika")
+        else:
+            nazwa = _tekst(wiersz, "roslina").lower()
+            if not nazwa:
+                raise BladWiersza("brak roslina_id / roslina")
+            if nazwa not in self.po_nazwie:
+                raise BladWiersza(f"nieznana roślina: {nazwa!r}")
+            roslina_id = self.po_nazwie[nazwa]
+            if roslina_id is None:
+                raise BladWiersza(f"kilka roślin o nazwie {nazwa!r} – podaj roslina_id")
+
+        if not _tekst(wiersz, "data"):
+            raise BladWiersza("brak daty")
+        data = _data(_tekst(wiersz, "data"))
+
+        typ = _tekst(wiersz, "typ") or "podlewanie"
+        if typ not in _TYPY:
+            raise BladWiersza(f"nieznany typ czynności: {typ!r}")
+
+        wykonane = _tekst(wiersz, "wykonane").lower()
+        if wykonane and wykonane not in _PRAWDA | _FALSZ:
+            raise BladWiersza(f"niepoprawne wykonane: {wykonane!r}")
+
+        stan_gleby = _tekst(wiersz, "stan_gleby") or None
+        if stan_gleby and stan_gleby not in _STANY_GLEBY:
+            raise BladWiersza(f"niepoprawny stan_gleby: {stan_gleby!r}")
+        ilosc_wody = _tekst(wiersz, "ilosc_wody") or None
+        if ilosc_wody and ilosc_wody not in _ILOSCI_WODY:
+            raise BladWiersza(f"niepoprawna ilosc_wody: {ilosc_wody!r}")
+
+        return CzynoscPielegnacyjna(
+            roslina_id=roslina_id,
+            uzytkownik=self.uzytkownik,
+            typ=typ,
+            data=data,
+            wykonane=wykonane not in _FALSZ,
+            stan_gleby=stan_gleby,
+            ilosc_wody=ilosc_wody,
+            notatki=_tekst(wiersz, "notatki"),
+        )
+
+
+def _zapisz_pakiet(pakiet) -> int:
+    """bulk_create bez duplikatów (ta sama roślina, typ i chwila – w bazie lub w pakiecie)."""
+    istniejace = set(
+        CzynoscPielegnacyjna.objects
+        .filter(roslina_id__in={c.roslina_id for c in pakiet}, data__in={c.data for c in pakiet})
+        .values_list("roslina_id", "typ", "data")
+    )
+    nowe = []
+    for c in pakiet:
+        klucz = (c.roslina_id, c.typ, c.data)
+        if klucz not in istniejace:
+            istniejace.add(klucz)
+            nowe.append(c)
+    with transaction.atomic():
+        CzynoscPielegnacyjna.objects.bulk_create(nowe, batch_size=500)
+    return len(nowe)
+
+
+def przelicz_interwaly(roslina_id) -> int:
+    """
+    interwal_dni wszystkich podlewań rośliny jak w CzynoscPielegnacyjna.save():
+    dni od ostatniego podlewania ściśle wcześniejszego. Aktualizuje tylko zmienione.
+    """
+    wiersze = list(
+        CzynoscPielegnacyjna.objects
+        .filter(roslina_id=roslina_id, typ="podlewanie")
+        .order_by("data", "id")
+        .values_list("id", "data", "interwal_dni")
+    )
+    if len(wiersze) < 2:
+        return 0
+
+    ids = np.fromiter((w[0] for w in wiersze), dtype=np.int64, count=len(wiersze))
+    czasy = np.fromiter((w[1].timestamp() for w in wiersze), dtype=np.float64, count=len(wiersze))
+    stare = np.array([np.nan if w[2] is None else w[2] for w in wiersze], dtype=np.float64)
+
+    # indeks ostatniego podlewania o ściśle wcześniejszej dacie (remisy -> dalej wstecz)
+    poprzedni = np.searchsorted(czasy, czasy, side="left") - 1
+    ma_poprzednie = poprzedni >= 0
+    nowe = np.where(ma_poprzednie, (czasy - czasy[np.maximum(poprzedni, 0)]) / 86400.0, np.nan)
+
+    # bez poprzedniego save() niczego nie zmienia – zostawiamy wartość z bazy
+    zmienione = ma_poprzednie & ~np.isclose(nowe, stare, rtol=0, atol=1e-9, equal_nan=False)
+    do_zapisu = [
+        CzynoscPielegnacyjna(pk=int(pk), interwal_dni=float(v))
+        for pk, v in zip(ids[zmienione], nowe[zmienione])
+    ]
+    CzynoscPielegnacyjna.objects.bulk_update(do_zapisu, ["interwal_dni"], batch_size=500)
+    return len(do_zapisu)
+
+
+def importuj_historie(strumien, uzytkownik, format="csv", rozmiar_pakietu=None, postep=None) -> dict:
+    """
+    Importuje czynności ze strumienia tekstowego. Błędne wiersze są pomijane
+    (pierwsze MAKS_ZAPISANYCH_BLEDOW trafia do raportu); nieczytelny plik przerywa
+    czytanie i trafia do blad_pliku. Zwraca liczniki: wiersze, zaimportowane,
+    duplikaty, bledne, rosliny, interwaly, bledy=[(linia, opis)], blad_pliku.
+    """
+    rozmiar_pakietu = rozmiar_pakietu or ROZMIAR_PAKIETU
+    waliduj = _Walidator(uzytkownik)
+    raport = {"wiersze": 0, "zaimportowane": 0, "duplikaty": 0, "bledne": 0,
+              "rosliny": 0, "interwaly": 0, "bledy": [], "blad_pliku": None}
+    dotkniete = set()
+    pakiet = []
+
+    def zapisz():
+        zapisane = _zapisz_pakiet(pakiet)
+        raport["zaimportowane"] += zapisane
+        raport["duplikaty"] += len(pakiet) - zapisane
+        pakiet.clear()
+        if postep:
+            postep(raport)
+
+    wiersze = czytaj_wiersze(strumien, format)
+    nr = 0
+    while True:
+        try:
+            nr, wiersz = next(wiersze)
+        except StopIteration:
+            break
+        except (UnicodeDecodeError, csv.Error) as e:
+            # nieczytelny plik (kodowanie, uszkodzony CSV) – dalej nie da się czytać;
+            # to, co już przeczytane, zapisujemy jak zwykle
+            raport["blad_pliku"] = (
+                "plik nie jest w kodowaniu UTF-8" if isinstance(e, UnicodeDecodeError)
+                else f"uszkodzony plik CSV: {e}"
+            )
+            raport["bledne"] += 1
+            raport["bledy"].append((nr + 1, raport["blad_pliku"]))
+            break
+        raport["wiersze"] += 1
+        try:
+            c = waliduj(wiersz)
+        except BladWiersza as e:
+            raport["bledne"] += 1
+            if len(raport["bledy"]) < MAKS_ZAPISANYCH_BLEDOW:
+                raport["bledy"].append((nr, str(e)))
+            continue
+
+        pakiet.append(c)
+        dotkniete.add(c.roslina_id)
+        if len(pakiet) >= rozmiar_pakietu:
+            zapisz()
+    if pakiet:
+        zapisz()
+
+    if raport["zaimportowane"]:
+        for roslina_id in sorted(dotkniete):
+            raport["interwaly"] += przelicz_interwaly(roslina_id)
+        przelicz_liczniki_podlan(dotkniete, tylko_do_przodu=True)
+        oznacz_rosliny_do_odswiezenia(dotkniete)
+        uniewaznij_dashboard([uzytkownik.pk])
+    raport["rosliny"] = len(dotkniete)
+
+    logger.info(
+        f"[IMPORT] {uzytkownik}: {raport['zaimportowane']}/{raport['wiersze']} wierszy, "
+        f"duplikaty {raport['duplikaty']}, błędne {raport['bledne']}, roślin {raport['rosliny']}"
+    )
+    return raport
+
+
+def importuj_plik(plik, uzytkownik, format=None, **opcje) -> dict:
+    """Import z pliku binarnego (np. UploadedFile) – dekodowanie UTF-8 w locie."""
+    format = format or wykryj_format(getattr(plik, "name", ""))
+    strumien = io.TextIOWrapper(getattr(plik, "file", plik), encoding="utf-8-sig", newline="")
+    try:
+        return importuj_historie(strumien, uzytkownik, format=format, **opcje)
+    finally:
+        strumien.detach()
@@ -0,0 +1,146 @@
+"""
+Zdarzenia kalendarza pielęgnacji (FullCalendar) z cache.
+
+FullCalendar przy każdym przełączeniu widoku pyta o zakres start–end (siatka
+miesiąca), zwykle wielokrotnie o ten sam. Dlatego:
+  - przypomnienia i czynności są filtrowane po zakresie w bazie
+    (data_przypomnienia__range / data__range) i pobierane jako values(),
+  - gotowy JSON zdarzeń trzymany jest w cache per (użytkownik, okno),
+  - wpis pamięta wersję danych użytkownika (dashboard.wersja_danych – podbijana
+    tymi samymi sygnałami co dashboard); inna wersja = chybienie,
+  - ETag to (użytkownik, wersja, okno), więc odpowiedź 304 nie wymaga
+    ani zapytań do bazy, ani odczytu samych zdarzeń.
+"""
+
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils import timezone
+
+from .dashboard import wersja_danych
+from .models import CzynoscPielegnacyjna, Przypomnienie
+
+CZAS_ZYCIA_S = getattr(settings, "KALENDARZ_CACHE_TTL", 3600)
+
+STATUSY_PRZYPOMNIEN = ("oczekujace", "wyslane", "odlozone")
+
+KOLORY_PRZYPOMNIEN = {
+    "oczekujace": ("#ffcc33", "#ffcc33", "#000000"),
+    "wyslane": ("#81c784", "#81c784", "#ffffff"),
+    "wykonane": ("#43a047", "#43a047", "#ffffff"),
+    "odlozone": ("#7986cb", "#7986cb", "#ffffff"),
+}
+
+KOLORY_HISTORII = {
+    "podlewanie": ("#38B0DE", "#38B0DE", "#ffffff"),
+    "nawozenie": ("#f48fb1", "#f48fb1", "#ffffff"),
+    "przycinanie": ("#ff8a65", "#ff8a65", "#ffffff"),
+    "przesadzanie": ("#a1887f", "#a1887f", "#ffffff"),
+    "_default": ("#CED4DA", "#CED4DA", "#1F2D3D"),
+}
+
+_TYPY_PRZYPOMNIEN = dict(Przypomnienie.TYPY_PRZYPOMNIE)
+_TYPY_CZYNNOSCI = dict(CzynoscPielegnacyjna.TYPY_CZYNNOSCI)
+_STANY_GLEBY = dict(CzynoscPielegnacyjna.STAN_GLEBY)
+
+
+def _okno(start, end):
+    return f"{int(start.timestamp())}-{int(end.timestamp())}"
+
+
+def _klucz_zdarzen(uzytkownik_id, start, end):
+    return f"bloomly:kalendarz:{uzytkownik_id}:{_okno(start, end)}"
+
+
+def etag_zdarzen(uzytkownik_id, wersja, start, end) -> str:
+    return f'"kal-{uzytkownik_id}-{wersja}-{_okno(start, end)}"'
+
+
+def zdarzenia_kalendarza(uzytkownik_id, start, end) -> list:
+    """Zdarzenia FullCalendar (przypomnienia + historia) z zakresu [start, end] prosto z bazy."""
+    adresy = {}
+
+    def url_rosliny(roslina_id):
+        if roslina_id not in adresy:
+            adresy[roslina_id] = reverse("szczegoly_rosliny", args=[roslina_id])
+        return adresy[roslina_id]
+
+    zdarzenia = []
+    przypomnienia = Przypomnienie.objects.filter(
+        uzytkownik_id=uzytkownik_id,
+        status__in=STATUSY_PRZYPOMNIEN,
+        data_przypomnienia__range=(start, end),
+    ).order_by().values("id", "tytul", "typ", "status", "data_przypomnienia", "roslina_id", "roslina__nazwa")
+
+    for r in przypomnienia:
+        bg, bd, fg = KOLORY_PRZYPOMNIEN.get(r["status"], KOLORY_PRZYPOMNIEN["oczekujace"])
+        tytul = r["tytul"] or _TYPY_PRZYPOMNIEN.get(r["typ"], r["typ"])
+        zdarzenia.append({
+            "id": f"rem-{r['id']}",
+            "title": f"🔔 {tytul} • {r['roslina__nazwa']}",
+            "start": timezone.localtime(r["data_przypomnienia"]).isoformat(),
+            "allDay": False,
+            "url": url_rosliny(r["roslina_id"]),
+            "backgroundColor": bg,
+            "borderColor": bd,
+            "textColor": fg,
+            "extendedProps": {
+                "kind": "reminder",
+                "status": r["status"],
+                "roslina": r["roslina__nazwa"],
+            },
+        })
+
+    historia = CzynoscPielegnacyjna.objects.filter(
+        uzytkownik_id=uzytkownik_id, data__range=(start, end)
+    ).order_by().values(
+        "id", "typ", "data", "notatki", "ilosc_wody", "stan_gleby", "roslina_id", "roslina__nazwa"
+    )
+
+    for c in historia:
+        typ = c["typ"] or "_default"
+        bg, bd, fg = KOLORY_HISTORII.get(typ, KOLORY_HISTORII["_default"])
+        typ_txt = _TYPY_CZYNNOSCI.get(typ, str(typ).capitalize())
+
+        bits = []
+        if c["ilosc_wody"]:
+            bits.append(f"{c['ilosc_wody']} ml")
+        if c["stan_gleby"]:
+            bits.append(_STANY_GLEBY.get(c["stan_gleby"], c["stan_gleby"]))
+        subtitle = f" • {' • '.join(bits)}" if bits else ""
+
+        zdarzenia.append({
+            "id": f"hist-{c['id']}",
+            "title": f"🌿 {typ_txt} • {c['roslina__nazwa']}{subtitle}",
+            "start": timezone.localtime(c["data"]).isoformat(),
+            "allDay": False,
+            "url": url_rosliny(c["roslina_id"]),
+            "backgroundColor": bg,
+            "borderColor": bd,
+            "textColor": fg,
+            "extendedProps": {
+                "kind": "history",
+                "typ": typ,
+                "roslina": c["roslina__nazwa"],
+                "notatki": c["notatki"] or "",
+                "ilosc_wody": c["ilosc_wody"],
+                "stan_gleby": c["stan_gleby"],
+            },
+        })
+
+    return zdarzenia
+
+
+def json_zdarzen(uzytkownik_id, wersja, start, end) -> str:
+    """JSON zdarzeń z cache; przy chybieniu liczony i zapisywany pod podaną wersją."""
+    klucz = _klucz_zdarzen(uzytkownik_id, start, end)
+    wpis = cache.get(klucz)
+    if wpis is not None and wpis["wersja"] == wersja:
+        return wpis["json"]
+
+    tresc = json.dumps(zdarzenia_kalendarza(uzytkownik_id, start, end))
+    cache.set(klucz, {"wersja": wersja, "json": tresc}, timeout=CZAS_ZYCIA_S)
+    return tresc
+
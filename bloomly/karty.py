@@ -0,0 +1,86 @@
+"""
+Karty roślin – wspólna warstwa zapytań dla list, dashboardu i przypomnień.
+
+Każdy widok pokazujący rośliny potrzebuje tego samego zestawu: roślina,
+ostatnie podlanie, otwarte przypomnienie i analiza ML. zapytanie_kart()
+pobiera go stałą liczbą zapytań niezależnie od liczby roślin:
+  1) rośliny + select_related('analiza') + Subquery ostatniego podlania,
+  2) Prefetch otwartych przypomnień (jedno zapytanie dla całej strony).
+Wiersze są zamieniane na lekkie obiekty KartaRosliny (__slots__), więc szablony
+nie mogą przypadkiem dociągnąć relacji (brak leniwych odwołań do ORM).
+"""
+
+from django.db.models import BooleanField, ExpressionWrapper, OuterRef, Prefetch, Subquery
+
+from .models import CzynoscPielegnacyjna, Przypomnienie, Roslina
+
+
+class KartaRosliny:
+    """Dane jednej rośliny do wyświetlenia (bez dostępu do bazy)."""
+
+    __slots__ = (
+        "id", "nazwa", "gatunek", "kategoria", "kategoria_nazwa", "poziom_trudnosci_nazwa",
+        "lokalizacja", "zdjecie", "czestotliwosc_podlewania", "liczba_podlan",
+        "ostatnie_podlewanie", "nastepne_podlewanie", "ostatnie_podlanie", "do_podlania",
+        "analiza", "przypomnienie",
+    )
+
+    def __init__(self, roslina):
+        self.id = roslina.id
+        self.nazwa = roslina.nazwa
+        self.gatunek = roslina.gatunek
+        self.kategoria = roslina.kategoria
+        self.kategoria_nazwa = roslina.get_kategoria_display()
+        self.poziom_trudnosci_nazwa = roslina.get_poziom_trudnosci_display()
+        self.lokalizacja = roslina.lokalizacja
+        self.zdjecie = roslina.zdjecie
+        self.czestotliwosc_podlewania = roslina.czestotliwosc_podlewania
+        self.liczba_podlan = roslina.liczba_podlan
+        self.ostatnie_podlewanie = roslina.ostatnie_podlewanie
+        self.nastepne_podlewanie = roslina.nastepne_podlewanie
+        # datetime ostatniego wykonanego podlewania z historii (Subquery)
+        self.ostatnie_podlanie = roslina.ostatnie_podlanie
+        self.do_podlania = roslina.do_podlania
+        self.analiza = getattr(roslina, "analiza", None)
+        otwarte = getattr(roslina, "otwarte_przypomnienia", None) or [None]
+        self.przypomnienie = otwarte[0]
+
+    @property
+    def pk(self):
+        return self.id
+
+    def __repr__(self):
+        return f"<KartaRosliny {self.id}: {self.nazwa}>"
+
+
+def zapytanie_kart(rosliny, z_przypomnieniami=True):
+    """Queryset roślin z adnotacjami i relacjami potrzebnymi do KartaRosliny."""
+    ostatnie_podlanie = (
+        CzynoscPielegnacyjna.objects
+        .filter(roslina=OuterRef("pk"), typ="podlewanie", wykonane=True)
+        .order_by("-data")
+        .values("data")[:1]
+    )
+    qs = rosliny.select_related("analiza").annotate(
+        ostatnie_podlanie=Subquery(ostatnie_podlanie),
+        do_podlania=ExpressionWrapper(Roslina.warunek_do_podlania(), output_field=BooleanField()),
+    )
+    if z_przypomnieniami:
+        qs = qs.prefetch_related(Prefetch(
+            "przypomnienie_set",
+            queryset=Przypomnienie.objects.filter(status__in=Przypomnienie.STATUSY_OTWARTE)
+            .order_by("data_przypomnienia", "id"),
+            to_attr="otwarte_przypomnienia",
+        ))
+    return qs
+
+
+def karty(rosliny) -> list:
+    """Rośliny (queryset z zapytanie_kart albo już pobrane wiersze) -> lista KartaRosliny."""
+    return [KartaRosliny(r) for r in rosliny]
+
+
+def karty_wg_id(roslina_ids, z_przypomnieniami=False) -> dict:
+    """{id: KartaRosliny} dla podanych roślin – np. do list przypomnień."""
+    qs = zapytanie_kart(Roslina.objects.filter(pk__in=set(roslina_ids)), z_przypomnieniami)
+    return {k.id: k for k in karty(qs.order_by())}
@@ -0,0 +1,100 @@
+import time as _time
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from bloomly.models import (
+    Roslina,
+    AnalizaPielegnacji,
+    Przypomnienie,
+    utworz_przypomnienie_podlewanie,
+)
+from bloomly.przypomnienia import zaplanuj_przypomnienia
+
+
+class _Wycofaj(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Porównuje planer zbiorczy przypomnień z pętlą per roślina (dane syntetyczne, wycofywane)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rosliny', type=int, default=10000, help='Liczba roślin syntetycznych')
+        parser.add_argument('--bez-petli', action='store_true',
+                            help='Pomiń pomiar starej pętli per roślina (wolna przy dużych N)')
+
+    def _dane(self, n):
+        """N roślin: 1/2 z analizą ML, 1/3 z otwartym przypomnieniem."""
+        user = User.objects.create_user(username='benchmark_przypomnien', password='x')
+        dzis = date.today()
+        rosliny = Roslina.objects.bulk_create([
+            Roslina(
+                wlasciciel=user, nazwa=f'Roślina {i}', gatunek='Testowa',
+                kategoria='doniczkowa', czestotliwosc_podlewania=3 + i % 10,
+                ostatnie_podlewanie=dzis - timedelta(days=i % 12) if i % 7 else None,
+                data_zakupu=dzis,
+            )
+            for i in range(n)
+        ], batch_size=1000)
+
+        AnalizaPielegnacji.objects.bulk_create([
+            AnalizaPielegnacji(
+                roslina=r, uzytkownik=user, rekomendowana_czestotliwosc=4 + i % 6,
+                liczba_podlan=3 + i % 8, pewnosc_rekomendacji=0.4 + (i % 5) / 10,
+            )
+            for i, r in enumerate(rosliny) if i % 2 == 0
+        ], batch_size=1000)
+
+        # Jedno otwarte przypomnienie na roślinę – duplikaty odrzuca ograniczenie w bazie
+        Przypomnienie.objects.bulk_create([
+            Przypomnienie(
+                roslina=r, uzytkownik=user, tytul='x', tresc='x',
+                data_przypomnienia=r.data_dodania + timedelta(days=1),
+            )
+            for i, r in enumerate(rosliny) if i % 3 == 0
+        ], batch_size=1000)
+        return user
+
+    def _zmierz(self, opis, fn):
+        zapytania = [0]
+
+        def licz(execute, sql, params, many, context):
+            zapytania[0] += 1
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(licz):
+            start = _time.perf_counter()
+            wynik = fn()
+            czas = _time.perf_counter() - start
+        self.stdout.write(f'{opis:<28} {czas:8.2f} s  {zapytania[0]:7d} zapytań  {wynik or ""}')
+        return czas
+
+    def handle(self, *args, **options):
+        n = options['rosliny']
+        self.stdout.write(f'⏱ Benchmark planera przypomnień: {n} roślin')
+
+        try:
+            with transaction.atomic():
+                user = self._dane(n)
+                rosliny = Roslina.objects.filter(wlasciciel=user, is_active=True)
+
+                if not options['bez_petli']:
+                    sid = transaction.savepoint()
+
+                    def petla():
+                        for r in rosliny.select_related('analiza', 'wlasciciel'):
+                            utworz_przypomnienie_podlewanie(r)
+
+                    self._zmierz('pętla per roślina', petla)
+                    transaction.savepoint_rollback(sid)
+
+                self._zmierz('planer zbiorczy', lambda: zaplanuj_przypomnienia(rosliny))
+                self._zmierz('planer (bez zmian)', lambda: zaplanuj_przypomnienia(rosliny))
+                raise _Wycofaj()
+        except _Wycofaj:
+            pass
+
+        self.stdout.write(self.style.SUCCESS('✓ Dane syntetyczne wycofane'))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from bloomly.ml_dataset import eksportuj_zbior, katalog_domyslny
+
+
+class Command(BaseCommand):
+    help = 'Eksportuje podlewania i atrybuty roślin do plików kolumnowych .npy (przyrostowo)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--katalog', default=None,
+                            help='Katalog docelowy (domyślnie settings.ML_DATASET_DIR)')
+        parser.add_argument('--pelny', action='store_true',
+                            help='Eksport od zera zamiast dopisywania nowych wierszy')
+        parser.add_argument('--pakiet', type=int, default=5000,
+                            help='Liczba wierszy zapisywanych naraz')
+
+    def handle(self, *args, **options):
+        katalog = options['katalog'] or katalog_domyslny()
+        tryb = 'pełny' if options['pelny'] else 'przyrostowy'
+        self.stdout.write(f'📦 Eksport zbioru ML ({tryb}) -> {katalog}')
+
+        manifest = eksportuj_zbior(
+            katalog=katalog,
+            pelny=options['pelny'],
+            rozmiar_pakietu=options['pakiet'],
+            postep=lambda n: self.stdout.write(f'  … {n} nowych wierszy'),
+        )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'✓ Dopisano {manifest["nowe_podlewania"]} podlewań '
+                f'(razem {manifest["liczba_podlewan"]}, roślin: {manifest["liczba_roslin"]})'
+            )
+        )
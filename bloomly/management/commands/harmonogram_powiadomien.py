@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from bloomly.models import Przypomnienie
+from bloomly.przypomnienia import histogram_wysylek, przelicz_terminy_powiadomien
+
+
+class Command(BaseCommand):
+    help = 'Pokazuje rozkład zakolejkowanych e-maili z przypomnieniami na godziny (czas lokalny)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--godzin', type=int, default=24, help='Horyzont w godzinach')
+        parser.add_argument('--przelicz', action='store_true',
+                            help='Najpierw przelicz sloty wysyłki wszystkich niewysłanych przypomnień')
+
+    def handle(self, *args, **options):
+        if options['przelicz']:
+            uzytkownicy = (
+                Przypomnienie.objects.filter(status='oczekujace', termin_powiadomienia__isnull=False)
+                .values_list('uzytkownik_id', flat=True).distinct()
+            )
+            zmienione = przelicz_terminy_powiadomien(list(uzytkownicy))
+            self.stdout.write(f'↻ Przeliczono sloty: {zmienione} przypomnień')
+
+        histogram = histogram_wysylek(godzin=options['godzin'])
+        if not histogram:
+            self.stdout.write('Brak zakolejkowanych e-maili.')
+            return
+
+        szczyt = max(histogram.values())
+        for (dzien, godzina), emaile in histogram.items():
+            pasek = '█' * max(1, round(40 * emaile / szczyt))
+            self.stdout.write(f'{dzien:%d.%m} {godzina:02d}:00  {emaile:6d}  {pasek}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ {sum(histogram.values())} e-maili, szczyt {szczyt}/h'
+        ))
@@ -0,0 +1,42 @@
+import time as _time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from bloomly.import_historii import FORMATY, importuj_historie, wykryj_format
+
+
+class Command(BaseCommand):
+    help = 'Importuje historię czynności (CSV / NDJSON) dla roślin użytkownika – strumieniowo, pakietami'
+
+    def add_arguments(self, parser):
+        parser.add_argument('plik', help='Ścieżka do pliku CSV / NDJSON')
+        parser.add_argument('--uzytkownik', required=True, help='Nazwa użytkownika – właściciela roślin')
+        parser.add_argument('--format', choices=FORMATY, default=None,
+                            help='Format pliku (domyślnie wg rozszerzenia)')
+        parser.add_argument('--pakiet', type=int, default=None, help='Liczba wierszy zapisywanych naraz')
+
+    def handle(self, *args, **options):
+        try:
+            uzytkownik = User.objects.get(username=options['uzytkownik'])
+        except User.DoesNotExist:
+            raise CommandError(f"Nie ma użytkownika {options['uzytkownik']!r}")
+
+        format = options['format'] or wykryj_format(options['plik'])
+        self.stdout.write(f"📥 Import {options['plik']} ({format}) dla {uzytkownik.username}")
+
+        start = _time.perf_counter()
+        with open(options['plik'], encoding='utf-8-sig', newline='') as strumien:
+            raport = importuj_historie(
+                strumien, uzytkownik, format=format, rozmiar_pakietu=options['pakiet'],
+                postep=lambda r: self.stdout.write(f"  … {r['wiersze']} wierszy, zapisano {r['zaimportowane']}"),
+            )
+
+        for linia, opis in raport['bledy']:
+            self.stdout.write(self.style.WARNING(f'  linia {linia}: {opis}'))
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ Zaimportowano {raport['zaimportowane']}/{raport['wiersze']} wierszy "
+            f"(duplikaty: {raport['duplikaty']}, błędne: {raport['bledne']}, "
+            f"roślin: {raport['rosliny']}, interwałów: {raport['interwaly']}) "
+            f"w {_time.perf_counter() - start:.1f} s"
+        ))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from bloomly.models import przelicz_liczniki_podlan
+
+
+class Command(BaseCommand):
+    help = 'Przelicza liczbę podlań, ostatnie i następne podlewanie roślin z historii czynności'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--roslina', type=int, action='append', dest='rosliny',
+                            help='ID rośliny (można podać wiele razy); domyślnie wszystkie')
+
+    def handle(self, *args, **options):
+        poprawione = przelicz_liczniki_podlan(options['rosliny'])
+        self.stdout.write(self.style.SUCCESS(f'✓ Poprawiono liczniki {poprawione} roślin'))
@@ -13,9 +13,9 @@ class Command(BaseCommand):
         if deleted_tasks[0] > 0:
             self.stdout.write(f'Usunięto {deleted_tasks[0]} starych zadań')
 
-        # Zadanie 1: Sprawdzaj przypomnienia co godzinę
-        schedule_hourly, _ = CrontabSchedule.objects.get_or_create(
-            minute='0',
+        # Zadanie 1: Ticker powiadomień co minutę (indeks termin_powiadomienia)
+        schedule_minutely, _ = CrontabSchedule.objects.get_or_create(
+            minute='*',
             hour='*',
             day_of_week='*',
             day_of_month='*',
@@ -23,35 +23,28 @@ class Command(BaseCommand):
         )
 
         PeriodicTask.objects.get_or_create(
-            name='Bloomly - Sprawdź przypomnienia co godzinę',
+            name='Bloomly - Wysyłka należnych powiadomień',
             defaults={
-                'crontab': schedule_hourly,
+                'crontab': schedule_minutely,
                 'task': 'bloomly.tasks.sprawdz_przypomnienia',
                 'enabled': True,
             }
         )
-        self.stdout.write('✓ Zadanie sprawdzania przypomnień (co godzinę)')
-
-        # Zadanie 2: Generuj przypomnienia codziennie o 8:00
-        schedule_daily, _ = CrontabSchedule.objects.get_or_create(
-            minute='0',
-            hour='8',
-            day_of_week='*',
-            day_of_month='*',
-            month_of_year='*',
-        )
+        self.stdout.write('✓ Ticker powiadomień e-mail (co minutę)')
 
+        # Zadanie 1b: Nadawca outboxu e-maili (limit SMTP, ponowienia)
         PeriodicTask.objects.get_or_create(
-            name='Bloomly - Generuj przypomnienia codziennie',
+            name='Bloomly - Wysyłka e-maili z outboxu',
             defaults={
-                'crontab': schedule_daily,
-                'task': 'bloomly.tasks.generuj_przypomnienia_dla_wszystkich',
+                'crontab': schedule_minutely,
+                'task': 'bloomly.tasks.wyslij_outbox',
                 'enabled': True,
             }
         )
-        self.stdout.write('✓ Zadanie generowania przypomnień (8:00 rano)')
+        self.stdout.write('✓ Nadawca outboxu e-maili (co minutę)')
 
-        # NOWE Zadanie 3: Analizuj rośliny codziennie o 2:00
+        # Zadanie 2: Nocny pipeline o 2:00 – analiza ML, odświeżenie przypomnień
+        # i kolejkowanie e-maili w jednym przebiegu (zastępuje osobne zadania 2:00 i 8:00)
         schedule_night, _ = CrontabSchedule.objects.get_or_create(
             minute='0',
             hour='2',
@@ -61,16 +54,16 @@ class Command(BaseCommand):
         )
 
         PeriodicTask.objects.get_or_create(
-            name='Bloomly - Analizuj rośliny ML',
+            name='Bloomly - Nocny pipeline roślin',
             defaults={
                 'crontab': schedule_night,
-                'task': 'bloomly.tasks.analizuj_wszystkie_rosliny',
+                'task': 'bloomly.tasks.nocny_pipeline_roslin',
                 'enabled': True,
             }
         )
-        self.stdout.write('✓ Zadanie analizy ML (2:00 w nocy)')
+        self.stdout.write('✓ Nocny pipeline: analiza ML + przypomnienia + e-maile (2:00 w nocy)')
 
-        # NOWE Zadanie 4: Zastosuj rekomendacje ML w niedziele o 3:00
+        # Zadanie 3: Zastosuj rekomendacje ML w niedziele o 3:00
         schedule_weekly, _ = CrontabSchedule.objects.get_or_create(
             minute='0',
             hour='3',
@@ -89,12 +82,32 @@ class Command(BaseCommand):
         )
         self.stdout.write('✓ Zadanie automatycznego stosowania rekomendacji (niedziela 3:00)')
 
+        # Zadanie 4: Retencja danych codziennie o 4:00 (po pipeline i rekomendacjach)
+        schedule_retention, _ = CrontabSchedule.objects.get_or_create(
+            minute='0',
+            hour='4',
+            day_of_week='*',
+            day_of_month='*',
+            month_of_year='*',
+        )
+
+        PeriodicTask.objects.get_or_create(
+            name='Bloomly - Retencja danych',
+            defaults={
+                'crontab': schedule_retention,
+                'task': 'bloomly.tasks.retencja_danych',
+                'enabled': True,
+            }
+        )
+        self.stdout.write('✓ Retencja: stare przypomnienia, wyniki Celery, sesje, outbox (4:00)')
+
         self.stdout.write(
             self.style.SUCCESS('\n🎉 Wszystkie zadania cykliczne zostały skonfigurowane!')
         )
 
         self.stdout.write('\nUtworzono zadania:')
-        self.stdout.write('• Co godzinę: sprawdzanie przypomnień do wysłania')
-        self.stdout.write('• Codziennie 8:00: generowanie nowych przypomnień')
-        self.stdout.write('• Codziennie 2:00: analiza ML wszystkich roślin')
+        self.stdout.write('• Co minutę: wysyłka należnych powiadomień e-mail')
+        self.stdout.write('• Co minutę: nadawca outboxu (limit SMTP, ponowienia, dead-letter)')
+        self.stdout.write('• Codziennie 2:00: nocny pipeline (analiza ML, przypomnienia, e-maile)')
         self.stdout.write('• Niedziela 3:00: automatyczne stosowanie rekomendacji ML')
+        self.stdout.write('• Codziennie 4:00: retencja danych (pakietami, z pauzami)')
@@ -12,7 +12,14 @@ class Command(BaseCommand):
     def handle(self, *args, **options):
         self.stdout.write('🤖 Trenowanie modeli ML...\n')
 
-        wynik = retrenuj_wszystkie_modele()
+        def postep(i, total, roslina, model_data):
+            if model_data:
+                opis = f'{model_data["model_type"]}, fit {model_data["czas_fit"]:.2f}s'
+            else:
+                opis = 'pominięto'
+            self.stdout.write(f'[{i}/{total}] {roslina.nazwa}: {opis}')
+
+        wynik = retrenuj_wszystkie_modele(postep=postep)
 
         self.stdout.write('\n' + '=' * 50)
         self.stdout.write(
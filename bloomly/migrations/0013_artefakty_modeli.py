@@ -0,0 +1,40 @@
+# Generated by Django 4.2.23 on 2026-10-19 06:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bloomly', '0012_remove_analizapielegnacji_ostatnia_aktualizacja_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArtefaktModelu',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True, verbose_name='SHA-256')),
+                ('dane', models.BinaryField(verbose_name='Dane')),
+                ('rozmiar', models.PositiveIntegerField(default=0, verbose_name='Rozmiar (B)')),
+                ('data_utworzenia', models.DateTimeField(auto_now_add=True, verbose_name='Data utworzenia')),
+            ],
+            options={
+                'verbose_name': 'Artefakt modelu',
+                'verbose_name_plural': 'Artefakty modeli',
+            },
+        ),
+        migrations.CreateModel(
+            name='ReferencjaArtefaktu',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nazwa', models.CharField(max_length=200, unique=True, verbose_name='Nazwa')),
+                ('sha256', models.CharField(max_length=64, verbose_name='SHA-256')),
+                ('data_aktualizacji', models.DateTimeField(auto_now=True, verbose_name='Ostatnia aktualizacja')),
+            ],
+            options={
+                'verbose_name': 'Referencja artefaktu',
+                'verbose_name_plural': 'Referencje artefaktów',
+            },
+        ),
+    ]
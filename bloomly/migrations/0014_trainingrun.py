@@ -0,0 +1,39 @@
+# Generated by Django 4.2.23 on 2026-10-19 06:57
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bloomly', '0013_artefakty_modeli'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrainingRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rodzaj', models.CharField(choices=[('trening', 'Trening modelu'), ('analiza', 'Analiza rośliny')], default='trening', max_length=10, verbose_name='Rodzaj')),
+                ('wynik', models.CharField(choices=[('ok', 'OK'), ('pominiete', 'Pominięte (za mało danych)'), ('blad', 'Błąd')], default='ok', max_length=10, verbose_name='Wynik')),
+                ('typ_modelu', models.CharField(blank=True, max_length=30, verbose_name='Typ modelu')),
+                ('liczba_wierszy', models.IntegerField(default=0, verbose_name='Liczba wierszy')),
+                ('liczba_cech', models.IntegerField(default=0, verbose_name='Liczba cech')),
+                ('czas_calkowity', models.FloatField(default=0.0, verbose_name='Czas całkowity (s)')),
+                ('czas_cv', models.FloatField(blank=True, null=True, verbose_name='Czas CV (s)')),
+                ('czas_fit', models.FloatField(blank=True, null=True, verbose_name='Czas fit (s)')),
+                ('komunikat', models.CharField(blank=True, max_length=255, verbose_name='Komunikat')),
+                ('task_id', models.CharField(blank=True, max_length=255, verbose_name='ID zadania Celery')),
+                ('data_rozpoczecia', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Data rozpoczęcia')),
+                ('roslina', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='treningi', to='bloomly.roslina', verbose_name='Roślina')),
+            ],
+            options={
+                'verbose_name': 'Przebieg treningu ML',
+                'verbose_name_plural': 'Przebiegi treningu ML',
+                'ordering': ['-data_rozpoczecia'],
+                'indexes': [models.Index(fields=['rodzaj', '-data_rozpoczecia'], name='bloomly_tra_rodzaj_a819bf_idx')],
+            },
+        ),
+    ]
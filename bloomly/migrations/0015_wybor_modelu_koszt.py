@@ -0,0 +1,33 @@
+# Generated by Django 4.2.23 on 2026-10-19 07:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bloomly', '0014_trainingrun'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analizapielegnacji',
+            name='czas_predykcji',
+            field=models.FloatField(blank=True, null=True, verbose_name='Czas predykcji (s)'),
+        ),
+        migrations.AddField(
+            model_name='analizapielegnacji',
+            name='czas_treningu',
+            field=models.FloatField(blank=True, null=True, verbose_name='Czas treningu modelu (s)'),
+        ),
+        migrations.AddField(
+            model_name='analizapielegnacji',
+            name='kandydaci_modeli',
+            field=models.JSONField(blank=True, default=list, verbose_name='Ocenione modele (MAE, koszt)'),
+        ),
+        migrations.AlterField(
+            model_name='analizapielegnacji',
+            name='typ_modelu',
+            field=models.CharField(choices=[('RF', 'Random Forest'), ('RFS', 'Random Forest (mały)'), ('GB', 'Gradient Boosting'), ('HGB', 'Histogram Gradient Boosting'), ('STAT', 'Mediana interwałów'), ('Statystyczny', 'Statystyczny (backup)')], default='RF', max_length=12, verbose_name='Typ modelu ML'),
+        ),
+    ]
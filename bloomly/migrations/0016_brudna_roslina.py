@@ -0,0 +1,26 @@
+# Generated by Django 4.2.23 on 2026-10-19 07:19
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bloomly', '0015_wybor_modelu_koszt'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BrudnaRoslina',
+            fields=[
+                ('roslina', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='znacznik_odswiezenia', serialize=False, to='bloomly.roslina', verbose_name='Roślina')),
+                ('data_oznaczenia', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Data oznaczenia')),
+            ],
+            options={
+                'verbose_name': 'Roślina do odświeżenia',
+                'verbose_name_plural': 'Rośliny do odświeżenia',
+            },
+        ),
+    ]
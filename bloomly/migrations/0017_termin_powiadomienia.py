@@ -0,0 +1,30 @@
+# Generated by Django 4.2.23 on 2026-10-19 07:23
+
+from datetime import timedelta
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def wypelnij_termin_powiadomienia(apps, schema_editor):
+    # Tylko przyszłe, niewysłane – przeterminowanych nie powiadamiamy wstecz
+    Przypomnienie = apps.get_model('bloomly', 'Przypomnienie')
+    Przypomnienie.objects.filter(
+        status='oczekujace', wyslane=False, data_przypomnienia__gt=timezone.now()
+    ).update(termin_powiadomienia=models.F('data_przypomnienia') - timedelta(days=3))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bloomly', '0016_brudna_roslina'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='przypomnienie',
+            name='termin_powiadomienia',
+            field=models.DateTimeField(blank=True, db_index=True, help_text='Kiedy wysłać e-mail; puste = nic do wysłania (wysłane, wykonane, po terminie)', null=True, verbose_name='Termin powiadomienia'),
+        ),
+        migrations.RunPython(wypelnij_termin_powiadomienia, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.23 on 2026-10-19 07:36
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('bloomly', '0017_termin_powiadomienia'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxEmail',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nadawca', models.CharField(max_length=255, verbose_name='Nadawca')),
+                ('adresat', models.EmailField(max_length=254, verbose_name='Adresat')),
+                ('temat', models.CharField(max_length=255, verbose_name='Temat')),
+                ('tresc', models.TextField(verbose_name='Treść')),
+                ('przypomnienia', models.JSONField(blank=True, default=list, verbose_name='ID przypomnień')),
+                ('status', models.CharField(choices=[('oczekuje', 'Oczekuje na wysłanie'), ('wyslany', 'Wysłany'), ('martwy', 'Porzucony (dead-letter)')], default='oczekuje', max_length=10, verbose_name='Status')),
+                ('proby', models.PositiveSmallIntegerField(default=0, verbose_name='Liczba prób')),
+                ('nastepna_proba', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Następna próba')),
+                ('ostatni_blad', models.TextField(blank=True, verbose_name='Ostatni błąd')),
+                ('data_utworzenia', models.DateTimeField(auto_now_add=True, verbose_name='Data utworzenia')),
+                ('data_wyslania', models.DateTimeField(blank=True, null=True, verbose_name='Data wysłania')),
+                ('uzytkownik', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='Użytkownik')),
+            ],
+            options={
+                'verbose_name': 'E-mail w kolejce',
+                'verbose_name_plural': 'E-maile w kolejce (outbox)',
+                'ordering': ['nastepna_proba'],
+                'indexes': [models.Index(fields=['status', 'nastepna_proba'], name='bloomly_out_status_62ee46_idx')],
+            },
+        ),
+    ]
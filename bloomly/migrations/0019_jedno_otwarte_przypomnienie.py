@@ -0,0 +1,42 @@
+# Generated by Django 4.2.23 on 2026-10-19 07:41
+
+from django.db import migrations, models
+
+
+def usun_duplikaty_otwartych(apps, schema_editor):
+    # ONE-OPEN jak dotąd w planerach: zostaje najwcześniejsze otwarte, resztę usuwamy
+    Przypomnienie = apps.get_model('bloomly', 'Przypomnienie')
+    widziane, do_usuniecia = set(), []
+    for pid, roslina_id, typ in (
+        Przypomnienie.objects
+        .filter(status__in=['oczekujace', 'wyslane'])
+        .order_by('roslina_id', 'typ', 'data_przypomnienia', 'id')
+        .values_list('id', 'roslina_id', 'typ')
+        .iterator()
+    ):
+        if (roslina_id, typ) in widziane:
+            do_usuniecia.append(pid)
+        else:
+            widziane.add((roslina_id, typ))
+    for i in range(0, len(do_usuniecia), 500):
+        Przypomnienie.objects.filter(id__in=do_usuniecia[i:i + 500]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bloomly', '0018_outbox_email'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='przypomnienie',
+            name='status',
+            field=models.CharField(choices=[('oczekujace', 'Oczekujące'), ('wyslane', 'Wysłane'), ('wykonane', 'Wykonane'), ('anulowane', 'Anulowane')], default='oczekujace', max_length=20, verbose_name='Status'),
+        ),
+        migrations.RunPython(usun_duplikaty_otwartych, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='przypomnienie',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['oczekujace', 'wyslane'])), fields=('roslina', 'typ'), name='jedno_otwarte_przypomnienie'),
+        ),
+    ]
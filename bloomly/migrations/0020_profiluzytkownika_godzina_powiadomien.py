@@ -0,0 +1,19 @@
+# Generated by Django 4.2.23 on 2026-10-19 08:02
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bloomly', '0019_jedno_otwarte_przypomnienie'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profiluzytkownika',
+            name='godzina_powiadomien',
+            field=models.PositiveSmallIntegerField(blank=True, help_text='Puste = wg pór, o których zwykle podlewasz', null=True, validators=[django.core.validators.MaxValueValidator(23)], verbose_name='Godzina powiadomień'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 4.2.23 on 2026-10-19 08:17
+
+from datetime import timedelta
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def wypelnij_liczniki(apps, schema_editor):
+    # jak przelicz_liczniki_podlan, ale bez ruszania ostatnie_podlewanie
+    Roslina = apps.get_model('bloomly', 'Roslina')
+    CzynoscPielegnacyjna = apps.get_model('bloomly', 'CzynoscPielegnacyjna')
+    liczby = dict(
+        CzynoscPielegnacyjna.objects.filter(typ='podlewanie', wykonane=True)
+        .order_by().values('roslina_id').annotate(n=Count('id')).values_list('roslina_id', 'n')
+    )
+    pakiet = []
+    for roslina in Roslina.objects.only('id', 'ostatnie_podlewanie', 'czestotliwosc_podlewania').iterator():
+        roslina.liczba_podlan = liczby.get(roslina.id, 0)
+        if roslina.ostatnie_podlewanie:
+            roslina.nastepne_podlewanie = roslina.ostatnie_podlewanie + timedelta(
+                days=roslina.czestotliwosc_podlewania
+            )
+        pakiet.append(roslina)
+        if len(pakiet) >= 500:
+            Roslina.objects.bulk_update(pakiet, ['liczba_podlan', 'nastepne_podlewanie'])
+            pakiet = []
+    Roslina.objects.bulk_update(pakiet, ['liczba_podlan', 'nastepne_podlewanie'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bloomly', '0020_profiluzytkownika_godzina_powiadomien'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='roslina',
+            name='liczba_podlan',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Liczba podlań'),
+        ),
+        migrations.AddField(
+            model_name='roslina',
+            name='nastepne_podlewanie',
+            field=models.DateField(blank=True, editable=False, null=True, verbose_name='Następne podlewanie'),
+        ),
+        migrations.RunPython(wypelnij_liczniki, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='roslina',
+            index=models.Index(fields=['wlasciciel', 'is_active', 'nastepne_podlewanie'], name='roslina_do_podlania_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.23 on 2026-10-19 08:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bloomly', '0021_liczniki_podlan_rosliny'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='roslina',
+            index=models.Index(fields=['wlasciciel', 'is_active', '-data_dodania', '-id'], name='roslina_nowe_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='roslina',
+            index=models.Index(fields=['wlasciciel', 'is_active', 'nazwa', 'id'], name='roslina_nazwa_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='roslina',
+            index=models.Index(fields=['wlasciciel', 'is_active', 'lokalizacja'], name='roslina_lokalizacja_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='roslina',
+            index=models.Index(fields=['wlasciciel', 'is_active', 'kategoria'], name='roslina_kategoria_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.23 on 2026-10-19 08:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bloomly', '0022_indeksy_listy_roslin'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='czynoscpielegnacyjna',
+            index=models.Index(fields=['roslina', 'typ', 'wykonane', '-data'], name='czynnosc_ostatnie_idx'),
+        ),
+    ]
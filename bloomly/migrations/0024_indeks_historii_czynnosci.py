@@ -0,0 +1,17 @@
+# Generated by Django 4.2.23 on 2026-10-19 08:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bloomly', '0023_indeks_ostatniego_podlania'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='czynoscpielegnacyjna',
+            index=models.Index(fields=['roslina', '-data', '-id'], name='czynnosc_historia_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.23 on 2026-10-19 09:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bloomly', '0024_indeks_historii_czynnosci'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analizapielegnacji',
+            name='migawka',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Migawka analizy'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.23 on 2026-10-19 09:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bloomly', '0025_migawka_analizy'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='przypomnienie',
+            index=models.Index(fields=['uzytkownik', 'status', 'data_przypomnienia', 'id'], name='przypomnienie_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='przypomnienie',
+            index=models.Index(fields=['uzytkownik', 'status', '-data_wykonania', '-id'], name='przypomnienie_wykonane_idx'),
+        ),
+    ]
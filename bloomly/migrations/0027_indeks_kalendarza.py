@@ -0,0 +1,17 @@
+# Generated by Django 4.2.23 on 2026-10-19 09:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bloomly', '0026_indeksy_feedu_przypomnien'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='czynoscpielegnacyjna',
+            index=models.Index(fields=['uzytkownik', 'data'], name='czynnosc_kalendarz_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.23 on 2026-10-19 11:50
+
+from django.db import migrations
+
+
+def oznacz_analizy_bez_migawki(apps, schema_editor):
+    # analizy sprzed migawek: roślina do odświeżenia -> najbliższy nocny pipeline liczy migawkę
+    AnalizaPielegnacji = apps.get_model('bloomly', 'AnalizaPielegnacji')
+    BrudnaRoslina = apps.get_model('bloomly', 'BrudnaRoslina')
+    ids = [
+        roslina_id
+        for roslina_id, migawka in AnalizaPielegnacji.objects.values_list('roslina_id', 'migawka').iterator()
+        if not migawka
+    ]
+    for i in range(0, len(ids), 500):
+        BrudnaRoslina.objects.bulk_create(
+            [BrudnaRoslina(roslina_id=rid) for rid in ids[i:i + 500]], ignore_conflicts=True
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bloomly', '0027_indeks_kalendarza'),
+    ]
+
+    operations = [
+        migrations.RunPython(oznacz_analizy_bez_migawki, migrations.RunPython.noop),
+    ]
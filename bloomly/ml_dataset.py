@@ -0,0 +1,336 @@
+"""
+Migawka zbioru treningowego w plikach kolumnowych (.npy) do pracy offline.
+
+Układ katalogu (settings.ML_DATASET_DIR):
+  podlewania_<kolumna>.npy   – jedna kolumna na plik, wiersze w kolejności dopisywania,
+  rosliny_<kolumna>.npy      – atrybuty roślin (przepisywane przy każdym eksporcie),
+  indeks_kolejnosc.npy       – permutacja wierszy posortowana po (roslina_id, data),
+  indeks_rosliny.npy         – roslina_id, dla których są wiersze (rosnąco),
+  indeks_offsety.npy         – początki grup roślin w indeks_kolejnosc (+ koniec),
+  manifest.json              – liczba wierszy, ostatnie wyeksportowane id, słowniki kodów.
+
+Pliki podlewań mają stały, 128-bajtowy nagłówek .npy, więc eksport przyrostowy
+dopisuje dane na końcu i podmienia tylko kształt w nagłówku. Manifest zapisywany
+jest na końcu – po przerwanym eksporcie nadmiarowe bajty są obcinane.
+
+Pliki przepisywane w całości (rośliny, indeks) są podmieniane atomowo (plik
+tymczasowy + os.replace) – czytelnik z otwartym mmap zostaje przy starej wersji,
+zamiast dostać obcięty plik (SIGBUS).
+
+Odczyt: ZbiorPodlewan(katalog) -> np.load(..., mmap_mode='r') bez ORM.
+"""
+
+import io
+import json
+import logging
+import os
+import struct
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+
+from .ml_storage import _atomowy_zapis
+from .ml_utils import _soil_to_num, _water_category
+from .models import CzynoscPielegnacyjna, Roslina
+
+logger = logging.getLogger(__name__)
+
+WERSJA_FORMATU = 1
+DLUGOSC_NAGLOWKA = 128
+
+# Kolumny podlewań: nazwa -> dtype
+KOLUMNY_PODLEWAN = {
+    "id": np.int64,
+    "roslina_id": np.int64,
+    "data": np.int64,           # sekundy od epoki (UTC)
+    "stan_gleby": np.int8,      # 0 sucha, 1 ok, 2 mokra, -1 brak
+    "ilosc_wody": np.int8,      # 0 mało, 1 średnio, 2 dużo, -1 brak
+    "interwal_dni": np.float32,  # NaN gdy brak poprzedniego podlania
+}
+
+# Kolumny roślin: nazwa -> dtype
+KOLUMNY_ROSLIN = {
+    "id": np.int64,
+    "wlasciciel_id": np.int64,
+    "kategoria": np.int16,          # kod wg manifest["slowniki"]["kategoria"]
+    "poziom_trudnosci": np.int16,   # kod wg manifest["slowniki"]["poziom_trudnosci"]
+    "czestotliwosc_podlewania": np.int16,
+    "is_active": np.bool_,
+}
+
+
+def katalog_domyslny() -> str:
+    return str(getattr(settings, "ML_DATASET_DIR", None) or os.path.join(settings.BASE_DIR, "ml_dataset"))
+
+
+def _plik(katalog, prefix, kolumna):
+    return os.path.join(katalog, f"{prefix}_{kolumna}.npy")
+
+
+# -----------------------------------
+# Format .npy ze stałym nagłówkiem
+# -----------------------------------
+def _naglowek(dtype, n: int) -> bytes:
+    """Nagłówek .npy v1.0 dopełniony do DLUGOSC_NAGLOWKA bajtów (kształt można nadpisać w miejscu)."""
+    slownik = {
+        "descr": np.lib.format.dtype_to_descr(np.dtype(dtype)),
+        "fortran_order": False,
+        "shape": (int(n),),
+    }
+    tekst = repr(slownik).encode("latin1")
+    miejsce = DLUGOSC_NAGLOWKA - 10  # magic(6) + wersja(2) + długość(2)
+    if len(tekst) + 1 > miejsce:
+        raise ValueError("Nagłówek .npy nie mieści się w stałej długości")
+    tekst = tekst.ljust(miejsce - 1) + b"\n"
+    return b"\x93NUMPY\x01\x00" + struct.pack("<H", miejsce) + tekst
+
+
+def _dopisz_kolumne(sciezka, dtype, stara_liczba: int, dane: np.ndarray):
+    """Dopisuje wiersze na końcu pliku i aktualizuje kształt w nagłówku."""
+    dtype = np.dtype(dtype)
+    if not os.path.exists(sciezka):
+        with open(sciezka, "wb") as f:
+            f.write(_naglowek(dtype, 0))
+
+    with open(sciezka, "r+b") as f:
+        # obetnij ewentualne resztki przerwanego eksportu
+        f.truncate(DLUGOSC_NAGLOWKA + stara_liczba * dtype.itemsize)
+        f.seek(0, os.SEEK_END)
+        f.write(np.ascontiguousarray(dane, dtype=dtype).tobytes())
+        f.seek(0)
+        f.write(_naglowek(dtype, stara_liczba + len(dane)))
+
+
+def _zapisz_npy(sciezka, tablica: np.ndarray):
+    """np.save przez plik tymczasowy + os.replace (bez nadpisywania pliku, który ktoś mapuje)."""
+    bufor = io.BytesIO()
+    np.save(bufor, tablica)
+    _atomowy_zapis(sciezka, bufor.getvalue())
+
+
+def _wczytaj_kolumne(sciezka, mmap_mode="r"):
+    if not os.path.exists(sciezka):
+        return None
+    # np.memmap nie obsługuje pustych plików
+    if os.path.getsize(sciezka) <= DLUGOSC_NAGLOWKA and mmap_mode:
+        return np.load(sciezka)
+    return np.load(sciezka, mmap_mode=mmap_mode)
+
+
+def _wczytaj_manifest(katalog):
+    sciezka = os.path.join(katalog, "manifest.json")
+    if not os.path.exists(sciezka):
+        return None
+    with open(sciezka, encoding="utf-8") as f:
+        return json.load(f)
+
+
+# -----------------------------------
+# Eksport
+# -----------------------------------
+def _koduj(wartosc, slownik: list) -> int:
+    if wartosc not in slownik:
+        slownik.append(wartosc)
+    return slownik.index(wartosc)
+
+
+def _kod_gleby(val) -> int:
+    num = _soil_to_num(val)
+    return -1 if np.isnan(num) else int(num)
+
+
+def _kod_wody(val) -> int:
+    kat = _water_category(val)
+    return -1 if kat is None else int(kat)
+
+
+def _eksportuj_rosliny(katalog, slowniki):
+    """Atrybuty roślin są małe – przepisywane w całości przy każdym eksporcie."""
+    wiersze = list(
+        Roslina.objects.order_by("id").values_list(
+            "id", "wlasciciel_id", "kategoria", "poziom_trudnosci",
+            "czestotliwosc_podlewania", "is_active",
+        )
+    )
+    kolumny = {k: [] for k in KOLUMNY_ROSLIN}
+    for rid, wid, kat, trud, czest, aktywna in wiersze:
+        kolumny["id"].append(rid)
+        kolumny["wlasciciel_id"].append(wid)
+        kolumny["kategoria"].append(_koduj(kat or "", slowniki["kategoria"]))
+        kolumny["poziom_trudnosci"].append(_koduj(trud or "", slowniki["poziom_trudnosci"]))
+        kolumny["czestotliwosc_podlewania"].append(czest)
+        kolumny["is_active"].append(aktywna)
+
+    for nazwa, dtype in KOLUMNY_ROSLIN.items():
+        _zapisz_npy(_plik(katalog, "rosliny", nazwa), np.asarray(kolumny[nazwa], dtype=dtype))
+    return len(wiersze)
+
+
+def _indeks(roslina_id, data) -> tuple:
+    """(kolejnosc, rosliny, offsety): permutacja po (roslina_id, data) + początki grup roślin."""
+    liczba = len(roslina_id)
+    if not liczba:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.zeros(1, dtype=np.int64)
+    kolejnosc = np.lexsort((data, roslina_id)).astype(np.int64)
+    posortowane = np.asarray(roslina_id)[kolejnosc]
+    rosliny, poczatki = np.unique(posortowane, return_index=True)
+    return kolejnosc, rosliny.astype(np.int64), np.append(poczatki, liczba).astype(np.int64)
+
+
+def _przebuduj_indeks(katalog, liczba: int):
+    """Indeks historii roślin na dysku – dostęp do historii rośliny bez skanowania."""
+    roslina_id = _wczytaj_kolumne(_plik(katalog, "podlewania", "roslina_id"))[:liczba]
+    data = _wczytaj_kolumne(_plik(katalog, "podlewania", "data"))[:liczba]
+    kolejnosc, rosliny, offsety = _indeks(roslina_id, data)
+
+    _zapisz_npy(os.path.join(katalog, "indeks_kolejnosc.npy"), kolejnosc)
+    _zapisz_npy(os.path.join(katalog, "indeks_rosliny.npy"), rosliny)
+    _zapisz_npy(os.path.join(katalog, "indeks_offsety.npy"), offsety)
+
+
+def eksportuj_zbior(katalog=None, pelny=False, rozmiar_pakietu=5000, postep=None):
+    """
+    Eksportuje wykonane podlewania (przyrostowo: id > ostatnie_id z manifestu)
+    i atrybuty roślin. `pelny=True` zaczyna od zera (np. po edycji starej historii).
+    Zwraca manifest.
+    """
+    katalog = str(katalog or katalog_domyslny())
+    os.makedirs(katalog, exist_ok=True)
+
+    manifest = None if pelny else _wczytaj_manifest(katalog)
+    if manifest and manifest.get("wersja") != WERSJA_FORMATU:
+        logger.warning(f"Zmieniony format zbioru ({manifest.get('wersja')}) – pełny eksport")
+        manifest = None
+
+    if manifest is None:
+        for nazwa in KOLUMNY_PODLEWAN:
+            sciezka = _plik(katalog, "podlewania", nazwa)
+            if os.path.exists(sciezka):
+                os.remove(sciezka)
+        manifest = {
+            "wersja": WERSJA_FORMATU,
+            "liczba_podlewan": 0,
+            "ostatnie_id": 0,
+            "slowniki": {"kategoria": [], "poziom_trudnosci": []},
+        }
+
+    liczba = manifest["liczba_podlewan"]
+    ostatnie_id = manifest["ostatnie_id"]
+    nowe = 0
+
+    # Utwórz brakujące pliki / obetnij pozostałości przerwanego eksportu do stanu z manifestu
+    for nazwa, dtype in KOLUMNY_PODLEWAN.items():
+        _dopisz_kolumne(_plik(katalog, "podlewania", nazwa), dtype, liczba, np.empty(0, dtype=dtype))
+
+    qs = (
+        CzynoscPielegnacyjna.objects
+        .filter(typ="podlewanie", wykonane=True, id__gt=ostatnie_id)
+        .order_by("id")
+        .values_list("id", "roslina_id", "data", "stan_gleby", "ilosc_wody", "interwal_dni")
+    )
+
+    pakiet = []
+
+    def _zapisz_pakiet():
+        nonlocal liczba, ostatnie_id, nowe
+        kolumny = {
+            "id": [w[0] for w in pakiet],
+            "roslina_id": [w[1] for w in pakiet],
+            "data": [int(w[2].timestamp()) for w in pakiet],
+            "stan_gleby": [_kod_gleby(w[3]) for w in pakiet],
+            "ilosc_wody": [_kod_wody(w[4]) for w in pakiet],
+            "interwal_dni": [np.nan if w[5] is None else w[5] for w in pakiet],
+        }
+        for nazwa, dtype in KOLUMNY_PODLEWAN.items():
+            _dopisz_kolumne(
+                _plik(katalog, "podlewania", nazwa), dtype, liczba,
+                np.asarray(kolumny[nazwa], dtype=dtype),
+            )
+        liczba += len(pakiet)
+        nowe += len(pakiet)
+        ostatnie_id = pakiet[-1][0]
+        if postep:
+            postep(nowe)
+        pakiet.clear()
+
+    for wiersz in qs.iterator(chunk_size=rozmiar_pakietu):
+        pakiet.append(wiersz)
+        if len(pakiet) >= rozmiar_pakietu:
+            _zapisz_pakiet()
+    if pakiet:
+        _zapisz_pakiet()
+
+    liczba_roslin = _eksportuj_rosliny(katalog, manifest["slowniki"])
+    _przebuduj_indeks(katalog, liczba)
+
+    manifest.update({
+        "liczba_podlewan": liczba,
+        "ostatnie_id": ostatnie_id,
+        "liczba_roslin": liczba_roslin,
+        "nowe_podlewania": nowe,
+        "data_eksportu": timezone.now().isoformat(),
+    })
+    _atomowy_zapis(
+        os.path.join(katalog, "manifest.json"),
+        json.dumps(manifest, ensure_ascii=False, indent=2).encode("utf-8"),
+    )
+    logger.info(f"Eksport zbioru ML: +{nowe} podlewań (razem {liczba}), {liczba_roslin} roślin -> {katalog}")
+    return manifest
+
+
+# -----------------------------------
+# Odczyt (bez ORM)
+# -----------------------------------
+class ZbiorPodlewan:
+    """
+    Widok tylko do odczytu na wyeksportowany zbiór (kolumny mapowane w pamięci).
+
+        zbior = ZbiorPodlewan()
+        zbior.podlewania["data"]             # cała kolumna (np.memmap)
+        zbior.historia_rosliny(42)["data"]   # podlewania rośliny 42 rosnąco po dacie
+    """
+
+    def __init__(self, katalog=None, mmap_mode="r"):
+        self.katalog = str(katalog or katalog_domyslny())
+        self.manifest = _wczytaj_manifest(self.katalog)
+        if self.manifest is None:
+            raise FileNotFoundError(f"Brak manifest.json w {self.katalog} – uruchom eksportuj_dane_ml")
+
+        n = self.manifest["liczba_podlewan"]
+        self.podlewania = {}
+        for nazwa in KOLUMNY_PODLEWAN:
+            kolumna = _wczytaj_kolumne(_plik(self.katalog, "podlewania", nazwa), mmap_mode)
+            # plik może być dłuższy, jeśli trwa kolejny eksport – liczy się manifest
+            self.podlewania[nazwa] = kolumna[:n]
+
+        self.rosliny = {
+            nazwa: _wczytaj_kolumne(_plik(self.katalog, "rosliny", nazwa), mmap_mode)
+            for nazwa in KOLUMNY_ROSLIN
+        }
+        self.slowniki = self.manifest["slowniki"]
+        self.kolejnosc = _wczytaj_kolumne(os.path.join(self.katalog, "indeks_kolejnosc.npy"), mmap_mode)
+        self.indeks_rosliny = np.load(os.path.join(self.katalog, "indeks_rosliny.npy"))
+        self.offsety = np.load(os.path.join(self.katalog, "indeks_offsety.npy"))
+        if (self.offsety[-1] != n or len(self.kolejnosc) != n
+                or len(self.offsety) != len(self.indeks_rosliny) + 1):
+            # indeks z innego eksportu niż manifest (odczyt w trakcie eksportu) – liczony w pamięci
+            self.kolejnosc, self.indeks_rosliny, self.offsety = _indeks(
+                self.podlewania["roslina_id"], self.podlewania["data"]
+            )
+
+    def __len__(self):
+        return self.manifest["liczba_podlewan"]
+
+    def historia_rosliny(self, roslina_id: int) -> dict:
+        """Kolumny podlewań jednej rośliny (kopie, rosnąco po dacie)."""
+        i = np.searchsorted(self.indeks_rosliny, roslina_id)
+        if i >= len(self.indeks_rosliny) or self.indeks_rosliny[i] != roslina_id:
+            return {nazwa: np.empty(0, dtype=dtype) for nazwa, dtype in KOLUMNY_PODLEWAN.items()}
+        wiersze = np.asarray(self.kolejnosc[self.offsety[i]:self.offsety[i + 1]])
+        return {nazwa: np.asarray(kolumna)[wiersze] for nazwa, kolumna in self.podlewania.items()}
+
+    def interwaly_dni(self, roslina_id: int) -> np.ndarray:
+        """Interwały między kolejnymi podlaniami rośliny (dni kalendarzowe, jak w ml_utils)."""
+        dni = self.historia_rosliny(roslina_id)["data"] // 86400
+        return np.diff(dni)
@@ -0,0 +1,490 @@
+"""
+Magazyn artefaktów modeli ML współdzielony przez węzły web i workery Celery.
+
+- bloby adresowane treścią (sha256 zserializowanego modelu),
+- atomowa publikacja: najpierw blob, potem podmiana wskaźnika (ref -> digest),
+- lokalny cache read-through dla backendów zdalnych (baza danych, S3),
+- cache LRU zdeserializowanych obiektów w pamięci procesu (klucz = digest),
+- sprzątanie blobów i plików cache, na które nie wskazuje żaden ref
+  (usun_osierocone_artefakty, wołane z nocnej retencji).
+
+Backend wybierany w settings.ML_ARTIFACT_STORE (analogicznie do CACHES).
+"""
+
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+class ArtifactNotFound(Exception):
+    """Brak bloba o podanym digeście w magazynie."""
+
+
+def _digest(dane: bytes) -> str:
+    return hashlib.sha256(dane).hexdigest()
+
+
+def _atomowy_zapis(sciezka: str, dane: bytes):
+    """Zapis przez plik tymczasowy w tym samym katalogu + os.replace (atomowe)."""
+    katalog = os.path.dirname(sciezka)
+    os.makedirs(katalog, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=katalog, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(dane)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, sciezka)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+# -----------------------------------
+# Backendy
+# -----------------------------------
+class ArtifactStore:
+    """
+    Interfejs backendu. Bloby są niezmienne (klucz = digest),
+    wskaźniki (ref) to jedyny zmienny stan i są podmieniane atomowo.
+    """
+
+    # True -> bloby leżą na lokalnym dysku, cache read-through jest zbędny
+    lokalny = False
+
+    def has_blob(self, digest: str) -> bool:
+        raise NotImplementedError
+
+    def put_blob(self, digest: str, dane: bytes):
+        raise NotImplementedError
+
+    def get_blob(self, digest: str) -> bytes:
+        raise NotImplementedError
+
+    def set_ref(self, nazwa: str, digest: str):
+        raise NotImplementedError
+
+    def get_ref(self, nazwa: str) -> Optional[str]:
+        raise NotImplementedError
+
+    def list_refs(self, prefix: str = "") -> List[str]:
+        raise NotImplementedError
+
+    def delete_ref(self, nazwa: str):
+        raise NotImplementedError
+
+    def list_blobs(self) -> Iterable[Tuple[str, datetime]]:
+        """(digest, czas zapisu w UTC) wszystkich blobów."""
+        raise NotImplementedError
+
+    def delete_blob(self, digest: str):
+        raise NotImplementedError
+
+    def referenced_blobs(self) -> set:
+        """Digesty, na które wskazuje jakikolwiek ref."""
+        return {d for d in (self.get_ref(n) for n in self.list_refs()) if d}
+
+
+def _czas_pliku(sciezka: str) -> datetime:
+    return datetime.fromtimestamp(os.path.getmtime(sciezka), tz=dt_timezone.utc)
+
+
+class LocalArtifactStore(ArtifactStore):
+    """
+    Katalog lokalny (lub zamontowany współdzielony, np. NFS):
+      <root>/blobs/<ab>/<digest>.pkl  – bloby,
+      <root>/<nazwa>                  – symlink do bloba (publikacja = os.replace symlinka).
+    Dzięki symlinkom stare ścieżki model_roslina_<id>.pkl dalej wskazują aktualny model.
+    """
+
+    lokalny = True
+
+    def __init__(self, root=None):
+        self.root = str(root or os.path.join(settings.BASE_DIR, "ml_models"))
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.root, "blobs", digest[:2], f"{digest}.pkl")
+
+    def has_blob(self, digest):
+        return os.path.exists(self._blob_path(digest))
+
+    def put_blob(self, digest, dane):
+        _atomowy_zapis(self._blob_path(digest), dane)
+
+    def get_blob(self, digest):
+        try:
+            with open(self._blob_path(digest), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            raise ArtifactNotFound(digest)
+
+    def set_ref(self, nazwa, digest):
+        os.makedirs(self.root, exist_ok=True)
+        cel = os.path.relpath(self._blob_path(digest), self.root)
+        tmp = os.path.join(self.root, f".tmp-ref-{os.getpid()}-{nazwa}")
+        if os.path.lexists(tmp):
+            os.unlink(tmp)
+        os.symlink(cel, tmp)
+        os.replace(tmp, os.path.join(self.root, nazwa))
+
+    def get_ref(self, nazwa):
+        sciezka = os.path.join(self.root, nazwa)
+        if not os.path.islink(sciezka):
+            return None
+        return os.path.basename(os.readlink(sciezka)).rsplit(".", 1)[0]
+
+    def list_refs(self, prefix=""):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            n for n in os.listdir(self.root)
+            if n.startswith(prefix) and os.path.islink(os.path.join(self.root, n))
+        )
+
+    def delete_ref(self, nazwa):
+        sciezka = os.path.join(self.root, nazwa)
+        if os.path.lexists(sciezka):
+            os.unlink(sciezka)
+
+    def list_blobs(self):
+        katalog = os.path.join(self.root, "blobs")
+        for podkatalog, _, pliki in os.walk(katalog):
+            for plik in pliki:
+                if plik.endswith(".pkl") and not plik.startswith(".tmp-"):
+                    yield plik[:-4], _czas_pliku(os.path.join(podkatalog, plik))
+
+    def delete_blob(self, digest):
+        try:
+            os.unlink(self._blob_path(digest))
+        except FileNotFoundError:
+            pass
+
+
+class DatabaseArtifactStore(ArtifactStore):
+    """Bloby w tabeli ArtefaktModelu (BinaryField), wskaźniki w ReferencjaArtefaktu."""
+
+    def has_blob(self, digest):
+        from .models import ArtefaktModelu
+        return ArtefaktModelu.objects.filter(sha256=digest).exists()
+
+    def put_blob(self, digest, dane):
+        from .models import ArtefaktModelu
+        ArtefaktModelu.objects.bulk_create(
+            [ArtefaktModelu(sha256=digest, dane=dane, rozmiar=len(dane))],
+            ignore_conflicts=True,
+        )
+
+    def get_blob(self, digest):
+        from .models import ArtefaktModelu
+        dane = ArtefaktModelu.objects.filter(sha256=digest).values_list("dane", flat=True).first()
+        if dane is None:
+            raise ArtifactNotFound(digest)
+        return bytes(dane)
+
+    def set_ref(self, nazwa, digest):
+        from .models import ReferencjaArtefaktu
+        ReferencjaArtefaktu.objects.update_or_create(nazwa=nazwa, defaults={"sha256": digest})
+
+    def get_ref(self, nazwa):
+        from .models import ReferencjaArtefaktu
+        return ReferencjaArtefaktu.objects.filter(nazwa=nazwa).values_list("sha256", flat=True).first()
+
+    def list_refs(self, prefix=""):
+        from .models import ReferencjaArtefaktu
+        return list(
+            ReferencjaArtefaktu.objects.filter(nazwa__startswith=prefix)
+            .order_by("nazwa").values_list("nazwa", flat=True)
+        )
+
+    def delete_ref(self, nazwa):
+        from .models import ReferencjaArtefaktu
+        ReferencjaArtefaktu.objects.filter(nazwa=nazwa).delete()
+
+    def list_blobs(self):
+        from .models import ArtefaktModelu
+        return ArtefaktModelu.objects.order_by().values_list("sha256", "data_utworzenia").iterator()
+
+    def delete_blob(self, digest):
+        from .models import ArtefaktModelu
+        ArtefaktModelu.objects.filter(sha256=digest).delete()
+
+    def referenced_blobs(self):
+        from .models import ReferencjaArtefaktu
+        return set(ReferencjaArtefaktu.objects.values_list("sha256", flat=True))
+
+
+def _s3_brak_obiektu(exc) -> bool:
+    kod = (getattr(exc, "response", None) or {}).get("Error", {}).get("Code")
+    return str(kod) in {"404", "NoSuchKey", "NotFound"}
+
+
+class S3ArtifactStore(ArtifactStore):
+    """
+    Magazyn zgodny z S3 (AWS, MinIO, Ceph...). Pojedynczy PUT obiektu jest atomowy,
+    więc publikacja = PUT bloba (klucz niezmienny) + PUT wskaźnika.
+    `client` pozwala wstrzyknąć lokalny zamiennik (np. w testach).
+    """
+
+    def __init__(self, bucket, prefix="bloomly/ml", client=None, **client_kwargs):
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self._client = client
+        self._client_kwargs = client_kwargs
+
+    @property
+    def client(self):
+        if self._client is None:
+            try:
+                import boto3
+            except ImportError:
+                raise ImproperlyConfigured("S3ArtifactStore wymaga pakietu boto3 (pip install boto3).")
+            self._client = boto3.client("s3", **self._client_kwargs)
+        return self._client
+
+    def _blob_key(self, digest):
+        return f"{self.prefix}/blobs/{digest}.pkl"
+
+    def _ref_key(self, nazwa):
+        return f"{self.prefix}/refs/{nazwa}"
+
+    def _get(self, key) -> Optional[bytes]:
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=key)["Body"].read()
+        except Exception as e:
+            if _s3_brak_obiektu(e):
+                return None
+            raise
+
+    def has_blob(self, digest):
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._blob_key(digest))
+            return True
+        except Exception as e:
+            if _s3_brak_obiektu(e):
+                return False
+            raise
+
+    def put_blob(self, digest, dane):
+        self.client.put_object(Bucket=self.bucket, Key=self._blob_key(digest), Body=dane)
+
+    def get_blob(self, digest):
+        dane = self._get(self._blob_key(digest))
+        if dane is None:
+            raise ArtifactNotFound(digest)
+        return dane
+
+    def set_ref(self, nazwa, digest):
+        self.client.put_object(Bucket=self.bucket, Key=self._ref_key(nazwa), Body=digest.encode("ascii"))
+
+    def get_ref(self, nazwa):
+        dane = self._get(self._ref_key(nazwa))
+        return dane.decode("ascii").strip() if dane else None
+
+    def _listuj(self, prefix):
+        kwargs = {"Bucket": self.bucket, "Prefix": prefix}
+        while True:
+            odp = self.client.list_objects_v2(**kwargs)
+            yield from odp.get("Contents", [])
+            if not odp.get("IsTruncated"):
+                break
+            kwargs["ContinuationToken"] = odp["NextContinuationToken"]
+
+    def list_refs(self, prefix=""):
+        obetnij = len(self._ref_key(""))
+        return sorted(o["Key"][obetnij:] for o in self._listuj(self._ref_key(prefix)))
+
+    def delete_ref(self, nazwa):
+        self.client.delete_object(Bucket=self.bucket, Key=self._ref_key(nazwa))
+
+    def list_blobs(self):
+        obetnij = len(f"{self.prefix}/blobs/")
+        for o in self._listuj(f"{self.prefix}/blobs/"):
+            yield o["Key"][obetnij:].rsplit(".", 1)[0], o["LastModified"]
+
+    def delete_blob(self, digest):
+        self.client.delete_object(Bucket=self.bucket, Key=self._blob_key(digest))
+
+
+# -----------------------------------
+# Fabryka + API wysokiego poziomu
+# -----------------------------------
+_store = None
+
+
+def get_artifact_store() -> ArtifactStore:
+    """Zwraca (i zapamiętuje) backend skonfigurowany w settings.ML_ARTIFACT_STORE."""
+    global _store
+    if _store is None:
+        conf = getattr(settings, "ML_ARTIFACT_STORE", None) or {}
+        backend = conf.get("BACKEND", "bloomly.ml_storage.LocalArtifactStore")
+        _store = import_string(backend)(**conf.get("OPTIONS", {}))
+    return _store
+
+
+def reset_artifact_store():
+    """Zapomina skonfigurowany backend (np. po zmianie ustawień w testach)."""
+    global _store
+    _store = None
+
+
+# Bloby są niezmienne, więc obiekt spod danego digestu można bezpiecznie współdzielić
+_pamiec = OrderedDict()
+_pamiec_lock = threading.Lock()
+
+
+def _pamiec_pobierz(digest):
+    with _pamiec_lock:
+        obiekt = _pamiec.get(digest)
+        if obiekt is not None:
+            _pamiec.move_to_end(digest)
+        return obiekt
+
+
+def _pamiec_zapisz(digest, obiekt):
+    limit = getattr(settings, "ML_ARTIFACT_MEMORY_CACHE_SIZE", 128)
+    if limit <= 0:
+        return
+    with _pamiec_lock:
+        _pamiec[digest] = obiekt
+        _pamiec.move_to_end(digest)
+        while len(_pamiec) > limit:
+            _pamiec.popitem(last=False)
+
+
+def wyczysc_pamiec_artefaktow():
+    """Czyści cache obiektów w pamięci procesu."""
+    with _pamiec_lock:
+        _pamiec.clear()
+
+
+def _katalog_cache() -> str:
+    return str(getattr(settings, "ML_ARTIFACT_CACHE_DIR", None) or os.path.join(
+        settings.BASE_DIR, "ml_models", "cache"
+    ))
+
+
+def _cache_path(digest: str) -> str:
+    return os.path.join(_katalog_cache(), f"{digest}.pkl")
+
+
+def _legacy_path(nazwa: str) -> str:
+    katalog = getattr(settings, "ML_ARTIFACT_LEGACY_DIR", None) or os.path.join(settings.BASE_DIR, "ml_models")
+    return os.path.join(str(katalog), nazwa)
+
+
+def _importuj_stary_plik(nazwa: str, store: ArtifactStore):
+    """
+    Modele sprzed magazynu leżą jako zwykłe pliki ml_models/<nazwa> (pickle).
+    Przy pierwszym odczycie są publikowane w magazynie – dla backendu lokalnego
+    set_ref podmienia plik na symlink, więc import wykonuje się raz.
+    Zwraca obiekt albo None, gdy starego pliku nie ma.
+    """
+    sciezka = _legacy_path(nazwa)
+    if os.path.islink(sciezka) or not os.path.isfile(sciezka):
+        return None
+    with open(sciezka, "rb") as f:
+        obiekt = pickle.load(f)
+    zapisz_artefakt(nazwa, obiekt, store=store)
+    logger.info(f"Zaimportowano stary plik modelu {sciezka} do magazynu artefaktów")
+    return obiekt
+
+
+def zapisz_artefakt(nazwa: str, obiekt, store: ArtifactStore = None) -> str:
+    """
+    Publikuje obiekt pod nazwą. Zwraca digest.
+    Blob o tym samym digeście nie jest wysyłany ponownie.
+    """
+    store = store or get_artifact_store()
+    dane = pickle.dumps(obiekt, protocol=pickle.HIGHEST_PROTOCOL)
+    digest = _digest(dane)
+
+    if not store.has_blob(digest):
+        store.put_blob(digest, dane)
+    if not store.lokalny:
+        _atomowy_zapis(_cache_path(digest), dane)
+
+    store.set_ref(nazwa, digest)
+    logger.info(f"Opublikowano artefakt {nazwa} -> {digest[:12]} ({len(dane)} B)")
+    return digest
+
+
+def wczytaj_artefakt(nazwa: str, store: ArtifactStore = None):
+    """
+    Zwraca obiekt opublikowany pod nazwą albo None, jeśli wskaźnik nie istnieje
+    (i nie ma starego pliku do zaimportowania, patrz _importuj_stary_plik).
+    Dla backendów zdalnych blob trafia do lokalnego cache (read-through).
+    Zdeserializowany obiekt trafia do cache LRU procesu – zwracany obiekt
+    jest współdzielony i nie powinien być modyfikowany.
+    """
+    store = store or get_artifact_store()
+    digest = store.get_ref(nazwa)
+    if not digest:
+        return _importuj_stary_plik(nazwa, store)
+
+    obiekt = _pamiec_pobierz(digest)
+    if obiekt is not None:
+        return obiekt
+
+    if store.lokalny:
+        dane = store.get_blob(digest)
+    else:
+        sciezka = _cache_path(digest)
+        try:
+            with open(sciezka, "rb") as f:
+                dane = f.read()
+        except FileNotFoundError:
+            dane = store.get_blob(digest)
+            if _digest(dane) != digest:
+                raise ArtifactNotFound(f"{digest} (niezgodna suma kontrolna)")
+            _atomowy_zapis(sciezka, dane)
+
+    obiekt = pickle.loads(dane)
+    _pamiec_zapisz(digest, obiekt)
+    return obiekt
+
+
+def lista_artefaktow(prefix: str = "", store: ArtifactStore = None) -> List[str]:
+    store = store or get_artifact_store()
+    return store.list_refs(prefix)
+
+
+def usun_osierocone_artefakty(min_wiek: timedelta, store: ArtifactStore = None, teraz=None) -> int:
+    """
+    Usuwa bloby i pliki lokalnego cache, na które nie wskazuje żaden ref.
+    `min_wiek` chroni bloby świeżo zapisane przez trwającą publikację
+    (blob jest zapisywany przed podmianą wskaźnika). Zwraca liczbę usuniętych.
+    """
+    store = store or get_artifact_store()
+    granica = (teraz or datetime.now(dt_timezone.utc)) - min_wiek
+    wskazywane = store.referenced_blobs()
+    usuniete = 0
+
+    for digest, czas in list(store.list_blobs()):
+        if digest not in wskazywane and czas < granica:
+            store.delete_blob(digest)
+            usuniete += 1
+
+    katalog = _katalog_cache()
+    if not store.lokalny and os.path.isdir(katalog):
+        for plik in os.listdir(katalog):
+            sciezka = os.path.join(katalog, plik)
+            if (plik.endswith(".pkl") and plik[:-4] not in wskazywane
+                    and os.path.isfile(sciezka) and _czas_pliku(sciezka) < granica):
+                os.unlink(sciezka)
+                usuniete += 1
+
+    logger.info(f"Usunięto {usuniete} osieroconych artefaktów ML")
+    return usuniete
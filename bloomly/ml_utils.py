@@ -1,37 +1,94 @@
 import os
-import pickle
 import logging
-from datetime import datetime
+import time
+from datetime import datetime, timedelta
 import math
 
 import numpy as np
 import pandas as pd
 from django.utils import timezone
 from django.conf import settings
-from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
+from sklearn.dummy import DummyRegressor
+from sklearn.ensemble import (
+    RandomForestRegressor,
+    GradientBoostingRegressor,
+    HistGradientBoostingRegressor,
+)
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
-from sklearn.model_selection import cross_val_score, KFold
+from sklearn.model_selection import cross_validate, KFold
 
 
-from .models import CzynoscPielegnacyjna, Roslina, AnalizaPielegnacji
+from .models import CzynoscPielegnacyjna, Roslina, AnalizaPielegnacji, TrainingRun
+from .ml_storage import zapisz_artefakt, wczytaj_artefakt, lista_artefaktow
 
 # -----------------------------------
 # Konfiguracja
 # -----------------------------------
 logger = logging.getLogger(__name__)
 
+# Domyślny katalog LocalArtifactStore (patrz settings.ML_ARTIFACT_STORE)
 ML_MODELS_DIR = os.path.join(settings.BASE_DIR, "ml_models")
-os.makedirs(ML_MODELS_DIR, exist_ok=True)
 
 # ZMIANA: obniżony próg minimalny dla ML
 MIN_SAMPLES_FOR_ML = 6  # było 8 - teraz 6
 MIN_R2_FOR_UI = 0.20  # było 0.30 - bardziej tolerancyjne
 PRED_MIN, PRED_MAX = 1, 30
 
+# Wybór silnika: najtańszy kandydat, którego CV MAE mieści się w tolerancji (dni) od najlepszego
+ML_MAE_TOLERANCE_DAYS = getattr(settings, "ML_MAE_TOLERANCE_DAYS", 0.5)
+MIN_SAMPLES_FOR_CV = 8
+
 
 # -----------------------------------
 # Pomocnicze
 # -----------------------------------
+def _klucz_modelu(roslina_id) -> str:
+    """Nazwa artefaktu modelu rośliny w magazynie (ml_storage)."""
+    return f"model_roslina_{roslina_id}.pkl"
+
+
+def _historia_podlewan(roslina, podlewania=None):
+    """
+    Wykonane podlewania rośliny rosnąco po dacie.
+    Przekazana migawka (`podlewania`) jest zwracana bez zapytania do bazy,
+    dzięki czemu jeden przebieg może współdzielić historię między funkcjami.
+    """
+    if podlewania is not None:
+        return podlewania
+    return list(
+        CzynoscPielegnacyjna.objects.filter(
+            roslina=roslina, typ="podlewanie", wykonane=True
+        ).order_by("data", "id")
+    )
+
+
+def _biezacy_task_id() -> str:
+    """ID zadania Celery, w którym wykonuje się kod (pusty poza workerem)."""
+    try:
+        from celery import current_task
+        return (current_task and current_task.request.id) or ""
+    except Exception:
+        return ""
+
+
+def _zapisz_przebieg(roslina, rodzaj, start, wynik="ok", **pola):
+    """Zapisuje TrainingRun; błąd zapisu pomiaru nie może przerwać treningu."""
+    czas = time.perf_counter() - start
+    try:
+        return TrainingRun.objects.create(
+            roslina=roslina,
+            rodzaj=rodzaj,
+            wynik=wynik,
+            czas_calkowity=czas,
+            data_rozpoczecia=timezone.now() - timedelta(seconds=czas),
+            task_id=_biezacy_task_id(),
+            **pola,
+        )
+    except Exception as e:
+        logger.warning(f"Nie udało się zapisać pomiaru {rodzaj} dla {roslina}: {e}")
+        return None
+
+
 def _safe_mean(a):
     a = np.asarray(a, dtype=float)
     return float(np.nanmean(a)) if a.size else 0.0
@@ -151,20 +208,16 @@ def _oblicz_pewnosc_regularnosci(interwaly, srednia, odchylenie):
     return max(0.0, min(1.0, pewnosc))
 
 
-def _oblicz_jakosc_podlewania(roslina: Roslina):
+def _oblicz_jakosc_podlewania(roslina: Roslina, podlewania=None):
     """
     Zwraca:
       - soil_score:  0..1 (czy podlewasz raczej przy suchej / ok glebie, a nie mokrej)
       - water_score: 0..1 (spójność ilości wody)
     """
-    qs = CzynoscPielegnacyjna.objects.filter(
-        roslina=roslina,
-        typ="podlewanie",
-        wykonane=True,
-    )
+    podlewania = _historia_podlewan(roslina, podlewania)
 
     # --- stan gleby ---
-    soils = [getattr(c, "stan_gleby", None) for c in qs if getattr(c, "stan_gleby", None)]
+    soils = [getattr(c, "stan_gleby", None) for c in podlewania if getattr(c, "stan_gleby", None)]
     soil_score = 0.5
     if len(soils) >= 3:
         soil_vals = []
@@ -183,7 +236,7 @@ def _oblicz_jakosc_podlewania(roslina: Roslina):
 
     # --- ilość wody (stabilność) ---
     water_cats = []
-    for c in qs:
+    for c in podlewania:
         cat = _water_category(getattr(c, "ilosc_wody", None))
         if cat is not None:
             water_cats.append(cat)
@@ -208,18 +261,15 @@ def _oblicz_jakosc_podlewania(roslina: Roslina):
 # -----------------------------------
 # NOWA FUNKCJA: Ekstrakcja dodatkowych cech
 # -----------------------------------
-def _extract_advanced_features(roslina: Roslina, current_date):
+def _extract_advanced_features(roslina: Roslina, current_date, podlewania=None):
     """
     Dodatkowe cechy kontekstowe, które mogą poprawić predykcję:
     - liczba dni od ostatniego podlania
     - trend w ostatnich podlewaniach
     - sezonowość
     """
-    podlewania = list(
-        CzynoscPielegnacyjna.objects.filter(
-            roslina=roslina, typ="podlewanie", wykonane=True
-        ).order_by("-data")[:5]  # ostatnie 5 podlań
-    )
+    # ostatnie 5 podlań, od najnowszego
+    podlewania = _historia_podlewan(roslina, podlewania)[-5:][::-1]
 
     features = {}
 
@@ -258,7 +308,7 @@ def _extract_advanced_features(roslina: Roslina, current_date):
 # -----------------------------------
 # Jednowierszowe cechy do inferencji
 # -----------------------------------
-def _build_one_row_features(roslina: Roslina, dt: timezone.datetime) -> pd.DataFrame:
+def _build_one_row_features(roslina: Roslina, dt: timezone.datetime, podlewania=None) -> pd.DataFrame:
     """
     ZMIANA: Dodano więcej cech i kategoryczne kodowanie wody
     """
@@ -272,13 +322,8 @@ def _build_one_row_features(roslina: Roslina, dt: timezone.datetime) -> pd.DataF
     trud = roslina.poziom_trudnosci or "unknown"
 
     # ostatni wpis podlewania
-    last = (
-        CzynoscPielegnacyjna.objects.filter(
-            roslina=roslina, typ="podlewanie", wykonane=True
-        )
-        .order_by("-data")
-        .first()
-    )
+    podlewania = _historia_podlewan(roslina, podlewania)
+    last = podlewania[-1] if podlewania else None
 
     soil_num = _soil_to_num(getattr(last, "stan_gleby", None) if last else None)
     soil_oh = _soil_one_hot(soil_num)
@@ -288,7 +333,7 @@ def _build_one_row_features(roslina: Roslina, dt: timezone.datetime) -> pd.DataF
     water_oh = _water_one_hot(water_cat)
 
     # NOWE: dodatkowe cechy
-    advanced = _extract_advanced_features(roslina, dt)
+    advanced = _extract_advanced_features(roslina, dt, podlewania)
 
     base = pd.DataFrame(
         [
@@ -322,17 +367,11 @@ def _build_one_row_features(roslina: Roslina, dt: timezone.datetime) -> pd.DataF
 # -----------------------------------
 # Przygotowanie danych (features/target)
 # -----------------------------------
-def przygotuj_dane_treningowe(roslina: Roslina):
+def przygotuj_dane_treningowe(roslina: Roslina, podlewania=None):
     """
     ZMIANA: Dodano więcej cech i outlier detection
     """
-    qs = (
-        CzynoscPielegnacyjna.objects.filter(
-            roslina=roslina, typ="podlewanie", wykonane=True
-        )
-        .order_by("data")
-    )
-    podlewania = list(qs)
+    podlewania = _historia_podlewan(roslina, podlewania)
     if len(podlewania) < MIN_SAMPLES_FOR_ML:
         logger.debug(f"Za mało podlewań dla {roslina.nazwa}: {len(podlewania)}")
         return None
@@ -460,68 +499,151 @@ def przygotuj_dane_treningowe(roslina: Roslina):
     return X, y
 
 
+# -----------------------------------
+# Kandydaci modeli (koszt vs. dokładność)
+# -----------------------------------
+_KANDYDACI_MODELI = {
+    # Backup statystyczny: mediana interwałów z historii
+    "STAT": lambda: DummyRegressor(strategy="median"),
+    "RFS": lambda: RandomForestRegressor(
+        n_estimators=30,
+        max_depth=4,
+        max_features="sqrt",
+        min_samples_leaf=2,
+        random_state=42,
+    ),
+    "HGB": lambda: HistGradientBoostingRegressor(
+        max_iter=50,
+        max_depth=3,
+        learning_rate=0.1,
+        min_samples_leaf=2,
+        random_state=42,
+    ),
+    "GB": lambda: GradientBoostingRegressor(
+        n_estimators=50,
+        max_depth=3,
+        learning_rate=0.1,
+        min_samples_leaf=2,
+        random_state=42,
+    ),
+    "RF": lambda: RandomForestRegressor(
+        n_estimators=200,
+        max_depth=6,
+        max_features="sqrt",
+        min_samples_leaf=2,
+        random_state=42,
+        n_jobs=-1,
+    ),
+}
+
+
+def ocen_kandydatow(X, y, typy=None):
+    """
+    Ocena kandydatów na tych samych foldach KFold.
+    Dla każdego: CV MAE, średni czas fit i predykcji (s) na fold.
+    """
+    kf = KFold(n_splits=min(5, len(X)), shuffle=True, random_state=42)
+    wyniki = []
+    for typ in typy or _KANDYDACI_MODELI:
+        cv = cross_validate(
+            _KANDYDACI_MODELI[typ](), X, y,
+            cv=kf,
+            scoring="neg_mean_absolute_error",
+        )
+        czas_fit = float(np.mean(cv["fit_time"]))
+        czas_predykcji = float(np.mean(cv["score_time"]))
+        wyniki.append({
+            "typ": typ,
+            "cv_mae": float(-cv["test_score"].mean()),
+            "cv_mae_std": float(cv["test_score"].std()),
+            "czas_fit_s": czas_fit,
+            "czas_predykcji_s": czas_predykcji,
+            "koszt_s": czas_fit + czas_predykcji,
+        })
+    return wyniki
+
+
+def wybierz_kandydata(kandydaci, tolerancja=None):
+    """Najtańszy kandydat z CV MAE <= najlepsze MAE + tolerancja."""
+    if tolerancja is None:
+        tolerancja = ML_MAE_TOLERANCE_DAYS
+    najlepsze = min(k["cv_mae"] for k in kandydaci)
+    dopuszczalni = [k for k in kandydaci if k["cv_mae"] <= najlepsze + tolerancja]
+    return min(dopuszczalni, key=lambda k: (k["koszt_s"], k["cv_mae"]))
+
+
 # -----------------------------------
 # ZMIANA: Nowa funkcja treningu z cross-validation
 # -----------------------------------
-def trenuj_model_ml(roslina: Roslina, use_cv=True):
+def trenuj_model_ml(roslina: Roslina, use_cv=True, podlewania=None):
     """
-    Trenuje model z walidacją krzyżową (jeśli use_cv=True)
+    Trenuje model z walidacją krzyżową (jeśli use_cv=True).
+    Każde wywołanie zapisuje TrainingRun (czasy CV/fit, rozmiar danych, wynik).
     """
-    data = przygotuj_dane_treningowe(roslina)
+    start = time.perf_counter()
+    try:
+        model_data = _trenuj_model_ml(roslina, use_cv=use_cv, podlewania=podlewania)
+    except Exception as e:
+        _zapisz_przebieg(roslina, "trening", start, wynik="blad", komunikat=str(e)[:255])
+        raise
+
+    if model_data is None:
+        _zapisz_przebieg(roslina, "trening", start, wynik="pominiete", komunikat="Za mało danych")
+    else:
+        _zapisz_przebieg(
+            roslina, "trening", start,
+            typ_modelu=model_data["model_type"],
+            liczba_wierszy=model_data["n_samples"],
+            liczba_cech=model_data["n_features"],
+            czas_cv=model_data["czas_cv"],
+            czas_fit=model_data["czas_fit"],
+        )
+    return model_data
+
+
+def _trenuj_model_ml(roslina: Roslina, use_cv=True, podlewania=None):
+    data = przygotuj_dane_treningowe(roslina, podlewania)
     if data is None:
         return None
 
     X, y = data
 
-    # ZMIANA: wybór modelu na podstawie liczby próbek
-    if len(X) < 15:
-        # Dla małych zbiorów: prostszy model
-        model = GradientBoostingRegressor(
-            n_estimators=50,
-            max_depth=3,
-            learning_rate=0.1,
-            min_samples_leaf=2,
-            random_state=42,
-        )
-        model_type = "GB"
-        logger.info(f"Używam GradientBoosting dla {roslina.nazwa} ({len(X)} próbek)")
-    else:
-        # Dla większych zbiorów: Random Forest
-        model = RandomForestRegressor(
-            n_estimators=200,
-            max_depth=6,
-            max_features="sqrt",
-            min_samples_leaf=2,
-            random_state=42,
-            n_jobs=-1,
-        )
-        model_type = "RF"
-        logger.info(f"Używam RandomForest dla {roslina.nazwa} ({len(X)} próbek)")
-
-    # ZMIANA: Cross-validation dla małych zbiorów
-    if use_cv and len(X) >= 8:
-        kf = KFold(n_splits=min(5, len(X)), shuffle=True, random_state=42)
-        cv_scores = cross_val_score(
-            model, X, y,
-            cv=kf,
-            scoring='neg_mean_absolute_error',
-            n_jobs=-1
-        )
-        cv_mae = -cv_scores.mean()
-        cv_mae_std = cv_scores.std()
+    czas_cv = None
+    cv_mae = None
+    cv_mae_std = None
+    kandydaci = []
+
+    if use_cv and len(X) >= MIN_SAMPLES_FOR_CV:
+        t0 = time.perf_counter()
+        kandydaci = ocen_kandydatow(X, y)
+        czas_cv = time.perf_counter() - t0
+
+        wybrany = wybierz_kandydata(kandydaci)
+        model_type = wybrany["typ"]
+        cv_mae = wybrany["cv_mae"]
+        cv_mae_std = wybrany["cv_mae_std"]
 
         logger.info(
-            f"CV dla {roslina.nazwa}: MAE={cv_mae:.2f} ± {cv_mae_std:.2f}"
+            f"Wybór modelu dla {roslina.nazwa}: {model_type} "
+            f"(CV MAE={cv_mae:.2f} ± {cv_mae_std:.2f}, koszt={wybrany['koszt_s'] * 1000:.1f} ms) | "
+            + ", ".join(f"{k['typ']}={k['cv_mae']:.2f}" for k in kandydaci)
         )
     else:
-        cv_mae = None
-        cv_mae_std = None
+        # Za mało danych na rzetelne CV – prosty model jak dotychczas
+        model_type = "GB" if len(X) < 15 else "RF"
+        logger.info(f"Używam {model_type} bez oceny kandydatów dla {roslina.nazwa} ({len(X)} próbek)")
+
+    model = _KANDYDACI_MODELI[model_type]()
 
     # Trening na całym zbiorze
+    t0 = time.perf_counter()
     model.fit(X, y)
+    czas_fit = time.perf_counter() - t0
 
     # Ewaluacja
+    t0 = time.perf_counter()
     y_pred = model.predict(X)
+    czas_predykcji = time.perf_counter() - t0
     r2 = r2_score(y, y_pred)
     mae = mean_absolute_error(y, y_pred)
     rmse = float(np.sqrt(mean_squared_error(y, y_pred)))
@@ -540,7 +662,6 @@ def trenuj_model_ml(roslina: Roslina, use_cv=True):
         for k, v in raw_med.items()
     }
 
-    model_path = os.path.join(ML_MODELS_DIR, f"model_roslina_{roslina.id}.pkl")
     model_data = {
         "model": model,
         "feature_columns": list(X.columns),
@@ -549,15 +670,20 @@ def trenuj_model_ml(roslina: Roslina, use_cv=True):
         "adj_score": float(adj_r2),
         "mae": float(mae),
         "rmse": float(rmse),
-        "cv_mae": float(cv_mae) if cv_mae else None,
-        "cv_mae_std": float(cv_mae_std) if cv_mae_std else None,
+        "cv_mae": float(cv_mae) if cv_mae is not None else None,
+        "cv_mae_std": float(cv_mae_std) if cv_mae_std is not None else None,
         "n_samples": int(len(X)),
+        "n_features": int(X.shape[1]),
+        "czas_cv": czas_cv,
+        "czas_fit": czas_fit,
+        "czas_predykcji": czas_predykcji,
+        "kandydaci": kandydaci,
         "trained_at": datetime.now().isoformat(),
         "model_type": model_type,
     }
 
-    with open(model_path, "wb") as f:
-        pickle.dump(model_data, f)
+    # Publikacja w magazynie współdzielonym – inne węzły nie muszą trenować ponownie
+    zapisz_artefakt(_klucz_modelu(roslina.id), model_data)
 
     logger.info(
         f"Model dla {roslina.nazwa}: R²={r2:.3f} (adj={adj_r2:.3f}), "
@@ -569,30 +695,27 @@ def trenuj_model_ml(roslina: Roslina, use_cv=True):
 # -----------------------------------
 # Predykcja (inferencja)
 # -----------------------------------
-def przewidz_czestotliwosc_ml(roslina: Roslina, teraz=None):
+def przewidz_czestotliwosc_ml(roslina: Roslina, teraz=None, podlewania=None):
     """
     Przewiduje optymalną częstotliwość podlewania używając wytrenowanego modelu.
     """
     if teraz is None:
         teraz = timezone.now()
 
-    model_path = os.path.join(ML_MODELS_DIR, f"model_roslina_{roslina.id}.pkl")
+    try:
+        model_data = wczytaj_artefakt(_klucz_modelu(roslina.id))
+    except Exception as e:
+        logger.error(f"Błąd ładowania modelu dla {roslina.nazwa}: {e}")
+        model_data = trenuj_model_ml(roslina, podlewania=podlewania)
+        if model_data is None:
+            return None
 
-    if not os.path.exists(model_path):
+    if model_data is None:
         logger.info(f"Brak modelu dla {roslina.nazwa}, trenowanie...")
-        model_data = trenuj_model_ml(roslina)
+        model_data = trenuj_model_ml(roslina, podlewania=podlewania)
         if model_data is None:
             logger.warning(f"Nie udało się wytrenować modelu dla {roslina.nazwa}")
             return None
-    else:
-        try:
-            with open(model_path, "rb") as f:
-                model_data = pickle.load(f)
-        except Exception as e:
-            logger.error(f"Błąd ładowania modelu dla {roslina.nazwa}: {e}")
-            model_data = trenuj_model_ml(roslina)
-            if model_data is None:
-                return None
 
     if model_data.get("n_samples", 0) < MIN_SAMPLES_FOR_ML:
         logger.warning(
@@ -600,7 +723,7 @@ def przewidz_czestotliwosc_ml(roslina: Roslina, teraz=None):
         )
         return None
 
-    X_pred = _build_one_row_features(roslina, teraz)
+    X_pred = _build_one_row_features(roslina, teraz, podlewania)
     cols = model_data["feature_columns"]
     X_pred = X_pred.reindex(columns=cols)
 
@@ -631,20 +754,20 @@ def przewidz_czestotliwosc_ml(roslina: Roslina, teraz=None):
         "cv_mae": model_data.get("cv_mae"),
         "n_samples": model_data.get("n_samples", 0),
         "model_type": model_data.get("model_type", "RF"),
+        "czas_fit": model_data.get("czas_fit"),
+        "czas_predykcji": model_data.get("czas_predykcji"),
+        "kandydaci": model_data.get("kandydaci", []),
     }
 
 
 # -----------------------------------
 # Backup statystyczny
 # -----------------------------------
-def _policz_statystyki_podlewan(roslina):
+def _policz_statystyki_podlewan(roslina, podlewania=None):
     """Zwraca: liczba_podlan, interwaly[], srednia, mediana, odchylenie."""
-    podlewania = CzynoscPielegnacyjna.objects.filter(
-        roslina=roslina, typ='podlewanie', wykonane=True
-    ).order_by('data')
+    lst = _historia_podlewan(roslina, podlewania)
 
     interwaly = []
-    lst = list(podlewania)
     for i in range(1, len(lst)):
         d = (lst[i].data.date() - lst[i - 1].data.date()).days
         if 0 < d <= 60:
@@ -655,7 +778,7 @@ def _policz_statystyki_podlewan(roslina):
     odchylenie = float(np.std(interwaly)) if interwaly else 0.0
 
     return {
-        'liczba_podlan': podlewania.count(),
+        'liczba_podlan': len(lst),
         'interwaly': interwaly,
         'srednia': srednia,
         'mediana': mediana,
@@ -663,27 +786,21 @@ def _policz_statystyki_podlewan(roslina):
     }
 
 
-def analizuj_wzorce_statystyczne(roslina: Roslina):
+def analizuj_wzorce_statystyczne(roslina: Roslina, podlewania=None):
     """
     Prosta analiza statystyczna jako backup gdy ML nie ma wystarczających danych.
     """
-    qs = (
-        CzynoscPielegnacyjna.objects.filter(
-            roslina=roslina, typ="podlewanie", wykonane=True
-        )
-        .order_by("data")
-    )
-    if qs.count() < 3:
+    lst = _historia_podlewan(roslina, podlewania)
+    if len(lst) < 3:
         return {
             "rekomendowana_czestotliwosc": roslina.czestotliwosc_podlewania,
             "pewnosc": 0.3,
-            "liczba_podlan": qs.count(),
+            "liczba_podlan": len(lst),
             "komunikat": "Za mało danych (minimum 3 podlania)",
             "model_type": "Statystyczny",
         }
 
     interwaly = []
-    lst = list(qs)
     for i in range(1, len(lst)):
         d = (lst[i].data.date() - lst[i - 1].data.date()).days
         if 0 < d <= 60:
@@ -693,7 +810,7 @@ def analizuj_wzorce_statystyczne(roslina: Roslina):
         return {
             "rekomendowana_czestotliwosc": roslina.czestotliwosc_podlewania,
             "pewnosc": 0.4,
-            "liczba_podlan": qs.count(),
+            "liczba_podlan": len(lst),
             "komunikat": "Za mało prawidłowych interwałów",
             "model_type": "Statystyczny",
         }
@@ -716,7 +833,7 @@ def analizuj_wzorce_statystyczne(roslina: Roslina):
     return {
         "rekomendowana_czestotliwosc": rekomendacja,
         "pewnosc": round(pewnosc, 2),
-        "liczba_podlan": qs.count(),
+        "liczba_podlan": len(lst),
         "srednia": round(srednia, 1),
         "mediana": mediana,
         "odchylenie": round(odchylenie, 1),
@@ -728,16 +845,15 @@ def analizuj_wzorce_statystyczne(roslina: Roslina):
 # -----------------------------------
 # Analiza pór podlewania
 # -----------------------------------
-def analizuj_pory_podlewania(roslina: Roslina):
+def analizuj_pory_podlewania(roslina: Roslina, podlewania=None):
     """Zlicza pory dnia, kiedy użytkownik najczęściej podlewa."""
-    qs = CzynoscPielegnacyjna.objects.filter(
-        roslina=roslina, typ="podlewanie", wykonane=True
-    )
+    podlewania = _historia_podlewan(roslina, podlewania)
 
     rano = popoludniu = wieczorem = noc = 0
 
-    for p in qs:
-        h = p.data.hour
+    for p in podlewania:
+        # pora dnia użytkownika, nie UTC z bazy
+        h = timezone.localtime(p.data).hour if timezone.is_aware(p.data) else p.data.hour
         if 6 <= h < 12:
             rano += 1
         elif 12 <= h < 18:
@@ -748,7 +864,7 @@ def analizuj_pory_podlewania(roslina: Roslina):
             noc += 1
 
     pory_dict = {"rano": rano, "popoludniu": popoludniu, "wieczorem": wieczorem, "noc": noc}
-    preferowana = max(pory_dict.items(), key=lambda x: x[1])[0] if qs.count() > 0 else None
+    preferowana = max(pory_dict.items(), key=lambda x: x[1])[0] if podlewania else None
 
     return {
         "rano": rano,
@@ -762,14 +878,32 @@ def analizuj_pory_podlewania(roslina: Roslina):
 # -----------------------------------
 # Aktualizacja analizy - POPRAWIONA
 # -----------------------------------
-def zaktualizuj_analize_rosliny(roslina):
+def zaktualizuj_analize_rosliny(roslina, podlewania=None):
     """
-    ZMIANA: Zaktualizowana logika agregacji pewności + zapis nowych pól
+    ZMIANA: Zaktualizowana logika agregacji pewności + zapis nowych pól.
+    Czas i wynik analizy trafiają do TrainingRun (rodzaj='analiza').
     """
+    start = time.perf_counter()
+    try:
+        wynik = _zaktualizuj_analize_rosliny(roslina, podlewania)
+    except Exception as e:
+        _zapisz_przebieg(roslina, "analiza", start, wynik="blad", komunikat=str(e)[:255])
+        raise
+
+    _zapisz_przebieg(
+        roslina, "analiza", start,
+        typ_modelu=str(wynik["wzorce"].get("model_type", ""))[:30],
+        liczba_wierszy=wynik["analiza"].liczba_podlan,
+    )
+    return wynik
+
+
+def _zaktualizuj_analize_rosliny(roslina, podlewania=None):
     logger.info(f"Aktualizacja analizy dla rośliny: {roslina.nazwa}")
+    podlewania = _historia_podlewan(roslina, podlewania)
 
-    stat = _policz_statystyki_podlewan(roslina)
-    wynik_ml = przewidz_czestotliwosc_ml(roslina)
+    stat = _policz_statystyki_podlewan(roslina, podlewania)
+    wynik_ml = przewidz_czestotliwosc_ml(roslina, podlewania=podlewania)
 
     if wynik_ml and wynik_ml.get('n_samples', 0) >= MIN_SAMPLES_FOR_ML:
         wzorce = dict(wynik_ml)
@@ -779,7 +913,7 @@ def zaktualizuj_analize_rosliny(roslina):
         )
         wzorce['liczba_podlan'] = stat['liczba_podlan']
     else:
-        wzorce = analizuj_wzorce_statystyczne(roslina)
+        wzorce = analizuj_wzorce_statystyczne(roslina, podlewania)
         logger.info(f"Używam analizy statystycznej dla {roslina.nazwa}")
 
     # ZMIANA: Bardziej konserwatywna agregacja pewności
@@ -796,7 +930,7 @@ def zaktualizuj_analize_rosliny(roslina):
         stat.get("odchylenie", 0.0),
     )
 
-    jakosc = _oblicz_jakosc_podlewania(roslina)
+    jakosc = _oblicz_jakosc_podlewania(roslina, podlewania)
     soil_score = jakosc["soil_score"]
     water_score = jakosc["water_score"]
     biome_score = 0.5 * soil_score + 0.5 * water_score
@@ -817,16 +951,18 @@ def zaktualizuj_analize_rosliny(roslina):
     wzorce["pewnosc"] = wzorce["pewnosc_laczna"]
 
     # Zapis do bazy
+    # jedna analiza na roślinę; po zmianie właściciela przechodzi na nowego
     analiza, created = AnalizaPielegnacji.objects.get_or_create(
-        roslina=roslina, uzytkownik=roslina.wlasciciel
+        roslina=roslina, defaults={"uzytkownik_id": roslina.wlasciciel_id}
     )
+    analiza.uzytkownik_id = roslina.wlasciciel_id
 
     analiza.srednia_czestotliwosc_dni = stat['srednia'] if stat['srednia'] > 0 else \
         wzorce.get('srednia', wzorce['rekomendowana_czestotliwosc'])
     analiza.odchylenie_standardowe = stat['odchylenie']
     analiza.liczba_podlan = stat['liczba_podlan']
 
-    pory = analizuj_pory_podlewania(roslina)
+    pory = analizuj_pory_podlewania(roslina, podlewania)
     analiza.podlewa_rano = pory['rano'] > 0
     analiza.podlewa_po_poludniu = pory['popoludniu'] > 0
     analiza.podlewa_wieczorem = pory['wieczorem'] > 0
@@ -843,11 +979,19 @@ def zaktualizuj_analize_rosliny(roslina):
     analiza.rmse = wzorce.get('rmse', None)
     analiza.cv_mae = wzorce.get('cv_mae', None)
 
+    # Koszt wybranego silnika + porównanie kandydatów
+    analiza.czas_treningu = wzorce.get('czas_fit', None)
+    analiza.czas_predykcji = wzorce.get('czas_predykcji', None)
+    analiza.kandydaci_modeli = wzorce.get('kandydaci', [])
+
     # ✅ NOWE - Składowe pewności
     analiza.pewnosc_model = wzorce.get('pewnosc_modelu', 0.0)
     analiza.pewnosc_regularnosc = wzorce.get('pewnosc_regularnosci', 0.0)
     analiza.pewnosc_biologia = biome_score
 
+    # Migawka dla widoku analizy – strona renderuje się z niej bez ponownego liczenia
+    analiza.migawka = _migawka_analizy(stat, pory, wzorce)
+
     analiza.save()
 
     logger.info(
@@ -861,6 +1005,41 @@ def zaktualizuj_analize_rosliny(roslina):
     return {'analiza': analiza, 'wzorce': wzorce, 'pory': pory, 'created': created}
 
 
+def _migawka_analizy(stat, pory, wzorce) -> dict:
+    """
+    Niezmienna migawka jednego przebiegu analizy (JSON): szereg interwałów z histogramem,
+    statystyki, pory podlewania i metryki modelu. Każdy przebieg zapisuje nową w całości.
+    """
+    interwaly = [int(d) for d in stat.get('interwaly') or []]
+    histogram = {}
+    for d in interwaly:
+        histogram[d] = histogram.get(d, 0) + 1
+
+    def liczba(v):
+        return None if v is None else float(v)
+
+    return {
+        'interwaly': interwaly,
+        'histogram_interwalow': sorted(histogram.items()),
+        'srednia': liczba(stat.get('srednia')),
+        'mediana': liczba(stat.get('mediana')),
+        'odchylenie': liczba(stat.get('odchylenie')),
+        'pory': dict(pory),
+        'metryki': {
+            'typ_modelu': wzorce.get('model_type', 'RF'),
+            'n_samples': int(wzorce.get('n_samples', stat.get('liczba_podlan', 0))),
+            'cv_mae': liczba(wzorce.get('cv_mae')),
+            'mae': liczba(wzorce.get('mae')),
+            'rmse': liczba(wzorce.get('rmse')),
+            'r2': liczba(wzorce.get('r2')),
+            'pewnosc_modelu': liczba(wzorce.get('pewnosc_modelu')),
+            'pewnosc_regularnosci': liczba(wzorce.get('pewnosc_regularnosci')),
+            'pewnosc_gleby': liczba(wzorce.get('pewnosc_gleby')),
+            'pewnosc_wody': liczba(wzorce.get('pewnosc_wody')),
+        },
+    }
+
+
 def zastosuj_rekomendacje_ml(roslina: Roslina, min_pewnosc: float = 0.5):
     """
     ZMIANA: Obniżony próg pewności do 0.5
@@ -902,31 +1081,39 @@ def zastosuj_rekomendacje_ml(roslina: Roslina, min_pewnosc: float = 0.5):
 # -----------------------------------
 # Operacje wsadowe
 # -----------------------------------
-def retrenuj_wszystkie_modele():
-    """Trenuje/retrenuje modele ML dla wszystkich aktywnych roślin."""
+def retrenuj_wszystkie_modele(postep=None):
+    """
+    Trenuje/retrenuje modele ML dla wszystkich aktywnych roślin.
+    `postep(i, total, roslina, wynik)` – opcjonalny callback (np. update_state zadania Celery).
+    """
     rosliny = Roslina.objects.filter(is_active=True)
+    total = rosliny.count()
     wytrenowane = 0
     pominiete = 0
     bledy = 0
 
-    logger.info(f"Rozpoczynam trenowanie modeli dla {rosliny.count()} roślin...")
+    logger.info(f"Rozpoczynam trenowanie modeli dla {total} roślin...")
 
-    for r in rosliny:
+    for i, r in enumerate(rosliny.iterator(), start=1):
+        wynik = None
         try:
             wynik = trenuj_model_ml(r)
             if wynik:
                 wytrenowane += 1
-                print(
+                logger.info(
                     f"✓ {r.nazwa}: R²={wynik['score']:.3f} (adj={wynik.get('adj_score', 0):.3f}), "
-                    f"MAE={wynik['mae']:.2f} dni, próbki={wynik['n_samples']}"
+                    f"MAE={wynik['mae']:.2f} dni, próbki={wynik['n_samples']}, "
+                    f"fit={wynik['czas_fit']:.3f}s"
                 )
             else:
                 pominiete += 1
-                print(f"⚠ {r.nazwa}: Za mało danych")
+                logger.info(f"⚠ {r.nazwa}: Za mało danych")
         except Exception as e:
             bledy += 1
-            logger.error(f"Błąd dla {r.nazwa}: {str(e)}", exc_info=True)
-            print(f"✗ {r.nazwa}: Błąd - {str(e)}")
+            logger.error(f"✗ Błąd dla {r.nazwa}: {str(e)}", exc_info=True)
+
+        if postep:
+            postep(i, total, r, wynik)
 
     logger.info(
         f"Trenowanie zakończone: wytrenowane={wytrenowane}, "
@@ -936,19 +1123,19 @@ def retrenuj_wszystkie_modele():
         "wytrenowane": wytrenowane,
         "pominiete": pominiete,
         "bledy": bledy,
-        "total": rosliny.count(),
+        "total": total,
     }
 
 
 def statystyki_modeli():
     """Zwraca statystyki wszystkich wytrenowanych modeli."""
     modele = []
-    for filename in os.listdir(ML_MODELS_DIR):
+    for filename in lista_artefaktow("model_roslina_"):
         if filename.endswith(".pkl"):
-            filepath = os.path.join(ML_MODELS_DIR, filename)
             try:
-                with open(filepath, "rb") as f:
-                    model_data = pickle.load(f)
+                model_data = wczytaj_artefakt(filename)
+                if model_data is None:
+                    continue
                 roslina_id = filename.replace("model_roslina_", "").replace(".pkl", "")
                 modele.append(
                     {
@@ -966,3 +1153,70 @@ def statystyki_modeli():
             except Exception as e:
                 logger.error(f"Błąd ładowania modelu {filename}: {e}")
     return modele
+
+
+def statystyki_treningow(godziny: int = 24, rodzaj: str = "trening", limit_najwolniejszych: int = 10):
+    """
+    Podsumowanie TrainingRun z ostatnich `godziny` godzin:
+    przepustowość (rośliny/s), p50/p95 czasu fit i czasu całkowitego, najwolniejsze rośliny.
+    Przepustowość liczona względem czasu zegarowego (od pierwszego startu do ostatniego
+    końca) – przebiegi równoległych workerów nakładają się; suma czasów to `czas_laczny_s`.
+    """
+    od = timezone.now() - timedelta(hours=godziny)
+    wiersze = list(
+        TrainingRun.objects
+        .filter(rodzaj=rodzaj, data_rozpoczecia__gte=od)
+        .values(
+            "roslina_id", "roslina__nazwa", "wynik", "typ_modelu",
+            "liczba_wierszy", "czas_calkowity", "czas_fit", "data_rozpoczecia",
+        )
+    )
+
+    def _percentyle(wartosci):
+        if not wartosci:
+            return {"p50": None, "p95": None}
+        a = np.asarray(wartosci, dtype=float)
+        return {"p50": round(float(np.percentile(a, 50)), 4), "p95": round(float(np.percentile(a, 95)), 4)}
+
+    czasy = [w["czas_calkowity"] for w in wiersze]
+    czasy_fit = [w["czas_fit"] for w in wiersze if w["czas_fit"] is not None]
+    suma = float(sum(czasy))
+    rozpietosc = 0.0
+    if wiersze:
+        poczatek = min(w["data_rozpoczecia"] for w in wiersze)
+        koniec = max(w["data_rozpoczecia"] + timedelta(seconds=w["czas_calkowity"]) for w in wiersze)
+        rozpietosc = (koniec - poczatek).total_seconds()
+
+    wyniki = {}
+    typy = {}
+    for w in wiersze:
+        wyniki[w["wynik"]] = wyniki.get(w["wynik"], 0) + 1
+        if w["typ_modelu"]:
+            typy[w["typ_modelu"]] = typy.get(w["typ_modelu"], 0) + 1
+
+    najwolniejsze = sorted(wiersze, key=lambda w: w["czas_calkowity"], reverse=True)[:limit_najwolniejszych]
+
+    return {
+        "rodzaj": rodzaj,
+        "okno_godzin": godziny,
+        "liczba": len(wiersze),
+        "wyniki": wyniki,
+        "typy_modeli": typy,
+        "czas_laczny_s": round(suma, 3),
+        "czas_zegarowy_s": round(rozpietosc, 3),
+        "rosliny_na_sekunde": round(len(wiersze) / rozpietosc, 3) if rozpietosc > 0 else None,
+        "czas_fit_s": _percentyle(czasy_fit),
+        "czas_calkowity_s": _percentyle(czasy),
+        "najwolniejsze": [
+            {
+                "roslina_id": w["roslina_id"],
+                "roslina": w["roslina__nazwa"],
+                "czas_calkowity_s": round(w["czas_calkowity"], 4),
+                "czas_fit_s": round(w["czas_fit"], 4) if w["czas_fit"] is not None else None,
+                "liczba_wierszy": w["liczba_wierszy"],
+                "typ_modelu": w["typ_modelu"],
+                "data": w["data_rozpoczecia"].isoformat(),
+            }
+            for w in najwolniejsze
+        ],
+    }
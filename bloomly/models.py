@@ -1,9 +1,11 @@
 from django.db import models
+from django.core.validators import MaxValueValidator
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db.models import Count, F, Max
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.utils import timezone
-from datetime import time
+from datetime import datetime, time
 from datetime import timedelta
 from typing import Optional
 import math
@@ -16,6 +18,11 @@ class ProfilUzytkownika(models.Model):
     data_urodzenia = models.DateField(null=True, blank=True, verbose_name="Data urodzenia")
 
     powiadomienia_email = models.BooleanField(default=True, verbose_name="Powiadomienia email")
+    godzina_powiadomien = models.PositiveSmallIntegerField(
+        null=True, blank=True, validators=[MaxValueValidator(23)],
+        verbose_name="Godzina powiadomień",
+        help_text="Puste = wg pór, o których zwykle podlewasz"
+    )
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -78,16 +85,56 @@ class Roslina(models.Model):
     czestotliwosc_podlewania = models.IntegerField(default=7, verbose_name="Częstotliwość podlewania (dni)")
     ostatnie_podlewanie = models.DateField(null=True, blank=True, verbose_name="Ostatnie podlewanie")
 
+    # Pola zdenormalizowane: liczba_podlan zmieniana tylko przez F() (zapis/usunięcie
+    # podlewania), nastepne_podlewanie = ostatnie_podlewanie + czestotliwosc_podlewania.
+    # Naprawa: manage.py przelicz_liczniki_podlan
+    liczba_podlan = models.PositiveIntegerField(default=0, editable=False, verbose_name="Liczba podlań")
+    nastepne_podlewanie = models.DateField(null=True, blank=True, editable=False,
+                                           verbose_name="Następne podlewanie")
+
     is_active = models.BooleanField(default=True, verbose_name="Aktywna")
 
     class Meta:
         verbose_name = "Roślina"
         verbose_name_plural = "Rośliny"
         ordering = ['-data_dodania']
+        indexes = [
+            models.Index(fields=['wlasciciel', 'is_active', 'nastepne_podlewanie'], name='roslina_do_podlania_idx'),
+            # stronicowanie i filtry listy roślin (views.SORTOWANIA_ROSLIN)
+            models.Index(fields=['wlasciciel', 'is_active', '-data_dodania', '-id'], name='roslina_nowe_idx'),
+            models.Index(fields=['wlasciciel', 'is_active', 'nazwa', 'id'], name='roslina_nazwa_idx'),
+            models.Index(fields=['wlasciciel', 'is_active', 'lokalizacja'], name='roslina_lokalizacja_idx'),
+            models.Index(fields=['wlasciciel', 'is_active', 'kategoria'], name='roslina_kategoria_idx'),
+        ]
 
     def __str__(self):
         return self.nazwa
 
+    def save(self, *args, **kwargs):
+        self.nastepne_podlewanie = self.wyznacz_nastepne_podlewanie()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            if {'ostatnie_podlewanie', 'czestotliwosc_podlewania'} & set(update_fields):
+                kwargs['update_fields'] = {*update_fields, 'nastepne_podlewanie'}
+        elif self.pk is not None and not self._state.adding:
+            # pełny zapis nie nadpisuje licznika nieaktualną wartością z pamięci
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields if not f.primary_key and f.name != 'liczba_podlan'
+            ]
+        super().save(*args, **kwargs)
+
+    def wyznacz_nastepne_podlewanie(self, ostatnie=None):
+        ostatnie = ostatnie or self.ostatnie_podlewanie
+        if ostatnie is None:
+            return None
+        return ostatnie + timedelta(days=self.czestotliwosc_podlewania)
+
+    @staticmethod
+    def warunek_do_podlania(dzien=None):
+        """Q dla roślin do podlania (jak czy_potrzebuje_podlewania), po indeksie nastepne_podlewanie"""
+        dzien = dzien or timezone.now().date()
+        return models.Q(nastepne_podlewanie__isnull=True) | models.Q(nastepne_podlewanie__lte=dzien)
+
     def dni_od_podlewania(self):
         """Ile dni minęło od ostatniego podlewania"""
         if self.ostatnie_podlewanie:
@@ -128,8 +175,26 @@ class CzynoscPielegnacyjna(models.Model):
 
     def save(self, *args, **kwargs):
         is_new = self.pk is None
+        poprzednio = None
+        if not is_new:
+            poprzednio = CzynoscPielegnacyjna.objects.filter(pk=self.pk).values('typ', 'wykonane', 'data').first()
         super().save(*args, **kwargs)
 
+        if poprzednio is None:
+            # nowe podlewanie: szybka ścieżka – licznik przez F(), ostatnie podlewanie tylko do przodu
+            if self.liczy_sie_do_licznika():
+                Roslina.objects.filter(pk=self.roslina_id).update(liczba_podlan=F('liczba_podlan') + 1)
+                self.roslina.liczba_podlan += 1
+                self._przesun_ostatnie_podlewanie(timezone.localtime(self.data).date())
+        else:
+            liczyla_sie = poprzednio['typ'] == 'podlewanie' and poprzednio['wykonane']
+            if (liczyla_sie or self.liczy_sie_do_licznika()) and (
+                liczyla_sie != self.liczy_sie_do_licznika() or poprzednio['data'] != self.data
+            ):
+                # edycja mogła cofnąć ostatnie podlewanie – ta sama definicja co komenda naprawy
+                przelicz_liczniki_podlan([self.roslina_id])
+                self.roslina.refresh_from_db(fields=['liczba_podlan', 'ostatnie_podlewanie', 'nastepne_podlewanie'])
+
         if self.typ == 'podlewanie':
             prev = (
                 CzynoscPielegnacyjna.objects
@@ -143,10 +208,20 @@ class CzynoscPielegnacyjna(models.Model):
                 if self.interwal_dni != interval:
                     CzynoscPielegnacyjna.objects.filter(pk=self.pk).update(interwal_dni=interval)
 
-            if is_new and (
-                    self.roslina.ostatnie_podlewanie is None or self.data.date() > self.roslina.ostatnie_podlewanie):
-                self.roslina.ostatnie_podlewanie = self.data.date()
-                self.roslina.save(update_fields=['ostatnie_podlewanie'])
+    def _przesun_ostatnie_podlewanie(self, dzien):
+        """Warunkowe UPDATE (tylko do przodu) – bez wyścigu odczyt-zapis między równoległymi podlaniami."""
+        roslina = self.roslina
+        nastepne = roslina.wyznacz_nastepne_podlewanie(dzien)
+        przesunieto = Roslina.objects.filter(pk=roslina.pk).filter(
+            models.Q(ostatnie_podlewanie__isnull=True) | models.Q(ostatnie_podlewanie__lt=dzien)
+        ).update(ostatnie_podlewanie=dzien, nastepne_podlewanie=nastepne)
+        if przesunieto:
+            roslina.ostatnie_podlewanie = dzien
+            roslina.nastepne_podlewanie = nastepne
+            oznacz_rosliny_do_odswiezenia([roslina.pk])
+
+    def liczy_sie_do_licznika(self):
+        return self.typ == 'podlewanie' and self.wykonane
 
     roslina = models.ForeignKey(Roslina, on_delete=models.CASCADE, verbose_name="Roślina")
     uzytkownik = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name="Użytkownik")
@@ -162,15 +237,29 @@ class CzynoscPielegnacyjna(models.Model):
         verbose_name = "Czynność pielęgnacyjna"
         verbose_name_plural = "Czynności pielęgnacyjne"
         ordering = ['-data']
+        indexes = [
+            # ostatnie podlanie rośliny (Subquery w bloomly.karty)
+            models.Index(fields=['roslina', 'typ', 'wykonane', '-data'], name='czynnosc_ostatnie_idx'),
+            # historia rośliny stronicowana po (data, id) – views.KLUCZE_HISTORII
+            models.Index(fields=['roslina', '-data', '-id'], name='czynnosc_historia_idx'),
+            # kalendarz: czynności użytkownika z zakresu dat (bloomly.kalendarz)
+            models.Index(fields=['uzytkownik', 'data'], name='czynnosc_kalendarz_idx'),
+        ]
 
     def __str__(self):
         return f"{self.get_typ_display()} - {self.roslina.nazwa} ({self.data.strftime('%d.%m.%Y')})"
 
+# Statusy otwartego przypomnienia – wspólne dla STATUSY_OTWARTE i częściowego UNIQUE
+# jedno_otwarte_przypomnienie (a przez nie dla ON CONFLICT ... WHERE w przypomnienia.py)
+STATUSY_OTWARTE_PRZYPOMNIEN = ('oczekujace', 'wyslane')
+
+
 class Przypomnienie(models.Model):
     """
     Przypomnienia dotyczą TYLKO podlewania.
-    Statusy: tylko 'oczekujace' i 'wykonane'.
-    'wyslane' to wyłącznie flaga techniczna (czy wysłano powiadomienie), a nie osobny status.
+    Otwarte (STATUSY_OTWARTE): 'oczekujace' i 'wyslane' (powiadomienie poszło, podlewanie
+    jeszcze nie) – na roślinę może być tylko jedno, pilnuje tego częściowy UNIQUE w bazie.
+    Zamknięte: 'wykonane' i 'anulowane' (brak danych do wyznaczenia terminu).
     """
     TYPY_PRZYPOMNIE = [
         ('podlewanie', 'Podlewanie'),
@@ -178,9 +267,16 @@ class Przypomnienie(models.Model):
 
     STATUS_CHOICES = [
         ('oczekujace', 'Oczekujące'),
+        ('wyslane', 'Wysłane'),
         ('wykonane', 'Wykonane'),
+        ('anulowane', 'Anulowane'),
     ]
 
+    STATUSY_OTWARTE = STATUSY_OTWARTE_PRZYPOMNIEN
+
+    # E-mail wychodzi tyle dni przed terminem (indeks termin_powiadomienia)
+    DNI_PRZED_POWIADOMIENIEM = 3
+
     roslina = models.ForeignKey(Roslina, on_delete=models.CASCADE, verbose_name="Roślina")
     uzytkownik = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name="Użytkownik")
 
@@ -206,6 +302,10 @@ class Przypomnienie(models.Model):
     )
 
     wyslane = models.BooleanField(default=False, verbose_name="Wysłane")
+    termin_powiadomienia = models.DateTimeField(
+        null=True, blank=True, db_index=True, verbose_name="Termin powiadomienia",
+        help_text="Kiedy wysłać e-mail; puste = nic do wysłania (wysłane, wykonane, po terminie)"
+    )
 
     powtarzalne = models.BooleanField(default=True, verbose_name="Systemowe (ML)")
     interwal_dni = models.IntegerField(null=True, blank=True, verbose_name="Interwał (dni) wg ML")
@@ -217,10 +317,56 @@ class Przypomnienie(models.Model):
         verbose_name = "Przypomnienie"
         verbose_name_plural = "Przypomnienia"
         ordering = ['data_przypomnienia']
+        constraints = [
+            # ONE-OPEN; warunek musi być identyczny z ON CONFLICT ... WHERE w przypomnienia.upsert
+            models.UniqueConstraint(
+                fields=['roslina', 'typ'],
+                # lista jak w migracji 0019 – krotka dałaby nową migrację bez zmiany w bazie
+                condition=models.Q(status__in=list(STATUSY_OTWARTE_PRZYPOMNIEN)),
+                name='jedno_otwarte_przypomnienie',
+            ),
+        ]
+        indexes = [
+            # feed przypomnień stronicowany po kluczu – views.KLUCZE_PRZYPOMNIEN
+            models.Index(fields=['uzytkownik', 'status', 'data_przypomnienia', 'id'], name='przypomnienie_feed_idx'),
+            models.Index(fields=['uzytkownik', 'status', '-data_wykonania', '-id'], name='przypomnienie_wykonane_idx'),
+        ]
 
     def __str__(self):
         return f"{self.tytul} - {self.roslina.nazwa} ({self.data_przypomnienia.strftime('%d.%m.%Y')})"
 
+    def save(self, *args, pora=None, **kwargs):
+        # Utrzymuj indeks powiadomień przy każdej zmianie terminu/statusu;
+        # `pora` – slot użytkownika, gdy wywołujący go zna (bez pory_wysylki)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None:
+            self.termin_powiadomienia = self.wyznacz_termin_powiadomienia(pora)
+        elif {'data_przypomnienia', 'status', 'wyslane'} & set(update_fields):
+            self.termin_powiadomienia = self.wyznacz_termin_powiadomienia(pora)
+            kwargs['update_fields'] = set(update_fields) | {'termin_powiadomienia'}
+        super().save(*args, **kwargs)
+
+    def wyznacz_termin_powiadomienia(self, pora=None):
+        """
+        Chwila wysyłki e-maila albo None, jeśli nie ma czego wysyłać: ostatni slot
+        użytkownika (godzina, minuta – przypomnienia.pory_wysylki) nie później niż
+        DNI_PRZED_POWIADOMIENIEM dni przed terminem.
+        """
+        if self.status != 'oczekujace' or self.wyslane or not self.data_przypomnienia:
+            return None
+        if pora is None:
+            from .przypomnienia import pory_wysylki
+            pora = pory_wysylki([self.uzytkownik_id])[self.uzytkownik_id]
+        godzina, minuta = pora
+
+        # w czasie lokalnym: ta sama godzina zegarowa także przy zmianie czasu (DST)
+        granica = timezone.localtime(self.data_przypomnienia) - timedelta(days=self.DNI_PRZED_POWIADOMIENIEM)
+        dzien = granica.date()
+        slot = timezone.make_aware(datetime.combine(dzien, time(godzina))) + timedelta(minutes=minuta)
+        if slot > granica:
+            slot = timezone.make_aware(datetime.combine(dzien - timedelta(days=1), time(godzina))) + timedelta(minutes=minuta)
+        return slot
+
     def is_overdue(self) -> bool:
         """Czy przypomnienie jest przeterminowane (tylko dla oczekujących)."""
         if self.status != 'oczekujace' or not self.data_przypomnienia:
@@ -285,13 +431,40 @@ class Przypomnienie(models.Model):
         self.data_wykonania = timezone.now()
         self.save(update_fields=['status', 'data_wykonania'])
 
-    def odloz(self, dni: int = 1):
+    def odloz(self, dni: int = 1, pora=None):
         """
         Przesuń termin przypomnienia o określoną liczbę dni.
         Status pozostaje 'oczekujace' (nie mamy osobnego statusu 'odlozone').
+        Slot wysyłki bierzemy z bieżącego terminu powiadomienia (przelicz_terminy_powiadomien
+        trzyma go w zgodzie z profilem), więc przesunięcie nie odpytuje pory_wysylki.
         """
+        if pora is None and self.termin_powiadomienia:
+            termin = timezone.localtime(self.termin_powiadomienia)
+            pora = (termin.hour, termin.minute)
         self.data_przypomnienia += timedelta(days=dni)
-        self.save(update_fields=['data_przypomnienia'])
+        self.save(update_fields=['data_przypomnienia'], pora=pora)
+
+
+def _interwal_z_analizy(czestotliwosc, rekomendowana=None, liczba_podlan=None, pewnosc=None) -> int:
+    """
+    Reguła wyboru interwału (ML vs. ustawienie rośliny) na samych wartościach,
+    wspólna dla pojedynczej rośliny i planera zbiorczego (przypomnienia.py).
+    """
+    domyslny = max(1, czestotliwosc or 7)
+    if (
+        rekomendowana
+        and (liczba_podlan or 0) >= 5
+        and (pewnosc or 0) >= 0.5
+    ):
+        return max(1, rekomendowana)
+    return domyslny
+
+
+def _data_przypomnienia_w_poludnie(baza, interwal_dni: int):
+    """Termin przypomnienia: baza + interwał, godz. 12:00 czasu lokalnego."""
+    docelowa_data = baza + timedelta(days=interwal_dni)
+    naive_dt = timezone.datetime.combine(docelowa_data, time(12, 0))
+    return timezone.make_aware(naive_dt)
 
 
 def _wyznacz_interwal_ml_dni(roslina: Roslina) -> int:
@@ -300,32 +473,26 @@ def _wyznacz_interwal_ml_dni(roslina: Roslina) -> int:
     Jeśli model nie ma jeszcze wystarczających danych lub pewność jest niska,
     fallback: czestotliwosc_podlewania z modelu Roslina.
     """
-
-    domyslny = max(1, roslina.czestotliwosc_podlewania or 7)
-
     try:
         analiza = roslina.analiza  
     except AnalizaPielegnacji.DoesNotExist:
-        return domyslny
-
-
-    if (
-        analiza.rekomendowana_czestotliwosc
-        and analiza.liczba_podlan >= 5
-        and analiza.pewnosc_rekomendacji >= 0.5
-    ):
-        return max(1, analiza.rekomendowana_czestotliwosc)
-
-    return domyslny
-
+        return _interwal_z_analizy(roslina.czestotliwosc_podlewania)
 
-from django.db import transaction
+    return _interwal_z_analizy(
+        roslina.czestotliwosc_podlewania,
+        analiza.rekomendowana_czestotliwosc,
+        analiza.liczba_podlan,
+        analiza.pewnosc_rekomendacji,
+    )
 
 
 def utworz_przypomnienie_podlewanie(roslina) -> Optional[Przypomnienie]:
     """
-    ONE-OPEN + ML - thread-safe version
+    ONE-OPEN + ML: jedno zapytanie upsert (częściowy UNIQUE w bazie zamiast
+    blokady i usuwania duplikatów) – patrz przypomnienia.upsert_otwarte_przypomnienie.
     """
+    from .przypomnienia import upsert_otwarte_przypomnienie
+
     if not roslina.is_active:
         return None
 
@@ -336,72 +503,39 @@ def utworz_przypomnienie_podlewanie(roslina) -> Optional[Przypomnienie]:
     else:
         baza = timezone.now().date()
 
-    docelowa_data = baza + timedelta(days=interwal_dni)
-    noon = time(12, 0)
-    naive_dt = timezone.datetime.combine(docelowa_data, noon)
-    data_przypomnienia = timezone.make_aware(naive_dt)
-
-    with transaction.atomic():
-        oczekujace = list(
-            Przypomnienie.objects
-            .filter(roslina=roslina, status='oczekujace')
-            .select_for_update()  
-            .order_by('data_przypomnienia')
-        )
-
-        if oczekujace:
-            do_zachowania = oczekujace[0]
-
-            if len(oczekujace) > 1:
-   
-                for przyp in oczekujace[1:]:
-                    przyp.delete()
-
-            if (
-                    do_zachowania.data_przypomnienia != data_przypomnienia
-                    or do_zachowania.interwal_dni != interwal_dni
-            ):
-                do_zachowania.data_przypomnienia = data_przypomnienia
-                do_zachowania.interwal_dni = interwal_dni
-                do_zachowania.automatyczne = True
-                do_zachowania.powtarzalne = True
-                do_zachowania.save(update_fields=[
-                    'data_przypomnienia',
-                    'interwal_dni',
-                    'automatyczne',
-                    'powtarzalne'
-                ])
-
-            return do_zachowania
-
-        return Przypomnienie.objects.create(
-            roslina=roslina,
-            uzytkownik=roslina.wlasciciel,
-            typ='podlewanie',
-            tytul=f'Podlej {roslina.nazwa}',
-            tresc=(
+    pid, _ = upsert_otwarte_przypomnienie(
+        roslina.pk,
+        {
+            'uzytkownik_id': roslina.wlasciciel_id,
+            'tytul': f'Podlej {roslina.nazwa}',
+            'tresc': (
                 f'Czas podlać {roslina.nazwa} ({roslina.gatunek}). '
                 f'Ostatnie podlewanie: {roslina.ostatnie_podlewanie or "brak danych"}. '
                 f'Interwał (ML): co {interwal_dni} dni.'
             ),
-            data_przypomnienia=data_przypomnienia,
-            powtarzalne=True,
-            interwal_dni=interwal_dni,
-            automatyczne=True,
-            priorytet=2 if roslina.czy_potrzebuje_podlewania() else 1,
-            status='oczekujace',
-        )
+            'data_przypomnienia': _data_przypomnienia_w_poludnie(baza, interwal_dni),
+            'powtarzalne': True,
+            'interwal_dni': interwal_dni,
+            'automatyczne': True,
+            'priorytet': 2 if roslina.czy_potrzebuje_podlewania() else 1,
+        },
+        pola_aktualizacji=('interwal_dni', 'automatyczne', 'powtarzalne'),
+    )
+    return Przypomnienie.objects.get(pk=pid)
+
 
 def aktualizuj_przypomnienia_uzytkownika(uzytkownik: User):
     """
     Dla każdej aktywnej rośliny użytkownika:
     - zapewnij, że istnieje dokładnie JEDNO oczekujące przypomnienie o podlewaniu,
       wyliczone wg ML (ONE-OPEN).
+    Zbiorczo (stała liczba zapytań) – patrz przypomnienia.zaplanuj_przypomnienia.
     """
-    rosliny = Roslina.objects.filter(wlasciciel=uzytkownik, is_active=True)
+    from .przypomnienia import zaplanuj_przypomnienia
 
-    for roslina in rosliny:
-        utworz_przypomnienie_podlewanie(roslina)
+    return zaplanuj_przypomnienia(
+        Roslina.objects.filter(wlasciciel=uzytkownik, is_active=True)
+    )
 
 
 class Kategoria(models.Model):
@@ -587,7 +721,11 @@ class AnalizaPielegnacji(models.Model):
 
     TYPY_MODELU = [
         ('RF', 'Random Forest'),
+        ('RFS', 'Random Forest (mały)'),
         ('GB', 'Gradient Boosting'),
+        ('HGB', 'Histogram Gradient Boosting'),
+        ('STAT', 'Mediana interwałów'),
+        ('Statystyczny', 'Statystyczny (backup)'),
     ]
 
     roslina = models.OneToOneField(
@@ -614,7 +752,7 @@ class AnalizaPielegnacji(models.Model):
     pewnosc_rekomendacji = models.FloatField(default=0.5)
 
     typ_modelu = models.CharField(
-        max_length=2,
+        max_length=12,
         choices=TYPY_MODELU,
         default='RF',
         verbose_name="Typ modelu ML"
@@ -625,10 +763,18 @@ class AnalizaPielegnacji(models.Model):
     rmse = models.FloatField(null=True, blank=True, verbose_name="RMSE")
     cv_mae = models.FloatField(null=True, blank=True, verbose_name="CV MAE (Cross-Validation)")
 
+    czas_treningu = models.FloatField(null=True, blank=True, verbose_name="Czas treningu modelu (s)")
+    czas_predykcji = models.FloatField(null=True, blank=True, verbose_name="Czas predykcji (s)")
+    kandydaci_modeli = models.JSONField(default=list, blank=True, verbose_name="Ocenione modele (MAE, koszt)")
+
     pewnosc_model = models.FloatField(default=0.0, verbose_name="Pewność - jakość modelu")
     pewnosc_regularnosc = models.FloatField(default=0.0, verbose_name="Pewność - regularność")
     pewnosc_biologia = models.FloatField(default=0.0, verbose_name="Pewność - zgodność biologiczna")
 
+    # Wynik ostatniego przebiegu ml_utils.zaktualizuj_analize_rosliny (interwały, histogramy,
+    # pory, metryki) – widok analizy renderuje się wyłącznie z niej
+    migawka = models.JSONField(default=dict, blank=True, editable=False, verbose_name="Migawka analizy")
+
     data_aktualizacji = models.DateTimeField(auto_now=True, verbose_name="Ostatnia aktualizacja")
     data_utworzenia = models.DateTimeField(auto_now_add=True, verbose_name="Data utworzenia")
 
@@ -638,3 +784,236 @@ class AnalizaPielegnacji(models.Model):
 
     def __str__(self):
         return f"Analiza: {self.roslina.nazwa} - {self.rekomendowana_czestotliwosc} dni ({self.get_typ_modelu_display()})"
+
+
+class ArtefaktModelu(models.Model):
+    """Zserializowany model ML adresowany treścią (backend DatabaseArtifactStore)."""
+
+    sha256 = models.CharField(max_length=64, unique=True, verbose_name="SHA-256")
+    dane = models.BinaryField(verbose_name="Dane")
+    rozmiar = models.PositiveIntegerField(default=0, verbose_name="Rozmiar (B)")
+    data_utworzenia = models.DateTimeField(auto_now_add=True, verbose_name="Data utworzenia")
+
+    class Meta:
+        verbose_name = "Artefakt modelu"
+        verbose_name_plural = "Artefakty modeli"
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.rozmiar} B)"
+
+
+class ReferencjaArtefaktu(models.Model):
+    """Wskaźnik nazwa -> digest aktualnie opublikowanego artefaktu."""
+
+    nazwa = models.CharField(max_length=200, unique=True, verbose_name="Nazwa")
+    sha256 = models.CharField(max_length=64, verbose_name="SHA-256")
+    data_aktualizacji = models.DateTimeField(auto_now=True, verbose_name="Ostatnia aktualizacja")
+
+    class Meta:
+        verbose_name = "Referencja artefaktu"
+        verbose_name_plural = "Referencje artefaktów"
+
+    def __str__(self):
+        return f"{self.nazwa} -> {self.sha256[:12]}"
+
+
+class TrainingRun(models.Model):
+    """Pomiar pojedynczego treningu modelu / analizy rośliny (czasy, rozmiar danych, wynik)."""
+
+    RODZAJE = [
+        ('trening', 'Trening modelu'),
+        ('analiza', 'Analiza rośliny'),
+    ]
+
+    WYNIKI = [
+        ('ok', 'OK'),
+        ('pominiete', 'Pominięte (za mało danych)'),
+        ('blad', 'Błąd'),
+    ]
+
+    roslina = models.ForeignKey(
+        Roslina, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='treningi', verbose_name="Roślina"
+    )
+    rodzaj = models.CharField(max_length=10, choices=RODZAJE, default='trening', verbose_name="Rodzaj")
+    wynik = models.CharField(max_length=10, choices=WYNIKI, default='ok', verbose_name="Wynik")
+    typ_modelu = models.CharField(max_length=30, blank=True, verbose_name="Typ modelu")
+
+    liczba_wierszy = models.IntegerField(default=0, verbose_name="Liczba wierszy")
+    liczba_cech = models.IntegerField(default=0, verbose_name="Liczba cech")
+
+    czas_calkowity = models.FloatField(default=0.0, verbose_name="Czas całkowity (s)")
+    czas_cv = models.FloatField(null=True, blank=True, verbose_name="Czas CV (s)")
+    czas_fit = models.FloatField(null=True, blank=True, verbose_name="Czas fit (s)")
+
+    komunikat = models.CharField(max_length=255, blank=True, verbose_name="Komunikat")
+    task_id = models.CharField(max_length=255, blank=True, verbose_name="ID zadania Celery")
+    data_rozpoczecia = models.DateTimeField(default=timezone.now, verbose_name="Data rozpoczęcia")
+
+    class Meta:
+        verbose_name = "Przebieg treningu ML"
+        verbose_name_plural = "Przebiegi treningu ML"
+        ordering = ['-data_rozpoczecia']
+        indexes = [
+            models.Index(fields=['rodzaj', '-data_rozpoczecia']),
+        ]
+
+    def __str__(self):
+        nazwa = self.roslina.nazwa if self.roslina_id else "—"
+        return f"{self.get_rodzaj_display()} {nazwa}: {self.get_wynik_display()} ({self.czas_calkowity:.2f} s)"
+
+
+class BrudnaRoslina(models.Model):
+    """
+    Znacznik „roślina wymaga odświeżenia” – ustawiany sygnałami przy zapisie
+    czynności, rośliny lub analizy; zdejmowany po przeliczeniu przypomnienia.
+    """
+
+    roslina = models.OneToOneField(
+        Roslina, on_delete=models.CASCADE, primary_key=True,
+        related_name='znacznik_odswiezenia', verbose_name="Roślina"
+    )
+    data_oznaczenia = models.DateTimeField(default=timezone.now, verbose_name="Data oznaczenia")
+
+    class Meta:
+        verbose_name = "Roślina do odświeżenia"
+        verbose_name_plural = "Rośliny do odświeżenia"
+
+    def __str__(self):
+        return f"{self.roslina_id} @ {self.data_oznaczenia:%Y-%m-%d %H:%M}"
+
+
+def oznacz_rosliny_do_odswiezenia(roslina_ids):
+    """Jeden upsert: nowy znacznik albo przesunięcie daty istniejącego."""
+    teraz = timezone.now()
+    BrudnaRoslina.objects.bulk_create(
+        [BrudnaRoslina(roslina_id=rid, data_oznaczenia=teraz) for rid in set(roslina_ids)],
+        update_conflicts=True,
+        unique_fields=['roslina'],
+        update_fields=['data_oznaczenia'],
+    )
+
+
+@receiver(post_save, sender=Roslina)
+def oznacz_zmiane_rosliny(sender, instance, raw=False, **kwargs):
+    if not raw:
+        oznacz_rosliny_do_odswiezenia([instance.pk])
+
+
+@receiver(post_save, sender=CzynoscPielegnacyjna)
+@receiver(post_save, sender=AnalizaPielegnacji)
+def oznacz_zmiane_danych_rosliny(sender, instance, raw=False, **kwargs):
+    if not raw:
+        oznacz_rosliny_do_odswiezenia([instance.roslina_id])
+
+
+@receiver(post_delete, sender=CzynoscPielegnacyjna)
+def cofnij_liczniki_podlan(sender, instance, origin=None, **kwargs):
+    """Usunięte podlewanie: licznik i ostatnie podlewanie przeliczane z pozostałej historii."""
+    # kaskada z usuwanej rośliny/użytkownika – nie ma czego poprawiać
+    if not (isinstance(origin, CzynoscPielegnacyjna) or getattr(origin, 'model', None) is CzynoscPielegnacyjna):
+        return
+    if not instance.liczy_sie_do_licznika():
+        return
+    przelicz_liczniki_podlan([instance.roslina_id])
+
+
+@receiver(post_save, sender=Roslina)
+@receiver(post_delete, sender=Roslina)
+@receiver(post_save, sender=CzynoscPielegnacyjna)
+@receiver(post_delete, sender=CzynoscPielegnacyjna)
+@receiver(post_save, sender=Przypomnienie)
+def uniewaznij_dashboard_uzytkownika(sender, instance, raw=False, origin=None, **kwargs):
+    """
+    Zmiana roślin, czynności lub przypomnień użytkownika -> nowa wersja jego dashboardu.
+    Bez post_delete dla Przypomnienie (retencja usuwa je szybkim DELETE bez kolektora).
+    """
+    if raw:
+        return
+    # kaskada: unieważnia sygnał usuwanego obiektu nadrzędnego
+    if origin is not None and getattr(origin, 'model', type(origin)) is not sender:
+        return
+    from .dashboard import uniewaznij_dashboard
+    uniewaznij_dashboard([getattr(instance, 'wlasciciel_id', None) or getattr(instance, 'uzytkownik_id', None)])
+
+
+def przelicz_liczniki_podlan(roslina_ids=None, tylko_do_przodu=False) -> int:
+    """
+    Przelicza liczba_podlan / ostatnie_podlewanie / nastepne_podlewanie z historii
+    (jedno zapytanie agregujące + bulk_update zmienionych). Rośliny bez historii
+    zachowują ręcznie wpisane ostatnie podlewanie; `tylko_do_przodu` nie cofa go
+    także przy historii (import). Zwraca liczbę poprawionych roślin.
+    """
+    rosliny = Roslina.objects.all() if roslina_ids is None else Roslina.objects.filter(pk__in=roslina_ids)
+    statystyki = {
+        w['roslina_id']: w
+        for w in CzynoscPielegnacyjna.objects.filter(roslina__in=rosliny, typ='podlewanie', wykonane=True)
+        .order_by().values('roslina_id').annotate(liczba=Count('id'), ostatnia=Max('data'))
+    }
+
+    zmienione = []
+    pola = ['liczba_podlan', 'ostatnie_podlewanie', 'nastepne_podlewanie']
+    for roslina in rosliny.only('id', 'wlasciciel_id', 'czestotliwosc_podlewania', *pola).iterator():
+        w = statystyki.get(roslina.pk)
+        przed = [getattr(roslina, p) for p in pola]
+        roslina.liczba_podlan = w['liczba'] if w else 0
+        if w:
+            dzien = timezone.localtime(w['ostatnia']).date()
+            if not (tylko_do_przodu and roslina.ostatnie_podlewanie and roslina.ostatnie_podlewanie > dzien):
+                roslina.ostatnie_podlewanie = dzien
+        roslina.nastepne_podlewanie = roslina.wyznacz_nastepne_podlewanie()
+        if [getattr(roslina, p) for p in pola] != przed:
+            zmienione.append(roslina)
+
+    Roslina.objects.bulk_update(zmienione, pola, batch_size=500)
+    if zmienione:
+        oznacz_rosliny_do_odswiezenia([r.pk for r in zmienione])
+        from .dashboard import uniewaznij_dashboard
+        uniewaznij_dashboard({r.wlasciciel_id for r in zmienione})
+    return len(zmienione)
+
+
+class OutboxEmail(models.Model):
+    """
+    Transakcyjny outbox: wiadomość zapisana razem ze zmianą stanu przypomnień,
+    wysyłana później przez bloomly.outbox (limit, ponowienia, dead-letter).
+    """
+
+    STATUSY = [
+        ('oczekuje', 'Oczekuje na wysłanie'),
+        ('wyslany', 'Wysłany'),
+        ('martwy', 'Porzucony (dead-letter)'),
+    ]
+
+    uzytkownik = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, verbose_name="Użytkownik"
+    )
+    nadawca = models.CharField(max_length=255, verbose_name="Nadawca")
+    adresat = models.EmailField(verbose_name="Adresat")
+    temat = models.CharField(max_length=255, verbose_name="Temat")
+    tresc = models.TextField(verbose_name="Treść")
+    przypomnienia = models.JSONField(default=list, blank=True, verbose_name="ID przypomnień")
+
+    status = models.CharField(max_length=10, choices=STATUSY, default='oczekuje', verbose_name="Status")
+    proby = models.PositiveSmallIntegerField(default=0, verbose_name="Liczba prób")
+    nastepna_proba = models.DateTimeField(default=timezone.now, verbose_name="Następna próba")
+    ostatni_blad = models.TextField(blank=True, verbose_name="Ostatni błąd")
+
+    data_utworzenia = models.DateTimeField(auto_now_add=True, verbose_name="Data utworzenia")
+    data_wyslania = models.DateTimeField(null=True, blank=True, verbose_name="Data wysłania")
+
+    class Meta:
+        verbose_name = "E-mail w kolejce"
+        verbose_name_plural = "E-maile w kolejce (outbox)"
+        ordering = ['nastepna_proba']
+        indexes = [
+            models.Index(fields=['status', 'nastepna_proba']),
+        ]
+
+    def __str__(self):
+        return f"{self.adresat}: {self.temat} ({self.get_status_display()})"
+
+    def jako_wiadomosc(self):
+        from django.core.mail import EmailMessage
+
+        return EmailMessage(self.temat, self.tresc, self.nadawca, [self.adresat])
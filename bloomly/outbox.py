@@ -0,0 +1,207 @@
+"""
+Transakcyjny outbox e-maili (OutboxEmail).
+
+Zadania zapisują wiadomości w tej samej transakcji co zmianę stanu przypomnień
+(zakolejkuj), a nadawca (oproznij_outbox, zadanie wyslij_outbox) wysyła je:
+  - z limitem szybkości dostawcy SMTP (token bucket),
+  - pakietami na jednym połączeniu; rozmiar pakietu dobierany AIMD
+    (+1 po udanym pakiecie, /2 po błędzie),
+  - z ponowieniami z wykładniczym backoffem i dead-letterem po OUTBOX_MAX_ATTEMPTS.
+
+Rezerwacja wierszy (select_for_update + dzierżawa na nastepna_proba) pozwala
+uruchomić kilku nadawców, ale limit szybkości liczy każdy proces osobno –
+nadawcę najlepiej trzymać w jednej kolejce z concurrency=1.
+"""
+
+import logging
+import threading
+import time
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboxEmail
+
+logger = logging.getLogger(__name__)
+
+# Limit dostawcy SMTP i dopuszczalny „zryw” ponad średnią
+LIMIT_NA_MINUTE = getattr(settings, "OUTBOX_EMAIL_RATE_PER_MINUTE", 60)
+POJEMNOSC_KUBELKA = getattr(settings, "OUTBOX_EMAIL_BURST", 10)
+
+# Ponowienia: 1 min, 2 min, 4 min ... maks. 6 h; potem dead-letter
+MAKS_PROB = getattr(settings, "OUTBOX_MAX_ATTEMPTS", 6)
+BACKOFF_BAZA = timedelta(minutes=1)
+BACKOFF_MAKS = timedelta(hours=6)
+
+# Zarezerwowane wiersze są niewidoczne dla innych nadawców przez tyle czasu
+DZIERZAWA = timedelta(minutes=10)
+
+# Rozmiar pakietu (wiadomości na jedno połączenie SMTP)
+PAKIET_START = getattr(settings, "OUTBOX_BATCH_SIZE", 20)
+PAKIET_MIN = 1
+PAKIET_MAKS = 100
+
+
+class TokenBucket:
+    """Klasyczny kubełek żetonów; zegar wstrzykiwany dla testów."""
+
+    def __init__(self, na_sekunde: float, pojemnosc: int, zegar=time.monotonic):
+        self.na_sekunde = na_sekunde
+        self.pojemnosc = pojemnosc
+        self.zegar = zegar
+        self.zetony = float(pojemnosc)
+        self.ostatnio = zegar()
+        self._lock = threading.Lock()
+
+    def pobierz(self) -> float:
+        """Bierze żeton i zwraca 0 albo – gdy pusto – ile sekund poczekać."""
+        with self._lock:
+            teraz = self.zegar()
+            self.zetony = min(self.pojemnosc, self.zetony + (teraz - self.ostatnio) * self.na_sekunde)
+            self.ostatnio = teraz
+            if self.zetony >= 1:
+                self.zetony -= 1
+                return 0.0
+            return (1 - self.zetony) / self.na_sekunde
+
+
+class RozmiarPakietu:
+    """AIMD: addytywny wzrost po sukcesie, multiplikatywny spadek po błędzie."""
+
+    def __init__(self, start=PAKIET_START, minimum=PAKIET_MIN, maksimum=PAKIET_MAKS):
+        self.minimum = minimum
+        self.maksimum = maksimum
+        self.wartosc = max(minimum, min(maksimum, start))
+
+    def sukces(self):
+        self.wartosc = min(self.maksimum, self.wartosc + 1)
+
+    def porazka(self):
+        self.wartosc = max(self.minimum, self.wartosc // 2)
+
+
+# Stan nadawcy w procesie workera (jak cache modeli w ml_storage)
+_limiter = TokenBucket(LIMIT_NA_MINUTE / 60.0, POJEMNOSC_KUBELKA)
+_pakiet = RozmiarPakietu()
+
+
+def opoznienie_ponowienia(proby: int) -> timedelta:
+    """Backoff po `proby` nieudanych próbach."""
+    return min(BACKOFF_BAZA * (2 ** min(max(proby - 1, 0), 20)), BACKOFF_MAKS)
+
+
+def zakolejkuj(wiadomosci) -> list:
+    """
+    Zapisuje wiadomości do outboxu. Wywoływać w transakcji zmieniającej stan
+    przypomnień – albo oba zapisy się utrwalą, albo żaden.
+    wiadomosci: iterowalne (EmailMessage, uzytkownik_id, [id przypomnień]).
+    """
+    return OutboxEmail.objects.bulk_create([
+        OutboxEmail(
+            uzytkownik_id=uzytkownik_id,
+            nadawca=msg.from_email or settings.DEFAULT_FROM_EMAIL,
+            adresat=msg.to[0],
+            temat=msg.subject,
+            tresc=msg.body,
+            przypomnienia=list(przypomnienia),
+        )
+        for msg, uzytkownik_id, przypomnienia in wiadomosci
+    ])
+
+
+def _zarezerwuj(limit: int, teraz) -> list:
+    with transaction.atomic():
+        wiersze = list(
+            OutboxEmail.objects
+            .select_for_update(skip_locked=True)
+            .filter(status="oczekuje", nastepna_proba__lte=teraz)
+            .order_by("nastepna_proba", "id")[:limit]
+        )
+        if wiersze:
+            OutboxEmail.objects.filter(id__in=[w.id for w in wiersze]).update(
+                nastepna_proba=teraz + DZIERZAWA
+            )
+    return wiersze
+
+
+def _zapisz_wyniki(wyslane, bledy, zwolnione, teraz, licznik):
+    if wyslane:
+        OutboxEmail.objects.filter(id__in=[w.id for w in wyslane]).update(
+            status="wyslany", data_wyslania=teraz, ostatni_blad=""
+        )
+    for w, blad in bledy:
+        w.proby += 1
+        w.ostatni_blad = blad[:1000]
+        if w.proby >= MAKS_PROB:
+            w.status = "martwy"
+            licznik["martwe"] += 1
+            logger.error(f"[OUTBOX] Porzucono e-mail {w.id} do {w.adresat} po {w.proby} próbach: {blad}")
+        else:
+            w.nastepna_proba = teraz + opoznienie_ponowienia(w.proby)
+            licznik["ponowione"] += 1
+    if bledy:
+        OutboxEmail.objects.bulk_update(
+            [w for w, _ in bledy], ["proby", "ostatni_blad", "status", "nastepna_proba"]
+        )
+    if zwolnione:
+        # nie zmieściły się w limicie – bez kary, od razu do kolejnego przebiegu
+        OutboxEmail.objects.filter(id__in=[w.id for w in zwolnione]).update(nastepna_proba=teraz)
+
+
+def oproznij_outbox(budzet_s: float = 50.0, limiter=None, pakiet=None, spij=time.sleep) -> dict:
+    """
+    Wysyła oczekujące wiadomości, aż kolejka się opróżni albo minie budżet czasu.
+    Zwraca liczniki: wyslane, ponowione, martwe, pakiety.
+    """
+    limiter = limiter or _limiter
+    pakiet = pakiet or _pakiet
+    licznik = {"wyslane": 0, "ponowione": 0, "martwe": 0, "pakiety": 0}
+    start = time.monotonic()
+
+    while True:
+        wiersze = _zarezerwuj(pakiet.wartosc, timezone.now())
+        if not wiersze:
+            break
+        licznik["pakiety"] += 1
+
+        wyslane, bledy, koniec_budzetu, awaria = [], [], False, False
+        kolejka = list(wiersze)
+        try:
+            with get_connection() as polaczenie:
+                while kolejka:
+                    czekaj = limiter.pobierz()
+                    if czekaj:
+                        if time.monotonic() - start + czekaj > budzet_s:
+                            koniec_budzetu = True
+                            break
+                        spij(czekaj)
+                        continue
+                    w = kolejka.pop(0)
+                    try:
+                        polaczenie.send_messages([w.jako_wiadomosc()])
+                        wyslane.append(w)
+                    except Exception as e:
+                        bledy.append((w, str(e)))
+        except Exception as e:
+            # połączenie nie powstało / zerwane – cała reszta pakietu do ponowienia
+            bledy.extend((w, str(e)) for w in kolejka)
+            kolejka = []
+            awaria = True
+
+        _zapisz_wyniki(wyslane, bledy, kolejka, timezone.now(), licznik)
+        licznik["wyslane"] += len(wyslane)
+
+        if bledy:
+            pakiet.porazka()
+        elif not koniec_budzetu:
+            pakiet.sukces()
+        if koniec_budzetu or awaria:
+            break
+
+    if licznik["pakiety"]:
+        logger.info(f"[OUTBOX] {licznik} (pakiet: {pakiet.wartosc})")
+    return licznik
@@ -0,0 +1,468 @@
+"""
+Zbiorczy planer przypomnień o podlewaniu (ONE-OPEN).
+
+Zamiast wywoływać utworz_przypomnienie_podlewanie() dla każdej rośliny osobno
+(transakcja + select_for_update + pojedyncze zapisy), planer:
+  1) liczy docelowe terminy dla całego zbioru roślin jednym zapytaniem
+     (Roslina + AnalizaPielegnacji),
+  2) pobiera istniejące otwarte przypomnienia jednym zapytaniem,
+  3) stosuje różnicę: bulk_create, bulk_update i jeden DELETE (duplikaty).
+
+Liczba zapytań nie zależy od liczby roślin (poza podziałem na pakiety bulk_*).
+
+Odświeżanie przyrostowe: sygnały w models.py oznaczają rośliny, których dane się
+zmieniły (BrudnaRoslina); rosliny_do_odswiezenia() zwraca tylko te + rotacyjny
+wycinek całej floty, zdejmij_znaczniki() czyści je po przeliczeniu.
+
+Pora wysyłki e-maili: każdy użytkownik ma własny slot (godzina z profilu albo
+z pór podlewania + stały rozrzut minut), więc wysyłka rozkłada się w ciągu doby
+zamiast skupiać się wokół jednej godziny – pory_wysylki(), histogram_wysylek().
+"""
+
+import logging
+import zlib
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, F, Q
+from django.db.models.functions import ExtractHour, TruncDate
+from django.utils import timezone
+
+from .dashboard import uniewaznij_dashboard
+from .models import (
+    AnalizaPielegnacji,
+    BrudnaRoslina,
+    ProfilUzytkownika,
+    Przypomnienie,
+    Roslina,
+    _interwal_z_analizy,
+    _data_przypomnienia_w_poludnie,
+)
+
+logger = logging.getLogger(__name__)
+
+# Pola porównywane/aktualizowane w istniejącym przypomnieniu (jak utworz_przypomnienie_podlewanie)
+POLA_ONE_OPEN = ("data_przypomnienia", "interwal_dni", "automatyczne", "powtarzalne")
+
+# Pola „uzbrojenia” wysyłki – przywracane tylko, gdy zmienia się termin
+# (inaczej każde odświeżenie wysłałoby to samo powiadomienie ponownie)
+POLA_UZBROJENIA = ("status", "wyslane")
+
+ROZMIAR_PAKIETU = 500
+
+# Przegląd rotacyjny: każda aktywna roślina jest przeliczana co najmniej raz na tyle dni,
+# nawet bez znacznika (zabezpieczenie przed zmianami z pominięciem sygnałów, np. .update())
+OKRES_PRZEGLADU_DNI = getattr(settings, "REMINDER_SWEEP_DAYS", 7)
+
+# Slot wysyłki e-maili: godzina dla pory podlewania (AnalizaPielegnacji.podlewa_*),
+# domyślna godzina i rozrzut minut (stały dla użytkownika – zestawienie zostaje jedno)
+GODZINA_WYSYLKI = getattr(settings, "REMINDER_SEND_HOUR", 9)
+GODZINY_POR = {"rano": 8, "po_poludniu": 13, "wieczorem": 18}
+ROZRZUT_MINUT = getattr(settings, "REMINDER_SEND_JITTER_MINUTES", 60)
+
+
+def rozrzut_minut(uzytkownik_id) -> int:
+    """Deterministyczne przesunięcie slotu użytkownika w minutach (0..ROZRZUT_MINUT-1)."""
+    if ROZRZUT_MINUT <= 1:
+        return 0
+    return zlib.crc32(str(uzytkownik_id).encode()) % ROZRZUT_MINUT
+
+
+def pory_wysylki(uzytkownik_ids) -> dict:
+    """
+    {uzytkownik_id: (godzina, minuta)} – slot wysyłki e-maili, dwa zapytania
+    niezależnie od liczby użytkowników. Kolejność źródeł godziny:
+    ProfilUzytkownika.godzina_powiadomien -> najczęstsza pora podlewania
+    w analizach roślin użytkownika -> REMINDER_SEND_HOUR.
+    """
+    ids = {uid for uid in uzytkownik_ids if uid is not None}
+    if not ids:
+        return {}
+
+    godziny = dict(
+        ProfilUzytkownika.objects
+        .filter(user_id__in=ids, godzina_powiadomien__isnull=False)
+        .values_list("user_id", "godzina_powiadomien")
+    )
+    bez_profilu = ids - set(godziny)
+    if bez_profilu:
+        for w in (
+            AnalizaPielegnacji.objects
+            .filter(uzytkownik_id__in=bez_profilu)
+            .values("uzytkownik_id")
+            .annotate(
+                rano=Count("pk", filter=Q(podlewa_rano=True)),
+                po_poludniu=Count("pk", filter=Q(podlewa_po_poludniu=True)),
+                wieczorem=Count("pk", filter=Q(podlewa_wieczorem=True)),
+            )
+            .order_by()
+        ):
+            # remis -> wcześniejsza pora (kolejność GODZINY_POR)
+            pora = max(GODZINY_POR, key=lambda p: w[p])
+            if w[pora]:
+                godziny[w["uzytkownik_id"]] = GODZINY_POR[pora]
+
+    return {uid: (godziny.get(uid, GODZINA_WYSYLKI), rozrzut_minut(uid)) for uid in ids}
+
+
+def przelicz_terminy_powiadomien(uzytkownik_ids) -> int:
+    """
+    Przelicza termin_powiadomienia niewysłanych przypomnień użytkowników po zmianie
+    ich slotu (profil, nowe analizy). Zarezerwowane przez ticker (termin = NULL)
+    nie wracają do indeksu. Zwraca liczbę zmienionych.
+    """
+    pory = pory_wysylki(uzytkownik_ids)
+    do_zmiany = []
+    for pr in Przypomnienie.objects.filter(
+        uzytkownik_id__in=list(pory), status="oczekujace", wyslane=False,
+        termin_powiadomienia__isnull=False, data_przypomnienia__gt=timezone.now(),
+    ).only("id", "uzytkownik_id", "status", "wyslane", "data_przypomnienia", "termin_powiadomienia"):
+        termin = pr.wyznacz_termin_powiadomienia(pory[pr.uzytkownik_id])
+        if termin != pr.termin_powiadomienia:
+            pr.termin_powiadomienia = termin
+            do_zmiany.append(pr)
+    Przypomnienie.objects.bulk_update(do_zmiany, ["termin_powiadomienia"], batch_size=ROZMIAR_PAKIETU)
+    return len(do_zmiany)
+
+
+def histogram_wysylek(od=None, godzin=24) -> dict:
+    """
+    Zakolejkowane wysyłki w najbliższych `godzin` godzinach: {(dzień, godzina): liczba e-maili}
+    w czasie lokalnym. E-mail = zestawienie, czyli użytkownik w danym slocie.
+    """
+    od = od or timezone.now()
+    strefa = timezone.get_current_timezone()
+    wiersze = (
+        Przypomnienie.objects
+        .filter(termin_powiadomienia__gte=od, termin_powiadomienia__lt=od + timedelta(hours=godzin))
+        .annotate(
+            dzien=TruncDate("termin_powiadomienia", tzinfo=strefa),
+            godzina=ExtractHour("termin_powiadomienia", tzinfo=strefa),
+        )
+        .values("dzien", "godzina")
+        .annotate(emaile=Count("uzytkownik_id", distinct=True))
+        .order_by("dzien", "godzina")
+    )
+    return {(w["dzien"], w["godzina"]): w["emaile"] for w in wiersze}
+
+
+def cele_z_analizy(rosliny, dzis=None) -> dict:
+    """
+    {roslina_id: pola przypomnienia} dla roślin z querysetu – jedno zapytanie
+    (wartości AnalizaPielegnacji przez LEFT JOIN).
+    """
+    dzis = dzis or timezone.now().date()
+    wiersze = rosliny.values(
+        "id", "nazwa", "gatunek", "wlasciciel_id",
+        "czestotliwosc_podlewania", "ostatnie_podlewanie",
+        "analiza__rekomendowana_czestotliwosc",
+        "analiza__liczba_podlan",
+        "analiza__pewnosc_rekomendacji",
+    )
+
+    cele = {}
+    for w in wiersze:
+        interwal = _interwal_z_analizy(
+            w["czestotliwosc_podlewania"],
+            w["analiza__rekomendowana_czestotliwosc"],
+            w["analiza__liczba_podlan"],
+            w["analiza__pewnosc_rekomendacji"],
+        )
+        ostatnie = w["ostatnie_podlewanie"]
+        # jak Roslina.czy_potrzebuje_podlewania()
+        potrzebuje = ostatnie is None or (dzis - ostatnie).days >= w["czestotliwosc_podlewania"]
+
+        cele[w["id"]] = {
+            "uzytkownik_id": w["wlasciciel_id"],
+            "tytul": f"Podlej {w['nazwa']}",
+            "tresc": (
+                f"Czas podlać {w['nazwa']} ({w['gatunek']}). "
+                f"Ostatnie podlewanie: {ostatnie or 'brak danych'}. "
+                f"Interwał (ML): co {interwal} dni."
+            ),
+            "data_przypomnienia": _data_przypomnienia_w_poludnie(ostatnie or dzis, interwal),
+            "powtarzalne": True,
+            "interwal_dni": interwal,
+            "automatyczne": True,
+            "priorytet": 2 if potrzebuje else 1,
+            "status": "oczekujace",
+        }
+    return cele
+
+
+def rosliny_do_odswiezenia(dzis=None, pelny=False) -> list:
+    """
+    ID aktywnych roślin do przeliczenia: oznaczone (BrudnaRoslina) + dzisiejszy
+    wycinek przeglądu rotacyjnego (id % OKRES_PRZEGLADU_DNI). pelny=True – wszystkie.
+    """
+    qs = Roslina.objects.filter(is_active=True)
+    if not pelny:
+        dzis = dzis or timezone.now().date()
+        qs = qs.annotate(
+            reszta=F("id") % OKRES_PRZEGLADU_DNI
+        ).filter(
+            Q(znacznik_odswiezenia__isnull=False) | Q(reszta=dzis.toordinal() % OKRES_PRZEGLADU_DNI)
+        )
+    return list(qs.order_by("pk").values_list("pk", flat=True))
+
+
+def zdejmij_znaczniki(roslina_ids, do_czasu) -> int:
+    """
+    Usuwa znaczniki ustawione najpóźniej `do_czasu` (chwila odczytu danych rośliny).
+    Późniejsze oznaczenie – zmiana w trakcie przeliczania – zostaje na kolejny przebieg.
+    """
+    usuniete, _ = BrudnaRoslina.objects.filter(
+        roslina_id__in=list(roslina_ids), data_oznaczenia__lte=do_czasu
+    ).delete()
+    return usuniete
+
+
+def _upsert_sql(pola_insert, pola_aktualizacji, wierszy=1):
+    """INSERT ... ON CONFLICT (częściowy UNIQUE jedno_otwarte_przypomnienie) DO UPDATE."""
+    qn = connection.ops.quote_name
+    tabela = qn(Przypomnienie._meta.db_table)
+
+    def kol(pole):
+        return qn(Przypomnienie._meta.get_field(pole).column)
+
+    otwarte = ", ".join(f"'{s}'" for s in Przypomnienie.STATUSY_OTWARTE)
+    ten_sam_termin = f"{tabela}.{kol('data_przypomnienia')} = excluded.{kol('data_przypomnienia')}"
+
+    warunkowe = (*POLA_UZBROJENIA, "termin_powiadomienia")
+    ustaw = [
+        f"{kol(p)} = excluded.{kol(p)}"
+        for p in pola_aktualizacji if p not in (*warunkowe, "data_przypomnienia")
+    ]
+    ustaw += [
+        f"{kol(p)} = CASE WHEN {ten_sam_termin} THEN {tabela}.{kol(p)} ELSE excluded.{kol(p)} END"
+        for p in warunkowe
+    ]
+    ustaw.append(f"{kol('data_przypomnienia')} = excluded.{kol('data_przypomnienia')}")
+
+    wiersz = f"({', '.join(['%s'] * len(pola_insert))})"
+    return (
+        f"INSERT INTO {tabela} ({', '.join(kol(p) for p in pola_insert)}) "
+        f"VALUES {', '.join([wiersz] * wierszy)} "
+        f"ON CONFLICT ({kol('roslina')}, {kol('typ')}) WHERE {kol('status')} IN ({otwarte}) "
+        f"DO UPDATE SET {', '.join(ustaw)} "
+        f"RETURNING {kol('id')}, {kol('data_utworzenia')}"
+    )
+
+
+def _upsert_natywny() -> bool:
+    """ON CONFLICT ... WHERE ... RETURNING: PostgreSQL albo SQLite >= 3.35 (RETURNING)."""
+    if connection.vendor == "postgresql":
+        return True
+    return connection.vendor == "sqlite" and connection.Database.sqlite_version_info >= (3, 35)
+
+
+def _z_bazy(pole, wartosc):
+    """Surowa wartość z RETURNING przez konwertery backendu i pola (jak w zwykłym SELECT)."""
+    kolumna = pole.get_col(pole.model._meta.db_table)
+    for konwerter in connection.ops.get_db_converters(kolumna) + pole.get_db_converters(connection):
+        wartosc = konwerter(wartosc, kolumna, connection)
+    return wartosc
+
+
+def _kolumny(pr) -> dict:
+    """Wartości kolumn instancji – surowy INSERT nie zna domyślnych wartości modelu."""
+    return {
+        f.attname: getattr(pr, f.attname)
+        for f in Przypomnienie._meta.concrete_fields if not f.primary_key
+    }
+
+
+def _wartosci_db(dane) -> list:
+    """Wartości kolumn przygotowane do zapytania (get_db_prep_save pól)."""
+    return [Przypomnienie._meta.get_field(p).get_db_prep_save(v, connection) for p, v in dane.items()]
+
+
+def upsert_otwarte_przypomnienie(roslina_id, pola: dict, pola_aktualizacji, pora=None) -> tuple:
+    """
+    Jedno zapytanie zamiast blokady i skanowania: tworzy otwarte przypomnienie
+    rośliny albo aktualizuje istniejące (UNIQUE jedno_otwarte_przypomnienie).
+    Status/wyslane/termin_powiadomienia są przywracane tylko przy zmianie terminu.
+    `pora` – slot wysyłki użytkownika, gdy wywołujący ma już pory_wysylki().
+    Zwraca (id, czy_utworzono).
+    """
+    wzor = Przypomnienie(
+        roslina_id=roslina_id, typ="podlewanie", status="oczekujace", wyslane=False,
+        data_utworzenia=timezone.now(), **pola,
+    )
+    wzor.termin_powiadomienia = wzor.wyznacz_termin_powiadomienia(pora)
+    dane = _kolumny(wzor)
+
+    if not _upsert_natywny():
+        return _upsert_z_blokada(dane, pola_aktualizacji, pora)
+
+    wartosci = _wartosci_db(dane)
+    with connection.cursor() as cursor:
+        cursor.execute(_upsert_sql(list(dane), pola_aktualizacji), wartosci)
+        pid, utworzone_o = cursor.fetchone()
+    uniewaznij_dashboard([dane["uzytkownik_id"]])
+    # data_utworzenia nie jest w DO UPDATE – zgodna z wstawianą tylko dla nowego wiersza
+    return pid, _z_bazy(Przypomnienie._meta.get_field("data_utworzenia"), utworzone_o) == dane["data_utworzenia"]
+
+
+def _upsert_z_blokada(dane, pola_aktualizacji, pora=None) -> tuple:
+    """Fallback dla baz bez ON CONFLICT ... WHERE ... RETURNING (MySQL, SQLite < 3.35)."""
+    with transaction.atomic():
+        pr = (
+            Przypomnienie.objects.select_for_update()
+            .filter(roslina_id=dane["roslina_id"], typ=dane["typ"], status__in=Przypomnienie.STATUSY_OTWARTE)
+            .first()
+        )
+        if pr is None:
+            pr = Przypomnienie(**dane)
+            pr.save(force_insert=True, pora=pora)
+            return pr.id, True
+        zmiana_terminu = pr.data_przypomnienia != dane["data_przypomnienia"]
+        pola = [p for p in pola_aktualizacji if p not in POLA_UZBROJENIA]
+        for p in (*pola, "data_przypomnienia", *(POLA_UZBROJENIA if zmiana_terminu else ())):
+            setattr(pr, p, dane[p])
+        pr.save(pora=pora)
+        return pr.id, False
+
+
+def _wstaw_otwarte(nowe, pola_aktualizacji, pory, rozmiar_pakietu) -> int:
+    """
+    Wstawia nowe otwarte przypomnienia pakietami przez upsert z celem konfliktu
+    (jedno_otwarte_przypomnienie). Jeśli równoległy upsert pojedynczej rośliny
+    zdążył wstawić otwarte, dostaje ono pola planera zamiast wstawienia po cichu
+    pominiętego (ignore_conflicts); inne naruszenia więzów nadal rzucają błąd.
+    Zwraca liczbę faktycznie wstawionych wierszy.
+    """
+    teraz = timezone.now()
+    wiersze = []
+    for pr in nowe:
+        pr.data_utworzenia = teraz
+        wiersze.append(_kolumny(pr))
+
+    if not _upsert_natywny():
+        return sum(
+            _upsert_z_blokada(dane, pola_aktualizacji, pory.get(dane["uzytkownik_id"]))[1]
+            for dane in wiersze
+        )
+
+    pola = list(wiersze[0])
+    pole_utworzenia = Przypomnienie._meta.get_field("data_utworzenia")
+    rozmiar = min(rozmiar_pakietu, connection.ops.bulk_batch_size(pola, wiersze) or rozmiar_pakietu)
+    utworzone = 0
+    with connection.cursor() as cursor:
+        for i in range(0, len(wiersze), rozmiar):
+            pakiet = wiersze[i:i + rozmiar]
+            cursor.execute(
+                _upsert_sql(pola, pola_aktualizacji, wierszy=len(pakiet)),
+                [v for dane in pakiet for v in _wartosci_db(dane)],
+            )
+            # data_utworzenia nie jest w DO UPDATE – zgodna z wstawianą tylko dla nowych wierszy
+            utworzone += sum(_z_bazy(pole_utworzenia, o) == teraz for _, o in cursor.fetchall())
+    return utworzone
+
+
+def zsynchronizuj_przypomnienia(
+    cele: dict,
+    statusy_otwarte=Przypomnienie.STATUSY_OTWARTE,
+    pola_aktualizacji=POLA_ONE_OPEN,
+    rozmiar_pakietu=ROZMIAR_PAKIETU,
+) -> dict:
+    """
+    Doprowadza otwarte przypomnienia do stanu `cele`:
+      {roslina_id: pola przypomnienia}  -> dokładnie jedno otwarte z tymi polami,
+      {roslina_id: None}                -> wszystkie otwarte anulowane.
+    Wywoływać w transakcji. Zwraca liczniki zmian.
+    """
+    licznik = {"utworzone": 0, "zaktualizowane": 0, "usuniete": 0, "anulowane": 0, "bez_zmian": 0}
+    if not cele:
+        return licznik
+
+    pory = pory_wysylki(c["uzytkownik_id"] for c in cele.values() if c)
+    otwarte = {}
+    for pr in (
+        Przypomnienie.objects
+        .select_for_update()
+        .filter(roslina_id__in=list(cele), typ="podlewanie", status__in=statusy_otwarte)
+        .order_by("roslina_id", "data_przypomnienia", "id")
+    ):
+        otwarte.setdefault(pr.roslina_id, []).append(pr)
+
+    do_utworzenia, do_aktualizacji, do_usuniecia, do_anulowania = [], [], [], []
+    for roslina_id, cel in cele.items():
+        istniejace = otwarte.get(roslina_id, [])
+
+        if cel is None:
+            do_anulowania.extend(pr.id for pr in istniejace)
+            continue
+
+        if not istniejace:
+            nowe = Przypomnienie(roslina_id=roslina_id, typ="podlewanie", **cel)
+            nowe.termin_powiadomienia = nowe.wyznacz_termin_powiadomienia(pory.get(nowe.uzytkownik_id))
+            do_utworzenia.append(nowe)
+            continue
+
+        # ONE-OPEN: zostaw najwcześniejsze, resztę usuń
+        zachowane, *duplikaty = istniejace
+        do_usuniecia.extend(pr.id for pr in duplikaty)
+
+        zmienione = False
+        ten_sam_termin = zachowane.data_przypomnienia == cel.get("data_przypomnienia")
+        for pole in pola_aktualizacji:
+            if ten_sam_termin and pole in POLA_UZBROJENIA:
+                continue
+            if getattr(zachowane, pole) != cel[pole]:
+                setattr(zachowane, pole, cel[pole])
+                zmienione = True
+        # bulk_update omija save() – indeks powiadomień liczymy tutaj
+        termin = zachowane.wyznacz_termin_powiadomienia(pory.get(zachowane.uzytkownik_id))
+        if zachowane.termin_powiadomienia != termin:
+            zachowane.termin_powiadomienia = termin
+            zmienione = True
+        if zmienione:
+            do_aktualizacji.append(zachowane)
+        else:
+            licznik["bez_zmian"] += 1
+
+    if do_usuniecia:
+        Przypomnienie.objects.filter(id__in=do_usuniecia).delete()
+    if do_anulowania:
+        Przypomnienie.objects.filter(id__in=do_anulowania).update(status="anulowane", termin_powiadomienia=None)
+    if do_aktualizacji:
+        Przypomnienie.objects.bulk_update(
+            do_aktualizacji, [*pola_aktualizacji, "termin_powiadomienia"], batch_size=rozmiar_pakietu
+        )
+    utworzone = 0
+    if do_utworzenia:
+        # równoległy upsert pojedynczej rośliny mógł już wstawić otwarte – nadpisujemy je celem planera
+        utworzone = _wstaw_otwarte(do_utworzenia, pola_aktualizacji, pory, rozmiar_pakietu)
+    if do_usuniecia or do_anulowania or do_aktualizacji or do_utworzenia:
+        # operacje zbiorcze omijają sygnały – dashboard unieważniamy sami
+        uniewaznij_dashboard(
+            {c["uzytkownik_id"] for c in cele.values() if c}
+            | {pr.uzytkownik_id for lista in otwarte.values() for pr in lista}
+        )
+
+    licznik.update({
+        "utworzone": utworzone,
+        "zaktualizowane": len(do_aktualizacji) + len(do_utworzenia) - utworzone,
+        "usuniete": len(do_usuniecia),
+        "anulowane": len(do_anulowania),
+    })
+    return licznik
+
+
+def zaplanuj_przypomnienia(rosliny=None, dzis=None) -> dict:
+    """
+    ONE-OPEN dla wszystkich aktywnych roślin z querysetu (domyślnie: wszystkich),
+    w jednej transakcji. Rośliny są blokowane na czas planowania (cele liczone
+    z gotowych analiz, bez predykcji), więc blokada jest krótka.
+    """
+    qs = (rosliny if rosliny is not None else Roslina.objects.all()).filter(is_active=True)
+
+    with transaction.atomic():
+        cele = cele_z_analizy(qs.order_by().select_for_update(of=("self",)), dzis=dzis)
+        licznik = zsynchronizuj_przypomnienia(cele)
+
+    logger.info(f"[PLANER] {len(cele)} roślin: {licznik}")
+    return licznik
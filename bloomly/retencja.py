@@ -0,0 +1,132 @@
+"""
+Retencja danych: usuwanie starych wierszy pakietami po zakresach klucza głównego.
+
+Zamiast jednego qs.delete() na całej tabeli (kolektor Django ładuje wiersze,
+a SQLite trzyma blokadę zapisu przez cały czas) każda polityka:
+  1) pobiera kolejny zakres kluczy (keyset: pk > ostatni, tylko kolumna pk),
+  2) usuwa go w krótkiej transakcji (DELETE ... WHERE pk BETWEEN lo AND hi + warunek polityki),
+  3) robi pauzę, żeby zapisy aplikacji mogły wejść między pakiety.
+
+Polityki (POLITYKI) i liczbę dni (DATA_RETENTION_DAYS; None = wyłączona) można
+zmieniać w ustawieniach. Całość uruchamia jedno zadanie (tasks.retencja_danych).
+"""
+
+import logging
+import time
+
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+DNI_DOMYSLNIE = {
+    "przypomnienia": 90,
+    "wyniki_celery": 30,
+    "sesje": 0,
+    "outbox": 30,
+    # bloby modeli ML bez wskaźnika (ml_storage.usun_osierocone_artefakty, nie tabela)
+    "artefakty_ml": 1,
+}
+ROZMIAR_PAKIETU = getattr(settings, "DATA_RETENTION_CHUNK_SIZE", 1000)
+PAUZA_S = getattr(settings, "DATA_RETENTION_PAUSE_S", 0.1)
+
+
+class Polityka:
+    """Co usuwać: model (app_label.Model) + warunek zależny od granicy czasu."""
+
+    def __init__(self, nazwa, model, warunek):
+        self.nazwa = nazwa
+        self.model = model
+        self.warunek = warunek
+
+    def queryset(self, granica):
+        """Queryset do usunięcia albo None, gdy aplikacji modelu nie ma w INSTALLED_APPS."""
+        try:
+            model = apps.get_model(self.model)
+        except LookupError:
+            return None
+        return model._base_manager.filter(self.warunek(granica))
+
+
+POLITYKI = [
+    Polityka(
+        "przypomnienia", "bloomly.Przypomnienie",
+        lambda g: Q(status__in=("wykonane", "anulowane"), data_utworzenia__lt=g),
+    ),
+    Polityka("wyniki_celery", "django_celery_results.TaskResult", lambda g: Q(date_done__lt=g)),
+    Polityka("sesje", "sessions.Session", lambda g: Q(expire_date__lt=g)),
+    Polityka("outbox", "bloomly.OutboxEmail", lambda g: Q(status="wyslany", data_wyslania__lt=g)),
+]
+
+
+def dni_retencji(nazwa):
+    return getattr(settings, "DATA_RETENTION_DAYS", {}).get(nazwa, DNI_DOMYSLNIE.get(nazwa))
+
+
+def usun_pakietami(qs, rozmiar=None, pauza=None, spij=time.sleep, termin=None, postep=None) -> tuple:
+    """
+    Usuwa wiersze querysetu pakietami po zakresach pk. Każdy pakiet to osobna,
+    krótka transakcja. `termin` (time.monotonic) przerywa pracę – reszta zostaje
+    na kolejny przebieg. Zwraca (usuniete, czy_skonczone).
+    """
+    rozmiar = rozmiar or ROZMIAR_PAKIETU
+    pauza = PAUZA_S if pauza is None else pauza
+    usuniete, ostatni = 0, None
+
+    while True:
+        klucze = qs.order_by("pk")
+        if ostatni is not None:
+            klucze = klucze.filter(pk__gt=ostatni)
+        zakres = list(klucze.values_list("pk", flat=True)[:rozmiar])
+        if not zakres:
+            return usuniete, True
+
+        with transaction.atomic():
+            n, _ = qs.filter(pk__range=(zakres[0], zakres[-1])).delete()
+        usuniete += n
+        ostatni = zakres[-1]
+        if postep:
+            postep(usuniete)
+
+        if len(zakres) < rozmiar:
+            return usuniete, True
+        if termin is not None and time.monotonic() >= termin:
+            return usuniete, False
+        if pauza:
+            spij(pauza)
+
+
+def zastosuj_retencje(polityki=None, teraz=None, budzet_s=None, postep=None, **opcje) -> dict:
+    """
+    Stosuje polityki retencji po kolei. Zwraca {nazwa: liczba usuniętych}
+    (polityki wyłączone/niedostępne pomija). `budzet_s` ogranicza łączny czas.
+    """
+    teraz = teraz or timezone.now()
+    termin = time.monotonic() + budzet_s if budzet_s else None
+    wynik = {}
+
+    for polityka in polityki or POLITYKI:
+        dni = dni_retencji(polityka.nazwa)
+        if dni is None:
+            continue
+        qs = polityka.queryset(teraz - timedelta(days=dni))
+        if qs is None:
+            continue
+
+        usuniete, skonczone = usun_pakietami(
+            qs, termin=termin,
+            postep=(lambda n, nazwa=polityka.nazwa: postep(nazwa, n)) if postep else None,
+            **opcje,
+        )
+        wynik[polityka.nazwa] = usuniete
+        logger.info(f"[RETENCJA] {polityka.nazwa}: usunięto {usuniete} (starsze niż {dni} dni)")
+        if not skonczone:
+            logger.info("[RETENCJA] Wyczerpany budżet czasu – reszta w kolejnym przebiegu")
+            break
+
+    return wynik
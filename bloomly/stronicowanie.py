@@ -0,0 +1,145 @@
+"""
+Stronicowanie po kluczu (keyset) dla list, które rosną razem z danymi użytkownika.
+
+Zamiast OFFSET (baza i tak czyta wszystkie pominięte wiersze) kolejna strona
+zaczyna się za ostatnim wierszem poprzedniej: WHERE (klucz) > (ostatnia wartość).
+Koszt strony nie zależy od jej numeru, a przy indeksie zgodnym z porządkiem
+– także od liczby wierszy.
+
+Porządek opisuje lista kluczy [(pole, malejąco)], ostatni klucz musi być unikalny
+(np. id). NULL jest traktowany jak wartość najmniejsza (pierwszy rosnąco,
+ostatni malejąco). Kursor to base64 z JSON-em wartości kluczy ostatniego wiersza.
+"""
+
+import base64
+import binascii
+import datetime
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Q
+
+
+class BlednyKursor(ValueError):
+    """Kursor nie daje się odczytać (ręcznie zmieniony URL, inny porządek)."""
+
+
+class Strona:
+    """Wiersze jednej strony + kursor następnej (None = ostatnia strona)."""
+
+    def __init__(self, obiekty, nastepny=None):
+        self.obiekty = obiekty
+        self.nastepny = nastepny
+
+    def __iter__(self):
+        return iter(self.obiekty)
+
+    def __len__(self):
+        return len(self.obiekty)
+
+    def __bool__(self):
+        return bool(self.obiekty)
+
+
+def porzadek(klucze):
+    """Wyrażenia order_by dla kluczy (z tym samym położeniem NULL co w warunku kursora)."""
+    return [
+        F(pole).desc(nulls_last=True) if malejaco else F(pole).asc(nulls_first=True)
+        for pole, malejaco in klucze
+    ]
+
+
+class _KoderKursora(DjangoJSONEncoder):
+    # DjangoJSONEncoder obcina mikrosekundy – kursor musi trafić dokładnie w wiersz
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def zakoduj_kursor(wartosci) -> str:
+    surowy = json.dumps(list(wartosci), cls=_KoderKursora, separators=(",", ":"))
+    return base64.urlsafe_b64encode(surowy.encode()).decode().rstrip("=")
+
+
+def odkoduj_kursor(kursor, liczba_kluczy) -> list:
+    try:
+        surowy = base64.urlsafe_b64decode(kursor + "=" * (-len(kursor) % 4))
+        wartosci = json.loads(surowy)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise BlednyKursor(f"Nieczytelny kursor: {kursor!r}") from e
+    if not isinstance(wartosci, list) or len(wartosci) != liczba_kluczy:
+        raise BlednyKursor(f"Kursor nie pasuje do porządku ({liczba_kluczy} kluczy)")
+    return wartosci
+
+
+def _wartosci_pol(model, klucze, wartosci) -> list:
+    """
+    Wartości z kursora -> typy pól kluczy (to_python + walidatory, np. zakres int).
+    Ręcznie zmieniony kursor z poprawną strukturą, ale złymi typami, to też BlednyKursor.
+    """
+    wynik = []
+    for (pole, _), wartosc in zip(klucze, wartosci):
+        if wartosc is not None:
+            try:
+                field = model._meta.get_field(pole)
+            except FieldDoesNotExist:
+                field = None
+            try:
+                if field is not None:
+                    wartosc = field.to_python(wartosc)
+                    field.run_validators(wartosc)
+                    # nie każda baza ma zakres pól całkowitych (SQLite) – 64 bity to górna granica
+                    if isinstance(wartosc, int) and not -2 ** 63 <= wartosc < 2 ** 63:
+                        raise OverflowError(wartosc)
+                elif isinstance(wartosc, (list, dict)):
+                    raise ValueError(wartosc)
+            except (ValidationError, ValueError, TypeError, OverflowError) as e:
+                raise BlednyKursor(f"Nieprawidłowa wartość klucza {pole!r} w kursorze") from e
+        wynik.append(wartosc)
+    return wynik
+
+
+def _za(pole, malejaco, wartosc):
+    """Warunek „dalej w porządku niż wartosc” dla jednego klucza."""
+    if wartosc is None:
+        return Q(pk__in=[]) if malejaco else Q(**{f"{pole}__isnull": False})
+    if malejaco:
+        return Q(**{f"{pole}__lt": wartosc}) | Q(**{f"{pole}__isnull": True})
+    return Q(**{f"{pole}__gt": wartosc})
+
+
+def _rowne(pole, wartosc):
+    return Q(**{f"{pole}__isnull": True}) if wartosc is None else Q(**{pole: wartosc})
+
+
+def warunek_za_kursorem(klucze, wartosci) -> Q:
+    """(k1, k2, ...) > (w1, w2, ...) leksykograficznie, jako suma warunków Q."""
+    warunek = Q(pk__in=[])
+    prefiks = Q()
+    for (pole, malejaco), wartosc in zip(klucze, wartosci):
+        warunek |= prefiks & _za(pole, malejaco, wartosc)
+        prefiks &= _rowne(pole, wartosc)
+    return warunek
+
+
+def stronicuj(qs, klucze, kursor=None, rozmiar=20) -> Strona:
+    """
+    Jedna strona querysetu w porządku `klucze`, zaczynając za `kursor`.
+    Pobiera rozmiar+1 wierszy, żeby wiedzieć, czy jest następna strona.
+    Rzuca BlednyKursor dla kursora, którego nie da się odczytać.
+    """
+    if kursor:
+        wartosci = _wartosci_pol(qs.model, klucze, odkoduj_kursor(kursor, len(klucze)))
+        qs = qs.filter(warunek_za_kursorem(klucze, wartosci))
+    wiersze = list(qs.order_by(*porzadek(klucze))[:rozmiar + 1])
+
+    nastepny = None
+    if len(wiersze) > rozmiar:
+        wiersze = wiersze[:rozmiar]
+        ostatni = wiersze[-1]
+        nastepny = zakoduj_kursor(
+            ostatni[pole] if isinstance(ostatni, dict) else getattr(ostatni, pole) for pole, _ in klucze
+        )
+    return Strona(wiersze, nastepny)
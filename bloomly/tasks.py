@@ -6,15 +6,18 @@ Zadania Celery dla aplikacji Bloomly
 """
 
 # Django core
-from django.core.mail import send_mail
+from django.core.cache import cache
+from django.core.mail import EmailMessage, send_mail
+from django.template.loader import render_to_string
 from django.conf import settings
 from django.utils import timezone
 from django.db import transaction
+from django.db.models import OuterRef, Subquery
 from datetime import timedelta, datetime
 import logging
 
 # Celery
-from celery import shared_task
+from celery import shared_task, chord, group
 
 # Modele
 from .models import (
@@ -23,14 +26,28 @@ from .models import (
     CzynoscPielegnacyjna,
     AnalizaPielegnacji,
 )
+from .dashboard import uniewaznij_dashboard
+from .outbox import oproznij_outbox, zakolejkuj
+from .retencja import POLITYKI, dni_retencji, zastosuj_retencje
+from .przypomnienia import (
+    histogram_wysylek,
+    pory_wysylki,
+    przelicz_terminy_powiadomien,
+    rosliny_do_odswiezenia,
+    upsert_otwarte_przypomnienie,
+    zdejmij_znaczniki,
+    zsynchronizuj_przypomnienia,
+)
 
 # ML Utils
+from .ml_storage import usun_osierocone_artefakty
 from .ml_utils import (
     zaktualizuj_analize_rosliny,
     zastosuj_rekomendacje_ml,
     retrenuj_wszystkie_modele,
     przewidz_czestotliwosc_ml,
     analizuj_wzorce_statystyczne,
+    _historia_podlewan,
 )
 
 # Logger
@@ -39,14 +56,70 @@ logger = logging.getLogger(__name__)
 # Godzina, o której „kotwiczymy” przypomnienia (lokalnie)
 REMINDER_HOUR = 9  # 09:00 czasu Europe/Warsaw
 
-# Jakie statusy traktujemy jako „otwarte”
-OPEN_STATUSES = ("oczekujace", "wyslane")
+# Jakie statusy traktujemy jako „otwarte” (częściowy UNIQUE w bazie)
+OPEN_STATUSES = Przypomnienie.STATUSY_OTWARTE
+
+# Ile dni przed terminem wysyłamy e-mail i z jakim wyprzedzeniem ticker bierze
+# powiadomienia z indeksu termin_powiadomienia (sloty użytkowników są co do minuty,
+# więc okno to jedno tyknięcie)
+EMAIL_DNI_PRZED = Przypomnienie.DNI_PRZED_POWIADOMIENIEM
+EMAIL_OKNO = timedelta(minutes=1)
+
+# Maks. liczba powiadomień zlecanych w jednym tyknięciu sprawdz_przypomnienia
+EMAIL_TICK_LIMIT = getattr(settings, "REMINDER_EMAIL_TICK_LIMIT", 1000)
+
+# Budżet e-maili (zestawień = użytkowników) na minutę; nadmiar czeka w indeksie
+# na kolejne tyknięcie
+EMAIL_BUDZET_NA_MINUTE = getattr(settings, "REMINDER_EMAILS_PER_MINUTE", 200)
+
+# Adres aplikacji w linkach e-maili
+ADRES_APLIKACJI = getattr(settings, "BLOOMLY_BASE_URL", "http://127.0.0.1:8000")
+
+# Rozmiar pakietu roślin w nocnym pipeline
+PIPELINE_CHUNK_SIZE = getattr(settings, "NIGHTLY_PIPELINE_CHUNK_SIZE", 100)
+
+# Ile roślin obsługuje jedno zadanie odświeżania przypomnień (0 = zadanie na roślinę)
+REMINDER_REFRESH_CHUNK_SIZE = getattr(settings, "REMINDER_REFRESH_CHUNK_SIZE", 200)
+
+# Ile razy odświeżenie rośliny ponawia obliczenie, gdy w międzyczasie doszło podlewanie
+REFRESH_MAX_ATTEMPTS = getattr(settings, "REMINDER_REFRESH_MAX_ATTEMPTS", 3)
+
+# Limit czasu jednego przebiegu retencji (reszta w kolejnym przebiegu)
+RETENCJA_BUDZET_S = getattr(settings, "DATA_RETENTION_TIME_BUDGET_S", 20 * 60)
+
+# Pola odświeżane w otwartym przypomnieniu (re-arm wysyłki, jak w _zapisz_przypomnienie)
+POLA_ODSWIEZENIA = (
+    "data_przypomnienia", "tytul", "tresc",
+    "status", "wyslane", "automatyczne", "interwal_dni",
+)
 
 
 # ============================================
 # POMOCNICZE — ONE-OPEN refresher
 # ============================================
 
+class KonfliktPodlewan(Exception):
+    """Najnowsze podlewanie rośliny zmieniło się między obliczeniem a zapisem."""
+
+
+def _wersje_podlewan(roslina_ids) -> dict:
+    """
+    {roslina_id: id najnowszego wykonanego podlewania} jednym zapytaniem.
+    Służy jako numer wersji historii przy zapisie compare-and-swap.
+    """
+    ostatnie = (
+        CzynoscPielegnacyjna.objects
+        .filter(roslina=OuterRef("pk"), typ="podlewanie", wykonane=True)
+        .order_by("-data", "-id")
+        .values("id")[:1]
+    )
+    return dict(
+        Roslina.objects.filter(pk__in=list(roslina_ids))
+        .annotate(wersja=Subquery(ostatnie))
+        .values_list("pk", "wersja")
+    )
+
+
 def _tzaware(dt: datetime) -> datetime:
     """Zwraca dt świadomy strefy (lokalny)."""
     if timezone.is_naive(dt):
@@ -54,24 +127,33 @@ def _tzaware(dt: datetime) -> datetime:
     return dt.astimezone(timezone.get_current_timezone())
 
 
-def _nastepny_termin_podlewania(roslina: Roslina):
+def _nastepny_termin_podlewania(roslina: Roslina, podlewania=None, wzorce=None):
     """
     Oblicz (data_przypomnienia, meta, zrodlo) bazując na:
     - ostatnim podlaniu (wpis t),
     - predykcji RF (fallback: statystyka).
+    `podlewania` (migawka historii) i `wzorce` (gotowa predykcja) pozwalają
+    nie powtarzać zapytań i predykcji, gdy wywołujący już je ma.
     Zwraca None, jeśli brak ostatniego podlania.
     """
-    last = (
-        CzynoscPielegnacyjna.objects
-        .filter(roslina=roslina, typ="podlewanie", wykonane=True)
-        .order_by("-data")
-        .first()
-    )
+    if podlewania is not None:
+        last = podlewania[-1] if podlewania else None
+    else:
+        last = (
+            CzynoscPielegnacyjna.objects
+            .filter(roslina=roslina, typ="podlewanie", wykonane=True)
+            .order_by("-data")
+            .first()
+        )
     if not last:
         return None
 
     # RF → fallback stat
-    w = przewidz_czestotliwosc_ml(roslina) or analizuj_wzorce_statystyczne(roslina)
+    w = (
+        wzorce
+        or przewidz_czestotliwosc_ml(roslina, podlewania=podlewania)
+        or analizuj_wzorce_statystyczne(roslina, podlewania)
+    )
     days = int(w["rekomendowana_czestotliwosc"])
 
     base = _tzaware(last.data)
@@ -82,74 +164,93 @@ def _nastepny_termin_podlewania(roslina: Roslina):
     return due, w, zrodlo
 
 
+def _tytul_i_tresc(r: Roslina, meta, zrodlo):
+    # krótka, czytelna treść – bez pól, których nie ma w modelu
+    return (
+        f"Podlej {r.nazwa}",
+        f"Rekomendacja: za {meta['rekomendowana_czestotliwosc']} dni. Źródło: {zrodlo}.",
+    )
+
+
+def _zapisz_przypomnienie(r: Roslina, calc, pora=None):
+    """
+    Zapis ONE-OPEN dla wyliczonego terminu – jeden upsert, bez blokady rośliny.
+    Przy zmianie terminu re-armuje wysyłkę (status 'oczekujace', wyslane=False).
+    Zwraca (akcja, przypomnienie|None).
+    """
+    if not calc:
+        # brak danych → zamknij otwarte
+        Przypomnienie.objects.filter(
+            roslina=r, typ="podlewanie", status__in=OPEN_STATUSES
+        ).update(status="anulowane", termin_powiadomienia=None)
+        uniewaznij_dashboard([r.wlasciciel_id])
+        logger.info(f"[ONE-OPEN] {r.nazwa}: brak ostatniego podlewania – anulowano otwarte.")
+        return "brak danych", None
+
+    due, meta, zrodlo = calc
+    tytul, tresc = _tytul_i_tresc(r, meta, zrodlo)
+
+    pid, utworzono = upsert_otwarte_przypomnienie(
+        r.pk,
+        {
+            "uzytkownik_id": r.wlasciciel_id,
+            "tytul": tytul,
+            "tresc": tresc,
+            "data_przypomnienia": due,
+            "powtarzalne": False,
+            "interwal_dni": None,  # nie powtarzamy „z automatu”
+            "automatyczne": True,
+            "priorytet": 2,
+        },
+        pola_aktualizacji=("tytul", "tresc", "automatyczne", "interwal_dni"),
+        pora=pora,
+    )
+    akcja = "utworzono" if utworzono else "zaktualizowano"
+    logger.info(f"[ONE-OPEN] {akcja.capitalize()} przypomnienie dla {r.nazwa} -> {due}.")
+    return akcja, Przypomnienie(pk=pid, roslina=r, data_przypomnienia=due)
+
+
 @shared_task
 def odswiez_przypomnienie_rosliny(roslina_id: int):
     """
     Idempotentnie utrzymuje JEDNO otwarte przypomnienie dla rośliny.
-    - Jeśli istnieje otwarte → AKTUALIZUJE datę/treść i re-armuje wysyłkę,
+    - Jeśli istnieje otwarte → AKTUALIZUJE datę/treść (nowy termin re-armuje wysyłkę),
     - Jeśli nie istnieje → TWORZY jedno,
     - Jeśli brak danych (brak ostatniego podlewania) → zamyka otwarte.
+
+    Dwie fazy: predykcja (może wczytać/trenować model) bez blokad i transakcji,
+    potem krótki zapis z kontrolą compare-and-swap na id najnowszego podlewania.
+    Gdy podlewanie doszło w międzyczasie – liczymy od nowa (REFRESH_MAX_ATTEMPTS).
     """
     try:
-        with transaction.atomic():
-            r = Roslina.objects.select_for_update().get(pk=roslina_id, is_active=True)
-            calc = _nastepny_termin_podlewania(r)
-
-            open_qs = Przypomnienie.objects.filter(
-                roslina=r, typ="podlewanie", status__in=OPEN_STATUSES
-            ).order_by("data_przypomnienia")
-
-            if not calc:
-                # brak danych → zamknij otwarte
-                if open_qs.exists():
-                    open_qs.update(status="anulowane")
-                logger.info(f"[ONE-OPEN] {r.nazwa}: brak ostatniego podlewania – anulowano otwarte.")
-                return "brak danych"
-
-            due, meta, zrodlo = calc
-            tytul = f"Podlej {r.nazwa}"
-            # krótka, czytelna treść – bez pól, których nie ma w modelu
-            tresc = (
-                f"Rekomendacja: za {meta['rekomendowana_czestotliwosc']} dni. "
-                f"Źródło: {zrodlo}."
-            )
-
-            if open_qs.exists():
-                pr = open_qs.first()
-                # re-arm: ustaw nową datę i przywróć do 'oczekujące' jeśli była 'wysłane'
-                pr.data_przypomnienia = due
-                pr.tytul = tytul
-                pr.tresc = tresc
-                pr.status = "oczekujace"
-                pr.wyslane = False
-                pr.automatyczne = True
-                pr.interwal_dni = None  # nie powtarzamy „z automatu”
-                pr.save(update_fields=[
-                    "data_przypomnienia", "tytul", "tresc",
-                    "status", "wyslane", "automatyczne", "interwal_dni"
-                ])
-                logger.info(f"[ONE-OPEN] Zaktualizowano przypomnienie dla {r.nazwa} -> {due}.")
-                return "zaktualizowano"
-            else:
-                Przypomnienie.objects.create(
-                    roslina=r,
-                    uzytkownik=r.wlasciciel,
-                    typ="podlewanie",
-                    tytul=tytul,
-                    tresc=tresc,
-                    data_przypomnienia=due,
-                    status="oczekujace",
-                    wyslane=False,
-                    powtarzalne=False,
-                    interwal_dni=None,
-                    automatyczne=True,
-                    priorytet=2,
-                )
-                logger.info(f"[ONE-OPEN] Utworzono przypomnienie dla {r.nazwa} -> {due}.")
-                return "utworzono"
+        r = Roslina.objects.get(pk=roslina_id, is_active=True)
     except Roslina.DoesNotExist:
         logger.warning(f"[ONE-OPEN] roślina id={roslina_id} nie istnieje lub nieaktywna.")
         return "brak rosliny"
+
+    try:
+        for proba in range(1, REFRESH_MAX_ATTEMPTS + 1):
+            # Faza 1: obliczenie na migawce historii, bez blokad
+            odczyt = timezone.now()
+            podlewania = _historia_podlewan(r)
+            wersja = podlewania[-1].pk if podlewania else None
+            calc = _nastepny_termin_podlewania(r, podlewania=podlewania)
+
+            # Faza 2: zapis + CAS. Sprawdzenie po zapisie – transakcja trzyma już
+            # blokadę zapisu (SQLite), więc nowe podlewanie nie wejdzie pomiędzy.
+            try:
+                with transaction.atomic():
+                    akcja, _ = _zapisz_przypomnienie(r, calc)
+                    if _wersje_podlewan([r.pk]).get(r.pk) != wersja:
+                        raise KonfliktPodlewan()
+                    zdejmij_znaczniki([r.pk], odczyt)
+                return akcja
+            except KonfliktPodlewan:
+                logger.info(f"[ONE-OPEN] {r.nazwa}: nowe podlewanie w trakcie obliczeń – próba {proba}.")
+
+        # roślina zostaje oznaczona jako brudna – dokończy ją kolejny przebieg
+        logger.warning(f"[ONE-OPEN] {r.nazwa}: konflikt po {REFRESH_MAX_ATTEMPTS} próbach.")
+        return "konflikt"
     except Exception as e:
         logger.exception(f"[ONE-OPEN] Błąd odświeżania przypomnienia dla roslina_id={roslina_id}: {e}")
         return f"błąd: {e}"
@@ -221,31 +322,138 @@ Zespół Bloomly 🌿
         logger.error(f"Błąd wysyłania emaila: {str(e)}")
         return f"Błąd wysyłania emaila: {str(e)}"
 
+def _zestawienie_dla_uzytkownika(uzytkownik, przypomnienia, teraz) -> EmailMessage:
+    """Jedna wiadomość z wszystkimi należnymi przypomnieniami użytkownika."""
+    for p in przypomnienia:
+        p.data_lokalna = timezone.localtime(p.data_przypomnienia)
+        p.dni_do = (p.data_przypomnienia.date() - teraz.date()).days
+
+    if len(przypomnienia) == 1:
+        subject = f"🌱 {przypomnienia[0].tytul} - za {przypomnienia[0].dni_do} dni"
+    else:
+        subject = f"🌱 {len(przypomnienia)} roślin czeka na podlewanie"
+
+    body = render_to_string("bloomly/emails/zestawienie_przypomnien.txt", {
+        "imie": uzytkownik.first_name or uzytkownik.username,
+        "przypomnienia": przypomnienia,
+        "adres": ADRES_APLIKACJI,
+    }).strip()
+    return EmailMessage(subject, body, settings.DEFAULT_FROM_EMAIL, [uzytkownik.email])
+
+
+@shared_task
+def wyslij_zestawienia_przypomnien(przypomnienie_ids):
+    """
+    Jedno zestawienie na użytkownika (szablon) trafia do outboxu w tej samej
+    transakcji, w której przypomnienia są oznaczane jako wysłane (jeden UPDATE).
+    Samą wysyłkę (limit, ponowienia) robi wyslij_outbox.
+    """
+    teraz = timezone.now()
+    with transaction.atomic():
+        per_uzytkownik = {}
+        for pr in (
+            Przypomnienie.objects
+            .select_for_update(of=("self",))
+            .filter(id__in=przypomnienie_ids, status="oczekujace", wyslane=False)
+            .select_related("uzytkownik", "roslina")
+            .order_by("uzytkownik_id", "data_przypomnienia")
+        ):
+            if pr.uzytkownik.email:
+                per_uzytkownik.setdefault(pr.uzytkownik_id, []).append(pr)
+
+        zakolejkuj(
+            (_zestawienie_dla_uzytkownika(lista[0].uzytkownik, lista, teraz), uid, [p.id for p in lista])
+            for uid, lista in per_uzytkownik.items()
+        )
+        ids = [p.id for lista in per_uzytkownik.values() for p in lista]
+        if ids:
+            Przypomnienie.objects.filter(id__in=ids).update(
+                status="wyslane", wyslane=True, data_wyslania=teraz, termin_powiadomienia=None
+            )
+            # UPDATE omija sygnały – zmiana statusu widoczna na dashboardzie i w kalendarzu
+            uniewaznij_dashboard(per_uzytkownik.keys())
+
+    logger.info(f"Zakolejkowano {len(per_uzytkownik)} zestawień ({len(ids)} przypomnień)")
+    return f"Zakolejkowano {len(per_uzytkownik)} zestawień ({len(ids)} przypomnień)"
+
+
+@shared_task
+def wyslij_outbox():
+    """
+    Nadawca outboxu (Celery Beat co minutę): limit szybkości SMTP, ponowienia
+    z backoffem, dead-letter – patrz bloomly.outbox.
+    """
+    licznik = oproznij_outbox()
+    return (f"Wysłano {licznik['wyslane']} e-maili "
+            f"(ponowienia: {licznik['ponowione']}, porzucone: {licznik['martwe']})")
+
+
+def _zarezerwuj_powiadomienia(qs, teraz) -> list:
+    """
+    Zdejmuje z indeksu należne powiadomienia (termin_powiadomienia <= teraz + EMAIL_OKNO)
+    i zwraca [(id, czy_email_wlaczony)]. Zdjęcie z indeksu = rezerwacja: równoległy
+    ticker / pipeline nie zleci tego samego e-maila drugi raz.
+    Bierze przypomnienia najwyżej EMAIL_BUDZET_NA_MINUTE użytkowników (jedno
+    zestawienie na użytkownika) – reszta zostaje w indeksie na kolejne tyknięcie.
+    """
+    with transaction.atomic():
+        kandydaci = (
+            qs.filter(
+                termin_powiadomienia__lte=teraz + EMAIL_OKNO,
+                data_przypomnienia__gt=teraz,
+                status="oczekujace",
+                wyslane=False,
+            )
+            .select_for_update(skip_locked=True, of=("self",))
+            .order_by("termin_powiadomienia", "uzytkownik_id")
+            .values_list("id", "uzytkownik_id", "uzytkownik__profiluzytkownika__powiadomienia_email")
+        )[:EMAIL_TICK_LIMIT]
+
+        nalezne, uzytkownicy = [], set()
+        for pid, uid, email_wlaczony in kandydaci:
+            if uid not in uzytkownicy:
+                if len(uzytkownicy) >= EMAIL_BUDZET_NA_MINUTE:
+                    continue
+                uzytkownicy.add(uid)
+            nalezne.append((pid, email_wlaczony))
+        if nalezne:
+            Przypomnienie.objects.filter(id__in=[pid for pid, _ in nalezne]).update(termin_powiadomienia=None)
+    return nalezne
+
+
 @shared_task
 def sprawdz_przypomnienia():
     """
-    Wysyła emaile 3 dni przed terminem podlewania.
-    Uruchamiane co godzinę przez Celery Beat.
+    Ticker powiadomień (Celery Beat co minutę): wysyła e-maile, których
+    termin_powiadomienia (3 dni przed terminem) już nadszedł – bez skanowania
+    całej tabeli i bez gubienia przypomnień utworzonych/przesuniętych w oknie.
     """
     teraz = timezone.now()
-    za_3_dni = teraz + timedelta(days=3)
-    za_3_dni_koniec = za_3_dni + timedelta(hours=1)  # Okno 1h
-
-    qs = Przypomnienie.objects.filter(
-        data_przypomnienia__gte=za_3_dni,
-        data_przypomnienia__lte=za_3_dni_koniec,
-        status="oczekujace",
-        wyslane=False,
-    )
 
-    wyslane = 0
-    for pr in qs.select_related("uzytkownik", "roslina"):
-        # tylko jeśli user ma włączone maile
-        if hasattr(pr.uzytkownik, "profiluzytkownika") and pr.uzytkownik.profiluzytkownika.powiadomienia_email:
-            wyslij_email_przypomnienie.delay(pr.id)
-            wyslane += 1
+    # Po terminie nie powiadamiamy – tylko czyścimy indeks
+    Przypomnienie.objects.filter(
+        termin_powiadomienia__isnull=False, data_przypomnienia__lte=teraz
+    ).update(termin_powiadomienia=None)
+
+    nalezne = _zarezerwuj_powiadomienia(Przypomnienie.objects.all(), teraz)
+
+    # tylko jeśli user ma włączone maile; jedno zadanie zestawień na tyknięcie
+    do_wyslania = [pid for pid, email_wlaczony in nalezne if email_wlaczony]
+    if do_wyslania:
+        wyslij_zestawienia_przypomnien.delay(do_wyslania)
+    wyslane = len(do_wyslania)
+
+    # raz na godzinę: rozkład zakolejkowanych wysyłek na najbliższą dobę; znacznik
+    # godziny w cache, bo tyknięcie o pełnej godzinie może wypaść albo się spóźnić
+    godzina = timezone.localtime(teraz).strftime("%Y%m%d%H")
+    if cache.add(f"bloomly:histogram_wysylek:{godzina}", 1, timeout=2 * 3600):
+        histogram = histogram_wysylek(teraz)
+        logger.info(
+            "[POWIADOMIENIA] E-maile na godzinę (24 h): "
+            + ", ".join(f"{g:02d}:00={n}" for (_, g), n in histogram.items())
+        )
 
-    logger.info(f"Zaplanowano wysłanie {wyslane} przypomnień (3 dni przed terminem) z {qs.count()} dostępnych")
+    logger.info(f"Zaplanowano wysłanie {wyslane} przypomnień (3 dni przed terminem) z {len(nalezne)} dostępnych")
     return f"Zaplanowano wysłanie {wyslane} przypomnień"
 
 # ============================================
@@ -253,18 +461,102 @@ def sprawdz_przypomnienia():
 # ============================================
 
 @shared_task
-def odswiez_przypomnienia_dla_wszystkich():
+def odswiez_pakiet_przypomnien(roslina_ids):
+    """
+    ONE-OPEN dla pakietu roślin w jednym zadaniu:
+    - historia podlewań wszystkich roślin pakietu jednym zapytaniem,
+    - predykcje z modeli (cache obiektów w pamięci workera, ml_storage),
+    - zapis różnicy zbiorczo (przypomnienia.zsynchronizuj_przypomnienia).
+    """
+    odczyt = timezone.now()
+    rosliny = list(Roslina.objects.filter(pk__in=roslina_ids, is_active=True).order_by("pk"))
+
+    historia = {}
+    for c in (
+        CzynoscPielegnacyjna.objects
+        .filter(roslina_id__in=[r.pk for r in rosliny], typ="podlewanie", wykonane=True)
+        .order_by("roslina_id", "data", "id")
+    ):
+        historia.setdefault(c.roslina_id, []).append(c)
+
+    cele = {}
+    bledy = 0
+    for r in rosliny:
+        try:
+            calc = _nastepny_termin_podlewania(r, podlewania=historia.get(r.pk, []))
+        except Exception as e:
+            bledy += 1
+            logger.exception(f"[ONE-OPEN] Błąd predykcji dla {r.nazwa} (ID: {r.pk}): {e}")
+            continue
+
+        if not calc:
+            cele[r.pk] = None
+            continue
+
+        due, meta, zrodlo = calc
+        tytul, tresc = _tytul_i_tresc(r, meta, zrodlo)
+        cele[r.pk] = {
+            "uzytkownik_id": r.wlasciciel_id,
+            "tytul": tytul,
+            "tresc": tresc,
+            "data_przypomnienia": due,
+            "status": "oczekujace",
+            "wyslane": False,
+            "powtarzalne": False,
+            "interwal_dni": None,
+            "automatyczne": True,
+            "priorytet": 2,
+        }
+
+    with transaction.atomic():
+        # CAS zamiast blokad: rośliny z nowym podlewaniem pomijamy (zostają brudne)
+        wersje = _wersje_podlewan(cele)
+        konflikty = [
+            rid for rid in cele
+            if wersje.get(rid) != (historia[rid][-1].pk if historia.get(rid) else None)
+        ]
+        for rid in konflikty:
+            del cele[rid]
+        licznik = zsynchronizuj_przypomnienia(
+            cele, statusy_otwarte=OPEN_STATUSES, pola_aktualizacji=POLA_ODSWIEZENIA
+        )
+        zdejmij_znaczniki(cele, odczyt)
+
+    licznik["bledy"] = bledy
+    licznik["konflikty"] = len(konflikty)
+    logger.info(f"[ONE-OPEN] Pakiet {len(roslina_ids)} roślin: {licznik}")
+    return licznik
+
+
+@shared_task
+def odswiez_przypomnienia_dla_wszystkich(chunk_size=None, pelny=False):
     """
     Dzienny refresh: dla każdej aktywnej rośliny utrzymuj JEDNO otwarte przypomnienie
     (RF → fallback stat). Uruchamiane np. codziennie o 06:00.
+    Rośliny idą pakietami (REMINDER_REFRESH_CHUNK_SIZE) – jedna wiadomość
+    w brokerze na pakiet zamiast na roślinę.
+    Tylko rośliny ze zmienionymi danymi + wycinek przeglądu rotacyjnego
+    (pelny=True – wszystkie aktywne).
     """
-    rosliny = Roslina.objects.filter(is_active=True).values_list("id", flat=True)
-    ok = err = 0
-    for rid in rosliny:
-        res = odswiez_przypomnienie_rosliny.delay(rid)
-        ok += 1 if res else 0
-    logger.info(f"[ONE-OPEN] Odświeżono przypomnienia dla {ok}/{len(rosliny)} roślin.")
-    return f"Odświeżono {ok}/{len(rosliny)} roślin"
+    if chunk_size is None:
+        chunk_size = REMINDER_REFRESH_CHUNK_SIZE
+    rosliny = rosliny_do_odswiezenia(pelny=pelny)
+
+    if chunk_size <= 0:
+        # tryb zgodności: zadanie na roślinę
+        ok = 0
+        for rid in rosliny:
+            res = odswiez_przypomnienie_rosliny.delay(rid)
+            ok += 1 if res else 0
+        logger.info(f"[ONE-OPEN] Odświeżono przypomnienia dla {ok}/{len(rosliny)} roślin.")
+        return f"Odświeżono {ok}/{len(rosliny)} roślin"
+
+    pakiety = [rosliny[i:i + chunk_size] for i in range(0, len(rosliny), chunk_size)]
+    if pakiety:
+        group(odswiez_pakiet_przypomnien.s(p) for p in pakiety).apply_async()
+
+    logger.info(f"[ONE-OPEN] Zlecono odświeżenie {len(rosliny)} roślin w {len(pakiety)} pakietach.")
+    return f"Zlecono {len(rosliny)} roślin w {len(pakiety)} pakietach"
 
 # Zachowaj zgodność nazw z istniejącym harmonogramem (stara nazwa → nowa logika)
 generuj_przypomnienia_dla_wszystkich = odswiez_przypomnienia_dla_wszystkich
@@ -286,18 +578,31 @@ def sprawdz_inteligentne_przypomnienia():
 # ANALIZA ML - AKTUALIZACJE
 # ============================================
 
-@shared_task
-def analizuj_wszystkie_rosliny():
+def _raportuj_postep(task, i, total, co_ile=25, **meta):
+    """
+    Publikuje postęp zadania (stan PROGRESS w backendzie wyników).
+    Co `co_ile` pozycji + na końcu, żeby nie zapychać backendu zapisami.
+    """
+    if not getattr(task.request, "id", None):
+        return
+    if i % co_ile and i != total:
+        return
+    task.update_state(state="PROGRESS", meta={"biezaca": i, "total": total, **meta})
+
+
+@shared_task(bind=True)
+def analizuj_wszystkie_rosliny(self):
     """
     Analizuje wzorce podlewania dla wszystkich roślin. Uruchamiane codziennie o 3:00.
     """
     rosliny = Roslina.objects.filter(is_active=True)
+    total = rosliny.count()
 
     zaktualizowane = 0
     pominiete = 0
     bledy = 0
 
-    for roslina in rosliny:
+    for i, roslina in enumerate(rosliny.iterator(), start=1):
         try:
             wynik = zaktualizuj_analize_rosliny(roslina)
             if wynik["analiza"]:
@@ -308,22 +613,28 @@ def analizuj_wszystkie_rosliny():
             bledy += 1
             logger.error(f"Błąd analizy rośliny {roslina.nazwa} (ID: {roslina.id}): {str(e)}")
 
+        _raportuj_postep(self, i, total, zaktualizowane=zaktualizowane, bledy=bledy)
+
     logger.info(
         f"Analiza zakończona: zaktualizowane={zaktualizowane}, "
         f"pominięte={pominiete}, błędy={bledy}"
     )
 
-    return f"Przeanalizowano {zaktualizowane}/{rosliny.count()} roślin (pominięto: {pominiete}, błędy: {bledy})"
+    return f"Przeanalizowano {zaktualizowane}/{total} roślin (pominięto: {pominiete}, błędy: {bledy})"
 
 
-@shared_task
-def retrenuj_modele_ml():
+@shared_task(bind=True)
+def retrenuj_modele_ml(self):
     """
     Retrenuje wszystkie modele ML (np. raz w tygodniu w nocy).
+    Postęp widoczny w backendzie wyników (stan PROGRESS).
     """
     logger.info("Rozpoczęcie retrenowania modeli ML...")
 
-    wynik = retrenuj_wszystkie_modele()
+    def postep(i, total, roslina, wynik):
+        _raportuj_postep(self, i, total, roslina_id=roslina.id)
+
+    wynik = retrenuj_wszystkie_modele(postep=postep)
 
     logger.info(
         f"Retrenowanie zakończone: wytrenowane={wynik['wytrenowane']}, "
@@ -377,6 +688,107 @@ def zastosuj_rekomendacje_automatycznie():
             f"(pominięto: {pominiete}, błędy: {bledy})")
 
 
+# ============================================
+# NOCNY PIPELINE (analiza + przypomnienie + e-mail w jednym przebiegu)
+# ============================================
+
+@shared_task
+def przetworz_pakiet_roslin(roslina_ids):
+    """
+    Jeden przebieg na roślinę: migawka historii -> analiza (jedna predykcja)
+    -> ONE-OPEN przypomnienie -> e-mail, jeśli termin_powiadomienia już nadszedł
+    (ta sama rezerwacja co w sprawdz_przypomnienia, więc bez podwójnej wysyłki;
+    jedno zadanie zestawień na cały pakiet). Niezmieniony termin nie uzbraja
+    przypomnienia ponownie – wysłane zostaje wysłane.
+    Zwraca liczniki pakietu (sumowane przez podsumuj_nocny_pipeline).
+    """
+    licznik = {
+        "rosliny": 0, "przeanalizowane": 0, "utworzono": 0, "zaktualizowano": 0,
+        "brak_danych": 0, "emaile": 0, "bledy": 0,
+    }
+    teraz = timezone.now()
+    do_wyslania = []
+
+    rosliny = list(
+        Roslina.objects
+        .filter(pk__in=roslina_ids, is_active=True)
+        .select_related("wlasciciel__profiluzytkownika")
+        .order_by("pk")
+    )
+    pory = pory_wysylki(r.wlasciciel_id for r in rosliny)
+    for r in rosliny:
+        licznik["rosliny"] += 1
+        try:
+            podlewania = _historia_podlewan(r)
+            wynik = zaktualizuj_analize_rosliny(r, podlewania=podlewania)
+            licznik["przeanalizowane"] += 1
+            # zapis analizy sam oznacza roślinę – znacznik zdejmujemy do tej chwili
+            odczyt = timezone.now()
+
+            calc = _nastepny_termin_podlewania(r, podlewania=podlewania, wzorce=wynik["wzorce"])
+            akcja, pr = _zapisz_przypomnienie(r, calc, pora=pory[r.wlasciciel_id])
+            zdejmij_znaczniki([r.pk], odczyt)
+
+            licznik[akcja.replace(" ", "_")] += 1
+
+            profil = getattr(r.wlasciciel, "profiluzytkownika", None)
+            if (
+                pr is not None and profil and profil.powiadomienia_email
+                and _zarezerwuj_powiadomienia(Przypomnienie.objects.filter(pk=pr.pk), teraz)
+            ):
+                do_wyslania.append(pr.id)
+                licznik["emaile"] += 1
+        except Exception as e:
+            licznik["bledy"] += 1
+            logger.exception(f"[PIPELINE] Błąd dla rośliny {r.nazwa} (ID: {r.id}): {e}")
+
+    if do_wyslania:
+        wyslij_zestawienia_przypomnien.delay(do_wyslania)
+
+    # nowe analizy mogły zmienić pory podlewania, a z nimi sloty wysyłki
+    przelicz_terminy_powiadomien(pory)
+
+    logger.info(f"[PIPELINE] Pakiet {len(roslina_ids)} roślin: {licznik}")
+    return licznik
+
+
+@shared_task
+def podsumuj_nocny_pipeline(wyniki):
+    """Callback chorda: sumuje liczniki pakietów."""
+    suma = {}
+    for licznik in wyniki:
+        for k, v in (licznik or {}).items():
+            suma[k] = suma.get(k, 0) + v
+
+    logger.info(f"[PIPELINE] Zakończono: {suma}")
+    return (
+        f"Pipeline: przeanalizowano {suma.get('przeanalizowane', 0)}/{suma.get('rosliny', 0)} roślin, "
+        f"przypomnienia +{suma.get('utworzono', 0)}/~{suma.get('zaktualizowano', 0)}, "
+        f"e-maile: {suma.get('emaile', 0)}, błędy: {suma.get('bledy', 0)}"
+    )
+
+
+@shared_task
+def nocny_pipeline_roslin(chunk_size=None, pelny=False):
+    """
+    Zastępuje trzy osobne przebiegi (analiza 2:00, przypomnienia 8:00, część
+    godzinowego sprawdzania) jednym: pakiety roślin jako grupa Celery,
+    podsumowanie w chordzie.
+    Przetwarzane są tylko rośliny ze zmienionymi danymi + wycinek przeglądu
+    rotacyjnego (pelny=True – wszystkie aktywne).
+    """
+    chunk_size = chunk_size or PIPELINE_CHUNK_SIZE
+    ids = rosliny_do_odswiezenia(pelny=pelny)
+    if not ids:
+        return "Brak roślin do przetworzenia"
+
+    pakiety = [ids[i:i + chunk_size] for i in range(0, len(ids), chunk_size)]
+    chord(group(przetworz_pakiet_roslin.s(p) for p in pakiety))(podsumuj_nocny_pipeline.s())
+
+    logger.info(f"[PIPELINE] Zlecono {len(ids)} roślin w {len(pakiety)} pakietach")
+    return f"Zlecono {len(ids)} roślin w {len(pakiety)} pakietach"
+
+
 # ============================================
 # RAPORTY I PODSUMOWANIA
 # ============================================
@@ -429,18 +841,11 @@ def test_ml_pipeline():
 @shared_task
 def czyszczenie_starych_przypomnien():
     """
-    Usuwa stare wykonane przypomnienia (starsze niż 3 miesiące)
+    Usuwa stare zamknięte przypomnienia (domyślnie starsze niż 3 miesiące)
+    – tylko polityka „przypomnienia” silnika retencji, pakietami.
     """
     try:
-        granica = timezone.now() - timedelta(days=90)
-
-        stare = Przypomnienie.objects.filter(
-            status="wykonane",
-            data_utworzenia__lt=granica,
-        )
-
-        liczba = stare.count()
-        stare.delete()
+        liczba = zastosuj_retencje([p for p in POLITYKI if p.nazwa == "przypomnienia"]).get("przypomnienia", 0)
 
         logger.info(f"Usunięto {liczba} starych przypomnień")
         return f"Usunięto {liczba} starych przypomnień"
@@ -451,3 +856,27 @@ def czyszczenie_starych_przypomnien():
 
 # alias wstecznej kompatybilności (jeśli masz gdzieś starą nazwę)
 czyszczenie_starych_przypomnie = czyszczenie_starych_przypomnien
+
+
+@shared_task(bind=True)
+def retencja_danych(self, budzet_s=None):
+    """
+    Nocna retencja wszystkich tabel z polityką (przypomnienia, wyniki Celery,
+    wygasłe sesje, wysłany outbox) – pakietami po zakresach pk, z pauzami –
+    oraz sprzątanie osieroconych blobów modeli ML (artefakty_ml).
+    Postęp raportowany w stanie zadania (PROGRESS).
+    """
+    if budzet_s is None:
+        budzet_s = RETENCJA_BUDZET_S
+
+    def postep(nazwa, usuniete):
+        if self.request.id:
+            self.update_state(state="PROGRESS", meta={"polityka": nazwa, "usuniete": usuniete})
+
+    wynik = zastosuj_retencje(budzet_s=budzet_s, postep=postep)
+    dni = dni_retencji("artefakty_ml")
+    if dni is not None:
+        wynik["artefakty_ml"] = usun_osierocone_artefakty(timedelta(days=dni))
+    opis = ", ".join(f"{nazwa}: {n}" for nazwa, n in wynik.items()) or "brak polityk"
+    logger.info(f"[RETENCJA] Zakończono – {opis}")
+    return f"Retencja – usunięto {opis}"
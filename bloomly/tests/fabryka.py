@@ -0,0 +1,102 @@
+"""
+Fabryka danych testowych: realistyczny zestaw (rośliny z historią, analizy ML,
+przypomnienia, forum, baza wiedzy) dosiewany porcjami – każde wywołanie
+zasiej(n) dokłada n elementów każdego rodzaju do tych samych „głównych” obiektów,
+żeby można było porównać liczbę zapytań przy rosnących danych.
+"""
+
+from datetime import date, timedelta
+from itertools import count
+
+from django.contrib.auth.models import User
+from django.utils import timezone
+
+from bloomly.models import (
+    AnalizaPielegnacji, BazaRoslin, CzynoscPielegnacyjna, Kategoria, Komentarz, Post, Przypomnienie, Roslina,
+)
+
+
+class Fabryka:
+    def __init__(self, username="wlasciciel", password="testpass123"):
+        self._numer = count(1)
+        self.password = password
+        self.user = User.objects.create_user(
+            username=username, password=password, email=f"{username}@example.com", is_staff=True
+        )
+        self.kategoria = self._kategoria()
+        self.roslina = self._roslina()
+        # główna roślina ma od razu historię, na której model ML się wytrenuje
+        for dni in range(16, 41, 4):
+            CzynoscPielegnacyjna.objects.create(
+                roslina=self.roslina, uzytkownik=self.user, typ="podlewanie",
+                data=timezone.now() - timedelta(days=dni), ilosc_wody=200, stan_gleby="dry",
+            )
+        self.przypomnienie = self.roslina.przypomnienie_set.get(status="oczekujace")
+        self.post = self._post(self.user)
+        self.komentarz = Komentarz.objects.create(post=self.post, autor=self.user, tresc="Pierwszy")
+        self.baza = self._baza()
+
+    def zasiej(self, n):
+        """Dokłada po n: roślin, podlań głównej rośliny, autorów postów, komentarzy, haseł bazy, kategorii."""
+        teraz = timezone.now()
+        for _ in range(n):
+            self._roslina()
+            CzynoscPielegnacyjna.objects.create(
+                roslina=self.roslina, uzytkownik=self.user, typ="podlewanie",
+                data=teraz - timedelta(days=44 + next(self._numer)), ilosc_wody=200, stan_gleby="dry",
+            )
+            autor = self._autor()
+            self._post(autor)
+            Komentarz.objects.create(post=self.post, autor=autor, tresc="Też tak mam")
+            self._baza()
+            self._kategoria()
+
+    def _autor(self):
+        i = next(self._numer)
+        return User.objects.create_user(
+            username=f"autor{i}", password="x", first_name="Autor", last_name=str(i)
+        )
+
+    def _kategoria(self):
+        i = next(self._numer)
+        return Kategoria.objects.create(nazwa=f"Kategoria {i}", slug=f"kategoria-{i}", typ="forum")
+
+    def _post(self, autor):
+        i = next(self._numer)
+        return Post.objects.create(
+            tytul=f"Post {i}", slug=f"post-{i}", tresc="Treść", autor=autor, kategoria=self.kategoria
+        )
+
+    def _baza(self):
+        i = next(self._numer)
+        return BazaRoslin.objects.create(
+            nazwa_polska=f"Monstera {i}", nazwa_naukowa=f"Monstera deliciosa {i}", slug=f"monstera-{i}",
+            opis_krotki="Opis", opis_szczegolowy="Opis", rodzina="Araceae", poziom_trudnosci="latwy",
+            wymagania_swiatla="jasne", czestotliwosc_podlewania="co tydzień", autor=self.user,
+        )
+
+    def _roslina(self):
+        i = next(self._numer)
+        teraz = timezone.now()
+        roslina = Roslina.objects.create(
+            wlasciciel=self.user, nazwa=f"Roślina {i}", gatunek="Monstera", kategoria="doniczkowa",
+            czestotliwosc_podlewania=3 + i % 5, data_zakupu=date.today() - timedelta(days=365),
+        )
+        for dni in (12, 8, 4):
+            CzynoscPielegnacyjna.objects.create(
+                roslina=roslina, uzytkownik=self.user, typ="podlewanie",
+                data=teraz - timedelta(days=dni, hours=i % 12), ilosc_wody=250, stan_gleby="dry",
+            )
+        AnalizaPielegnacji.objects.create(
+            roslina=roslina, uzytkownik=self.user, liczba_podlan=3, typ_modelu="Statystyczny",
+            srednia_czestotliwosc_dni=4, rekomendowana_czestotliwosc=4, pewnosc_rekomendacji=0.6,
+        )
+        Przypomnienie.objects.create(
+            roslina=roslina, uzytkownik=self.user, tytul=f"Podlej {roslina.nazwa}", tresc="Czas podlać",
+            data_przypomnienia=teraz + timedelta(hours=2 + i % 20),
+        )
+        Przypomnienie.objects.create(
+            roslina=roslina, uzytkownik=self.user, tytul=f"Podlej {roslina.nazwa}", tresc="Czas podlać",
+            data_przypomnienia=teraz - timedelta(days=4), status="wykonane", data_wykonania=teraz - timedelta(days=4),
+        )
+        return roslina
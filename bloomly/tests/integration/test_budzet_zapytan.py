@@ -0,0 +1,232 @@
+"""
+Testy integracyjne - budżety zapytań SQL (regresje N+1)
+
+Każdy URL z bloomly/urls.py i każde zadanie Celery jest mierzone przy dwóch
+rozmiarach danych (Fabryka.zasiej). Liczba zapytań nie może rosnąć razem
+z danymi i nie może przekroczyć budżetu z tests/budzet_zapytan.json.
+Zadania, które z założenia pracują per roślina (ML), mają w pliku budżet
+{"stale": ..., "na_rosline": ...} zamiast stałej liczby.
+
+Po świadomej zmianie liczby zapytań: BLOOMLY_ZAPISZ_BUDZETY=1 python manage.py test
+bloomly.tests.integration.test_budzet_zapytan – plik zostanie nadpisany zmierzonymi wartościami.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from itertools import count
+from pathlib import Path
+from unittest.mock import patch
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from bloomly import tasks
+from bloomly.ml_storage import reset_artifact_store, wyczysc_pamiec_artefaktow
+from bloomly.models import CzynoscPielegnacyjna, Przypomnienie, Roslina
+from bloomly.stronicowanie import zakoduj_kursor
+from bloomly.tests.fabryka import Fabryka
+from bloomly.urls import urlpatterns
+
+PLIK_BUDZETOW = Path(__file__).resolve().parent.parent / "budzet_zapytan.json"
+BUDZETY = json.loads(PLIK_BUDZETOW.read_text(encoding="utf-8"))
+ZAPISZ_BUDZETY = bool(os.environ.get("BLOOMLY_ZAPISZ_BUDZETY"))
+
+MALE, DUZE = 2, 6
+
+# argumenty URL-i (nazwa -> kwargs z fabryki) i żądania inne niż GET
+ARGUMENTY = {
+    "szczegoly_rosliny": lambda f: {"id": f.roslina.id},
+    "edytuj_roslina": lambda f: {"id": f.roslina.id},
+    "usun_roslina": lambda f: {"id": f.roslina.id},
+    "podlej_roslina": lambda f: {"id": f.roslina.id},
+    "dodaj_czynnosc": lambda f: {"id": f.roslina.id},
+    "historia_rosliny": lambda f: {"id": f.roslina.id},
+    "analiza_ml_rosliny": lambda f: {"id": f.roslina.id},
+    "oznacz_podlanie": lambda f: {"id": f.roslina.id},
+    "szczegoly_przypomnienia": lambda f: {"id": f.przypomnienie.id},
+    "wykonaj_przypomnienie": lambda f: {"id": f.przypomnienie.id},
+    "odloz_przypomnienie": lambda f: {"id": f.przypomnienie.id},
+    "forum_kategoria": lambda f: {"slug": f.kategoria.slug},
+    "forum_post": lambda f: {"slug": f.post.slug},
+    "forum_edytuj_post": lambda f: {"slug": f.post.slug},
+    "forum_usun_post": lambda f: {"slug": f.post.slug},
+    "forum_usun_komentarz": lambda f: {"pk": f.komentarz.pk},
+    "baza_roslin_szczegoly": lambda f: {"slug": f.baza.slug},
+    "baza_roslin_edytuj": lambda f: {"slug": f.baza.slug},
+}
+
+_minuty = count(1)
+
+
+def _chwila():
+    """Kolejna (wcześniejsza) minuta w formacie datetime-local – każde żądanie zapisuje nowy wpis."""
+    return (timezone.localtime() - timedelta(minutes=next(_minuty))).strftime("%Y-%m-%dT%H:%M")
+
+
+def _plik_importu(f):
+    wiersze = [f"{f.roslina.id},{_chwila()},podlewanie,tak,dry,med" for _ in range(2)]
+    tresc = "roslina_id,data,typ,wykonane,stan_gleby,ilosc_wody\n" + "\n".join(wiersze) + "\n"
+    return SimpleUploadedFile("historia.csv", tresc.encode(), content_type="text/csv")
+
+
+# żądania POST mierzone obok GET: nazwa -> dane formularza (budowane przed pomiarem)
+POST = {
+    "oznacz_podlanie": lambda f: {},
+    "podlej_roslina": lambda f: {"data": _chwila(), "stan_gleby": "dry", "ilosc_wody": "med"},
+    "dodaj_czynnosc": lambda f: {"typ": "nawozenie", "data": _chwila(), "notatki": "Nawóz"},
+    "wykonaj_przypomnienie": lambda f: {"data": _chwila(), "stan_gleby": "moist", "ilosc_wody": "low"},
+    "import_historii": lambda f: {"plik": _plik_importu(f)},
+    "analiza_ml_rosliny": lambda f: {"przelicz": "1"},
+}
+
+
+def _parametry(nazwa, f):
+    """Warianty parametrów GET widoku – liczy się najdroższy."""
+    if nazwa == "kalendarz_events_json":
+        teraz = timezone.now()
+        return [{"start": (teraz - timezone.timedelta(days=90)).isoformat(),
+                 "end": (teraz + timezone.timedelta(days=30)).isoformat()}]
+    if nazwa == "historia_rosliny":
+        # pierwsza strona i kolejna (kursor za najnowszym wpisem – warunek keyset)
+        najnowsza = CzynoscPielegnacyjna.objects.filter(roslina=f.roslina).order_by("-data", "-id").first()
+        return [{}, {"kursor": zakoduj_kursor([najnowsza.data, najnowsza.id])}]
+    return [{}]
+
+
+def _zadania(f):
+    """nazwa -> wywołanie zadania (synchronicznie; kolejkowanie dalszych zadań jest zaślepione)"""
+    rosliny = lambda: list(Roslina.objects.values_list("id", flat=True))  # noqa: E731
+    otwarte = lambda: list(Przypomnienie.objects.filter(status="oczekujace").values_list("id", flat=True))  # noqa: E731
+    return {
+        "odswiez_przypomnienie_rosliny": lambda: tasks.odswiez_przypomnienie_rosliny(f.roslina.id),
+        "wyslij_email_przypomnienie": lambda: tasks.wyslij_email_przypomnienie(f.przypomnienie.id),
+        "wyslij_zestawienia_przypomnien": lambda: tasks.wyslij_zestawienia_przypomnien(otwarte()),
+        "wyslij_outbox": tasks.wyslij_outbox,
+        "sprawdz_przypomnienia": tasks.sprawdz_przypomnienia,
+        "odswiez_pakiet_przypomnien": lambda: tasks.odswiez_pakiet_przypomnien(rosliny()),
+        "odswiez_przypomnienia_dla_wszystkich": lambda: tasks.odswiez_przypomnienia_dla_wszystkich(pelny=True),
+        "sprawdz_inteligentne_przypomnienia": tasks.sprawdz_inteligentne_przypomnienia,
+        "analizuj_wszystkie_rosliny": tasks.analizuj_wszystkie_rosliny,
+        "retrenuj_modele_ml": tasks.retrenuj_modele_ml,
+        "zastosuj_rekomendacje_automatycznie": tasks.zastosuj_rekomendacje_automatycznie,
+        "przetworz_pakiet_roslin": lambda: tasks.przetworz_pakiet_roslin(rosliny()),
+        "podsumuj_nocny_pipeline": lambda: tasks.podsumuj_nocny_pipeline([{"rosliny": 1}] * len(rosliny())),
+        "nocny_pipeline_roslin": lambda: tasks.nocny_pipeline_roslin(pelny=True),
+        "test_ml_pipeline": tasks.test_ml_pipeline,
+        "czyszczenie_starych_przypomnien": tasks.czyszczenie_starych_przypomnien,
+        "retencja_danych": lambda: tasks.retencja_danych(budzet_s=60),
+    }
+
+
+class BudzetZapytanTest(TestCase):
+    def setUp(self):
+        # stała pora dnia: dane fabryki są liczone od „teraz”, a od godziny uruchomienia
+        # zależało, czy przypomnienia świeżych roślin są już należne (rezerwacja wysyłki
+        # to +1 zapytanie na roślinę w przetworz_pakiet_roslin)
+        start = datetime.now(dt_timezone.utc)
+        poludnie = timezone.make_aware(datetime.combine(timezone.localdate(), time(12)))
+        zegar = patch(
+            "django.utils.timezone.now",
+            side_effect=lambda: poludnie + (datetime.now(dt_timezone.utc) - start),
+        )
+        zegar.start()
+        self.addCleanup(zegar.stop)
+
+        # modele ML z innych testów (te same id roślin) nie mogą zmieniać ścieżki kodu
+        tmp = tempfile.mkdtemp()
+        ustawienia = override_settings(
+            ML_ARTIFACT_STORE={"BACKEND": "bloomly.ml_storage.LocalArtifactStore", "OPTIONS": {"root": tmp}},
+            ML_ARTIFACT_CACHE_DIR=os.path.join(tmp, "cache"),
+        )
+        ustawienia.enable()
+        reset_artifact_store()
+        wyczysc_pamiec_artefaktow()
+        self.addCleanup(shutil.rmtree, tmp, ignore_errors=True)
+        self.addCleanup(reset_artifact_store)
+        self.addCleanup(ustawienia.disable)
+
+        self.fabryka = Fabryka()
+        self.fabryka.zasiej(MALE)
+
+    def _zmierz(self, wywolanie):
+        with CaptureQueriesContext(connection) as ctx:
+            wywolanie()
+        return len(ctx.captured_queries)
+
+    def _zmierz_widok(self, nazwa):
+        klient = Client()
+        klient.force_login(self.fabryka.user)
+        url = reverse(nazwa, kwargs=ARGUMENTY.get(nazwa, lambda f: {})(self.fabryka))
+        zmierzone = [
+            self._zmierz(lambda: self.assertLess(klient.get(url, parametry).status_code, 500))
+            for parametry in _parametry(nazwa, self.fabryka)
+        ]
+        if nazwa in POST:
+            # rozgrzewka: mierzymy powtórne wywołanie, żeby stan (np. dzisiejsze podlanie) był ten sam
+            self._wyslij(klient, url, POST[nazwa](self.fabryka))
+            dane = POST[nazwa](self.fabryka)
+            zmierzone.append(self._zmierz(lambda: self._wyslij(klient, url, dane)))
+        return max(zmierzone)
+
+    def _wyslij(self, klient, url, dane):
+        response = klient.post(url, dane)
+        self.assertLess(response.status_code, 400)
+        # formularz wyrenderowany ponownie z błędami = zapis się nie odbył
+        formularz = (response.context or {}).get("form") if response.status_code == 200 else None
+        self.assertFalse(formularz and formularz.errors, url)
+
+    def _zmierz_zadania(self):
+        with patch("bloomly.tasks.group"), patch("bloomly.tasks.chord"), \
+                patch("bloomly.tasks.wyslij_zestawienia_przypomnien.delay"), \
+                patch("bloomly.tasks.odswiez_przypomnienie_rosliny.delay"):
+            return {nazwa: self._zmierz(zadanie) for nazwa, zadanie in _zadania(self.fabryka).items()}
+
+    def _zapisz(self, sekcja, zmierzone):
+        if not ZAPISZ_BUDZETY:
+            return
+        budzety = json.loads(PLIK_BUDZETOW.read_text(encoding="utf-8"))
+        for nazwa, liczba in zmierzone.items():
+            if not isinstance(budzety[sekcja].get(nazwa), dict):
+                budzety[sekcja][nazwa] = liczba
+        PLIK_BUDZETOW.write_text(json.dumps(budzety, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+
+    def test_kazdy_url_i_zadanie_ma_budzet(self):
+        self.assertEqual({p.name for p in urlpatterns if p.name}, set(BUDZETY["widoki"]))
+        self.assertEqual(set(_zadania(self.fabryka)), set(BUDZETY["zadania"]))
+
+    def test_widoki(self):
+        nazwy = sorted(p.name for p in urlpatterns if p.name)
+        male = {nazwa: self._zmierz_widok(nazwa) for nazwa in nazwy}
+        self.fabryka.zasiej(DUZE)
+        duze = {nazwa: self._zmierz_widok(nazwa) for nazwa in nazwy}
+        self._zapisz("widoki", duze)
+
+        for nazwa in nazwy:
+            with self.subTest(widok=nazwa):
+                self.assertEqual(duze[nazwa], male[nazwa], "liczba zapytań rośnie z danymi")
+                self.assertLessEqual(duze[nazwa], BUDZETY["widoki"][nazwa])
+
+    def test_zadania(self):
+        self._zmierz_zadania()  # rozgrzewka: modele ML głównej rośliny już wytrenowane
+        male, roslin_male = self._zmierz_zadania(), Roslina.objects.count()
+        self.fabryka.zasiej(DUZE)
+        duze, roslin_duze = self._zmierz_zadania(), Roslina.objects.count()
+        self._zapisz("zadania", duze)
+
+        for nazwa, budzet in BUDZETY["zadania"].items():
+            with self.subTest(zadanie=nazwa):
+                if isinstance(budzet, dict):
+                    # praca per roślina: stały koszt + koszt na roślinę
+                    na_rosline = (duze[nazwa] - male[nazwa]) / (roslin_duze - roslin_male)
+                    self.assertLessEqual(na_rosline, budzet["na_rosline"])
+                    self.assertLessEqual(duze[nazwa], budzet["stale"] + budzet["na_rosline"] * roslin_duze)
+                else:
+                    self.assertEqual(duze[nazwa], male[nazwa], "liczba zapytań rośnie z danymi")
+                    self.assertLessEqual(duze[nazwa], budzet)
@@ -18,7 +18,8 @@ from bloomly.ml_utils import (
     przewidz_czestotliwosc_ml,
     zaktualizuj_analize_rosliny,
     zastosuj_rekomendacje_ml,
-    retrenuj_wszystkie_modele
+    retrenuj_wszystkie_modele,
+    wybierz_kandydata,
 )
 
 
@@ -83,7 +84,7 @@ class MLPipelineBasicFlowTest(TestCase):
         self.assertIsInstance(analiza, AnalizaPielegnacji)
         self.assertEqual(analiza.roslina, self.roslina)
         self.assertGreater(analiza.liczba_podlan, 0)
-        self.assertIn(analiza.typ_modelu, ['RF', 'GB'])
+        self.assertIn(analiza.typ_modelu, dict(AnalizaPielegnacji.TYPY_MODELU))
 
         # 6. FAZA: Zastosowanie rekomendacji (jeśli pewność wysoka)
         if analiza.pewnosc_rekomendacji >= 0.7:
@@ -257,7 +258,7 @@ class MLPipelineMultiplePlantsTest(TestCase):
 
 
 class MLPipelineModelSelectionTest(TestCase):
-    """Test wyboru odpowiedniego modelu (GB vs RF)"""
+    """Test wyboru modelu (najtańszy kandydat w tolerancji MAE)"""
 
     def setUp(self):
         self.user = User.objects.create_user(
@@ -265,8 +266,8 @@ class MLPipelineModelSelectionTest(TestCase):
             password='testpass123'
         )
 
-    def test_gradient_boosting_for_small_dataset(self):
-        """Test wyboru Gradient Boosting dla małego zbioru danych"""
+    def test_small_dataset_picks_cheapest_within_tolerance(self):
+        """Test wyboru najtańszego kandydata dla małego zbioru danych"""
 
         roslina = Roslina.objects.create(
             nazwa="Mała roślina",
@@ -290,11 +291,12 @@ class MLPipelineModelSelectionTest(TestCase):
         model_data = trenuj_model_ml(roslina)
 
         if model_data:
-            # Dla <15 próbek powinien wybrać GB
-            self.assertEqual(model_data['model_type'], 'GB')
+            kandydaci = model_data['kandydaci']
+            self.assertEqual({k['typ'] for k in kandydaci}, {'STAT', 'RFS', 'HGB', 'GB', 'RF'})
+            self.assertEqual(model_data['model_type'], wybierz_kandydata(kandydaci)['typ'])
 
-    def test_random_forest_for_large_dataset(self):
-        """Test wyboru Random Forest dla dużego zbioru danych"""
+    def test_regular_large_dataset_uses_cheap_model(self):
+        """Regularne podlewanie: mediana interwałów jest tak samo dokładna jak RF, a dużo tańsza"""
 
         roslina = Roslina.objects.create(
             nazwa="Duża roślina",
@@ -317,9 +319,15 @@ class MLPipelineModelSelectionTest(TestCase):
 
         model_data = trenuj_model_ml(roslina)
 
-        if model_data:
-            # Dla >=15 próbek powinien wybrać RF
-            self.assertEqual(model_data['model_type'], 'RF')
+        self.assertIsNotNone(model_data)
+        koszty = {k['typ']: k['koszt_s'] for k in model_data['kandydaci']}
+        self.assertNotEqual(model_data['model_type'], 'RF')
+        self.assertLess(koszty[model_data['model_type']], koszty['RF'])
+
+        analiza = zaktualizuj_analize_rosliny(roslina)['analiza']
+        self.assertEqual(analiza.typ_modelu, model_data['model_type'])
+        self.assertEqual(len(analiza.kandydaci_modeli), 5)
+        self.assertIsNotNone(analiza.czas_treningu)
 
 
 class MLPipelineConfidenceCalculationTest(TestCase):
@@ -17,6 +17,8 @@ from bloomly.models import (
 )
 from bloomly.tasks import (
     wyslij_email_przypomnienie,
+    wyslij_zestawienia_przypomnien,
+    wyslij_outbox,
     sprawdz_przypomnienia,
     odswiez_przypomnienie_rosliny,
     odswiez_przypomnienia_dla_wszystkich
@@ -265,8 +267,10 @@ class ReminderSchedulingFlowTest(TestCase):
             wyslane=False
         )
 
-        with patch.object(wyslij_email_przypomnienie, 'delay', side_effect=lambda id: wyslij_email_przypomnienie(id)):
+        with patch.object(wyslij_zestawienia_przypomnien, 'delay',
+                          side_effect=lambda ids: wyslij_zestawienia_przypomnien(ids)):
             sprawdz_przypomnienia()
+        wyslij_outbox()
 
         self.assertGreater(len(mail.outbox), 0)
 
@@ -727,4 +731,76 @@ class NotificationErrorHandlingTest(TestCase):
             pass
 
         # System powinien działać
-        self.assertTrue(True)
\ No newline at end of file
+        self.assertTrue(True)
+
+class DigestEmailFlowTest(TestCase):
+    """Test zbiorczych zestawień (jeden e-mail na użytkownika, jedno połączenie SMTP)"""
+
+    def setUp(self):
+        self.ids = []
+        self.users = []
+        for u, liczba in (('anna', 3), ('bartek', 1)):
+            user = User.objects.create_user(username=u, email=f'{u}@example.com', password='testpass123')
+            self.users.append(user)
+            for i in range(liczba):
+                roslina = Roslina.objects.create(
+                    nazwa=f"{u} {i}",
+                    wlasciciel=user,
+                    czestotliwosc_podlewania=7,
+                    data_zakupu=date.today()
+                )
+                self.ids.append(Przypomnienie.objects.create(
+                    roslina=roslina,
+                    uzytkownik=user,
+                    typ="podlewanie",
+                    tytul=f"Podlej {roslina.nazwa}",
+                    tresc="Rekomendacja: za 7 dni.",
+                    data_przypomnienia=timezone.now() + timedelta(days=2, hours=i),
+                ).id)
+
+    def test_jedno_zestawienie_na_uzytkownika(self):
+        from django.core.mail import get_connection
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from bloomly.models import OutboxEmail
+
+        with CaptureQueriesContext(connection) as ctx:
+            wynik = wyslij_zestawienia_przypomnien(self.ids)
+
+        self.assertIn("2 zestawień", wynik)
+        aktualizacje = [
+            q for q in ctx.captured_queries if q['sql'].startswith('UPDATE "bloomly_przypomnienie"')
+        ]
+        self.assertEqual(len(aktualizacje), 1)
+        self.assertEqual(
+            Przypomnienie.objects.filter(id__in=self.ids, wyslane=True, status='wyslane').count(), 4
+        )
+        # Zapis do outboxu w tej samej transakcji – wysyłka dopiero przez nadawcę
+        self.assertEqual(OutboxEmail.objects.filter(status='oczekuje').count(), 2)
+        self.assertEqual(len(mail.outbox), 0)
+
+        with patch('bloomly.outbox.get_connection', wraps=get_connection) as mock_conn:
+            wyslij_outbox()
+
+        mock_conn.assert_called_once()
+        self.assertEqual(len(mail.outbox), 2)
+        zestawienie = next(m for m in mail.outbox if m.to == ['anna@example.com'])
+        self.assertIn("3 roślin", zestawienie.subject)
+        for i in range(3):
+            self.assertIn(f"anna {i}", zestawienie.body)
+        self.assertEqual(OutboxEmail.objects.filter(status='wyslany').count(), 2)
+
+    def test_blad_smtp_ponawiany_z_outboxu(self):
+        from bloomly.models import OutboxEmail
+
+        wyslij_zestawienia_przypomnien(self.ids)
+        with patch('django.core.mail.backends.locmem.EmailBackend.send_messages',
+                   side_effect=Exception("SMTP error")):
+            wyslij_outbox()
+
+        self.assertEqual(len(mail.outbox), 0)
+        for email in OutboxEmail.objects.all():
+            self.assertEqual(email.status, 'oczekuje')
+            self.assertEqual(email.proby, 1)
+            self.assertGreater(email.nastepna_proba, timezone.now())
+            self.assertIn("SMTP error", email.ostatni_blad)
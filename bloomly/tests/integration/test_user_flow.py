@@ -418,4 +418,34 @@ class UserIsolationTest(TestCase):
         # Roślina nadal powinna istnieć
         self.assertTrue(
             Roslina.objects.filter(id=self.roslina2.id).exists()
-        )
\ No newline at end of file
+        )
+
+class TrainingStatsEndpointFlowTest(TestCase):
+    """Test endpointu telemetrii trenowania (tylko staff)"""
+
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='zwykly', password='testpass123')
+        self.staff = User.objects.create_user(username='admin', password='testpass123', is_staff=True)
+        self.url = reverse('statystyki_treningow_json')
+
+    def test_zwykly_uzytkownik_nie_ma_dostepu(self):
+        self.client.login(username='zwykly', password='testpass123')
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 403)
+
+    def test_staff_widzi_statystyki(self):
+        from bloomly.models import TrainingRun
+        TrainingRun.objects.create(czas_calkowity=0.5, czas_fit=0.2, typ_modelu='RF')
+
+        self.client.login(username='admin', password='testpass123')
+        response = self.client.get(self.url, {'godziny': 1})
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['liczba'], 1)
+        self.assertEqual(data['typy_modeli'], {'RF': 1})
+
+    def test_nieprawidlowy_parametr(self):
+        self.client.login(username='admin', password='testpass123')
+        self.assertEqual(self.client.get(self.url, {'godziny': 'abc'}).status_code, 400)
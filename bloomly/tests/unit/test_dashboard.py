@@ -0,0 +1,106 @@
+"""
+Testy jednostkowe podsumowania strony głównej w cache (bloomly.dashboard)
+"""
+
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from bloomly.dashboard import podsumowanie_dashboardu, policz_podsumowanie
+from bloomly.models import CzynoscPielegnacyjna, Przypomnienie, Roslina
+from bloomly.przypomnienia import zaplanuj_przypomnienia
+
+LOCMEM = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "dashboard"}}
+
+
+def _zapytania_o_dane(ctx):
+    tabele = ('"bloomly_roslina"', '"bloomly_czynoscpielegnacyjna"', '"bloomly_przypomnienie"')
+    return [q["sql"] for q in ctx.captured_queries if any(t in q["sql"] for t in tabele)]
+
+
+@override_settings(CACHES=LOCMEM)
+class DashboardCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.inny = User.objects.create_user(username='inny', password='x')
+        self.roslina = Roslina.objects.create(
+            nazwa="Monstera", wlasciciel=self.user, czestotliwosc_podlewania=7, data_zakupu=date.today()
+        )
+        Roslina.objects.create(
+            nazwa="Fikus", wlasciciel=self.user, czestotliwosc_podlewania=7, data_zakupu=date.today(),
+            ostatnie_podlewanie=date.today(),
+        )
+        Roslina.objects.create(
+            nazwa="Cudza", wlasciciel=self.inny, czestotliwosc_podlewania=7, data_zakupu=date.today()
+        )
+
+    def _podlej(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return CzynoscPielegnacyjna.objects.create(
+                roslina=self.roslina, uzytkownik=self.user, typ="podlewanie", data=timezone.now()
+            )
+
+    def test_agregaty(self):
+        dane = policz_podsumowanie(self.user.pk)
+        self.assertEqual(dane["liczba_roslin"], 2)
+        self.assertEqual(dane["rosliny_do_podlania"], 1)
+        self.assertEqual(dane["ostatnie_czynnosci"], [])
+
+    def test_powtorny_odczyt_bez_zapytan(self):
+        podsumowanie_dashboardu(self.user)
+        with CaptureQueriesContext(connection) as ctx:
+            dane = podsumowanie_dashboardu(self.user)
+        self.assertEqual(len(ctx.captured_queries), 0)
+        self.assertEqual(dane["liczba_roslin"], 2)
+
+    def test_zmiana_danych_uniewaznia_tylko_wlasciciela(self):
+        podsumowanie_dashboardu(self.user)
+        podsumowanie_dashboardu(self.inny)
+        czynnosc = self._podlej()
+
+        dane = podsumowanie_dashboardu(self.user)
+        self.assertEqual(dane["rosliny_do_podlania"], 0)
+        self.assertEqual(dane["ostatnie_czynnosci"], [czynnosc])
+        with CaptureQueriesContext(connection) as ctx:
+            podsumowanie_dashboardu(self.inny)
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            czynnosc.delete()
+        self.assertEqual(podsumowanie_dashboardu(self.user)["ostatnie_czynnosci"], [])
+
+    def test_wyrzucona_wersja_nie_wskrzesza_starych_danych(self):
+        podsumowanie_dashboardu(self.user)
+        cache.delete(f"bloomly:dashboard:{self.user.pk}:wersja")
+        self._podlej()  # incr na brakującym kluczu – bez błędu
+        self.assertEqual(len(podsumowanie_dashboardu(self.user)["ostatnie_czynnosci"]), 1)
+
+    def test_planer_przypomnien_uniewaznia(self):
+        self._podlej()
+        Przypomnienie.objects.filter(roslina=self.roslina).delete()
+        self.assertEqual(podsumowanie_dashboardu(self.user)["pilne_przypomnienia"], [])
+
+        Roslina.objects.filter(pk=self.roslina.pk).update(
+            ostatnie_podlewanie=date.today() - timedelta(days=7)
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            zaplanuj_przypomnienia(Roslina.objects.filter(pk=self.roslina.pk))
+        self.assertEqual(len(podsumowanie_dashboardu(self.user)["pilne_przypomnienia"]), 1)
+
+    def test_strona_glowna(self):
+        self.client.login(username='testuser', password='testpass123')
+        self.client.get(reverse("home"))
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse("home"))
+
+        self.assertEqual(response.context["liczba_roslin"], 2)
+        self.assertEqual(response.context["rosliny_do_podlania"], 1)
+        self.assertEqual(_zapytania_o_dane(ctx), [])
@@ -0,0 +1,70 @@
+"""
+Testy jednostkowe stronicowanej historii pielęgnacji na stronie rośliny
+"""
+
+import re
+from datetime import date, datetime, timedelta
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from bloomly.models import CzynoscPielegnacyjna, Roslina
+from bloomly.stronicowanie import zakoduj_kursor
+from bloomly.views import ROZMIAR_STRONY_HISTORII
+
+
+class HistoriaRoslinyTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.roslina = Roslina.objects.create(
+            nazwa="Monstera", wlasciciel=self.user, czestotliwosc_podlewania=7, data_zakupu=date.today()
+        )
+        start = timezone.make_aware(datetime(2023, 1, 1, 8))
+        typy = ["podlewanie", "podlewanie", "nawozenie"]
+        self.czynnosci = [
+            CzynoscPielegnacyjna.objects.create(
+                roslina=self.roslina, uzytkownik=self.user, typ=typy[i % 3],
+                # po dwie czynności w tej samej chwili – kolejność rozstrzyga id
+                data=start + timedelta(days=i // 2), notatki=f"wpis {i}",
+            )
+            for i in range(45)
+        ]
+        self.client.login(username='testuser', password='testpass123')
+
+    def test_pierwsza_strona_i_podsumowanie(self):
+        response = self.client.get(reverse('szczegoly_rosliny', args=[self.roslina.id]))
+
+        self.assertEqual(len(response.context['czynnosci']), ROZMIAR_STRONY_HISTORII)
+        self.assertIsNotNone(response.context['nastepna_strona_historii'])
+        self.assertNotIn('historia', response.context)
+        self.assertEqual(
+            [(p['typ'], p['liczba']) for p in response.context['podsumowanie_historii']],
+            [("podlewanie", 30), ("nawozenie", 15)],
+        )
+        self.assertContains(response, "Pokaż starsze")
+
+    def test_kolejne_strony_bez_luk_i_powtorzen(self):
+        response = self.client.get(reverse('szczegoly_rosliny', args=[self.roslina.id]))
+        widziane = [c.pk for c in response.context['czynnosci']]
+        kursor = response.context['nastepna_strona_historii']
+        url = reverse('historia_rosliny', args=[self.roslina.id])
+        po_notatce = {c.notatki: c.pk for c in self.czynnosci}
+        while kursor:
+            dane = self.client.get(url, {'kursor': kursor}).json()
+            widziane.extend(po_notatce[n] for n in re.findall(r"wpis \d+", dane['html']))
+            kursor = dane['nastepny']
+
+        oczekiwane = [c.pk for c in sorted(self.czynnosci, key=lambda c: (c.data, c.pk), reverse=True)]
+        self.assertEqual(widziane, oczekiwane)
+
+    def test_cudza_roslina_i_bledny_kursor(self):
+        obcy = User.objects.create_user(username='obcy', password='x')
+        cudza = Roslina.objects.create(nazwa="Cudza", wlasciciel=obcy, czestotliwosc_podlewania=7,
+                                       data_zakupu=date.today())
+        self.assertEqual(self.client.get(reverse('historia_rosliny', args=[cudza.id])).status_code, 404)
+        for kursor in ('xyz', zakoduj_kursor(["abc", "x"])):
+            response = self.client.get(reverse('historia_rosliny', args=[self.roslina.id]), {'kursor': kursor})
+            self.assertEqual(response.status_code, 400)
+
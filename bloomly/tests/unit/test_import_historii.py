@@ -0,0 +1,182 @@
+"""
+Testy jednostkowe importu historii czynności (CSV / NDJSON)
+"""
+
+import io
+from datetime import date, datetime, timedelta
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from bloomly.import_historii import importuj_historie
+from bloomly.models import BrudnaRoslina, CzynoscPielegnacyjna, Roslina
+
+
+def _csv(wiersze):
+    return io.StringIO("roslina_id,roslina,data,typ,stan_gleby\n" + "\n".join(wiersze) + "\n")
+
+
+class ImportHistoriiTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.monstera = Roslina.objects.create(
+            nazwa="Monstera", wlasciciel=self.user, czestotliwosc_podlewania=7, data_zakupu=date.today()
+        )
+        self.fikus = Roslina.objects.create(
+            nazwa="Fikus", wlasciciel=self.user, czestotliwosc_podlewania=7, data_zakupu=date.today()
+        )
+        BrudnaRoslina.objects.all().delete()
+
+    def _interwaly(self, roslina):
+        return list(
+            CzynoscPielegnacyjna.objects.filter(roslina=roslina, typ="podlewanie")
+            .order_by("data", "id").values_list("interwal_dni", flat=True)
+        )
+
+    def test_csv_interwaly_jak_przy_zapisie(self):
+        m = self.monstera.id
+        raport = importuj_historie(_csv([
+            f"{m},,2024-05-10T08:00:00,podlewanie,dry",
+            f"{m},,2024-05-01T08:00:00,,",
+            ",fikus,2024-05-03,podlewanie,wet",
+            f"{m},,2024-05-04T20:00:00,podlewanie,",
+            f"{m},,2024-05-06T08:00:00,nawozenie,",
+        ]), self.user)
+
+        self.assertEqual(raport["zaimportowane"], 5)
+        self.assertEqual(raport["bledne"], 0)
+        self.assertEqual(raport["rosliny"], 2)
+        self.assertEqual(self._interwaly(self.monstera), [None, 3.5, 5.5])
+        self.assertEqual(
+            set(BrudnaRoslina.objects.values_list("roslina_id", flat=True)), {self.monstera.id, self.fikus.id}
+        )
+
+        # ta sama historia zapisywana pojedynczo (save()) daje te same interwały
+        kontrolna = Roslina.objects.create(
+            nazwa="Kontrolna", wlasciciel=self.user, czestotliwosc_podlewania=7, data_zakupu=date.today()
+        )
+        for dt in ("2024-05-01T08:00:00", "2024-05-04T20:00:00", "2024-05-10T08:00:00"):
+            CzynoscPielegnacyjna.objects.create(
+                roslina=kontrolna, uzytkownik=self.user, typ="podlewanie",
+                data=timezone.make_aware(datetime.fromisoformat(dt)),
+            )
+        self.assertEqual(self._interwaly(kontrolna), self._interwaly(self.monstera))
+
+        self.monstera.refresh_from_db()
+        self.fikus.refresh_from_db()
+        self.assertEqual(self.monstera.ostatnie_podlewanie, date(2024, 5, 10))
+        self.assertEqual(self.fikus.ostatnie_podlewanie, date(2024, 5, 3))
+
+    def test_ponowny_import_bez_duplikatow(self):
+        plik = [f"{self.monstera.id},,2024-05-0{d}T08:00:00,podlewanie," for d in range(1, 4)]
+        importuj_historie(_csv(plik), self.user)
+        raport = importuj_historie(_csv(plik), self.user)
+
+        self.assertEqual(raport["zaimportowane"], 0)
+        self.assertEqual(raport["duplikaty"], 3)
+        self.assertEqual(CzynoscPielegnacyjna.objects.count(), 3)
+
+    def test_dopisanie_przed_istniejacym_przelicza_nastepne(self):
+        CzynoscPielegnacyjna.objects.create(
+            roslina=self.monstera, uzytkownik=self.user, typ="podlewanie",
+            data=timezone.make_aware(datetime(2024, 5, 1, 8)),
+        )
+        CzynoscPielegnacyjna.objects.create(
+            roslina=self.monstera, uzytkownik=self.user, typ="podlewanie",
+            data=timezone.make_aware(datetime(2024, 5, 9, 8)),
+        )
+        importuj_historie(_csv([f"{self.monstera.id},,2024-05-05T08:00:00,podlewanie,"]), self.user)
+
+        self.assertEqual(self._interwaly(self.monstera), [None, 4.0, 4.0])
+
+    def test_walidacja_wierszy(self):
+        obcy = User.objects.create_user(username='obcy', password='x')
+        cudza = Roslina.objects.create(
+            nazwa="Cudza", wlasciciel=obcy, czestotliwosc_podlewania=7, data_zakupu=date.today()
+        )
+        raport = importuj_historie(_csv([
+            f"{cudza.id},,2024-05-01,podlewanie,",
+            ",Nieznana,2024-05-01,podlewanie,",
+            f"{self.monstera.id},,wczoraj,podlewanie,",
+            f"{self.monstera.id},,2024-05-01,podlewanie,bloto",
+            f"{self.monstera.id},,2024-05-01,podlewanie,moist",
+        ]), self.user)
+
+        self.assertEqual(raport["zaimportowane"], 1)
+        self.assertEqual(raport["bledne"], 4)
+        self.assertEqual([linia for linia, _ in raport["bledy"]], [2, 3, 4, 5])
+        self.assertFalse(CzynoscPielegnacyjna.objects.filter(roslina=cudza).exists())
+
+    def test_ndjson(self):
+        plik = io.StringIO(
+            f'{{"roslina_id": {self.monstera.id}, "data": "2024-05-01T08:00:00+02:00"}}\n'
+            '\n'
+            '{"roslina_id": \n'
+            f'{{"roslina": "Monstera", "data": "2024-05-03T08:00:00+02:00", "wykonane": "nie"}}\n'
+        )
+        raport = importuj_historie(plik, self.user, format="ndjson")
+
+        self.assertEqual(raport["zaimportowane"], 2)
+        self.assertEqual(raport["bledy"][0][0], 3)
+        self.assertFalse(CzynoscPielegnacyjna.objects.get(data__day=3).wykonane)
+        # niewykonane podlewanie nie przesuwa ostatniego podlewania
+        self.monstera.refresh_from_db()
+        self.assertEqual(self.monstera.ostatnie_podlewanie, date(2024, 5, 1))
+
+    def test_liczba_zapytan_zalezy_od_pakietow_nie_wierszy(self):
+        start = timezone.make_aware(datetime(2023, 1, 1, 8))
+        wiersze = [
+            f"{self.monstera.id},,{(start + timedelta(days=i)).isoformat()},podlewanie,"
+            for i in range(300)
+        ]
+        with CaptureQueriesContext(connection) as ctx:
+            raport = importuj_historie(_csv(wiersze), self.user, rozmiar_pakietu=100)
+
+        self.assertEqual(raport["zaimportowane"], 300)
+        self.assertEqual(raport["interwaly"], 299)
+        self.assertLess(len(ctx.captured_queries), 30)
+
+    def test_widok_uploadu(self):
+        self.client.login(username='testuser', password='testpass123')
+        plik = SimpleUploadedFile(
+            "historia.csv",
+            f"roslina_id,data\n{self.monstera.id},2024-05-01T08:00:00\n".encode("utf-8-sig"),
+        )
+        response = self.client.post(reverse("import_historii"), {"plik": plik})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["raport"]["zaimportowane"], 1)
+        self.assertContains(response, "Wynik importu")
+
+    def test_widok_nieczytelny_plik(self):
+        self.client.login(username='testuser', password='testpass123')
+        url = reverse("import_historii")
+
+        plik = SimpleUploadedFile("historia.csv", "roslina_id,data\n1,2024-05-01 zażółć\n".encode("cp1250"))
+        response = self.client.post(url, {"plik": plik})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("UTF-8", response.context["raport"]["blad_pliku"])
+        self.assertTrue(response.context["form"].errors)
+
+        plik = SimpleUploadedFile("historia.csv", f"roslina_id,data\n{self.monstera.id}\x00,2024-05-01\n".encode())
+        response = self.client.post(url, {"plik": plik})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["raport"]["bledne"], 1)
+        self.assertIn("NUL", response.context["raport"]["bledy"][0][1])
+
+    def test_widok_limit_rozmiaru(self):
+        self.client.login(username='testuser', password='testpass123')
+        plik = SimpleUploadedFile("historia.csv", b"roslina_id,data\n" + b"1,2024-05-01\n" * 10)
+        with patch("bloomly.views.MAKS_ROZMIAR_PLIKU", 64):
+            response = self.client.post(reverse("import_historii"), {"plik": plik})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.context["raport"])
+        self.assertIn("plik", response.context["form"].errors)
+        self.assertFalse(CzynoscPielegnacyjna.objects.exists())
@@ -0,0 +1,110 @@
+"""
+Testy jednostkowe zdarzeń kalendarza (bloomly.kalendarz, kalendarz_events_json)
+"""
+
+from datetime import date, datetime, timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from bloomly.kalendarz import zdarzenia_kalendarza
+from bloomly.models import CzynoscPielegnacyjna, Przypomnienie, Roslina
+from bloomly.tasks import wyslij_zestawienia_przypomnien
+
+LOCMEM = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "kalendarz"}}
+
+
+def _zapytania_o_dane(ctx):
+    tabele = ('"bloomly_roslina"', '"bloomly_czynoscpielegnacyjna"', '"bloomly_przypomnienie"')
+    return [q["sql"] for q in ctx.captured_queries if any(t in q["sql"] for t in tabele)]
+
+
+@override_settings(CACHES=LOCMEM)
+class KalendarzTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = User.objects.create_user(username='testuser', password='testpass123',
+                                             email='test@example.com')
+        self.roslina = Roslina.objects.create(
+            nazwa="Monstera", wlasciciel=self.user, czestotliwosc_podlewania=7, data_zakupu=date.today()
+        )
+        self.start = timezone.make_aware(datetime(2024, 4, 29))
+        self.end = timezone.make_aware(datetime(2024, 6, 10))
+        self.w_oknie = Przypomnienie.objects.create(
+            roslina=self.roslina, uzytkownik=self.user, tytul="", tresc="Czas podlać",
+            data_przypomnienia=self.start + timedelta(days=3),
+        )
+        Przypomnienie.objects.create(
+            roslina=self.roslina, uzytkownik=self.user, tytul="Stare", tresc="Czas podlać",
+            data_przypomnienia=self.start - timedelta(days=3), status="wykonane",
+        )
+        self.czynnosc = CzynoscPielegnacyjna.objects.create(
+            roslina=self.roslina, uzytkownik=self.user, typ="podlewanie", data=self.start + timedelta(days=1),
+            ilosc_wody="med", stan_gleby="dry",
+        )
+        CzynoscPielegnacyjna.objects.create(
+            roslina=self.roslina, uzytkownik=self.user, typ="nawozenie", data=self.end + timedelta(days=1)
+        )
+        inny = User.objects.create_user(username='inny', password='x')
+        cudza = Roslina.objects.create(nazwa="Cudza", wlasciciel=inny, czestotliwosc_podlewania=7,
+                                       data_zakupu=date.today())
+        CzynoscPielegnacyjna.objects.create(roslina=cudza, uzytkownik=inny, typ="podlewanie",
+                                            data=self.start + timedelta(days=2))
+
+        self.url = reverse('kalendarz_events_json')
+        self.parametry = {'start': self.start.isoformat(), 'end': self.end.isoformat()}
+        self.client.login(username='testuser', password='testpass123')
+
+    def test_zdarzenia_z_zakresu(self):
+        zdarzenia = {z['id']: z for z in zdarzenia_kalendarza(self.user.pk, self.start, self.end)}
+
+        self.assertEqual(set(zdarzenia), {f"rem-{self.w_oknie.pk}", f"hist-{self.czynnosc.pk}"})
+        self.assertEqual(zdarzenia[f"rem-{self.w_oknie.pk}"]['title'], "🔔 Podlewanie • Monstera")
+        historia = zdarzenia[f"hist-{self.czynnosc.pk}"]
+        self.assertEqual(historia['title'], "🌿 Podlewanie • Monstera • med ml • sucha")
+        self.assertEqual(historia['url'], reverse('szczegoly_rosliny', args=[self.roslina.pk]))
+
+    def test_cache_etag_i_uniewaznienie(self):
+        response = self.client.get(self.url, self.parametry)
+        self.assertEqual(len(response.json()), 2)
+        etag = response.headers['ETag']
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url, self.parametry, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(_zapytania_o_dane(ctx), [])
+
+        # inne okno – osobny wpis, ta sama wersja danych
+        response = self.client.get(self.url, {**self.parametry, 'end': (self.end + timedelta(days=7)).isoformat()})
+        self.assertEqual(len(response.json()), 3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Roslina.objects.get(pk=self.roslina.pk).save()
+        response = self.client.get(self.url, self.parametry, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+
+    def test_ponowny_odczyt_bez_zapytan(self):
+        self.client.get(self.url, self.parametry)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url, self.parametry)
+        self.assertEqual(len(response.json()), 2)
+        self.assertEqual(_zapytania_o_dane(ctx), [])
+
+    def test_wyslane_zestawienie_zmienia_etag(self):
+        response = self.client.get(self.url, self.parametry)
+        etag = response.headers['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            wyslij_zestawienia_przypomnien([self.w_oknie.pk])
+
+        response = self.client.get(self.url, self.parametry, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        przypomnienie = next(z for z in response.json() if z['id'] == f"rem-{self.w_oknie.pk}")
+        self.assertEqual(przypomnienie['extendedProps']['status'], "wyslane")
@@ -0,0 +1,94 @@
+"""
+Testy jednostkowe kart roślin (bloomly.karty)
+"""
+
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from bloomly.karty import KartaRosliny, karty, karty_wg_id, zapytanie_kart
+from bloomly.models import AnalizaPielegnacji, CzynoscPielegnacyjna, Przypomnienie, Roslina
+
+
+class KartyRoslinTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        teraz = timezone.now()
+        self.rosliny = []
+        for i in range(4):
+            roslina = Roslina.objects.create(
+                nazwa=f"R{i}", wlasciciel=self.user, czestotliwosc_podlewania=7, data_zakupu=date.today()
+            )
+            for dni in (9, 2 + i):
+                CzynoscPielegnacyjna.objects.create(
+                    roslina=roslina, uzytkownik=self.user, typ="podlewanie", data=teraz - timedelta(days=dni)
+                )
+            self.rosliny.append(roslina)
+        # nowsza, ale niewykonana czynność nie jest ostatnim podlaniem
+        CzynoscPielegnacyjna.objects.create(
+            roslina=self.rosliny[0], uzytkownik=self.user, typ="podlewanie", data=teraz, wykonane=False
+        )
+        AnalizaPielegnacji.objects.create(roslina=self.rosliny[1], uzytkownik=self.user)
+        for roslina in self.rosliny:
+            Przypomnienie.objects.create(
+                roslina=roslina, uzytkownik=self.user, tytul="Podlej", tresc="Czas podlać",
+                data_przypomnienia=teraz - timedelta(days=5), status="wykonane",
+            )
+        self.otwarte = Przypomnienie.objects.create(
+            roslina=self.rosliny[0], uzytkownik=self.user, tytul="Podlej", tresc="Czas podlać",
+            data_przypomnienia=teraz + timedelta(days=2),
+        )
+
+    def test_zawartosc_karty(self):
+        wynik = {k.id: k for k in karty(zapytanie_kart(Roslina.objects.filter(wlasciciel=self.user)))}
+        pierwsza = wynik[self.rosliny[0].id]
+
+        ostatnia = CzynoscPielegnacyjna.objects.filter(
+            roslina=self.rosliny[0], wykonane=True
+        ).order_by('-data').first()
+        self.assertEqual(pierwsza.ostatnie_podlanie, ostatnia.data)
+        self.assertEqual(pierwsza.liczba_podlan, 2)
+        self.assertEqual(pierwsza.kategoria_nazwa, self.rosliny[0].get_kategoria_display())
+        self.assertEqual(pierwsza.przypomnienie, self.otwarte)
+        self.assertIsNone(wynik[self.rosliny[1].id].przypomnienie)
+        self.assertIsNotNone(wynik[self.rosliny[1].id].analiza)
+        self.assertIsNone(wynik[self.rosliny[2].id].analiza)
+
+        with self.assertRaises(AttributeError):
+            pierwsza.dowolne_pole = 1
+
+    def test_stala_liczba_zapytan(self):
+        qs = Roslina.objects.filter(wlasciciel=self.user)
+        with CaptureQueriesContext(connection) as ctx:
+            wynik = karty(zapytanie_kart(qs))
+            [(k.analiza, k.przypomnienie, k.ostatnie_podlanie) for k in wynik]
+        self.assertEqual(len(ctx.captured_queries), 2)
+
+        with CaptureQueriesContext(connection) as ctx:
+            karty_wg_id([r.id for r in self.rosliny])
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+    def test_widoki_uzywaja_kart(self):
+        self.client.login(username='testuser', password='testpass123')
+
+        response = self.client.get(reverse('lista_roslin'))
+        self.assertTrue(all(isinstance(k, KartaRosliny) for k in response.context['rosliny']))
+
+        response = self.client.get(reverse('dashboard_analityczny'))
+        self.assertEqual(len(response.context['analizy']), 4)
+        # brakujące analizy są przeliczane
+        self.assertTrue(all(k.analiza for k in response.context['analizy']))
+
+        # analiza policzona dla innego użytkownika też
+        inny = User.objects.create_user(username='inny', password='x')
+        AnalizaPielegnacji.objects.filter(roslina=self.rosliny[1]).update(uzytkownik=inny)
+        response = self.client.get(reverse('dashboard_analityczny'))
+        self.assertEqual({k.analiza.uzytkownik_id for k in response.context['analizy']}, {self.user.id})
+
+        response = self.client.get(reverse('lista_przypomnie'), {'view': 'done'})
+        self.assertEqual({p.karta.id for p in response.context['przypomnienia']}, {r.id for r in self.rosliny})
@@ -0,0 +1,137 @@
+"""
+Testy jednostkowe zdenormalizowanych liczników podlań na Roslina
+"""
+
+from datetime import date, datetime, timedelta
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from bloomly.models import CzynoscPielegnacyjna, Roslina
+
+
+class LicznikiPodlanTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.roslina = Roslina.objects.create(
+            nazwa="Monstera", wlasciciel=self.user, czestotliwosc_podlewania=7, data_zakupu=date.today()
+        )
+
+    def _podlej(self, dt, **pola):
+        return CzynoscPielegnacyjna.objects.create(
+            roslina=self.roslina, uzytkownik=self.user, typ=pola.pop("typ", "podlewanie"), data=dt, **pola
+        )
+
+    def test_zapis_podlewania_aktualizuje_liczniki(self):
+        dt = timezone.make_aware(datetime(2024, 5, 1, 12))
+        self._podlej(dt)
+        self._podlej(dt + timedelta(days=3))
+        self._podlej(dt + timedelta(days=4), wykonane=False)
+        self._podlej(dt + timedelta(days=5), typ="nawozenie")
+
+        self.roslina.refresh_from_db()
+        self.assertEqual(self.roslina.liczba_podlan, 2)
+        # niewykonane podlewanie nie przesuwa ostatniego (jak w przelicz_liczniki_podlan)
+        self.assertEqual(self.roslina.ostatnie_podlewanie, date(2024, 5, 4))
+        self.assertEqual(self.roslina.nastepne_podlewanie, date(2024, 5, 11))
+
+    def test_dzien_podlania_w_czasie_lokalnym(self):
+        # 00:30 w Warszawie to jeszcze poprzedni dzień w UTC
+        self._podlej(timezone.make_aware(datetime(2024, 5, 2, 0, 30)))
+        self.roslina.refresh_from_db()
+        self.assertEqual(self.roslina.ostatnie_podlewanie, date(2024, 5, 2))
+
+        call_command("przelicz_liczniki_podlan", stdout=StringIO())
+        self.assertEqual(Roslina.objects.get(pk=self.roslina.pk).ostatnie_podlewanie, date(2024, 5, 2))
+
+    def test_edycja_daty_przelicza_ostatnie(self):
+        dt = timezone.make_aware(datetime(2024, 5, 1, 12))
+        self._podlej(dt)
+        pozniejsze = self._podlej(dt + timedelta(days=6))
+
+        pozniejsze.data = dt - timedelta(days=2)
+        pozniejsze.save()
+        self.roslina.refresh_from_db()
+        self.assertEqual(self.roslina.liczba_podlan, 2)
+        self.assertEqual(self.roslina.ostatnie_podlewanie, date(2024, 5, 1))
+        self.assertEqual(pozniejsze.roslina.ostatnie_podlewanie, date(2024, 5, 1))
+
+    def test_pelny_zapis_rosliny_nie_nadpisuje_licznika(self):
+        nieaktualna = Roslina.objects.get(pk=self.roslina.pk)
+        self._podlej(timezone.now())
+
+        nieaktualna.czestotliwosc_podlewania = 3
+        nieaktualna.save()
+
+        self.roslina.refresh_from_db()
+        self.assertEqual(self.roslina.liczba_podlan, 1)
+        self.assertEqual(self.roslina.czestotliwosc_podlewania, 3)
+
+    def test_edycja_i_usuniecie(self):
+        dt = timezone.make_aware(datetime(2024, 5, 1, 12))
+        pierwsze = self._podlej(dt)
+        drugie = self._podlej(dt + timedelta(days=6))
+
+        drugie.wykonane = False
+        drugie.save()
+        self.roslina.refresh_from_db()
+        self.assertEqual(self.roslina.liczba_podlan, 1)
+
+        drugie.wykonane = True
+        drugie.save()
+        drugie.delete()
+        self.roslina.refresh_from_db()
+        self.assertEqual(self.roslina.liczba_podlan, 1)
+        self.assertEqual(self.roslina.ostatnie_podlewanie, date(2024, 5, 1))
+
+        pierwsze.delete()
+        self.roslina.refresh_from_db()
+        self.assertEqual(self.roslina.liczba_podlan, 0)
+
+    def test_usuniecie_rosliny_z_historia(self):
+        self._podlej(timezone.now())
+        self.roslina.delete()
+        self.assertFalse(CzynoscPielegnacyjna.objects.exists())
+
+    def test_komenda_naprawy(self):
+        self._podlej(timezone.make_aware(datetime(2024, 5, 1, 12)))
+        Roslina.objects.filter(pk=self.roslina.pk).update(
+            liczba_podlan=9, ostatnie_podlewanie=None, nastepne_podlewanie=None
+        )
+        out = StringIO()
+        call_command("przelicz_liczniki_podlan", stdout=out)
+
+        self.roslina.refresh_from_db()
+        self.assertEqual(self.roslina.liczba_podlan, 1)
+        self.assertEqual(self.roslina.ostatnie_podlewanie, date(2024, 5, 1))
+        self.assertEqual(self.roslina.nastepne_podlewanie, date(2024, 5, 8))
+        self.assertIn("1 roślin", out.getvalue())
+
+    def test_rosliny_do_podlania_jednym_zapytaniem(self):
+        dzis = timezone.now().date()
+        for i, (ostatnie, czestotliwosc) in enumerate([(None, 7), (dzis, 7), (dzis - timedelta(days=7), 7)]):
+            Roslina.objects.create(
+                nazwa=f"R{i}", wlasciciel=self.user, czestotliwosc_podlewania=czestotliwosc,
+                ostatnie_podlewanie=ostatnie, data_zakupu=dzis,
+            )
+        rosliny = Roslina.objects.filter(wlasciciel=self.user)
+        oczekiwane = {r.pk for r in rosliny if r.czy_potrzebuje_podlewania()}
+
+        self.assertEqual(set(rosliny.filter(Roslina.warunek_do_podlania()).values_list("pk", flat=True)), oczekiwane)
+
+        self.client.login(username='testuser', password='testpass123')
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse("home"))
+        self.assertEqual(response.context["rosliny_do_podlania"], len(oczekiwane))
+        self.assertFalse(any(
+            'FROM "bloomly_roslina"' in q["sql"] and "COUNT" not in q["sql"] for q in ctx.captured_queries
+        ))
+
+        response = self.client.get(reverse("lista_roslin"))
+        self.assertEqual({r.pk for r in response.context["rosliny"] if r.do_podlania}, oczekiwane)
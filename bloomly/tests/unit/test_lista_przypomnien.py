@@ -0,0 +1,77 @@
+"""
+Testy jednostkowe feedu przypomnień (lista_przypomnie)
+"""
+
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from bloomly.models import Przypomnienie, Roslina
+from bloomly.views import ROZMIAR_STRONY_PRZYPOMNIEN
+
+
+class ListaPrzypomnienTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        teraz = timezone.now()
+        self.oczekujace = []
+        # jedno otwarte przypomnienie na roślinę (constraint jedno_otwarte_przypomnienie)
+        for i in range(ROZMIAR_STRONY_PRZYPOMNIEN + 5):
+            roslina = Roslina.objects.create(
+                nazwa=f"R{i}", wlasciciel=self.user, czestotliwosc_podlewania=7, data_zakupu=date.today()
+            )
+            self.oczekujace.append(Przypomnienie.objects.create(
+                roslina=roslina, uzytkownik=self.user, tytul="Podlej", tresc="Czas podlać",
+                data_przypomnienia=teraz + timedelta(days=i % 7 - 2),
+            ))
+        for i in range(3):
+            Przypomnienie.objects.create(
+                roslina=roslina, uzytkownik=self.user, tytul="Podlej", tresc="Czas podlać",
+                data_przypomnienia=teraz - timedelta(days=10 + i), status="wykonane",
+                data_wykonania=teraz - timedelta(days=i) if i else None,
+            )
+        self.url = reverse('lista_przypomnie')
+        self.client.login(username='testuser', password='testpass123')
+
+    def test_liczniki_jednym_zapytaniem(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url)
+
+        liczba = ROZMIAR_STRONY_PRZYPOMNIEN + 5
+        self.assertEqual(response.context['counts'], {'all': liczba + 3, 'upcoming': liczba, 'done': 3})
+        self.assertEqual(sum('COUNT(' in q['sql'] for q in ctx.captured_queries), 1)
+
+    def test_dni_do_terminu_z_sql(self):
+        response = self.client.get(self.url)
+        dzis = timezone.localdate()
+
+        for p in response.context['przypomnienia']:
+            oczekiwane = (timezone.localtime(p.data_przypomnienia).date() - dzis).days
+            self.assertEqual(p.do_terminu.days, oczekiwane)
+
+    def test_strony_bez_luk_i_powtorzen(self):
+        response = self.client.get(self.url)
+        widziane = [p.pk for p in response.context['przypomnienia']]
+        self.assertEqual(len(widziane), ROZMIAR_STRONY_PRZYPOMNIEN)
+        self.assertContains(response, "Następna strona")
+
+        response = self.client.get(self.url, {'kursor': response.context['nastepna_strona']})
+        widziane.extend(p.pk for p in response.context['przypomnienia'])
+        self.assertIsNone(response.context['nastepna_strona'])
+
+        oczekiwane = sorted(self.oczekujace, key=lambda p: (p.data_przypomnienia, p.pk))
+        self.assertEqual(widziane, [p.pk for p in oczekiwane])
+
+    def test_wykonane_najnowsze_pierwsze(self):
+        response = self.client.get(self.url, {'view': 'done', 'kursor': 'zepsuty'})
+
+        daty = [p.data_wykonania for p in response.context['przypomnienia']]
+        self.assertEqual(len(daty), 3)
+        # bez daty wykonania na końcu
+        self.assertIsNone(daty[-1])
+        self.assertGreater(daty[0], daty[1])
@@ -0,0 +1,100 @@
+"""
+Testy jednostkowe migawki analizy ML i widoku analiza_ml_rosliny
+"""
+
+from datetime import date, datetime, timedelta
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
+
+from bloomly.ml_utils import zaktualizuj_analize_rosliny
+from bloomly.models import AnalizaPielegnacji, CzynoscPielegnacyjna, Roslina
+
+
+class MigawkaAnalizyTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.roslina = Roslina.objects.create(
+            nazwa="Monstera", wlasciciel=self.user, czestotliwosc_podlewania=7, data_zakupu=date.today()
+        )
+        start = timezone.make_aware(datetime(2024, 3, 1, 8))
+        for dni in (0, 4, 8, 13, 17, 21):
+            CzynoscPielegnacyjna.objects.create(
+                roslina=self.roslina, uzytkownik=self.user, typ="podlewanie", data=start + timedelta(days=dni)
+            )
+        self.url = reverse('analiza_ml_rosliny', args=[self.roslina.id])
+        self.client.login(username='testuser', password='testpass123')
+
+    def test_analiza_zapisuje_migawke(self):
+        analiza = zaktualizuj_analize_rosliny(self.roslina)['analiza']
+        migawka = AnalizaPielegnacji.objects.get(pk=analiza.pk).migawka
+
+        self.assertEqual(migawka['interwaly'], [4, 4, 5, 4, 4])
+        self.assertEqual(migawka['histogram_interwalow'], [[4, 4], [5, 1]])
+        self.assertEqual(migawka['mediana'], 4.0)
+        self.assertEqual(migawka['pory']['rano'], 6)
+        self.assertEqual(migawka['pory']['preferowana_pora'], 'rano')
+        self.assertEqual(migawka['metryki']['typ_modelu'], analiza.typ_modelu)
+
+    def test_get_z_migawki_bez_zapisow_i_304(self):
+        zaktualizuj_analize_rosliny(self.roslina)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['wzorce']['interwaly'], [4, 4, 5, 4, 4])
+        self.assertEqual(response.context['pory']['rano'], 6)
+        self.assertFalse([q for q in ctx.captured_queries if not q['sql'].startswith('SELECT')])
+        self.assertEqual(
+            sum('"bloomly_czynoscpielegnacyjna"' in q['sql'] for q in ctx.captured_queries), 0
+        )
+        self.assertIn('ETag', response.headers)
+        self.assertNotIn('Last-Modified', response.headers)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response.headers['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+        # zmiana ustawień rośliny pokazywanych na stronie zmienia ETag
+        etag = response.headers['ETag']
+        Roslina.objects.filter(pk=self.roslina.pk).update(czestotliwosc_podlewania=4)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_brak_analizy_get_nie_tworzy_wiersza(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Analiza nie została jeszcze policzona")
+        self.assertFalse(AnalizaPielegnacji.objects.exists())
+
+        response = self.client.post(self.url, {'przelicz': '1'})
+        self.assertRedirects(response, self.url)
+        self.assertTrue(AnalizaPielegnacji.objects.get(roslina=self.roslina).migawka)
+
+    def test_etag_zmienia_sie_po_ponownym_logowaniu(self):
+        zaktualizuj_analize_rosliny(self.roslina)
+        etag = self.client.get(self.url).headers['ETag']
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # nowa sesja = nowy sekret CSRF; stara kopia strony miałaby nieważne formularze
+        self.client.logout()
+        self.client.login(username='testuser', password='testpass123')
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+
+    def test_if_modified_since_po_ponownym_logowaniu(self):
+        zaktualizuj_analize_rosliny(self.roslina)
+        self.client.get(self.url)
+        pozniej = http_date((timezone.now() + timedelta(days=1)).timestamp())
+
+        self.client.logout()
+        self.client.login(username='testuser', password='testpass123')
+        # jedynym walidatorem jest ETag z odciskiem CSRF – sama data nie daje 304
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=pozniej)
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,155 @@
+"""
+Testy jednostkowe eksportu zbioru treningowego do plików .npy
+"""
+
+import os
+import shutil
+import tempfile
+from datetime import timedelta, date
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from bloomly.ml_dataset import ZbiorPodlewan, eksportuj_zbior
+from bloomly.models import Roslina, CzynoscPielegnacyjna
+
+
+class EksportZbioruTest(TestCase):
+    """Testy eksportu kolumnowego i odczytu przez mmap"""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.r1 = Roslina.objects.create(
+            nazwa="Monstera", wlasciciel=self.user, czestotliwosc_podlewania=7,
+            kategoria='doniczkowa', poziom_trudnosci='latwy', data_zakupu=date.today()
+        )
+        self.r2 = Roslina.objects.create(
+            nazwa="Fikus", wlasciciel=self.user, czestotliwosc_podlewania=5,
+            kategoria='doniczkowa', poziom_trudnosci='sredni', data_zakupu=date.today()
+        )
+        self.start = timezone.now() - timedelta(days=60)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def _podlej(self, roslina, dzien, **kwargs):
+        return CzynoscPielegnacyjna.objects.create(
+            roslina=roslina, typ="podlewanie", wykonane=True, uzytkownik=self.user,
+            data=self.start + timedelta(days=dzien), **kwargs
+        )
+
+    def test_eksport_i_odczyt_mmap(self):
+        # Przeplatane rośliny, dodawane nie po kolei w czasie
+        self._podlej(self.r1, 14, stan_gleby="sucha", ilosc_wody="low")
+        self._podlej(self.r2, 5)
+        self._podlej(self.r1, 0)
+        self._podlej(self.r1, 7, stan_gleby="mokra")
+        CzynoscPielegnacyjna.objects.create(
+            roslina=self.r1, typ="nawozenie", wykonane=True, uzytkownik=self.user
+        )
+
+        manifest = eksportuj_zbior(katalog=self.tmp)
+        self.assertEqual(manifest["liczba_podlewan"], 4)
+
+        kolumna = np.load(os.path.join(self.tmp, "podlewania_data.npy"), mmap_mode="r")
+        self.assertIsInstance(kolumna, np.memmap)
+        self.assertEqual(kolumna.shape, (4,))
+
+        zbior = ZbiorPodlewan(self.tmp)
+        self.assertEqual(len(zbior), 4)
+        historia = zbior.historia_rosliny(self.r1.id)
+        self.assertEqual(list(np.diff(historia["data"]) > 0), [True, True])
+        self.assertEqual(list(historia["stan_gleby"]), [-1, 2, 0])
+        self.assertEqual(list(historia["ilosc_wody"]), [-1, -1, 0])
+        self.assertEqual(list(zbior.interwaly_dni(self.r1.id)), [7, 7])
+        self.assertEqual(len(zbior.historia_rosliny(999)["id"]), 0)
+
+        kategorie = zbior.slowniki["poziom_trudnosci"]
+        kody = dict(zip(zbior.rosliny["id"], zbior.rosliny["poziom_trudnosci"]))
+        self.assertEqual(kategorie[kody[self.r2.id]], "sredni")
+
+    def test_eksport_przyrostowy_dopisuje_tylko_nowe(self):
+        self._podlej(self.r1, 0)
+        self._podlej(self.r1, 7)
+        eksportuj_zbior(katalog=self.tmp)
+        rozmiar_przed = os.path.getsize(os.path.join(self.tmp, "podlewania_id.npy"))
+
+        self._podlej(self.r2, 3)
+        self._podlej(self.r1, 14)
+        manifest = eksportuj_zbior(katalog=self.tmp)
+
+        self.assertEqual(manifest["nowe_podlewania"], 2)
+        self.assertEqual(manifest["liczba_podlewan"], 4)
+        self.assertEqual(
+            os.path.getsize(os.path.join(self.tmp, "podlewania_id.npy")),
+            rozmiar_przed + 2 * 8
+        )
+        zbior = ZbiorPodlewan(self.tmp)
+        self.assertEqual(len(zbior.historia_rosliny(self.r1.id)["id"]), 3)
+        self.assertEqual(sorted(zbior.podlewania["id"]), sorted(
+            CzynoscPielegnacyjna.objects.values_list("id", flat=True)
+        ))
+
+    def test_czytelnik_przezywa_kolejny_eksport(self):
+        self._podlej(self.r1, 0)
+        self._podlej(self.r1, 7)
+        eksportuj_zbior(katalog=self.tmp)
+        zbior = ZbiorPodlewan(self.tmp)
+        indeks = os.path.join(self.tmp, "indeks_kolejnosc.npy")
+        inode = os.stat(indeks).st_ino
+
+        # pliki przepisywane w całości są podmieniane, a nie nadpisywane pod otwartym mmap
+        # (zapis w miejscu zmieniłby zmapowane dane, a krótszy plik zabiłby czytelnika SIGBUS)
+        Roslina.objects.filter(pk=self.r1.pk).update(is_active=False)
+        self._podlej(self.r2, 3)
+        eksportuj_zbior(katalog=self.tmp)
+        eksportuj_zbior(katalog=self.tmp)
+
+        self.assertNotEqual(os.stat(indeks).st_ino, inode)
+        self.assertTrue(all(zbior.rosliny["is_active"]))
+        self.assertEqual(list(zbior.interwaly_dni(self.r1.id)), [7])
+        nowy = ZbiorPodlewan(self.tmp)
+        self.assertEqual(len(nowy.historia_rosliny(self.r2.id)["id"]), 1)
+        self.assertFalse(dict(zip(nowy.rosliny["id"], nowy.rosliny["is_active"]))[self.r1.id])
+
+    def test_indeks_z_innego_eksportu(self):
+        self._podlej(self.r1, 0)
+        eksportuj_zbior(katalog=self.tmp)
+        manifest = os.path.join(self.tmp, "manifest.json")
+        with open(manifest, "rb") as f:
+            stary = f.read()
+        self._podlej(self.r1, 7)
+        self._podlej(self.r2, 3)
+        eksportuj_zbior(katalog=self.tmp)
+
+        # czytelnik trafił na nowy indeks i stary manifest (eksport w toku)
+        with open(manifest, "wb") as f:
+            f.write(stary)
+        zbior = ZbiorPodlewan(self.tmp)
+        self.assertEqual(len(zbior.historia_rosliny(self.r1.id)["id"]), 1)
+        self.assertEqual(len(zbior.historia_rosliny(self.r2.id)["id"]), 0)
+
+    def test_przerwany_eksport_jest_obcinany(self):
+        self._podlej(self.r1, 0)
+        eksportuj_zbior(katalog=self.tmp)
+
+        # Symulacja przerwanego zapisu: śmieci na końcu pliku bez aktualizacji manifestu
+        with open(os.path.join(self.tmp, "podlewania_id.npy"), "ab") as f:
+            f.write(b"\x00" * 24)
+
+        self._podlej(self.r1, 7)
+        eksportuj_zbior(katalog=self.tmp)
+
+        ids = np.load(os.path.join(self.tmp, "podlewania_id.npy"))
+        self.assertEqual(list(ids), list(CzynoscPielegnacyjna.objects.order_by("id").values_list("id", flat=True)))
+
+    def test_pusty_zbior_i_komenda(self):
+        call_command("eksportuj_dane_ml", katalog=self.tmp, stdout=open(os.devnull, "w"))
+
+        zbior = ZbiorPodlewan(self.tmp)
+        self.assertEqual(len(zbior), 0)
+        self.assertEqual(len(zbior.rosliny["id"]), 2)
@@ -0,0 +1,228 @@
+"""
+Testy jednostkowe magazynu artefaktów ML
+"""
+
+import io
+import os
+import pickle
+import shutil
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+from django.test import TestCase, override_settings
+
+from bloomly.ml_storage import (
+    LocalArtifactStore,
+    DatabaseArtifactStore,
+    S3ArtifactStore,
+    ArtifactNotFound,
+    wyczysc_pamiec_artefaktow,
+    zapisz_artefakt,
+    wczytaj_artefakt,
+    lista_artefaktow,
+    usun_osierocone_artefakty,
+)
+
+# Granica wieku w przyszłości: każdy osierocony artefakt jest „dość stary”
+PO_CZASIE = datetime.now(timezone.utc) + timedelta(days=30)
+
+
+class FakeS3Error(Exception):
+    def __init__(self, code):
+        super().__init__(code)
+        self.response = {"Error": {"Code": code}}
+
+
+class FakeS3Client:
+    """Lokalny zamiennik klienta S3 (słownik w pamięci) + licznik wywołań."""
+
+    def __init__(self):
+        self.obiekty = {}
+        self.czasy = {}
+        self.wywolania = []
+
+    def put_object(self, Bucket, Key, Body):
+        self.wywolania.append(("put", Key))
+        self.obiekty[(Bucket, Key)] = bytes(Body)
+        self.czasy[(Bucket, Key)] = datetime.now(timezone.utc)
+
+    def get_object(self, Bucket, Key):
+        self.wywolania.append(("get", Key))
+        if (Bucket, Key) not in self.obiekty:
+            raise FakeS3Error("NoSuchKey")
+        return {"Body": io.BytesIO(self.obiekty[(Bucket, Key)])}
+
+    def head_object(self, Bucket, Key):
+        self.wywolania.append(("head", Key))
+        if (Bucket, Key) not in self.obiekty:
+            raise FakeS3Error("404")
+        return {}
+
+    def delete_object(self, Bucket, Key):
+        self.obiekty.pop((Bucket, Key), None)
+
+    def list_objects_v2(self, Bucket, Prefix, **kwargs):
+        keys = sorted(k for b, k in self.obiekty if b == Bucket and k.startswith(Prefix))
+        return {
+            "Contents": [{"Key": k, "LastModified": self.czasy[(Bucket, k)]} for k in keys],
+            "IsTruncated": False,
+        }
+
+
+class LocalArtifactStoreTest(TestCase):
+    """Testy backendu lokalnego (katalog + symlinki)"""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        wyczysc_pamiec_artefaktow()
+        self.store = LocalArtifactStore(root=self.tmp)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_zapis_i_odczyt(self):
+        zapisz_artefakt("model_roslina_1.pkl", {"a": 1}, store=self.store)
+        self.assertEqual(wczytaj_artefakt("model_roslina_1.pkl", store=self.store), {"a": 1})
+
+    def test_cache_obiektow_w_pamieci(self):
+        digest = zapisz_artefakt("model_roslina_1.pkl", {"a": 1}, store=self.store)
+        pierwszy = wczytaj_artefakt("model_roslina_1.pkl", store=self.store)
+
+        # Blob usunięty z dysku – obiekt nadal dostępny z pamięci procesu
+        os.remove(self.store._blob_path(digest))
+        self.assertIs(wczytaj_artefakt("model_roslina_1.pkl", store=self.store), pierwszy)
+
+        # Nowa wersja = nowy digest -> brak trafienia w starym wpisie
+        zapisz_artefakt("model_roslina_1.pkl", {"a": 2}, store=self.store)
+        self.assertEqual(wczytaj_artefakt("model_roslina_1.pkl", store=self.store), {"a": 2})
+
+    def test_brak_artefaktu(self):
+        self.assertIsNone(wczytaj_artefakt("model_roslina_404.pkl", store=self.store))
+
+    def test_adresowanie_trescia_deduplikuje_bloby(self):
+        d1 = zapisz_artefakt("model_roslina_1.pkl", {"a": 1}, store=self.store)
+        d2 = zapisz_artefakt("model_roslina_2.pkl", {"a": 1}, store=self.store)
+        self.assertEqual(d1, d2)
+        bloby = [f for _, _, pliki in os.walk(os.path.join(self.tmp, "blobs")) for f in pliki]
+        self.assertEqual(bloby, [f"{d1}.pkl"])
+
+    def test_publikacja_podmienia_wskaznik(self):
+        zapisz_artefakt("model_roslina_1.pkl", {"v": 1}, store=self.store)
+        zapisz_artefakt("model_roslina_1.pkl", {"v": 2}, store=self.store)
+
+        self.assertEqual(wczytaj_artefakt("model_roslina_1.pkl", store=self.store), {"v": 2})
+        # Stara ścieżka nadal działa (symlink do bloba)
+        self.assertTrue(os.path.exists(os.path.join(self.tmp, "model_roslina_1.pkl")))
+        self.assertEqual(lista_artefaktow("model_roslina_", store=self.store), ["model_roslina_1.pkl"])
+
+    def test_sprzatanie_osieroconych_blobow(self):
+        stary = zapisz_artefakt("model_roslina_1.pkl", {"v": 1}, store=self.store)
+        nowy = zapisz_artefakt("model_roslina_1.pkl", {"v": 2}, store=self.store)
+
+        # świeży blob (np. trwająca publikacja) chroniony wiekiem
+        self.assertEqual(usun_osierocone_artefakty(timedelta(days=1), store=self.store), 0)
+
+        self.assertEqual(usun_osierocone_artefakty(timedelta(days=1), store=self.store, teraz=PO_CZASIE), 1)
+        self.assertFalse(self.store.has_blob(stary))
+        self.assertTrue(self.store.has_blob(nowy))
+        wyczysc_pamiec_artefaktow()
+        self.assertEqual(wczytaj_artefakt("model_roslina_1.pkl", store=self.store), {"v": 2})
+
+    def test_import_starego_pliku_modelu(self):
+        sciezka = os.path.join(self.tmp, "model_roslina_9.pkl")
+        with open(sciezka, "wb") as f:
+            pickle.dump({"stary": True}, f)
+
+        with override_settings(ML_ARTIFACT_LEGACY_DIR=self.tmp):
+            self.assertEqual(wczytaj_artefakt("model_roslina_9.pkl", store=self.store), {"stary": True})
+
+        # plik zastąpiony wskaźnikiem – kolejne odczyty idą przez magazyn
+        self.assertTrue(os.path.islink(sciezka))
+        self.assertIsNotNone(self.store.get_ref("model_roslina_9.pkl"))
+        wyczysc_pamiec_artefaktow()
+        self.assertEqual(wczytaj_artefakt("model_roslina_9.pkl", store=self.store), {"stary": True})
+
+
+class DatabaseArtifactStoreTest(TestCase):
+    """Testy backendu bazodanowego"""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        wyczysc_pamiec_artefaktow()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_zapis_i_odczyt_przez_cache(self):
+        store = DatabaseArtifactStore()
+        with override_settings(ML_ARTIFACT_CACHE_DIR=self.tmp):
+            digest = zapisz_artefakt("model_roslina_7.pkl", [1, 2, 3], store=store)
+            self.assertEqual(store.get_ref("model_roslina_7.pkl"), digest)
+
+            # Pusty cache -> blob pobrany z bazy i zapisany lokalnie
+            os.remove(os.path.join(self.tmp, f"{digest}.pkl"))
+            self.assertEqual(wczytaj_artefakt("model_roslina_7.pkl", store=store), [1, 2, 3])
+            self.assertTrue(os.path.exists(os.path.join(self.tmp, f"{digest}.pkl")))
+
+    def test_brak_bloba(self):
+        with self.assertRaises(ArtifactNotFound):
+            DatabaseArtifactStore().get_blob("0" * 64)
+
+    def test_sprzatanie_osieroconych_blobow_i_cache(self):
+        store = DatabaseArtifactStore()
+        with override_settings(ML_ARTIFACT_CACHE_DIR=self.tmp):
+            stary = zapisz_artefakt("model_roslina_7.pkl", [1], store=store)
+            nowy = zapisz_artefakt("model_roslina_7.pkl", [2], store=store)
+
+            # osierocony blob + jego plik w lokalnym cache
+            self.assertEqual(usun_osierocone_artefakty(timedelta(days=1), store=store, teraz=PO_CZASIE), 2)
+
+        self.assertFalse(store.has_blob(stary))
+        self.assertTrue(store.has_blob(nowy))
+        self.assertEqual(os.listdir(self.tmp), [f"{nowy}.pkl"])
+
+
+class S3ArtifactStoreTest(TestCase):
+    """Testy backendu S3 z lokalnym zamiennikiem klienta"""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        wyczysc_pamiec_artefaktow()
+        self.client = FakeS3Client()
+        self.store = S3ArtifactStore(bucket="bloomly", client=self.client)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_read_through_cache(self):
+        with override_settings(ML_ARTIFACT_CACHE_DIR=self.tmp):
+            digest = zapisz_artefakt("model_roslina_3.pkl", {"x": 3}, store=self.store)
+            os.remove(os.path.join(self.tmp, f"{digest}.pkl"))
+
+            self.assertEqual(wczytaj_artefakt("model_roslina_3.pkl", store=self.store), {"x": 3})
+            self.client.wywolania.clear()
+
+            # Drugi odczyt: tylko wskaźnik z S3, blob z lokalnego cache
+            self.assertEqual(wczytaj_artefakt("model_roslina_3.pkl", store=self.store), {"x": 3})
+            self.assertEqual(self.client.wywolania, [("get", "bloomly/ml/refs/model_roslina_3.pkl")])
+
+    def test_nie_wysyla_istniejacego_bloba(self):
+        with override_settings(ML_ARTIFACT_CACHE_DIR=self.tmp):
+            zapisz_artefakt("model_roslina_1.pkl", {"x": 1}, store=self.store)
+            self.client.wywolania.clear()
+            zapisz_artefakt("model_roslina_2.pkl", {"x": 1}, store=self.store)
+
+        puts = [k for op, k in self.client.wywolania if op == "put"]
+        self.assertEqual(puts, ["bloomly/ml/refs/model_roslina_2.pkl"])
+        self.assertEqual(usun_osierocone_artefakty(timedelta(days=1), store=self.store, teraz=PO_CZASIE), 0)
+        self.assertEqual(lista_artefaktow("model_roslina_", store=self.store),
+                         ["model_roslina_1.pkl", "model_roslina_2.pkl"])
+
+    def test_sprzatanie_osieroconych_blobow(self):
+        with override_settings(ML_ARTIFACT_CACHE_DIR=self.tmp):
+            stary = zapisz_artefakt("model_roslina_3.pkl", {"x": 1}, store=self.store)
+            zapisz_artefakt("model_roslina_3.pkl", {"x": 2}, store=self.store)
+            self.assertEqual(usun_osierocone_artefakty(timedelta(days=1), store=self.store, teraz=PO_CZASIE), 2)
+
+        self.assertFalse(self.store.has_blob(stary))
+        self.assertEqual(len([k for _, k in self.client.obiekty if "/blobs/" in k]), 1)
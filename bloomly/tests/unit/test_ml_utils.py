@@ -10,7 +10,7 @@ from datetime import timedelta, date
 import os
 import tempfile
 
-from bloomly.models import Roslina, CzynoscPielegnacyjna, AnalizaPielegnacji
+from bloomly.models import Roslina, CzynoscPielegnacyjna, AnalizaPielegnacji, TrainingRun
 from bloomly.ml_utils import (
     przygotuj_dane_treningowe,
     trenuj_model_ml,
@@ -18,6 +18,9 @@ from bloomly.ml_utils import (
     zaktualizuj_analize_rosliny,
     analizuj_wzorce_statystyczne,
     zastosuj_rekomendacje_ml,
+    retrenuj_wszystkie_modele,
+    statystyki_treningow,
+    wybierz_kandydata,
     _safe_mean,
     _safe_median,
     _soil_to_num,
@@ -228,7 +231,7 @@ class MLUtilsTrenujModelTest(TestCase):
             self.assertEqual(model_data['model_type'], 'GB')
 
     def test_wybor_modelu_dla_duzych_zbiorow(self):
-        """Test wyboru Random Forest dla dużych zbiorów (>=20 próbek)"""
+        """Test wyboru najtańszego modelu w tolerancji MAE dla dużych zbiorów"""
 
         self.roslina = Roslina.objects.create(
             nazwa="Duża roślina",
@@ -251,7 +254,19 @@ class MLUtilsTrenujModelTest(TestCase):
 
         model_data = trenuj_model_ml(self.roslina)
         if model_data:
-            self.assertEqual(model_data['model_type'], 'RF')
+            self.assertEqual(model_data['model_type'], wybierz_kandydata(model_data['kandydaci'])['typ'])
+            self.assertIsNotNone(model_data['czas_predykcji'])
+
+    def test_wybierz_kandydata_najtanszy_w_tolerancji(self):
+        """Droższy model wygrywa tylko, gdy tańsze są poza tolerancją MAE"""
+        kandydaci = [
+            {'typ': 'STAT', 'cv_mae': 1.4, 'koszt_s': 0.001},
+            {'typ': 'RFS', 'cv_mae': 1.1, 'koszt_s': 0.02},
+            {'typ': 'RF', 'cv_mae': 1.0, 'koszt_s': 0.4},
+        ]
+        self.assertEqual(wybierz_kandydata(kandydaci, tolerancja=0.5)['typ'], 'STAT')
+        self.assertEqual(wybierz_kandydata(kandydaci, tolerancja=0.2)['typ'], 'RFS')
+        self.assertEqual(wybierz_kandydata(kandydaci, tolerancja=0.0)['typ'], 'RF')
 
     def test_zapisywanie_modelu_do_pliku(self):
         """Test czy model jest zapisywany do pliku"""
@@ -404,7 +419,7 @@ class MLUtilsZaktualizujAnalizeTest(TestCase):
         wynik = zaktualizuj_analize_rosliny(self.roslina)
         analiza = wynik['analiza']
 
-        self.assertIn(analiza.typ_modelu, ['RF', 'GB'])
+        self.assertIn(analiza.typ_modelu, dict(AnalizaPielegnacji.TYPY_MODELU))
 
     def test_zaktualizuj_analize_zapisuje_metryki(self):
         """Test czy zapisywane są metryki ML"""
@@ -577,4 +592,103 @@ class MLUtilsObliczJakoscPodlewaniaTest(TestCase):
 
         jakosc = _oblicz_jakosc_podlewania(self.roslina)
 
-        self.assertEqual(jakosc['water_score'], 1.0)
\ No newline at end of file
+        self.assertEqual(jakosc['water_score'], 1.0)
+
+
+class MLUtilsTelemetriaTreninguTest(TestCase):
+    """Testy zapisu TrainingRun i podsumowania czasów trenowania"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.roslina = Roslina.objects.create(
+            nazwa="Monstera",
+            wlasciciel=self.user,
+            czestotliwosc_podlewania=7,
+            data_zakupu=date.today()
+        )
+        base_date = timezone.now() - timedelta(days=100)
+        for i in range(12):
+            CzynoscPielegnacyjna.objects.create(
+                roslina=self.roslina,
+                typ="podlewanie",
+                wykonane=True,
+                uzytkownik=self.user,
+                data=base_date + timedelta(days=i * 7),
+                stan_gleby="sucha",
+                ilosc_wody="200"
+            )
+
+    def test_trening_zapisuje_przebieg(self):
+        model_data = trenuj_model_ml(self.roslina)
+
+        run = TrainingRun.objects.get(roslina=self.roslina, rodzaj='trening')
+        self.assertEqual(run.wynik, 'ok')
+        self.assertEqual(run.typ_modelu, model_data['model_type'])
+        self.assertEqual(run.liczba_wierszy, model_data['n_samples'])
+        self.assertGreater(run.liczba_cech, 0)
+        self.assertIsNotNone(run.czas_fit)
+        self.assertIsNotNone(run.czas_cv)
+        self.assertGreaterEqual(run.czas_calkowity, run.czas_fit)
+
+    def test_pominiety_trening(self):
+        pusta = Roslina.objects.create(
+            nazwa="Nowa", wlasciciel=self.user, czestotliwosc_podlewania=7, data_zakupu=date.today()
+        )
+        self.assertIsNone(trenuj_model_ml(pusta))
+        self.assertEqual(TrainingRun.objects.get(roslina=pusta).wynik, 'pominiete')
+
+    def test_blad_treningu_zapisany(self):
+        with patch('bloomly.ml_utils.przygotuj_dane_treningowe', side_effect=ValueError("zepsute dane")):
+            with self.assertRaises(ValueError):
+                trenuj_model_ml(self.roslina)
+
+        run = TrainingRun.objects.get(roslina=self.roslina)
+        self.assertEqual(run.wynik, 'blad')
+        self.assertIn("zepsute dane", run.komunikat)
+
+    def test_analiza_zapisuje_przebieg(self):
+        zaktualizuj_analize_rosliny(self.roslina)
+        self.assertTrue(TrainingRun.objects.filter(roslina=self.roslina, rodzaj='analiza', wynik='ok').exists())
+
+    def test_retrenuj_wywoluje_callback_postepu(self):
+        wywolania = []
+        wynik = retrenuj_wszystkie_modele(postep=lambda i, total, r, m: wywolania.append((i, total, r.id)))
+
+        self.assertEqual(wynik['total'], 1)
+        self.assertEqual(wywolania, [(1, 1, self.roslina.id)])
+
+    def test_statystyki_treningow(self):
+        start = timezone.now() - timedelta(hours=1)
+        # kolejno, bez przerw: czas zegarowy = suma czasów
+        for czas, od in ((0.1, 0), (0.2, 0.1), (0.3, 0.3), (4.0, 0.6)):
+            TrainingRun.objects.create(
+                roslina=self.roslina, czas_calkowity=czas, czas_fit=czas / 2,
+                data_rozpoczecia=start + timedelta(seconds=od),
+            )
+        TrainingRun.objects.create(
+            roslina=self.roslina, czas_calkowity=9.0,
+            data_rozpoczecia=timezone.now() - timedelta(days=3)
+        )
+
+        stat = statystyki_treningow(godziny=24, limit_najwolniejszych=2)
+
+        self.assertEqual(stat['liczba'], 4)
+        self.assertEqual(stat['czas_fit_s']['p50'], 0.125)
+        self.assertAlmostEqual(stat['rosliny_na_sekunde'], 4 / 4.6, places=3)
+        self.assertEqual([n['czas_calkowity_s'] for n in stat['najwolniejsze']], [4.0, 0.3])
+
+    def test_przepustowosc_nakladajacych_sie_przebiegow(self):
+        start = timezone.now() - timedelta(hours=1)
+        # 4 workery równolegle: 8 przebiegów po 2 s w dwóch falach -> 4 s zegarowe
+        for i in range(8):
+            TrainingRun.objects.create(
+                roslina=self.roslina, czas_calkowity=2.0,
+                data_rozpoczecia=start + timedelta(seconds=2 * (i // 4)),
+            )
+
+        stat = statystyki_treningow(godziny=24)
+
+        self.assertEqual(stat['czas_laczny_s'], 16.0)
+        self.assertEqual(stat['czas_zegarowy_s'], 4.0)
+        self.assertEqual(stat['rosliny_na_sekunde'], 2.0)
+
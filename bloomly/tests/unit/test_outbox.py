@@ -0,0 +1,139 @@
+"""
+Testy jednostkowe outboxu e-maili (limit, AIMD, ponowienia, dead-letter)
+"""
+
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.mail import EmailMessage
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from bloomly.models import OutboxEmail
+from bloomly.outbox import (
+    MAKS_PROB,
+    RozmiarPakietu,
+    TokenBucket,
+    oproznij_outbox,
+    opoznienie_ponowienia,
+    zakolejkuj,
+)
+
+
+class Zegar:
+    def __init__(self):
+        self.t = 0.0
+
+    def __call__(self):
+        return self.t
+
+
+class TokenBucketTest(TestCase):
+    """Testy kubełka żetonów"""
+
+    def test_zryw_i_uzupelnianie(self):
+        zegar = Zegar()
+        kubelek = TokenBucket(na_sekunde=2, pojemnosc=3, zegar=zegar)
+
+        self.assertEqual([kubelek.pobierz() for _ in range(3)], [0, 0, 0])
+        self.assertAlmostEqual(kubelek.pobierz(), 0.5)
+
+        zegar.t = 0.5
+        self.assertEqual(kubelek.pobierz(), 0)
+
+        # Po długiej przerwie nie więcej niż pojemność
+        zegar.t = 100
+        self.assertEqual([kubelek.pobierz() for _ in range(3)], [0, 0, 0])
+        self.assertGreater(kubelek.pobierz(), 0)
+
+
+class RozmiarPakietuTest(TestCase):
+    """Testy doboru rozmiaru pakietu (AIMD)"""
+
+    def test_aimd(self):
+        pakiet = RozmiarPakietu(start=8, minimum=1, maksimum=10)
+        pakiet.sukces()
+        self.assertEqual(pakiet.wartosc, 9)
+        pakiet.porazka()
+        self.assertEqual(pakiet.wartosc, 4)
+        for _ in range(5):
+            pakiet.porazka()
+        self.assertEqual(pakiet.wartosc, 1)
+        for _ in range(20):
+            pakiet.sukces()
+        self.assertEqual(pakiet.wartosc, 10)
+
+
+class OproznijOutboxTest(TestCase):
+    """Testy nadawcy outboxu"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', email='t@example.com', password='x')
+        zakolejkuj(
+            (EmailMessage(f"Temat {i}", "Treść", "bloomly@example.com", ['t@example.com']), self.user.id, [i])
+            for i in range(5)
+        )
+        self.limiter = TokenBucket(na_sekunde=1000, pojemnosc=1000)
+
+    def test_wysyla_pakietami(self):
+        pakiet = RozmiarPakietu(start=2, minimum=1, maksimum=10)
+        licznik = oproznij_outbox(limiter=self.limiter, pakiet=pakiet)
+
+        self.assertEqual(licznik['wyslane'], 5)
+        # 2 + 3 (AIMD: +1 po udanym pakiecie)
+        self.assertEqual(licznik['pakiety'], 2)
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(pakiet.wartosc, 4)
+        self.assertFalse(OutboxEmail.objects.exclude(status='wyslany').exists())
+
+    def test_limit_szybkosci_konczy_przebieg(self):
+        limiter = TokenBucket(na_sekunde=0.01, pojemnosc=2)
+        licznik = oproznij_outbox(budzet_s=1, limiter=limiter, pakiet=RozmiarPakietu(start=10))
+
+        self.assertEqual(licznik['wyslane'], 2)
+        # Reszta wraca do kolejki bez kary
+        reszta = OutboxEmail.objects.filter(status='oczekuje')
+        self.assertEqual(reszta.count(), 3)
+        self.assertFalse(reszta.filter(proby__gt=0).exists())
+        self.assertFalse(reszta.filter(nastepna_proba__gt=timezone.now()).exists())
+
+    def test_backoff_i_dead_letter(self):
+        self.assertEqual(opoznienie_ponowienia(1), timedelta(minutes=1))
+        self.assertEqual(opoznienie_ponowienia(3), timedelta(minutes=4))
+        self.assertEqual(opoznienie_ponowienia(50), timedelta(hours=6))
+
+        pakiet = RozmiarPakietu(start=8)
+        with patch('django.core.mail.backends.locmem.EmailBackend.send_messages',
+                   side_effect=Exception("421 too many messages")):
+            for _ in range(MAKS_PROB):
+                OutboxEmail.objects.filter(status='oczekuje').update(nastepna_proba=timezone.now())
+                oproznij_outbox(limiter=self.limiter, pakiet=pakiet)
+
+        self.assertEqual(OutboxEmail.objects.filter(status='martwy').count(), 5)
+        self.assertEqual(pakiet.wartosc, 1)
+
+    def test_awaria_polaczenia_przerywa_przebieg(self):
+        with patch('django.core.mail.backends.locmem.EmailBackend.open',
+                   side_effect=ConnectionRefusedError("brak SMTP"), create=True):
+            licznik = oproznij_outbox(limiter=self.limiter, pakiet=RozmiarPakietu(start=2))
+
+        self.assertEqual(licznik['pakiety'], 1)
+        self.assertEqual(licznik['ponowione'], 2)
+        self.assertEqual(OutboxEmail.objects.filter(proby=0).count(), 3)
+
+    def test_backend_plikowy(self):
+        katalog = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, katalog, True)
+
+        with override_settings(EMAIL_BACKEND='django.core.mail.backends.filebased.EmailBackend',
+                               EMAIL_FILE_PATH=katalog):
+            licznik = oproznij_outbox(limiter=self.limiter, pakiet=RozmiarPakietu(start=10))
+
+        self.assertEqual(licznik['wyslane'], 5)
+        tresc = "".join(open(os.path.join(katalog, f)).read() for f in os.listdir(katalog))
+        self.assertEqual(tresc.count("Subject: Temat"), 5)
@@ -0,0 +1,360 @@
+"""
+Testy jednostkowe zbiorczego planera przypomnień (ONE-OPEN)
+"""
+
+from datetime import date, datetime, time, timedelta
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from bloomly.models import (
+    BrudnaRoslina,
+    CzynoscPielegnacyjna,
+    Roslina,
+    Przypomnienie,
+    AnalizaPielegnacji,
+    ProfilUzytkownika,
+    aktualizuj_przypomnienia_uzytkownika,
+    utworz_przypomnienie_podlewanie,
+)
+from bloomly.przypomnienia import (
+    GODZINY_POR,
+    OKRES_PRZEGLADU_DNI,
+    histogram_wysylek,
+    pory_wysylki,
+    przelicz_terminy_powiadomien,
+    rozrzut_minut,
+    rosliny_do_odswiezenia,
+    upsert_otwarte_przypomnienie,
+    zaplanuj_przypomnienia,
+    zdejmij_znaczniki,
+    zsynchronizuj_przypomnienia,
+)
+
+
+class PlanerPrzypomnienTest(TestCase):
+    """Testy planera zbiorczego"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.dzis = timezone.now().date()
+
+    def _roslina(self, i=0, **kwargs):
+        dane = dict(
+            nazwa=f"Roślina {i}", gatunek="Testowa", wlasciciel=self.user,
+            czestotliwosc_podlewania=7, data_zakupu=date.today(),
+            ostatnie_podlewanie=self.dzis - timedelta(days=2),
+        )
+        dane.update(kwargs)
+        return Roslina.objects.create(**dane)
+
+    def _otwarte(self, roslina):
+        return Przypomnienie.objects.filter(roslina=roslina, status='oczekujace')
+
+    def test_tworzy_jedno_przypomnienie_na_rosline(self):
+        rosliny = [self._roslina(i) for i in range(3)]
+
+        licznik = aktualizuj_przypomnienia_uzytkownika(self.user)
+
+        self.assertEqual(licznik['utworzone'], 3)
+        for r in rosliny:
+            self.assertEqual(self._otwarte(r).count(), 1)
+
+    def test_zgodnosc_z_wersja_per_roslina(self):
+        r = self._roslina()
+        AnalizaPielegnacji.objects.create(
+            roslina=r, uzytkownik=self.user,
+            rekomendowana_czestotliwosc=4, liczba_podlan=6, pewnosc_rekomendacji=0.8,
+        )
+        oczekiwane = utworz_przypomnienie_podlewanie(Roslina.objects.get(pk=r.pk))
+        Przypomnienie.objects.all().delete()
+
+        zaplanuj_przypomnienia(Roslina.objects.filter(pk=r.pk))
+
+        pr = self._otwarte(r).get()
+        for pole in ('data_przypomnienia', 'interwal_dni', 'tytul', 'tresc', 'priorytet', 'powtarzalne'):
+            self.assertEqual(getattr(pr, pole), getattr(oczekiwane, pole), pole)
+        self.assertEqual(pr.interwal_dni, 4)
+
+    def test_baza_odrzuca_drugie_otwarte_i_planer_aktualizuje(self):
+        r = self._roslina()
+        teraz = timezone.now()
+        pierwsze = Przypomnienie.objects.create(
+            roslina=r, uzytkownik=self.user, tytul="x", tresc="x",
+            data_przypomnienia=teraz + timedelta(days=1),
+        )
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Przypomnienie.objects.create(
+                roslina=r, uzytkownik=self.user, tytul="x", tresc="x",
+                data_przypomnienia=teraz + timedelta(days=2),
+            )
+
+        licznik = zaplanuj_przypomnienia(Roslina.objects.filter(pk=r.pk))
+
+        self.assertEqual(licznik['zaktualizowane'], 1)
+        self.assertEqual(list(self._otwarte(r).values_list('id', flat=True)), [pierwsze.id])
+
+        # Drugi przebieg nic nie zmienia
+        licznik = zaplanuj_przypomnienia(Roslina.objects.filter(pk=r.pk))
+        self.assertEqual(licznik['bez_zmian'], 1)
+        self.assertEqual(licznik['zaktualizowane'] + licznik['utworzone'], 0)
+
+    def test_warunek_unique_zgodny_ze_statusami_otwartymi(self):
+        (constraint,) = [
+            c for c in Przypomnienie._meta.constraints if c.name == 'jedno_otwarte_przypomnienie'
+        ]
+        self.assertEqual(dict(constraint.condition.children), {'status__in': list(Przypomnienie.STATUSY_OTWARTE)})
+
+    def test_upsert_jednym_zapytaniem(self):
+        r = self._roslina()
+        pola = dict(
+            uzytkownik_id=self.user.id, tytul="x", tresc="x",
+            data_przypomnienia=timezone.now() + timedelta(days=2),
+        )
+        pid, utworzone = upsert_otwarte_przypomnienie(r.id, pola, ("tytul",))
+        self.assertTrue(utworzone)
+
+        with CaptureQueriesContext(connection) as ctx:
+            # slot wysyłki podany przez wywołującego – bez zapytań o profil
+            pid2, utworzone = upsert_otwarte_przypomnienie(
+                r.id, dict(pola, tytul="y"), ("tytul",), pora=(9, 0)
+            )
+        self.assertFalse(utworzone)
+        self.assertEqual(pid2, pid)
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertEqual(Przypomnienie.objects.get(pk=pid).tytul, "y")
+
+    def test_upsert_stare_sqlite_z_blokada(self):
+        r = self._roslina()
+        pola = dict(
+            uzytkownik_id=self.user.id, tytul="x", tresc="x",
+            data_przypomnienia=timezone.now() + timedelta(days=2),
+        )
+        # SQLite bez RETURNING (< 3.35) – ten sam wynik przez SELECT ... FOR UPDATE
+        with patch.object(connection.Database, "sqlite_version_info", (3, 31, 1)):
+            pid, utworzone = upsert_otwarte_przypomnienie(r.id, pola, ("tytul",))
+            self.assertTrue(utworzone)
+            pid2, utworzone = upsert_otwarte_przypomnienie(r.id, dict(pola, tytul="y"), ("tytul",))
+        self.assertFalse(utworzone)
+        self.assertEqual(pid2, pid)
+        self.assertEqual(Przypomnienie.objects.get(pk=pid).tytul, "y")
+
+    def _wyscig_z_upsertem(self):
+        """Otwarte wstawione obok planera – skan planera (tylko 'wyslane') go nie widzi."""
+        r = self._roslina()
+        teraz = timezone.now()
+        istniejace = Przypomnienie.objects.create(
+            roslina=r, uzytkownik=self.user, tytul="stare", tresc="x",
+            data_przypomnienia=teraz + timedelta(days=1),
+        )
+        cel = dict(
+            uzytkownik_id=self.user.id, tytul="planer", tresc="y",
+            data_przypomnienia=teraz + timedelta(days=3), status="oczekujace", wyslane=False,
+            powtarzalne=False, interwal_dni=None, automatyczne=True, priorytet=2,
+        )
+        licznik = zsynchronizuj_przypomnienia(
+            {r.id: cel}, statusy_otwarte=("wyslane",),
+            pola_aktualizacji=("data_przypomnienia", "tytul", "tresc", "status", "wyslane"),
+        )
+        return r, istniejace, cel, licznik
+
+    def test_planer_nadpisuje_rownolegle_wstawione(self):
+        r, istniejace, cel, licznik = self._wyscig_z_upsertem()
+
+        self.assertEqual(licznik['utworzone'], 0)
+        self.assertEqual(licznik['zaktualizowane'], 1)
+        pr = self._otwarte(r).get()
+        self.assertEqual(pr.id, istniejace.id)
+        self.assertEqual((pr.tytul, pr.data_przypomnienia), ("planer", cel['data_przypomnienia']))
+        self.assertEqual(pr.termin_powiadomienia, pr.wyznacz_termin_powiadomienia())
+
+    def test_planer_nadpisuje_rownolegle_wstawione_z_blokada(self):
+        with patch.object(connection.Database, "sqlite_version_info", (3, 31, 1)):
+            r, istniejace, _, licznik = self._wyscig_z_upsertem()
+
+        self.assertEqual((licznik['utworzone'], licznik['zaktualizowane']), (0, 1))
+        self.assertEqual(self._otwarte(r).get().tytul, "planer")
+
+    def test_planer_nie_polyka_naruszen_wiezow(self):
+        r = self._roslina()
+        cel = dict(
+            uzytkownik_id=self.user.id, tytul=None, tresc="y",
+            data_przypomnienia=timezone.now(), status="oczekujace",
+        )
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            zsynchronizuj_przypomnienia({r.id: cel})
+
+    def test_bulk_utrzymuje_termin_powiadomienia(self):
+        r = self._roslina()
+        zaplanuj_przypomnienia(Roslina.objects.filter(pk=r.pk))
+        pr = self._otwarte(r).get()
+        self.assertEqual(pr.termin_powiadomienia, pr.wyznacz_termin_powiadomienia())
+
+        Roslina.objects.filter(pk=r.pk).update(ostatnie_podlewanie=self.dzis)
+        zaplanuj_przypomnienia(Roslina.objects.filter(pk=r.pk))
+        pr.refresh_from_db()
+        self.assertEqual(pr.termin_powiadomienia, pr.wyznacz_termin_powiadomienia())
+
+    def test_pomija_nieaktywne_i_wykonane(self):
+        nieaktywna = self._roslina(1, is_active=False)
+        aktywna = self._roslina(2)
+        Przypomnienie.objects.create(
+            roslina=aktywna, uzytkownik=self.user, tytul="x", tresc="x",
+            data_przypomnienia=timezone.now(), status='wykonane',
+        )
+
+        zaplanuj_przypomnienia()
+
+        self.assertFalse(Przypomnienie.objects.filter(roslina=nieaktywna).exists())
+        self.assertEqual(self._otwarte(aktywna).count(), 1)
+        self.assertEqual(Przypomnienie.objects.filter(roslina=aktywna).count(), 2)
+
+    def test_stala_liczba_zapytan(self):
+        def zapytania(n, start):
+            ids = [self._roslina(start + i).id for i in range(n)]
+            # połowa z istniejącym (nieaktualnym) przypomnieniem
+            for rid in ids[::2]:
+                Przypomnienie.objects.create(
+                    roslina_id=rid, uzytkownik=self.user, tytul="x", tresc="x",
+                    data_przypomnienia=timezone.now(),
+                )
+            with CaptureQueriesContext(connection) as ctx:
+                zaplanuj_przypomnienia(Roslina.objects.filter(id__in=ids))
+            return len(ctx.captured_queries)
+
+        self.assertEqual(zapytania(4, 0), zapytania(40, 100))
+
+
+class OdswiezaniePrzyrostoweTest(TestCase):
+    """Testy znaczników zmian (BrudnaRoslina) i wyboru roślin do odświeżenia"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.rosliny = [
+            Roslina.objects.create(
+                nazwa=f"Roślina {i}", gatunek="Testowa", wlasciciel=self.user,
+                czestotliwosc_podlewania=7, data_zakupu=date.today(),
+            )
+            for i in range(OKRES_PRZEGLADU_DNI + 1)
+        ]
+        # dzień, w którym przegląd rotacyjny nie obejmuje rośliny 0
+        self.dzis = date.fromordinal(
+            self.rosliny[0].pk + 1 + OKRES_PRZEGLADU_DNI * 10**5
+        )
+
+    def _czyste(self):
+        BrudnaRoslina.objects.all().delete()
+
+    def test_zapisy_oznaczaja_rosline(self):
+        self.assertEqual(BrudnaRoslina.objects.count(), len(self.rosliny))
+        self._czyste()
+        r = self.rosliny[0]
+
+        CzynoscPielegnacyjna.objects.create(
+            roslina=r, uzytkownik=self.user, typ='podlewanie', data=timezone.now()
+        )
+        self.assertEqual(list(BrudnaRoslina.objects.values_list('roslina_id', flat=True)), [r.pk])
+
+        self._czyste()
+        AnalizaPielegnacji.objects.create(roslina=r, uzytkownik=self.user)
+        self.assertTrue(BrudnaRoslina.objects.filter(roslina=r).exists())
+
+    def test_ponowne_oznaczenie_przesuwa_date(self):
+        r = self.rosliny[0]
+        stara = timezone.now() - timedelta(hours=1)
+        BrudnaRoslina.objects.filter(roslina=r).update(data_oznaczenia=stara)
+
+        r.czestotliwosc_podlewania = 5
+        r.save()
+
+        self.assertEqual(BrudnaRoslina.objects.filter(roslina=r).count(), 1)
+        self.assertGreater(BrudnaRoslina.objects.get(roslina=r).data_oznaczenia, stara)
+
+    def test_wybor_oznaczone_i_przeglad_rotacyjny(self):
+        self._czyste()
+        ids = rosliny_do_odswiezenia(dzis=self.dzis)
+
+        # bez znaczników: dokładnie jedna reszta z dzielenia przez okres przeglądu
+        reszta = self.dzis.toordinal() % OKRES_PRZEGLADU_DNI
+        self.assertEqual(ids, [r.pk for r in self.rosliny if r.pk % OKRES_PRZEGLADU_DNI == reszta])
+        self.assertNotIn(self.rosliny[0].pk, ids)
+
+        self.rosliny[0].save()
+        self.assertIn(self.rosliny[0].pk, rosliny_do_odswiezenia(dzis=self.dzis))
+        self.assertEqual(len(rosliny_do_odswiezenia(pelny=True)), len(self.rosliny))
+
+    def test_zdejmij_znaczniki_zostawia_pozniejsze(self):
+        odczyt = timezone.now()
+        pozniej = self.rosliny[1]
+        BrudnaRoslina.objects.filter(roslina=pozniej).update(
+            data_oznaczenia=odczyt + timedelta(seconds=5)
+        )
+
+        zdejmij_znaczniki([r.pk for r in self.rosliny], odczyt)
+
+        self.assertEqual(list(BrudnaRoslina.objects.values_list('roslina_id', flat=True)), [pozniej.pk])
+
+
+class PoraWysylkiTest(TestCase):
+    """Testy slotów wysyłki e-maili (godzina użytkownika + rozrzut minut)"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.roslina = Roslina.objects.create(
+            nazwa="Monstera", wlasciciel=self.user, czestotliwosc_podlewania=7, data_zakupu=date.today()
+        )
+
+    def _termin(self, dzien, godzina, **kwargs):
+        data = timezone.make_aware(datetime.combine(dzien, time(godzina)))
+        return Przypomnienie(
+            uzytkownik=self.user, status="oczekujace", data_przypomnienia=data
+        ).wyznacz_termin_powiadomienia(**kwargs)
+
+    def test_godzina_z_profilu_ma_pierwszenstwo(self):
+        AnalizaPielegnacji.objects.create(roslina=self.roslina, uzytkownik=self.user, podlewa_wieczorem=True)
+        ProfilUzytkownika.objects.filter(user=self.user).update(godzina_powiadomien=7)
+
+        self.assertEqual(pory_wysylki([self.user.id]), {self.user.id: (7, rozrzut_minut(self.user.id))})
+
+    def test_godzina_z_por_podlewania(self):
+        AnalizaPielegnacji.objects.create(
+            roslina=self.roslina, uzytkownik=self.user, podlewa_wieczorem=True
+        )
+        self.assertEqual(pory_wysylki([self.user.id])[self.user.id][0], GODZINY_POR["wieczorem"])
+
+        inny = User.objects.create_user(username='inny', password='x')
+        self.assertEqual(pory_wysylki([inny.id])[inny.id][0], 9)
+
+    def test_slot_nie_pozniej_niz_3_dni_przed(self):
+        dzien = date(2026, 3, 10)
+        # slot 8:xx mieści się przed 10:00 dnia D-3
+        termin = timezone.localtime(self._termin(dzien, 10, pora=(8, 15)))
+        self.assertEqual((termin.date(), termin.hour, termin.minute), (date(2026, 3, 7), 8, 15))
+        # slot 18:xx byłby za późno – dzień wcześniej
+        termin = timezone.localtime(self._termin(dzien, 10, pora=(18, 5)))
+        self.assertEqual((termin.date(), termin.hour, termin.minute), (date(2026, 3, 6), 18, 5))
+
+    def test_rozrzut_rozklada_uzytkownikow(self):
+        minuty = {rozrzut_minut(uid) for uid in range(1, 201)}
+        self.assertGreater(len(minuty), 40)
+        self.assertTrue(all(0 <= m < 60 for m in minuty))
+
+    def test_przelicza_po_zmianie_profilu_i_histogram(self):
+        pr = Przypomnienie.objects.create(
+            roslina=self.roslina, uzytkownik=self.user, tytul="x", tresc="x",
+            data_przypomnienia=timezone.now() + timedelta(days=6),
+        )
+        ProfilUzytkownika.objects.filter(user=self.user).update(godzina_powiadomien=20)
+
+        self.assertEqual(przelicz_terminy_powiadomien([self.user.id]), 1)
+        pr.refresh_from_db()
+        self.assertEqual(timezone.localtime(pr.termin_powiadomienia).hour, 20)
+        self.assertEqual(przelicz_terminy_powiadomien([self.user.id]), 0)
+
+        termin = timezone.localtime(pr.termin_powiadomienia)
+        histogram = histogram_wysylek(od=pr.termin_powiadomienia - timedelta(hours=1), godzin=2)
+        self.assertEqual(histogram, {(termin.date(), 20): 1})
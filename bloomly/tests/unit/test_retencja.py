@@ -0,0 +1,106 @@
+"""
+Testy jednostkowe silnika retencji (pakiety po zakresach pk, polityki, budżet czasu)
+"""
+
+from datetime import date, timedelta
+from unittest.mock import MagicMock, patch
+
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django_celery_results.models import TaskResult
+
+from bloomly.models import OutboxEmail, Przypomnienie, Roslina
+from bloomly.retencja import POLITYKI, usun_pakietami, zastosuj_retencje
+from bloomly.tasks import retencja_danych
+
+
+class RetencjaTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.teraz = timezone.now()
+
+    def _przypomnienia(self, n, status="wykonane", dni_temu=100):
+        ids = []
+        for i in range(n):
+            r = Roslina.objects.create(
+                nazwa=f"R{i}", wlasciciel=self.user, czestotliwosc_podlewania=7, data_zakupu=date.today()
+            )
+            ids.append(Przypomnienie.objects.create(
+                roslina=r, uzytkownik=self.user, tytul="x", tresc="x",
+                data_przypomnienia=self.teraz - timedelta(days=dni_temu), status=status,
+            ).id)
+        Przypomnienie.objects.filter(id__in=ids).update(data_utworzenia=self.teraz - timedelta(days=dni_temu))
+        return ids
+
+    def test_pakiety_po_zakresach_pk(self):
+        stare = self._przypomnienia(25)
+        nowe = self._przypomnienia(3, dni_temu=10)
+        otwarte = self._przypomnienia(2, status="oczekujace")
+        spij = MagicMock()
+
+        qs = POLITYKI[0].queryset(self.teraz - timedelta(days=90))
+        with CaptureQueriesContext(connection) as ctx:
+            usuniete, skonczone = usun_pakietami(qs, rozmiar=10, pauza=0.5, spij=spij)
+
+        self.assertEqual((usuniete, skonczone), (25, True))
+        self.assertFalse(Przypomnienie.objects.filter(id__in=stare).exists())
+        self.assertEqual(Przypomnienie.objects.filter(id__in=nowe + otwarte).count(), 5)
+
+        delete = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('DELETE')]
+        self.assertEqual(len(delete), 3)
+        self.assertTrue(all('BETWEEN' in sql for sql in delete))
+        # pauza między pełnymi pakietami, nie po ostatnim
+        self.assertEqual(spij.call_count, 2)
+
+    def test_budzet_czasu_przerywa(self):
+        self._przypomnienia(15)
+        qs = POLITYKI[0].queryset(self.teraz - timedelta(days=90))
+
+        usuniete, skonczone = usun_pakietami(qs, rozmiar=10, pauza=0, termin=0)
+
+        self.assertEqual((usuniete, skonczone), (10, False))
+        self.assertEqual(Przypomnienie.objects.count(), 5)
+
+    def test_polityki_tabel(self):
+        self._przypomnienia(1)
+        stary = TaskResult.objects.create(task_id="stary", status="SUCCESS")
+        TaskResult.objects.filter(pk=stary.pk).update(date_done=self.teraz - timedelta(days=40))
+        TaskResult.objects.create(task_id="nowy", status="SUCCESS")
+        Session.objects.create(session_key="wygasla", session_data="x", expire_date=self.teraz - timedelta(days=1))
+        Session.objects.create(session_key="aktywna", session_data="x", expire_date=self.teraz + timedelta(days=1))
+        OutboxEmail.objects.create(
+            uzytkownik=self.user, nadawca="a@b.pl", adresat="c@d.pl", temat="x", tresc="x",
+            status="wyslany", data_wyslania=self.teraz - timedelta(days=40),
+        )
+        OutboxEmail.objects.create(
+            uzytkownik=self.user, nadawca="a@b.pl", adresat="c@d.pl", temat="x", tresc="x",
+            status="martwy",
+        )
+        postep = MagicMock()
+
+        wynik = zastosuj_retencje(teraz=self.teraz, postep=postep, pauza=0)
+
+        self.assertEqual(wynik, {"przypomnienia": 1, "wyniki_celery": 1, "sesje": 1, "outbox": 1})
+        self.assertEqual(list(TaskResult.objects.values_list("task_id", flat=True)), ["nowy"])
+        self.assertEqual(list(Session.objects.values_list("session_key", flat=True)), ["aktywna"])
+        self.assertEqual(list(OutboxEmail.objects.values_list("status", flat=True)), ["martwy"])
+        postep.assert_any_call("wyniki_celery", 1)
+
+    @override_settings(DATA_RETENTION_DAYS={"przypomnienia": None, "wyniki_celery": None,
+                                            "sesje": None, "outbox": None})
+    def test_wylaczona_polityka(self):
+        self._przypomnienia(2)
+        self.assertEqual(zastosuj_retencje(pauza=0), {})
+        self.assertEqual(Przypomnienie.objects.count(), 2)
+
+    def test_zadanie(self):
+        self._przypomnienia(2, status="anulowane")
+        with patch("bloomly.tasks.usun_osierocone_artefakty", return_value=3) as sprzatanie:
+            wynik = retencja_danych(budzet_s=60)
+        self.assertIn("przypomnienia: 2", wynik)
+        self.assertIn("artefakty_ml: 3", wynik)
+        sprzatanie.assert_called_once_with(timedelta(days=1))
@@ -0,0 +1,120 @@
+"""
+Testy jednostkowe stronicowania po kluczu i listy roślin
+"""
+
+from datetime import date, datetime, timedelta
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from bloomly.models import CzynoscPielegnacyjna, Roslina
+from bloomly.stronicowanie import BlednyKursor, porzadek, stronicuj, zakoduj_kursor
+from bloomly.views import SORTOWANIA_ROSLIN
+
+
+def _wszystkie_strony(qs, klucze, rozmiar):
+    wynik, kursor = [], None
+    while True:
+        strona = stronicuj(qs, klucze, kursor, rozmiar)
+        wynik.extend(strona)
+        kursor = strona.nastepny
+        if not kursor:
+            return wynik
+
+
+class StronicowanieTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        dzis = date(2024, 5, 1)
+        # powtarzające się wartości i NULL-e w kluczu sortowania
+        for i, ostatnie in enumerate([None, dzis, dzis, None, dzis - timedelta(days=3), dzis, None]):
+            Roslina.objects.create(
+                nazwa=f"R{i % 3}", wlasciciel=self.user, czestotliwosc_podlewania=7,
+                ostatnie_podlewanie=ostatnie, data_zakupu=dzis,
+            )
+
+    def test_strony_skladaja_sie_na_pelny_porzadek(self):
+        qs = Roslina.objects.filter(wlasciciel=self.user)
+        for nazwa, klucze in SORTOWANIA_ROSLIN.items():
+            with self.subTest(sortowanie=nazwa):
+                oczekiwane = list(qs.order_by(*porzadek(klucze)))
+                for rozmiar in (1, 2, 3, 10):
+                    self.assertEqual([r.pk for r in _wszystkie_strony(qs, klucze, rozmiar)],
+                                     [r.pk for r in oczekiwane])
+
+    def test_malejaco_z_nullami_na_koncu(self):
+        klucze = [("nastepne_podlewanie", True), ("id", True)]
+        wynik = _wszystkie_strony(Roslina.objects.all(), klucze, 2)
+        self.assertEqual([r.nastepne_podlewanie is None for r in wynik], [False] * 4 + [True] * 3)
+        self.assertEqual(len({r.pk for r in wynik}), 7)
+
+    def test_datetime_z_mikrosekundami(self):
+        roslina = Roslina.objects.first()
+        chwila = timezone.make_aware(datetime(2024, 5, 1, 12, 0, 0, 123456))
+        for _ in range(3):
+            CzynoscPielegnacyjna.objects.create(roslina=roslina, uzytkownik=self.user, typ="zraszanie", data=chwila)
+        wynik = _wszystkie_strony(CzynoscPielegnacyjna.objects.all(), [("data", True), ("id", True)], 1)
+        self.assertEqual(len(wynik), 3)
+
+    def test_bledny_kursor(self):
+        with self.assertRaises(BlednyKursor):
+            stronicuj(Roslina.objects.all(), SORTOWANIA_ROSLIN["nazwa"], "nie-kursor")
+
+    def test_kursor_ze_zlymi_typami(self):
+        for klucze, wartosci in [
+            (SORTOWANIA_ROSLIN["nowe"], ["abc", "x"]),
+            (SORTOWANIA_ROSLIN["nazwa"], ["R1", 10 ** 30]),
+            (SORTOWANIA_ROSLIN["podlewanie"], [{"a": 1}, 1]),
+        ]:
+            with self.subTest(wartosci=wartosci), self.assertRaises(BlednyKursor):
+                stronicuj(Roslina.objects.all(), klucze, zakoduj_kursor(wartosci))
+
+
+class ListaRoslinTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        dzis = timezone.now().date()
+        for i in range(30):
+            Roslina.objects.create(
+                nazwa=f"Roślina {i:02d}", wlasciciel=self.user, czestotliwosc_podlewania=7, data_zakupu=dzis,
+                kategoria="ziolowa" if i % 2 else "doniczkowa", lokalizacja="kuchnia" if i < 10 else "salon",
+                ostatnie_podlewanie=dzis if i % 3 else None,
+            )
+        self.client.login(username='testuser', password='testpass123')
+
+    def test_strony_i_filtry(self):
+        url = reverse("lista_roslin")
+        response = self.client.get(url, {"sort": "nazwa"})
+        pierwsza = [r.nazwa for r in response.context["rosliny"]]
+        self.assertEqual(pierwsza, [f"Roślina {i:02d}" for i in range(24)])
+        self.assertEqual(response.context["lokalizacje"], ["kuchnia", "salon"])
+
+        response = self.client.get(url, {"sort": "nazwa", "kursor": response.context["nastepna_strona"]})
+        self.assertEqual([r.nazwa for r in response.context["rosliny"]], [f"Roślina {i:02d}" for i in range(24, 30)])
+        self.assertIsNone(response.context["nastepna_strona"])
+        self.assertContains(response, "Pierwsza strona")
+
+        response = self.client.get(url, {"kategoria": "ziolowa", "lokalizacja": "kuchnia", "do_podlania": "1"})
+        self.assertEqual(sorted(r.nazwa for r in response.context["rosliny"]), ["Roślina 03", "Roślina 09"])
+        self.assertTrue(all(r.do_podlania for r in response.context["rosliny"]))
+
+        response = self.client.get(url, {"sort": "podlewanie"})
+        self.assertEqual([r.do_podlania for r in response.context["rosliny"]][:10], [True] * 10)
+
+    def test_zepsuty_kursor_daje_pierwsza_strone(self):
+        for kursor in ("%%%", zakoduj_kursor(["abc", "x"])):
+            response = self.client.get(reverse("lista_roslin"), {"kursor": kursor})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.context["rosliny"]), 24)
+
+    def test_liczba_zapytan_nie_zalezy_od_strony(self):
+        url = reverse("lista_roslin")
+        with CaptureQueriesContext(connection) as pierwsza:
+            response = self.client.get(url, {"sort": "podlewanie"})
+        with CaptureQueriesContext(connection) as druga:
+            self.client.get(url, {"sort": "podlewanie", "kursor": response.context["nastepna_strona"]})
+        self.assertEqual(len(pierwsza.captured_queries), len(druga.captured_queries))
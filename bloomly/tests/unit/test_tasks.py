@@ -3,12 +3,18 @@ Testy jednostkowe zadań Celery
 Testują poszczególne funkcje tasków bez uruchamiania workera
 """
 
-from django.test import TestCase
+import threading
+import time
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth.models import User
 from django.utils import timezone
 from unittest.mock import patch, MagicMock
 from django.core import mail
-from datetime import timedelta, date
+from datetime import datetime, timedelta, date
 from unittest.mock import patch
 
 from bloomly.models import (
@@ -35,6 +41,8 @@ try:
 except ImportError:
     HAS_ML_TASKS = False
 
+LOCMEM = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "tasks"}}
+
 
 class WyslijEmailPrzypomnienieTaskTest(TestCase):
     """Testy zadania wysyłania pojedynczego emaila"""
@@ -194,19 +202,21 @@ class SprawdzPrzypomnienieTaskTest(TestCase):
         )
 
         # Wykonaj task
-        result = sprawdz_przypomnienia()
+        with patch('bloomly.tasks.wyslij_zestawienia_przypomnien.delay') as mock_delay:
+            result = sprawdz_przypomnienia()
 
-        # ✅ POPRAWKA: Sprawdź czy są przypomnienia do wysłania
-        # Może być 0 jeśli okno czasowe jest zbyt wąskie
-        print(f"DEBUG: Result = {result}")  # Dodaj debugging
+            # ✅ POPRAWKA: Sprawdź czy są przypomnienia do wysłania
+            print(f"DEBUG: Result = {result}")  # Dodaj debugging
+            mock_delay.assert_called_once()
 
-        # Sprawdź czy user ma włączone powiadomienia
-        self.user.profiluzytkownika.powiadomienia_email = True
-        self.user.profiluzytkownika.save()
+            # Sprawdź czy user ma włączone powiadomienia
+            self.user.profiluzytkownika.powiadomienia_email = True
+            self.user.profiluzytkownika.save()
 
-        # Ponów test
-        result = sprawdz_przypomnienia()
-        print(f"DEBUG po włączeniu: Result = {result}")
+            # Ponów test – powiadomienie zdjęte z indeksu, bez duplikatu
+            result = sprawdz_przypomnienia()
+            print(f"DEBUG po włączeniu: Result = {result}")
+            mock_delay.assert_called_once()
 
     def test_sprawdz_przypomnienia_za_wczesnie(self):
         """Test że nie wysyła przypomnień za wcześnie"""
@@ -280,7 +290,10 @@ class SprawdzPrzypomnienieTaskTest(TestCase):
         print(f"DEBUG: Przypomnienia w zakresie: {przypomnienia_w_zakresie.count()}")
 
         # ✅ POPRAWKA: Właściwa nazwa funkcji (bez literówki)
-        result = sprawdz_przypomnienia()
+        with patch('bloomly.tasks.wyslij_zestawienia_przypomnien.delay') as mock_delay:
+            result = sprawdz_przypomnienia()
+        mock_delay.assert_called_once()
+        self.assertEqual(len(mock_delay.call_args[0][0]), 3)
 
         print(f"DEBUG: Result = {result}, Emails = {len(mail.outbox)}")
 
@@ -426,6 +439,77 @@ class OdswiezPrzypomnienieTaskTest(TestCase):
         )
 
 
+class OdswiezenieBezBlokadTest(TransactionTestCase):
+    """Predykcja poza transakcją: podlewanie zapisane w trakcie nie czeka i wymusza ponowienie"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.roslina = Roslina.objects.create(
+            nazwa="Monstera",
+            wlasciciel=self.user,
+            czestotliwosc_podlewania=7,
+            data_zakupu=date.today()
+        )
+        CzynoscPielegnacyjna.objects.create(
+            roslina=self.roslina,
+            typ="podlewanie",
+            uzytkownik=self.user,
+            wykonane=True,
+            data=timezone.now() - timedelta(days=3)
+        )
+
+    def test_podlewanie_w_trakcie_predykcji(self):
+        from bloomly import tasks
+
+        prawdziwa = tasks._nastepny_termin_podlewania
+        w_predykcji = threading.Event()
+        zwolnij = threading.Event()
+        migawki = []
+        wynik = {}
+
+        def wolna_predykcja(r, podlewania=None, wzorce=None):
+            migawki.append(len(podlewania))
+            if len(migawki) == 1:
+                # „trenowanie modelu” – wątek odświeżania stoi tutaj
+                w_predykcji.set()
+                zwolnij.wait(10)
+            return prawdziwa(r, podlewania=podlewania, wzorce=wzorce)
+
+        def odswiez():
+            try:
+                wynik['akcja'] = odswiez_przypomnienie_rosliny(self.roslina.id)
+            finally:
+                connection.close()
+
+        with patch('bloomly.tasks._nastepny_termin_podlewania', side_effect=wolna_predykcja):
+            watek = threading.Thread(target=odswiez)
+            watek.start()
+            self.assertTrue(w_predykcji.wait(10))
+
+            start = time.monotonic()
+            CzynoscPielegnacyjna.objects.create(
+                roslina=self.roslina,
+                typ="podlewanie",
+                uzytkownik=self.user,
+                wykonane=True,
+                data=timezone.now()
+            )
+            czas_zapisu = time.monotonic() - start
+
+            zwolnij.set()
+            watek.join(20)
+
+        self.assertFalse(watek.is_alive())
+        self.assertLess(czas_zapisu, 1.0)
+        self.assertEqual(wynik['akcja'], 'utworzono')
+        # druga próba liczyła już z nowym podlewaniem
+        self.assertEqual(migawki, [1, 2])
+
+        pr = Przypomnienie.objects.get(roslina=self.roslina, status='oczekujace')
+        historia = list(CzynoscPielegnacyjna.objects.filter(roslina=self.roslina).order_by('data', 'id'))
+        self.assertEqual(pr.data_przypomnienia, prawdziwa(self.roslina, podlewania=historia)[0])
+
+
 class OdswiezWszystkichTaskTest(TestCase):
     """Testy zadania odświeżania wszystkich przypomnień"""
 
@@ -703,4 +787,419 @@ if HAS_ML_TASKS:
             result = retrenuj_modele_ml()
 
             # Powinien wytrenować 1 model
-            self.assertIn("Wytrenowano", result)
\ No newline at end of file
+            self.assertIn("Wytrenowano", result)
+
+class NocnyPipelineTaskTest(TestCase):
+    """Testy połączonego nocnego przebiegu (analiza + przypomnienie + e-mail)"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.roslina = Roslina.objects.create(
+            nazwa="Monstera",
+            wlasciciel=self.user,
+            czestotliwosc_podlewania=7,
+            data_zakupu=date.today()
+        )
+        # Regularnie co 7 dni, ostatnio 5 dni temu -> termin za ~2 dni (w oknie e-mail)
+        base_date = timezone.now() - timedelta(days=5 + 7 * 9)
+        for i in range(10):
+            CzynoscPielegnacyjna.objects.create(
+                roslina=self.roslina,
+                typ="podlewanie",
+                wykonane=True,
+                uzytkownik=self.user,
+                data=base_date + timedelta(days=i * 7),
+                stan_gleby="sucha"
+            )
+        self.pusta = Roslina.objects.create(
+            nazwa="Nowa",
+            wlasciciel=self.user,
+            czestotliwosc_podlewania=7,
+            data_zakupu=date.today()
+        )
+
+    def test_pakiet_analiza_przypomnienie_email(self):
+        from bloomly.tasks import przetworz_pakiet_roslin
+
+        with patch('bloomly.tasks.wyslij_zestawienia_przypomnien.delay') as mock_delay:
+            licznik = przetworz_pakiet_roslin([self.roslina.id, self.pusta.id])
+
+        self.assertEqual(licznik['rosliny'], 2)
+        self.assertEqual(licznik['przeanalizowane'], 2)
+        self.assertEqual(licznik['bledy'], 0)
+        self.assertEqual(licznik['brak_danych'], 1)
+        self.assertTrue(AnalizaPielegnacji.objects.filter(roslina=self.roslina).exists())
+
+        pr = Przypomnienie.objects.get(roslina=self.roslina, status='oczekujace')
+        self.assertEqual(timezone.localtime(pr.data_przypomnienia).hour, 9)
+        mock_delay.assert_called_once_with([pr.id])
+
+    def test_kolejny_przebieg_nie_wysyla_ponownie(self):
+        from bloomly.tasks import przetworz_pakiet_roslin, sprawdz_przypomnienia, wyslij_zestawienia_przypomnien
+
+        with patch('bloomly.tasks.wyslij_zestawienia_przypomnien.delay') as mock_delay:
+            przetworz_pakiet_roslin([self.roslina.id])
+        wyslij_zestawienia_przypomnien(*mock_delay.call_args[0])
+        pr = Przypomnienie.objects.get(roslina=self.roslina, status='wyslane')
+
+        # następna noc z tą samą historią: termin bez zmian -> bez ponownego uzbrojenia i e-maila
+        with patch('bloomly.tasks.wyslij_zestawienia_przypomnien.delay') as mock_delay:
+            licznik = przetworz_pakiet_roslin([self.roslina.id])
+            sprawdz_przypomnienia()
+
+        mock_delay.assert_not_called()
+        self.assertEqual(licznik['emaile'], 0)
+        pr.refresh_from_db()
+        self.assertEqual((pr.status, pr.wyslane), ('wyslane', True))
+
+    def test_historia_pobierana_raz_na_rosline(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from bloomly.tasks import przetworz_pakiet_roslin
+
+        with patch('bloomly.tasks.wyslij_zestawienia_przypomnien.delay'):
+            with CaptureQueriesContext(connection) as ctx:
+                przetworz_pakiet_roslin([self.roslina.id])
+
+        zapytania_historii = [
+            q['sql'] for q in ctx.captured_queries
+            if q['sql'].startswith('SELECT') and 'FROM "bloomly_czynoscpielegnacyjna"' in q['sql']
+        ]
+        self.assertEqual(len(zapytania_historii), 1)
+
+    def test_bez_zgody_na_email(self):
+        from bloomly.tasks import przetworz_pakiet_roslin
+
+        self.user.profiluzytkownika.powiadomienia_email = False
+        self.user.profiluzytkownika.save()
+
+        with patch('bloomly.tasks.wyslij_zestawienia_przypomnien.delay') as mock_delay:
+            licznik = przetworz_pakiet_roslin([self.roslina.id])
+
+        self.assertEqual(licznik['emaile'], 0)
+        mock_delay.assert_not_called()
+
+    def test_pipeline_dzieli_na_pakiety(self):
+        from bloomly.tasks import nocny_pipeline_roslin
+
+        with patch('bloomly.tasks.chord') as mock_chord:
+            result = nocny_pipeline_roslin(chunk_size=1)
+
+        header = list(mock_chord.call_args[0][0].tasks)
+        self.assertEqual([t.args[0] for t in header], [[self.roslina.id], [self.pusta.id]])
+        self.assertIn("2 pakietach", result)
+
+    def test_podsumowanie_sumuje_pakiety(self):
+        from bloomly.tasks import podsumuj_nocny_pipeline
+
+        result = podsumuj_nocny_pipeline([
+            {'rosliny': 2, 'przeanalizowane': 2, 'emaile': 1, 'bledy': 0},
+            {'rosliny': 3, 'przeanalizowane': 2, 'emaile': 0, 'bledy': 1},
+        ])
+        self.assertIn("4/5", result)
+        self.assertIn("błędy: 1", result)
+
+
+class OdswiezPakietPrzypomnienTaskTest(TestCase):
+    """Testy pakietowego odświeżania przypomnień (ONE-OPEN)"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.rosliny = []
+        for i in range(3):
+            roslina = Roslina.objects.create(
+                nazwa=f"Roślina {i}",
+                wlasciciel=self.user,
+                czestotliwosc_podlewania=7,
+                data_zakupu=date.today()
+            )
+            CzynoscPielegnacyjna.objects.create(
+                roslina=roslina,
+                typ="podlewanie",
+                uzytkownik=self.user,
+                wykonane=True,
+                data=timezone.now() - timedelta(days=2)
+            )
+            self.rosliny.append(roslina)
+        self.pusta = Roslina.objects.create(
+            nazwa="Nowa",
+            wlasciciel=self.user,
+            czestotliwosc_podlewania=7,
+            data_zakupu=date.today()
+        )
+
+    def test_pakiet_tworzy_i_uzbraja_przypomnienia(self):
+        from bloomly.tasks import odswiez_pakiet_przypomnien
+
+        ids = [r.id for r in self.rosliny]
+        licznik = odswiez_pakiet_przypomnien(ids)
+        self.assertEqual(licznik['utworzone'], 3)
+        self.assertEqual(
+            Przypomnienie.objects.filter(roslina_id__in=ids, status='oczekujace').count(), 3
+        )
+
+        # Wysłane przypomnienie z tym samym terminem zostaje wysłane (bez ponownego e-maila)
+        Przypomnienie.objects.filter(roslina=self.rosliny[0]).update(status='wyslane', wyslane=True)
+        licznik = odswiez_pakiet_przypomnien(ids)
+        self.assertEqual(licznik['utworzone'], 0)
+        pr = Przypomnienie.objects.get(roslina=self.rosliny[0])
+        self.assertEqual(pr.status, 'wyslane')
+
+        # Nowy termin (kolejne podlewanie) re-armuje wysyłkę, bez duplikatu
+        CzynoscPielegnacyjna.objects.create(
+            roslina=self.rosliny[0],
+            typ="podlewanie",
+            uzytkownik=self.user,
+            wykonane=True,
+            data=timezone.now()
+        )
+        odswiez_pakiet_przypomnien(ids)
+        pr = Przypomnienie.objects.get(roslina=self.rosliny[0])
+        self.assertEqual(pr.status, 'oczekujace')
+        self.assertFalse(pr.wyslane)
+        self.assertIsNotNone(pr.termin_powiadomienia)
+
+    def test_pakiet_anuluje_bez_historii(self):
+        from bloomly.tasks import odswiez_pakiet_przypomnien
+
+        Przypomnienie.objects.create(
+            roslina=self.pusta,
+            uzytkownik=self.user,
+            typ='podlewanie',
+            tytul='Podlej Nowa',
+            tresc='x',
+            data_przypomnienia=timezone.now() + timedelta(days=1),
+        )
+        licznik = odswiez_pakiet_przypomnien([self.pusta.id])
+        self.assertEqual(licznik['anulowane'], 1)
+        self.assertFalse(
+            Przypomnienie.objects.filter(roslina=self.pusta, status='oczekujace').exists()
+        )
+
+    def test_historia_pobierana_raz_na_pakiet(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from bloomly.tasks import odswiez_pakiet_przypomnien
+
+        with CaptureQueriesContext(connection) as ctx:
+            odswiez_pakiet_przypomnien([r.id for r in self.rosliny] + [self.pusta.id])
+
+        # pełne wiersze historii (kontrola wersji CAS to osobne, lekkie zapytanie)
+        zapytania_historii = [
+            q['sql'] for q in ctx.captured_queries
+            if q['sql'].startswith('SELECT "bloomly_czynoscpielegnacyjna"')
+        ]
+        self.assertEqual(len(zapytania_historii), 1)
+
+    def test_pakiet_pomija_rosline_podlana_w_trakcie(self):
+        from bloomly.models import BrudnaRoslina
+        from bloomly.tasks import _nastepny_termin_podlewania, odswiez_pakiet_przypomnien
+
+        podlana = self.rosliny[0]
+
+        def z_podlewaniem(r, **kwargs):
+            if r.pk == podlana.pk:
+                CzynoscPielegnacyjna.objects.create(
+                    roslina=r, typ="podlewanie", uzytkownik=self.user,
+                    wykonane=True, data=timezone.now()
+                )
+            return _nastepny_termin_podlewania(r, **kwargs)
+
+        with patch('bloomly.tasks._nastepny_termin_podlewania', side_effect=z_podlewaniem):
+            licznik = odswiez_pakiet_przypomnien([r.id for r in self.rosliny])
+
+        self.assertEqual(licznik['konflikty'], 1)
+        self.assertEqual(licznik['utworzone'], 2)
+        self.assertFalse(Przypomnienie.objects.filter(roslina=podlana).exists())
+        # zostaje do kolejnego przebiegu
+        self.assertTrue(BrudnaRoslina.objects.filter(roslina=podlana).exists())
+
+    def test_dispatch_dzieli_na_pakiety(self):
+        with patch('bloomly.tasks.group') as mock_group:
+            result = odswiez_przypomnienia_dla_wszystkich(chunk_size=3)
+
+        pakiety = [s.args[0] for s in mock_group.call_args[0][0]]
+        self.assertEqual(pakiety, [[r.id for r in self.rosliny], [self.pusta.id]])
+        mock_group.return_value.apply_async.assert_called_once()
+        self.assertIn("2 pakietach", result)
+
+    def test_dispatch_tryb_per_roslina(self):
+        with patch('bloomly.tasks.odswiez_przypomnienie_rosliny.delay') as mock_delay:
+            odswiez_przypomnienia_dla_wszystkich(chunk_size=0)
+        self.assertEqual(mock_delay.call_count, 4)
+
+    def test_pakiet_zdejmuje_znaczniki_zmian(self):
+        from bloomly.models import BrudnaRoslina
+        from bloomly.tasks import odswiez_pakiet_przypomnien
+
+        ids = [r.id for r in self.rosliny]
+        self.assertEqual(BrudnaRoslina.objects.filter(roslina_id__in=ids).count(), 3)
+
+        odswiez_pakiet_przypomnien(ids)
+
+        self.assertFalse(BrudnaRoslina.objects.filter(roslina_id__in=ids).exists())
+        self.assertTrue(BrudnaRoslina.objects.filter(roslina=self.pusta).exists())
+
+    def test_dispatch_tylko_zmienione(self):
+        from bloomly.models import BrudnaRoslina
+
+        BrudnaRoslina.objects.exclude(roslina=self.pusta).delete()
+        with patch('bloomly.przypomnienia.OKRES_PRZEGLADU_DNI', 10**6), \
+                patch('bloomly.tasks.group') as mock_group:
+            odswiez_przypomnienia_dla_wszystkich(chunk_size=10)
+
+        # bez znacznika i poza dzisiejszym wycinkiem przeglądu -> pominięte
+        pakiety = [s.args[0] for s in mock_group.call_args[0][0]]
+        self.assertEqual(pakiety, [[self.pusta.id]])
+
+
+class TerminPowiadomieniaTest(TestCase):
+    """Testy indeksu termin_powiadomienia i tickera sprawdz_przypomnienia"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.roslina = Roslina.objects.create(
+            nazwa="Monstera",
+            wlasciciel=self.user,
+            czestotliwosc_podlewania=7,
+            data_zakupu=date.today()
+        )
+
+    def _przypomnienie(self, za, roslina=None):
+        return Przypomnienie.objects.create(
+            roslina=roslina or self.roslina,
+            uzytkownik=self.user,
+            typ="podlewanie",
+            tytul="Podlej Monstera",
+            tresc="Test",
+            data_przypomnienia=timezone.now() + za,
+        )
+
+    def test_termin_utrzymywany_przy_zapisie(self):
+        pr = self._przypomnienie(timedelta(days=5))
+        self.assertEqual(pr.termin_powiadomienia, pr.wyznacz_termin_powiadomienia())
+
+        pr.odloz(2)
+        pr.refresh_from_db()
+        self.assertEqual(pr.termin_powiadomienia, pr.wyznacz_termin_powiadomienia())
+
+        pr.oznacz_jako_wykonane()
+        pr.refresh_from_db()
+        self.assertIsNone(pr.termin_powiadomienia)
+
+    def test_zapis_bez_zapytan_o_slot(self):
+        pr = self._przypomnienie(timedelta(days=5))
+
+        # odłożenie bierze slot z bieżącego terminu, zamknięcie i inne pola go nie potrzebują
+        with CaptureQueriesContext(connection) as ctx:
+            pr.odloz(1)
+            pr.save(update_fields=["priorytet"])
+            pr.oznacz_jako_wykonane()
+        sql = " ".join(q["sql"] for q in ctx.captured_queries)
+        self.assertNotIn("bloomly_profiluzytkownika", sql)
+        self.assertNotIn("bloomly_analizapielegnacji", sql)
+
+        pr = self._przypomnienie(timedelta(days=5))
+        pr.odloz(2)
+        pr.refresh_from_db()
+        self.assertEqual(pr.termin_powiadomienia, pr.wyznacz_termin_powiadomienia())
+
+    def test_histogram_raz_na_godzine(self):
+        with override_settings(CACHES=LOCMEM), \
+                patch('bloomly.tasks.histogram_wysylek', return_value={}) as mock_histogram:
+            cache.clear()
+            self.addCleanup(cache.clear)
+            teraz = timezone.make_aware(datetime(2026, 3, 10, 14, 7))
+            for minuta in (0, 1, 30):
+                # tyknięcie o pełnej godzinie wypadło – histogram i tak raz w godzinie
+                with patch('bloomly.tasks.timezone.now', return_value=teraz + timedelta(minutes=minuta)):
+                    sprawdz_przypomnienia()
+            with patch('bloomly.tasks.timezone.now', return_value=teraz + timedelta(hours=1)):
+                sprawdz_przypomnienia()
+
+        self.assertEqual(mock_histogram.call_count, 2)
+
+    def test_przesuniete_w_okno_nie_jest_gubione(self):
+        # Utworzone 2 dni przed terminem – dawne okno (dokładnie 3 dni) by je pominęło
+        pr = self._przypomnienie(timedelta(days=2))
+
+        with patch('bloomly.tasks.wyslij_zestawienia_przypomnien.delay') as mock_delay:
+            sprawdz_przypomnienia()
+            sprawdz_przypomnienia()
+
+        mock_delay.assert_called_once_with([pr.id])
+        pr.refresh_from_db()
+        self.assertIsNone(pr.termin_powiadomienia)
+
+    def test_za_wczesnie_i_po_terminie(self):
+        druga = Roslina.objects.create(
+            nazwa="Fikus", wlasciciel=self.user, czestotliwosc_podlewania=7, data_zakupu=date.today()
+        )
+        wczesne = self._przypomnienie(timedelta(days=5))
+        po_terminie = self._przypomnienie(-timedelta(hours=1), roslina=druga)
+
+        with patch('bloomly.tasks.wyslij_zestawienia_przypomnien.delay') as mock_delay:
+            sprawdz_przypomnienia()
+
+        mock_delay.assert_not_called()
+        wczesne.refresh_from_db()
+        po_terminie.refresh_from_db()
+        self.assertIsNotNone(wczesne.termin_powiadomienia)
+        self.assertIsNone(po_terminie.termin_powiadomienia)
+
+    def test_budzet_emaili_na_minute(self):
+        uzytkownicy = [self.user] + [
+            User.objects.create_user(username=f'u{i}', email=f'u{i}@example.com', password='x')
+            for i in range(2)
+        ]
+        for u in uzytkownicy:
+            r = Roslina.objects.create(
+                nazwa="Fikus", wlasciciel=u, czestotliwosc_podlewania=7, data_zakupu=date.today()
+            )
+            Przypomnienie.objects.create(
+                roslina=r, uzytkownik=u, tytul="x", tresc="x",
+                data_przypomnienia=timezone.now() + timedelta(days=2),
+            )
+
+        with patch('bloomly.tasks.EMAIL_BUDZET_NA_MINUTE', 2), \
+                patch('bloomly.tasks.wyslij_zestawienia_przypomnien.delay') as mock_delay:
+            sprawdz_przypomnienia()
+            self.assertEqual(len(mock_delay.call_args[0][0]), 2)
+            # nadmiar czeka w indeksie na kolejne tyknięcie
+            self.assertEqual(Przypomnienie.objects.filter(termin_powiadomienia__isnull=False).count(), 1)
+
+            sprawdz_przypomnienia()
+            self.assertEqual(len(mock_delay.call_args[0][0]), 1)
+
+    def test_slot_wysylki_z_profilu(self):
+        ProfilUzytkownika.objects.filter(user=self.user).update(godzina_powiadomien=19)
+        pr = self._przypomnienie(timedelta(days=6))
+        self.assertEqual(timezone.localtime(pr.termin_powiadomienia).hour, 19)
+        self.assertLessEqual(
+            pr.termin_powiadomienia,
+            timezone.localtime(pr.data_przypomnienia) - timedelta(days=Przypomnienie.DNI_PRZED_POWIADOMIENIEM)
+        )
+
+    def test_odswiezenie_ustawia_termin(self):
+        CzynoscPielegnacyjna.objects.create(
+            roslina=self.roslina,
+            typ="podlewanie",
+            uzytkownik=self.user,
+            wykonane=True,
+            data=timezone.now() - timedelta(days=2)
+        )
+        odswiez_przypomnienie_rosliny(self.roslina.id)
+
+        pr = Przypomnienie.objects.get(roslina=self.roslina, status='oczekujace')
+        self.assertEqual(pr.termin_powiadomienia, pr.wyznacz_termin_powiadomienia())
@@ -28,6 +28,8 @@ urlpatterns = [
     path("rosliny/<int:id>/usun/", views.usun_roslina, name="usun_roslina"),
     path("rosliny/<int:id>/podlej/", views.podlej_roslina, name="podlej_roslina"),
     path("rosliny/<int:id>/czynnosci/nowa/", views.dodaj_czynnosc, name="dodaj_czynnosc"),
+    path("rosliny/<int:id>/historia/", views.historia_rosliny, name="historia_rosliny"),
+    path("rosliny/import/", views.import_historii, name="import_historii"),
 
 
     # Przypomnienia
@@ -54,6 +56,7 @@ urlpatterns = [
 
     # Analityka ML
     path("analityka/", views.dashboard_analityczny, name="dashboard_analityczny"),
+    path("analityka/treningi.json", views.statystyki_treningow_json, name="statystyki_treningow_json"),
     path("rosliny/<int:id>/analiza/", views.analiza_ml_rosliny, name="analiza_ml_rosliny"),
 
     # Kalendarz
@@ -1,13 +1,18 @@
+import hashlib
 import logging
 from typing import Optional
 from datetime import date, datetime, time, timedelta
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
-from django.db.models import Count, Q, F
-from django.http import JsonResponse
+from django.db.models import Count, DateField, DurationField, ExpressionWrapper, F, Q, Value
+from django.db.models.functions import TruncDate
+from django.http import HttpResponse, JsonResponse
 from django.shortcuts import render, get_object_or_404, redirect
+from django.template.loader import render_to_string
 from django.urls import reverse
 from django.utils import timezone
+from django.middleware.csrf import get_token
+from django.utils.cache import get_conditional_response, patch_cache_control
 from django.utils.dateparse import parse_date, parse_datetime
 from django.views.decorators.http import require_GET, require_POST
 from django.contrib import messages
@@ -22,7 +27,6 @@ from .models import (
     Komentarz,
     BazaRoslin,
     Kategoria,
-    AnalizaPielegnacji,
 )
 
 from .forms import (
@@ -36,9 +40,16 @@ from .forms import (
     BazaRoslinForm,
     WyszukiwarkaRoslinForm,
     WykonajPrzypomnienieForm,
+    ImportHistoriiForm,
 )
 
-from .ml_utils import zaktualizuj_analize_rosliny
+from .dashboard import podsumowanie_dashboardu
+from .kalendarz import etag_zdarzen, json_zdarzen, wersja_danych
+from .ml_utils import zaktualizuj_analize_rosliny, statystyki_treningow
+from .import_historii import KOLUMNY, MAKS_ROZMIAR_PLIKU, importuj_plik
+from .karty import karty, karty_wg_id, zapytanie_kart
+from .przypomnienia import przelicz_terminy_powiadomien
+from .stronicowanie import BlednyKursor, stronicuj
 
 logger = logging.getLogger(__name__)
 
@@ -50,24 +61,7 @@ logger = logging.getLogger(__name__)
 def strona_glowna(request):
     """Strona główna - dashboard użytkownika"""
     if request.user.is_authenticated:
-        rosliny = Roslina.objects.filter(wlasciciel=request.user, is_active=True)
-        rosliny_do_podlania = [r for r in rosliny if r.czy_potrzebuje_podlewania()]
-        ostatnie_czynnosci = CzynoscPielegnacyjna.objects.filter(
-            uzytkownik=request.user
-        ).order_by('-data')[:5]
-
-        pilne_przypomnienia = Przypomnienie.objects.filter(
-            uzytkownik=request.user,
-            status__in=['oczekujace', 'wyslane'],
-            data_przypomnienia__lte=timezone.now() + timedelta(hours=24)
-        ).order_by('data_przypomnienia')[:5]
-
-        context = {
-            'liczba_roslin': rosliny.count(),
-            'rosliny_do_podlania': len(rosliny_do_podlania),
-            'ostatnie_czynnosci': ostatnie_czynnosci,
-            'pilne_przypomnienia': pilne_przypomnienia,
-        }
+        context = podsumowanie_dashboardu(request.user)
     else:
         context = {}
 
@@ -128,6 +122,8 @@ def profil(request):
         if form.is_valid():
             form.save()
             request.user.save()
+            if "godzina_powiadomien" in form.changed_data:
+                przelicz_terminy_powiadomien([request.user.id])
             messages.success(request, "Profil został zaktualizowany pomyślnie!")
             return redirect("profil")
         else:
@@ -141,20 +137,65 @@ def profil(request):
 # ROŚLINY - CRUD
 # ============================================
 
+# sortowanie listy roślin -> klucze stronicowania (ostatni unikalny); każde ma indeks w Roslina.Meta
+SORTOWANIA_ROSLIN = {
+    'nowe': [('data_dodania', True), ('id', True)],
+    'nazwa': [('nazwa', False), ('id', False)],
+    'podlewanie': [('nastepne_podlewanie', False), ('id', False)],
+}
+ROZMIAR_STRONY_ROSLIN = 24
+
+
 @login_required
 def lista_roslin(request):
-    """Lista wszystkich roślin użytkownika"""
+    """Lista roślin użytkownika – stronicowana po kluczu, z filtrami i sortowaniem"""
     rosliny = Roslina.objects.filter(wlasciciel=request.user, is_active=True)
+    lokalizacje = list(
+        rosliny.exclude(lokalizacja='').order_by('lokalizacja').values_list('lokalizacja', flat=True).distinct()
+    )
 
-    search = request.GET.get('search')
+    search = request.GET.get('search', '').strip()
     if search:
         rosliny = rosliny.filter(
             Q(nazwa__icontains=search) | Q(gatunek__icontains=search)
         )
+    lokalizacja = request.GET.get('lokalizacja', '')
+    if lokalizacja:
+        rosliny = rosliny.filter(lokalizacja=lokalizacja)
+    kategoria = request.GET.get('kategoria', '')
+    if kategoria:
+        rosliny = rosliny.filter(kategoria=kategoria)
+    tylko_do_podlania = request.GET.get('do_podlania') == '1'
+    if tylko_do_podlania:
+        rosliny = rosliny.filter(Roslina.warunek_do_podlania())
+
+    sortowanie = request.GET.get('sort', 'nowe')
+    if sortowanie not in SORTOWANIA_ROSLIN:
+        sortowanie = 'nowe'
+
+    rosliny = zapytanie_kart(rosliny)
+    try:
+        strona = stronicuj(
+            rosliny, SORTOWANIA_ROSLIN[sortowanie], request.GET.get('kursor'), ROZMIAR_STRONY_ROSLIN
+        )
+    except BlednyKursor:
+        strona = stronicuj(rosliny, SORTOWANIA_ROSLIN[sortowanie], None, ROZMIAR_STRONY_ROSLIN)
+    strona.obiekty = karty(strona.obiekty)
 
+    parametry = request.GET.copy()
+    parametry.pop('kursor', None)
     context = {
-        'rosliny': rosliny,
+        'rosliny': strona,
         'search': search,
+        'lokalizacja': lokalizacja,
+        'lokalizacje': lokalizacje,
+        'kategoria': kategoria,
+        'kategorie': Roslina.KATEGORIE_ROSLIN,
+        'tylko_do_podlania': tylko_do_podlania,
+        'sortowanie': sortowanie,
+        'nastepna_strona': strona.nastepny,
+        'czy_kolejna_strona': 'kursor' in request.GET,
+        'parametry': parametry.urlencode(),
     }
     return render(request, 'bloomly/lista_roslin.html', context)
 
@@ -184,15 +225,26 @@ def _days_since(d):
     return (date.today() - d).days
 
 
+KLUCZE_HISTORII = [('data', True), ('id', True)]
+ROZMIAR_STRONY_HISTORII = 20
+
+
+def _podsumowanie_historii(historia):
+    """Liczba czynności każdego typu – jedno zapytanie agregujące."""
+    nazwy = dict(CzynoscPielegnacyjna.TYPY_CZYNNOSCI)
+    return [
+        {'typ': w['typ'], 'nazwa': nazwy.get(w['typ'], w['typ']), 'liczba': w['liczba']}
+        for w in historia.order_by().values('typ').annotate(liczba=Count('id')).order_by('-liczba', 'typ')
+    ]
+
+
 @login_required
 def szczegoly_rosliny(request, id):
     roslina = get_object_or_404(Roslina, pk=id, wlasciciel=request.user)
 
-    historia = (
-        CzynoscPielegnacyjna.objects
-        .filter(roslina=roslina)
-        .order_by("-data")
-    )
+    # pierwsza strona historii; kolejne dociąga historia_rosliny (kursor po (data, id))
+    historia = CzynoscPielegnacyjna.objects.filter(roslina=roslina)
+    czynnosci = stronicuj(historia, KLUCZE_HISTORII, rozmiar=ROZMIAR_STRONY_HISTORII)
 
     dni_od_ostatniego = _days_since(roslina.ostatnie_podlewanie)
     freq = roslina.czestotliwosc_podlewania or 7
@@ -201,8 +253,9 @@ def szczegoly_rosliny(request, id):
 
     return render(request, "bloomly/szczegoly_rosliny.html", {
         "roslina": roslina,
-        "historia": historia,
-        "czynnosci": historia,
+        "czynnosci": czynnosci,
+        "nastepna_strona_historii": czynnosci.nastepny,
+        "podsumowanie_historii": _podsumowanie_historii(historia),
         "dni_od_ostatniego": dni_od_ostatniego,
         "niedawno_podlana": niedawno_podlana,
         "do_podlania": do_podlania,
@@ -210,6 +263,26 @@ def szczegoly_rosliny(request, id):
     })
 
 
+@login_required
+@require_GET
+def historia_rosliny(request, id):
+    """Kolejna strona historii pielęgnacji (fragment HTML + kursor następnej strony)"""
+    roslina = get_object_or_404(Roslina, pk=id, wlasciciel=request.user)
+    try:
+        czynnosci = stronicuj(
+            CzynoscPielegnacyjna.objects.filter(roslina=roslina),
+            KLUCZE_HISTORII, request.GET.get('kursor'), ROZMIAR_STRONY_HISTORII,
+        )
+    except BlednyKursor:
+        return JsonResponse({'error': 'Nieprawidłowy kursor'}, status=400)
+
+    return JsonResponse({
+        'html': render_to_string('bloomly/historia_czynnosci.html', {'czynnosci': czynnosci}, request=request),
+        'nastepny': czynnosci.nastepny,
+        'liczba': len(czynnosci),
+    })
+
+
 @login_required
 def edytuj_roslina(request, id):
     """Edycja rośliny"""
@@ -276,9 +349,7 @@ def podlej_roslina(request, id):
 
          
             try:
-                liczba_podlan = CzynoscPielegnacyjna.objects.filter(
-                    roslina=roslina, typ='podlewanie', wykonane=True
-                ).count()
+                liczba_podlan = roslina.liczba_podlan
                 if liczba_podlan >= 5:
                     zaktualizuj_analize_rosliny(roslina)
                     logger.info(f"Zaktualizowano analizę ML dla {roslina.nazwa}")
@@ -295,6 +366,39 @@ def podlej_roslina(request, id):
     return render(request, 'bloomly/podlej_roslina.html', {'form': form, 'roslina': roslina})
 
 
+@login_required
+def import_historii(request):
+    """Import historii podlewań z pliku CSV / NDJSON (pakietami, bez zapisu wiersz po wierszu)"""
+    raport = None
+    if request.method == "POST":
+        form = ImportHistoriiForm(request.POST, request.FILES)
+        if form.is_valid() and request.FILES["plik"].size > MAKS_ROZMIAR_PLIKU:
+            form.add_error(
+                "plik", f"Plik jest za duży (maks. {MAKS_ROZMIAR_PLIKU // (1024 * 1024)} MB) – podziel go na części."
+            )
+        elif form.is_valid():
+            raport = importuj_plik(
+                request.FILES["plik"], request.user, format=form.cleaned_data["format"] or None
+            )
+            if raport["blad_pliku"]:
+                form.add_error("plik", f"Nie udało się odczytać pliku: {raport['blad_pliku']}.")
+            if raport["zaimportowane"]:
+                messages.success(
+                    request,
+                    f"Zaimportowano {raport['zaimportowane']} czynności dla {raport['rosliny']} roślin.",
+                )
+            else:
+                messages.warning(request, "Nie zaimportowano żadnych nowych czynności.")
+    else:
+        form = ImportHistoriiForm()
+
+    return render(request, "bloomly/import_historii.html", {
+        "form": form,
+        "raport": raport,
+        "kolumny": KOLUMNY,
+    })
+
+
 @login_required
 def dodaj_czynnosc(request, id):
     """Dodawanie dowolnej czynności pielęgnacyjnej"""
@@ -327,11 +431,7 @@ def dodaj_czynnosc(request, id):
 
             
                 try:
-                    liczba_podlan = CzynoscPielegnacyjna.objects.filter(
-                        roslina=roslina,
-                        typ="podlewanie",
-                        wykonane=True,
-                    ).count()
+                    liczba_podlan = roslina.liczba_podlan
                     if liczba_podlan >= 5:
                         zaktualizuj_analize_rosliny(roslina)
                 except Exception as e:
@@ -379,11 +479,7 @@ def oznacz_podlanie(request, id):
         roslina.save()
 
        
-        liczba_podlan = CzynoscPielegnacyjna.objects.filter(
-            roslina=roslina,
-            typ='podlewanie',
-            wykonane=True
-        ).count()
+        liczba_podlan = roslina.liczba_podlan
 
         ml_zaktualizowane = False
         if liczba_podlan >= 5:
@@ -419,44 +515,56 @@ def oznacz_podlanie(request, id):
 # ============================================
 # PRZYPOMNIENIA
 # ============================================
+
+# widok feedu -> klucze stronicowania; oba mają indeks w Przypomnienie.Meta
+KLUCZE_PRZYPOMNIEN = {
+    "upcoming": [("data_przypomnienia", False), ("id", False)],
+    "done": [("data_wykonania", True), ("id", True)],
+}
+ROZMIAR_STRONY_PRZYPOMNIEN = 50
+
+
 @login_required
 def lista_przypomnie(request):
     """Feed przypomnień"""
-    mode = request.GET.get("view", "upcoming")
+    mode = "done" if request.GET.get("view") == "done" else "upcoming"
     now = timezone.localtime(timezone.now())
 
+    base_qs = Przypomnienie.objects.filter(uzytkownik=request.user)
 
-    base_qs = (
-        Przypomnienie.objects
-        .filter(uzytkownik=request.user)
-        .select_related("roslina")
+    counts = base_qs.aggregate(
+        all=Count("id"),
+        upcoming=Count("id", filter=Q(status="oczekujace")),
+        done=Count("id", filter=Q(status="wykonane")),
     )
 
-    counts = {
-        "all": base_qs.count(),
-        "upcoming": base_qs.filter(status="oczekujace").count(),
-        "done": base_qs.filter(status="wykonane").count(),
-    }
-
-    if mode == "done":
-        przypomnienia = (
-            base_qs.filter(status="wykonane")
-            .order_by("-data_wykonania")[:200]
-        )
-    else:
-        przypomnienia = (
-            base_qs.filter(status="oczekujace")
-            .order_by("data_przypomnienia")[:200]
+    feed = base_qs.filter(status="wykonane" if mode == "done" else "oczekujace").annotate(
+        # dni kalendarzowe (czas lokalny) do terminu, liczone w SQL
+        do_terminu=ExpressionWrapper(
+            TruncDate("data_przypomnienia") - Value(now.date(), output_field=DateField()),
+            output_field=DurationField(),
         )
+    )
+    klucze = KLUCZE_PRZYPOMNIEN[mode]
+    try:
+        strona = stronicuj(feed, klucze, request.GET.get("kursor"), ROZMIAR_STRONY_PRZYPOMNIEN)
+    except BlednyKursor:
+        strona = stronicuj(feed, klucze, None, ROZMIAR_STRONY_PRZYPOMNIEN)
+
+    karty_roslin = karty_wg_id(p.roslina_id for p in strona)
+    for p in strona:
+        p.karta = karty_roslin[p.roslina_id]
 
     return render(
         request,
         "bloomly/lista_przypomnie.html",
         {
-            "przypomnienia": przypomnienia,
+            "przypomnienia": strona,
             "mode": mode,
             "counts": counts,
             "now": now,
+            "nastepna_strona": strona.nastepny,
+            "czy_kolejna_strona": "kursor" in request.GET,
         },
     )
 
@@ -517,9 +625,7 @@ def wykonaj_przypomnienie(request, id):
 
         
             try:
-                liczba_podlan = CzynoscPielegnacyjna.objects.filter(
-                    roslina=roslina, typ="podlewanie", wykonane=True
-                ).count()
+                liczba_podlan = roslina.liczba_podlan
                 if liczba_podlan >= 5:
                     zaktualizuj_analize_rosliny(roslina)
                     logger.info(f"Zaktualizowano ML dla {roslina.nazwa}")
@@ -593,7 +699,7 @@ def forum_home(request):
 
     posty = (
         Post.objects.filter(status="published")
-        .select_related("autor", "kategoria")
+        .select_related("autor__profiluzytkownika", "kategoria")
         .annotate(num_comments=Count("komentarz"))
     )
 
@@ -638,7 +744,7 @@ def forum_kategoria(request, slug):
 @login_required
 def forum_post(request, slug):
     """Szczegóły posta + komentarze"""
-    post = get_object_or_404(Post, slug=slug)
+    post = get_object_or_404(Post.objects.select_related("autor__profiluzytkownika"), slug=slug)
 
     session_key = f"seen_post_{post.pk}"
     if not request.session.get(session_key, False):
@@ -659,7 +765,7 @@ def forum_post(request, slug):
     else:
         komentarz_form = KomentarzForm()
 
-    komentarze = post.komentarz_set.select_related("autor").all()
+    komentarze = post.komentarz_set.select_related("autor__profiluzytkownika").all()
 
     return render(
         request,
@@ -864,118 +970,78 @@ def baza_roslin_edytuj(request, slug):
 
 @login_required
 def analiza_ml_rosliny(request, id):
-    roslina = get_object_or_404(Roslina, pk=id, wlasciciel=request.user)
+    """Analiza ML rośliny – render z migawki ostatniego przebiegu analizy (GET bez zapisów)"""
+    roslina = get_object_or_404(Roslina.objects.select_related('analiza'), pk=id, wlasciciel=request.user)
+    analiza = getattr(roslina, 'analiza', None)
 
-    analiza, created = AnalizaPielegnacji.objects.get_or_create(
-        roslina=roslina,
-        defaults={'uzytkownik': request.user}
-    )
-
-
-    podlewania = CzynoscPielegnacyjna.objects.filter(
-        roslina=roslina,
-        typ='podlewanie'
-    ).order_by('data')
-
-
-    interwaly = []
-    if podlewania.count() >= 2:
-        podlewania_list = list(podlewania.values_list('data', flat=True))
-        for i in range(1, len(podlewania_list)):
-            dni = (podlewania_list[i] - podlewania_list[i - 1]).days
-            if 0 < dni <= 60: 
-                interwaly.append(dni)
-
-    
-    wzorce = {}
-    if interwaly:
-        import statistics
-        wzorce['interwaly'] = interwaly
-        wzorce['srednia'] = statistics.mean(interwaly)
-        wzorce['mediana'] = statistics.median(interwaly)
-        wzorce['odchylenie'] = statistics.stdev(interwaly) if len(interwaly) > 1 else 0
-    else:
-        wzorce['interwaly'] = []
-
-   
-    if analiza.typ_modelu:  
-        wzorce['typ_modelu'] = analiza.typ_modelu
-        wzorce['n_samples'] = analiza.liczba_podlan
-        wzorce['cv_mae'] = analiza.cv_mae
-        wzorce['mae'] = analiza.mae
-        wzorce['rmse'] = analiza.rmse
-        wzorce['r2'] = analiza.r2_score
-
- 
-        wzorce['pewnosc_modelu'] = analiza.pewnosc_model
-        wzorce['pewnosc_regularnosci'] = analiza.pewnosc_regularnosc
-        wzorce['pewnosc_gleby'] = analiza.pewnosc_biologia
-        wzorce['pewnosc_wody'] = analiza.pewnosc_biologia
-
-    podlewania_z_godzinami = CzynoscPielegnacyjna.objects.filter(
-        roslina=roslina,
-        typ='podlewanie'
-    ).exclude(data__isnull=True)
-
-    pory = {
-        'rano': 0,
-        'popoludniu': 0,
-        'wieczorem': 0,
-        'preferowana_pora': None
-    }
-
-    for p in podlewania_z_godzinami:
-        godzina = p.data.hour
-        if 6 <= godzina < 12:
-            pory['rano'] += 1
-        elif 12 <= godzina < 18:
-            pory['popoludniu'] += 1
-        elif 18 <= godzina < 24:
-            pory['wieczorem'] += 1
-
-    max_count = max(pory['rano'], pory['popoludniu'], pory['wieczorem'])
-    if max_count > 0:
-        if pory['rano'] == max_count:
-            pory['preferowana_pora'] = 'rano'
-        elif pory['popoludniu'] == max_count:
-            pory['preferowana_pora'] = 'popoludniu'
-        elif pory['wieczorem'] == max_count:
-            pory['preferowana_pora'] = 'wieczorem'
-
-    if request.method == 'POST' and 'zastosuj' in request.POST:
-        if analiza.rekomendowana_czestotliwosc:
+    if request.method == 'POST':
+        if 'przelicz' in request.POST:
+            zaktualizuj_analize_rosliny(roslina)
+            messages.success(request, 'Analiza została przeliczona.')
+            return redirect('analiza_ml_rosliny', id=roslina.id)
+        if 'zastosuj' in request.POST and analiza and analiza.rekomendowana_czestotliwosc:
             roslina.czestotliwosc_podlewania = analiza.rekomendowana_czestotliwosc
             roslina.save()
             messages.success(request,
                              f'Częstotliwość podlewania zaktualizowana na {analiza.rekomendowana_czestotliwosc} dni!')
             return redirect('analiza_ml_rosliny', id=roslina.id)
 
-    context = {
+    migawka = analiza.migawka if analiza else {}
+    # strona zależy od migawki (data_aktualizacji) i ustawień rośliny pokazywanych obok niej
+    etag = None
+    if migawka:
+        # strona zawiera formularze z {% csrf_token %} – po ponownym logowaniu (nowy sekret CSRF)
+        # kopia z cache przeglądarki miałaby nieważny token, więc sekret wchodzi do ETagu; bez
+        # Last-Modified, bo samo If-Modified-Since oddałoby 304 mimo zmienionego sekretu
+        etag = (f'"{analiza.pk}-{analiza.data_aktualizacji.timestamp()}-{roslina.czestotliwosc_podlewania}'
+                f'-{_odcisk_csrf(request)}"')
+        if request.method == 'GET':
+            odpowiedz = get_conditional_response(request, etag=etag)
+            if odpowiedz is not None:
+                return _naglowki_walidacji(odpowiedz, etag)
+
+    wzorce = {k: v for k, v in migawka.items() if k not in ('pory', 'metryki')}
+    wzorce.update(migawka.get('metryki', {}))
+
+    response = render(request, 'bloomly/analiza_ml.html', {
         'roslina': roslina,
-        'analiza': analiza,
-        'wzorce': wzorce, 
-        'pory': pory,
-    }
+        'analiza': analiza if migawka else None,
+        'wzorce': wzorce,
+        'pory': migawka.get('pory', {}),
+    })
+    if etag:
+        _naglowki_walidacji(response, etag)
+    return response
+
+
+def _odcisk_csrf(request):
+    """Krótki skrót sekretu CSRF żądania (bez ujawniania sekretu w nagłówku)."""
+    get_token(request)
+    sekret = request.META.get('CSRF_COOKIE', '')
+    return hashlib.sha256(sekret.encode()).hexdigest()[:12]
+
+
+def _naglowki_walidacji(response, etag):
+    """ETag + prywatny cache z obowiązkową rewalidacją (strony per użytkownik)."""
+    response.headers['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
 
-    return render(request, 'bloomly/analiza_ml.html', context)
 
 @login_required
 def dashboard_analityczny(request):
     """Dashboard z analizami dla wszystkich roślin"""
     rosliny = Roslina.objects.filter(wlasciciel=request.user, is_active=True)
+    analizy = karty(zapytanie_kart(rosliny, z_przypomnieniami=False))
 
-    analizy = []
-    for roslina in rosliny:
-        try:
-            analiza = AnalizaPielegnacji.objects.get(roslina=roslina, uzytkownik=request.user)
-        except AnalizaPielegnacji.DoesNotExist:
-            wynik = zaktualizuj_analize_rosliny(roslina)
-            analiza = wynik['analiza']
-
-        analizy.append({
-            'roslina': roslina,
-            'analiza': analiza,
-        })
+    # brak analizy (albo policzona przez kogoś innego) -> przeliczenie, jak dotąd
+    brakujace = {
+        k.id: k for k in analizy
+        if k.analiza is None or k.analiza.uzytkownik_id != request.user.id
+    }
+    if brakujace:
+        for roslina in rosliny.filter(pk__in=list(brakujace)):
+            brakujace[roslina.id].analiza = zaktualizuj_analize_rosliny(roslina)['analiza']
 
     total_podlania = CzynoscPielegnacyjna.objects.filter(
         uzytkownik=request.user,
@@ -986,11 +1052,33 @@ def dashboard_analityczny(request):
     context = {
         'analizy': analizy,
         'total_podlania': total_podlania,
-        'liczba_roslin': rosliny.count(),
+        'liczba_roslin': len(analizy),
     }
     return render(request, 'bloomly/dashboard_analityczny.html', context)
 
 
+@login_required
+@require_GET
+def statystyki_treningow_json(request):
+    """
+    Telemetria trenowania/analizy modeli (tylko staff):
+    ?godziny=24&rodzaj=trening|analiza
+    """
+    if not request.user.is_staff:
+        return JsonResponse({'error': 'Brak uprawnień'}, status=403)
+
+    try:
+        godziny = max(1, min(int(request.GET.get('godziny', 24)), 24 * 30))
+    except ValueError:
+        return JsonResponse({'error': 'Nieprawidłowy parametr godziny'}, status=400)
+
+    rodzaj = request.GET.get('rodzaj', 'trening')
+    if rodzaj not in ('trening', 'analiza'):
+        return JsonResponse({'error': 'Nieprawidłowy parametr rodzaj'}, status=400)
+
+    return JsonResponse(statystyki_treningow(godziny=godziny, rodzaj=rodzaj))
+
+
 # ============================================
 # KALENDARZ
 # ============================================
@@ -1001,10 +1089,6 @@ def kalendarz_pielegnacji(request):
     return render(request, 'bloomly/kalendarz.html')
 
 
-def _model_has_field(model, field_name: str) -> bool:
-    return field_name in {f.name for f in model._meta.get_fields()}
-
-
 def _safe_dt(s: Optional[str]) -> Optional[datetime]:
     """ISO -> TZ-aware datetime"""
     if not s:
@@ -1019,138 +1103,23 @@ def _safe_dt(s: Optional[str]) -> Optional[datetime]:
     return dt
 
 
-def _get_user_plant_ids(user):
-    """Zwróć ID roślin użytkownika"""
-    fields = {f.name for f in Roslina._meta.get_fields()}
-    filt = {}
-    if "wlasciciel" in fields:
-        filt["wlasciciel"] = user
-    elif "owner" in fields:
-        filt["owner"] = user
-    elif "user" in fields:
-        filt["user"] = user
-    else:
-        return list(Roslina.objects.values_list("id", flat=True))
-    return list(Roslina.objects.filter(**filt).values_list("id", flat=True))
-
-
-def _first_existing_attr(obj, candidates, default=None):
-    for name in candidates:
-        if hasattr(obj, name):
-            val = getattr(obj, name)
-            if val is not None:
-                return val
-    return default
-
-
 @login_required
 @require_GET
 def kalendarz_events_json(request):
-    """Zdarzenia dla FullCalendar"""
-    user = request.user
+    """Zdarzenia dla FullCalendar (cache per okno + ETag)"""
+    uid = request.user.pk
 
     start = _safe_dt(request.GET.get("start"))
     end = _safe_dt(request.GET.get("end"))
     if not start or not end:
-        now = timezone.now()
-        start = now - timedelta(days=60)
-        end = now + timedelta(days=60)
-
-    plant_ids = _get_user_plant_ids(user)
-
-    events = []
-
-    REMINDER_COLORS = {
-        "oczekujace": ("#ffcc33", "#ffcc33", "#000000"),
-        "wyslane": ("#81c784", "#81c784", "#ffffff"),
-        "wykonane": ("#43a047", "#43a047", "#ffffff"),
-        "odlozone": ("#7986cb", "#7986cb", "#ffffff"),
-    }
-
-    HISTORY_COLORS = {
-        "podlewanie": ("#38B0DE", "#38B0DE", "#ffffff"),
-        "nawozenie": ("#f48fb1", "#f48fb1", "#ffffff"),
-        "przycinanie": ("#ff8a65", "#ff8a65", "#ffffff"),
-        "przesadzanie": ("#a1887f", "#a1887f", "#ffffff"),
-        "_default": ("#CED4DA", "#CED4DA", "#1F2D3D"),
-    }
-
-    ALLOWED_STATUSES = {"oczekujace", "wyslane", "odlozone"}
-    reminder_date_fields = ["data_przypomnienia", "termin", "data", "scheduled_for", "due_at", "due_on"]
-
-    przyp_qs = (
-        Przypomnienie.objects
-        .select_related("roslina")
-        .filter(roslina_id__in=plant_ids, status__in=ALLOWED_STATUSES)
-    )
-
-    filtered_przyp = []
-    for r in przyp_qs:
-        dt = _first_existing_attr(r, reminder_date_fields)
-        if not dt:
-            continue
-        if timezone.is_naive(dt):
-            dt = timezone.make_aware(dt)
-        if start <= dt <= end:
-            filtered_przyp.append((r, dt))
-
-    for r, dt in filtered_przyp:
-        status = getattr(r, "status", "oczekujace")
-        bg, bd, fg = REMINDER_COLORS.get(status, REMINDER_COLORS["oczekujace"])
-        title = (
-                _first_existing_attr(r, ["tytul"], None)
-                or (r.get_typ_display() if hasattr(r, "get_typ_display") else str(
-            _first_existing_attr(r, ["typ"], "Przypomnienie")))
-        )
-        events.append({
-            "id": f"rem-{r.pk}",
-            "title": f"🔔 {title} • {r.roslina.nazwa}",
-            "start": timezone.localtime(dt).isoformat(),
-            "allDay": False,
-            "url": reverse("szczegoly_rosliny", args=[r.roslina_id]) if hasattr(r, "roslina_id") else None,
-            "backgroundColor": bg,
-            "borderColor": bd,
-            "textColor": fg,
-            "extendedProps": {
-                "kind": "reminder",
-                "status": status,
-                "roslina": r.roslina.nazwa,
-            },
-        })
-
-
-    history_qs = CzynoscPielegnacyjna.objects.select_related("roslina").filter(
-        roslina_id__in=plant_ids, data__range=(start, end))
-
-    for c in history_qs:
-        typ = getattr(c, "typ", None) or "_default"
-        bg, bd, fg = HISTORY_COLORS.get(typ, HISTORY_COLORS["_default"])
-        typ_txt = c.get_typ_display() if hasattr(c, "get_typ_display") else str(typ).capitalize()
-
-        bits = []
-        if getattr(c, "ilosc_wody", None):
-            bits.append(f"{c.ilosc_wody} ml")
-        if getattr(c, "stan_gleby", None):
-            bits.append(c.get_stan_gleby_display() if hasattr(c, "get_stan_gleby_display") else str(c.stan_gleby))
-        subtitle = f" • {' • '.join(bits)}" if bits else ""
-
-        events.append({
-            "id": f"hist-{c.pk}",
-            "title": f"🌿 {typ_txt} • {c.roslina.nazwa}{subtitle}",
-            "start": timezone.localtime(c.data).isoformat(),
-            "allDay": False,
-            "url": reverse("szczegoly_rosliny", args=[c.roslina_id]),
-            "backgroundColor": bg,
-            "borderColor": bd,
-            "textColor": fg,
-            "extendedProps": {
-                "kind": "history",
-                "typ": typ,
-                "roslina": c.roslina.nazwa,
-                "notatki": getattr(c, "notatki", "") or "",
-                "ilosc_wody": getattr(c, "ilosc_wody", None),
-                "stan_gleby": getattr(c, "stan_gleby", None),
-            },
-        })
-
-    return JsonResponse(events, safe=False)
+        # domyślne okno wyrównane do dni, żeby kolejne zapytania trafiały w ten sam wpis cache
+        dzis = timezone.make_aware(datetime.combine(timezone.localdate(), time.min))
+        start = dzis - timedelta(days=60)
+        end = dzis + timedelta(days=60)
+
+    wersja = wersja_danych(uid)
+    etag = etag_zdarzen(uid, wersja, start, end)
+    odpowiedz = get_conditional_response(request, etag=etag)
+    if odpowiedz is None:
+        odpowiedz = HttpResponse(json_zdarzen(uid, wersja, start, end), content_type="application/json")
+    return _naglowki_walidacji(odpowiedz, etag)
@@ -262,15 +262,24 @@ LOGS_DIR.mkdir(exist_ok=True)
 # CACHE
 # ============================================
 
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
-        'LOCATION': 'redis://127.0.0.1:6379/1',
-        'OPTIONS': {
-            'db': 1,
+if 'test' in sys.argv:
+    # testy nie mogą dzielić cache (te same id w kolejnych bazach testowych);
+    # testy cache włączają LocMemCache przez override_settings
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': 'redis://127.0.0.1:6379/1',
+            'OPTIONS': {
+                'db': 1,
+            }
         }
     }
-}
 
 # ============================================
 # CUSTOM SETTINGS
@@ -279,6 +288,55 @@ CACHES = {
 ML_MIN_SAMPLES = 8
 ML_MIN_CONFIDENCE = 0.6
 ML_RETRAIN_INTERVAL_DAYS = 2
+# Wybór silnika ML: najtańszy model, którego CV MAE jest gorsze od najlepszego o maks. tyle dni
+ML_MAE_TOLERANCE_DAYS = 0.5
 
 NOTIFICATION_ADVANCE_HOURS = 24
-MAX_REMINDERS_PER_DAY = 10
\ No newline at end of file
+# Ile sekund żyje podsumowanie strony głównej w cache (bloomly.dashboard)
+DASHBOARD_CACHE_TTL = 300
+# Maks. rozmiar pliku importu historii obsługiwanego w żądaniu (bloomly.import_historii)
+IMPORT_HISTORII_MAX_BYTES = 10 * 1024 * 1024
+# Maks. czas życia JSON-a zdarzeń kalendarza w cache (bloomly.kalendarz; unieważniany wersją)
+KALENDARZ_CACHE_TTL = 3600
+MAX_REMINDERS_PER_DAY = 10
+
+# Magazyn artefaktów ML (bloomly.ml_storage) – współdzielony przez węzły web/worker.
+# Alternatywy:
+#   {'BACKEND': 'bloomly.ml_storage.DatabaseArtifactStore'}
+#   {'BACKEND': 'bloomly.ml_storage.S3ArtifactStore',
+#    'OPTIONS': {'bucket': 'bloomly-ml', 'endpoint_url': 'http://minio:9000'}}
+ML_ARTIFACT_STORE = {
+    'BACKEND': 'bloomly.ml_storage.LocalArtifactStore',
+    'OPTIONS': {
+        'root': BASE_DIR / 'ml_models',
+    },
+}
+ML_ARTIFACT_CACHE_DIR = BASE_DIR / 'ml_models' / 'cache'
+# Ile wczytanych modeli trzyma w pamięci jeden proces (LRU wg digestu)
+ML_ARTIFACT_MEMORY_CACHE_SIZE = 128
+
+# Odświeżanie przypomnień: liczba roślin na jedno zadanie Celery (0 = zadanie na roślinę)
+REMINDER_REFRESH_CHUNK_SIZE = 200
+# Rośliny bez zmian są i tak przeliczane rotacyjnie raz na tyle dni
+REMINDER_SWEEP_DAYS = 7
+# E-maile z przypomnieniami: godzina wysyłki, gdy nie wynika z profilu ani z pór podlewania,
+# rozrzut minut per użytkownik i limit e-maili (zestawień) na jedno tyknięcie tickera
+REMINDER_SEND_HOUR = 9
+REMINDER_SEND_JITTER_MINUTES = 60
+REMINDER_EMAILS_PER_MINUTE = 200
+
+# Retencja danych (bloomly.retencja, zadanie retencja_danych): dni przechowywania
+# per polityka (None = wyłączona), rozmiar pakietu DELETE i pauza między pakietami
+DATA_RETENTION_DAYS = {
+    'przypomnienia': 90,   # wykonane / anulowane
+    'wyniki_celery': 30,   # django_celery_results.TaskResult
+    'sesje': 0,            # wygasłe sesje
+    'outbox': 30,          # wysłane e-maile
+    'artefakty_ml': 1,     # bloby/cache modeli ML, na które nie wskazuje żaden ref
+}
+DATA_RETENTION_CHUNK_SIZE = 1000
+DATA_RETENTION_PAUSE_S = 0.1
+DATA_RETENTION_TIME_BUDGET_S = 20 * 60
+
+# Migawka zbioru treningowego (.npy, manage.py eksportuj_dane_ml)
+ML_DATASET_DIR = BASE_DIR / 'ml_dataset'